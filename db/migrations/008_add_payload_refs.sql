@@ -0,0 +1,24 @@
+-- Migration: Add payload store references to rule_requests and test_case_executions
+-- Purpose: Large KIE request/response payloads are stored as compressed, content-addressed
+--          blobs (local directory or S3) instead of inline JSONB. The row keeps the blob reference.
+-- Date: 2026-10-18
+
+ALTER TABLE rule_requests
+    ADD COLUMN IF NOT EXISTS request_payload_ref VARCHAR(80),
+    ADD COLUMN IF NOT EXISTS response_payload_ref VARCHAR(80);
+
+ALTER TABLE test_case_executions
+    ADD COLUMN IF NOT EXISTS request_payload_ref VARCHAR(80),
+    ADD COLUMN IF NOT EXISTS response_payload_ref VARCHAR(80);
+
+COMMENT ON COLUMN rule_requests.request_payload_ref IS 'Payload store reference (<codec>:<sha256>) when request_payload was offloaded';
+COMMENT ON COLUMN rule_requests.response_payload_ref IS 'Payload store reference (<codec>:<sha256>) when response_payload was offloaded';
+COMMENT ON COLUMN test_case_executions.request_payload_ref IS 'Payload store reference (<codec>:<sha256>) when request_payload was offloaded';
+COMMENT ON COLUMN test_case_executions.response_payload_ref IS 'Payload store reference (<codec>:<sha256>) when response_payload was offloaded';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 008 completed successfully!';
+    RAISE NOTICE 'Added columns: request_payload_ref, response_payload_ref to rule_requests and test_case_executions';
+END $$;
@@ -0,0 +1,18 @@
+-- Rollback Migration 008: Remove payload store references
+-- Date: 2026-10-18
+-- Note: rows whose payloads were offloaded keep NULL JSONB payloads after rollback.
+
+ALTER TABLE rule_requests
+    DROP COLUMN IF EXISTS request_payload_ref,
+    DROP COLUMN IF EXISTS response_payload_ref;
+
+ALTER TABLE test_case_executions
+    DROP COLUMN IF EXISTS request_payload_ref,
+    DROP COLUMN IF EXISTS response_payload_ref;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 008 completed successfully!';
+    RAISE NOTICE 'Removed columns: request_payload_ref, response_payload_ref';
+END $$;
@@ -0,0 +1,56 @@
+-- Migration: Add composite and partial indexes for the hot read queries
+-- Purpose: The per-request and per-page lookups all filter on (bank_id, policy_type_id, is_active = true)
+--          and then sort. The single-column indexes from migrations 001-004 force the planner to combine
+--          bitmaps and sort afterwards; these indexes match the filter, the partial predicate and the
+--          ORDER BY so the lookups become a single ordered index range scan.
+-- Verify with: python3 rule-agent/benchmark_query_plans.py
+-- Date: 2026-10-18
+--
+-- Note: on a busy production database run each CREATE INDEX below as CREATE INDEX CONCURRENTLY
+--       (outside a transaction block) to avoid holding write locks while the index builds.
+
+-- get_active_container / get_active_container_summary (bank + policy, active only) is already served by
+-- the partial unique index idx_unique_active_container from init.sql, so no new index is added for it.
+
+-- list_containers_page / iter_containers: keyset order (deployed_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_containers_deployed_at_id
+    ON rule_containers(deployed_at DESC, id DESC);
+
+-- get_hierarchical_rules: bank + policy, active only, ORDER BY level, order_index
+CREATE INDEX IF NOT EXISTS idx_hierarchical_rules_active_tree
+    ON hierarchical_rules(bank_id, policy_type_id, level, order_index)
+    WHERE is_active = true;
+
+-- get_extraction_queries: bank + policy + document_hash, active only, ORDER BY query_order
+CREATE INDEX IF NOT EXISTS idx_extraction_queries_active_document
+    ON policy_extraction_queries(bank_id, policy_type_id, document_hash, query_order)
+    WHERE is_active = true;
+
+-- get_extracted_rules_page: bank + policy, active only, keyset order (COALESCE(category, ''), rule_name, id)
+CREATE INDEX IF NOT EXISTS idx_extracted_rules_active_listing
+    ON extracted_rules(bank_id, policy_type_id, (COALESCE(category, '')), rule_name, id)
+    WHERE is_active = true;
+
+-- get_test_cases / get_test_cases_page: bank + policy, active only, ORDER BY priority, created_at, id
+CREATE INDEX IF NOT EXISTS idx_test_cases_active_listing
+    ON test_cases(bank_id, policy_type_id, priority, created_at, id)
+    WHERE is_active = true;
+
+-- get_test_executions(test_case_id=...): ORDER BY executed_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_test_executions_case_executed_at
+    ON test_case_executions(test_case_id, executed_at DESC, id DESC);
+
+-- Refresh planner statistics so the new indexes are considered immediately
+ANALYZE rule_containers;
+ANALYZE hierarchical_rules;
+ANALYZE policy_extraction_queries;
+ANALYZE extracted_rules;
+ANALYZE test_cases;
+ANALYZE test_case_executions;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 009 completed successfully!';
+    RAISE NOTICE 'Added composite/partial indexes for container listing, hierarchical rules, extraction query, extracted rule, test case and test execution lookups';
+END $$;
@@ -0,0 +1,17 @@
+-- Rollback Migration 009: Remove hot query composite and partial indexes
+-- Date: 2026-10-18
+-- Note: the single-column indexes from migrations 001-004 are untouched and keep serving these queries.
+
+DROP INDEX IF EXISTS idx_test_executions_case_executed_at;
+DROP INDEX IF EXISTS idx_test_cases_active_listing;
+DROP INDEX IF EXISTS idx_extracted_rules_active_listing;
+DROP INDEX IF EXISTS idx_extraction_queries_active_document;
+DROP INDEX IF EXISTS idx_hierarchical_rules_active_tree;
+DROP INDEX IF EXISTS idx_containers_deployed_at_id;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 009 completed successfully!';
+    RAISE NOTICE 'Removed hot query composite/partial indexes';
+END $$;
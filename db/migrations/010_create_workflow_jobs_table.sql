@@ -0,0 +1,56 @@
+-- Migration: Create workflow_jobs table for asynchronous policy processing
+-- Purpose: /process_policy_from_s3 can queue the underwriting workflow as a background job.
+--          Each job row holds its input, status, per-step progress, final result and cancellation flag.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS workflow_jobs (
+    id SERIAL PRIMARY KEY,
+    job_id VARCHAR(36) NOT NULL UNIQUE, -- UUID returned to the client
+    job_type VARCHAR(50) NOT NULL DEFAULT 'process_policy',
+
+    -- Job input
+    bank_id VARCHAR(50),
+    policy_type_id VARCHAR(50),
+    s3_url TEXT,
+    params JSONB,
+
+    -- Progress
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    current_step VARCHAR(100),
+    steps JSONB DEFAULT '{}'::jsonb, -- step name -> step result, written as each workflow step finishes
+    cancel_requested BOOLEAN DEFAULT false,
+
+    -- Outcome
+    result JSONB,
+    error_message TEXT,
+    worker_pid INTEGER,
+
+    -- Timestamps
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT check_workflow_job_status CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_status ON workflow_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_bank_policy ON workflow_jobs(bank_id, policy_type_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_created_at ON workflow_jobs(created_at);
+
+DROP TRIGGER IF EXISTS trigger_update_workflow_jobs_timestamp ON workflow_jobs;
+CREATE TRIGGER trigger_update_workflow_jobs_timestamp
+    BEFORE UPDATE ON workflow_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+COMMENT ON TABLE workflow_jobs IS 'Background underwriting workflow jobs with per-step progress';
+COMMENT ON COLUMN workflow_jobs.steps IS 'Results of finished workflow steps keyed by step name';
+COMMENT ON COLUMN workflow_jobs.cancel_requested IS 'Set by the cancel endpoint; running jobs stop at the next step boundary';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 010 completed successfully!';
+    RAISE NOTICE 'Created table: workflow_jobs';
+END $$;
@@ -0,0 +1,13 @@
+-- Rollback Migration 010: Drop workflow_jobs table
+-- Date: 2026-10-18
+-- Warning: removes the history of all background workflow jobs.
+
+DROP TRIGGER IF EXISTS trigger_update_workflow_jobs_timestamp ON workflow_jobs;
+DROP TABLE IF EXISTS workflow_jobs;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 010 completed successfully!';
+    RAISE NOTICE 'Dropped table: workflow_jobs';
+END $$;
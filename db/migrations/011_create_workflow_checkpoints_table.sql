@@ -0,0 +1,32 @@
+-- Migration: Create workflow_checkpoints table for resumable policy processing
+-- Purpose: The underwriting workflow stores each step output (extracted text, analysis, Textract answers,
+--          schema, DRL, hierarchical rules, test cases) keyed by document hash, step and config hash,
+--          so a failed run can be resumed from its first incomplete step.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+    id SERIAL PRIMARY KEY,
+    document_hash VARCHAR(64) NOT NULL,
+    step VARCHAR(100) NOT NULL,
+    config_hash VARCHAR(64) NOT NULL, -- hash of the LLM settings and step inputs that produced the output
+
+    -- Step output (outputs above PAYLOAD_INLINE_MAX_BYTES live in the payload store)
+    output JSONB,
+    output_ref VARCHAR(80),
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflow_checkpoints_key
+    ON workflow_checkpoints(document_hash, step, config_hash);
+CREATE INDEX IF NOT EXISTS idx_workflow_checkpoints_created_at ON workflow_checkpoints(created_at);
+
+COMMENT ON TABLE workflow_checkpoints IS 'Per-step workflow outputs used to resume interrupted runs';
+COMMENT ON COLUMN workflow_checkpoints.config_hash IS 'A changed input or LLM setting yields a new hash, so stale outputs are never reused';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 011 completed successfully!';
+    RAISE NOTICE 'Created table: workflow_checkpoints';
+END $$;
@@ -0,0 +1,12 @@
+-- Rollback Migration 011: Drop workflow_checkpoints table
+-- Date: 2026-10-18
+-- Warning: removes all step checkpoints; the next run of every document starts from scratch.
+
+DROP TABLE IF EXISTS workflow_checkpoints;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 011 completed successfully!';
+    RAISE NOTICE 'Dropped table: workflow_checkpoints';
+END $$;
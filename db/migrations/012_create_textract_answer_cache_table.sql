@@ -0,0 +1,30 @@
+-- Migration: Create textract_answer_cache table
+-- Purpose: Textract answers are cached per document and query. Re-running a policy, or a slightly
+--          different LLM-generated query list, only submits queries not yet answered for that document.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS textract_answer_cache (
+    id SERIAL PRIMARY KEY,
+    document_hash VARCHAR(64) NOT NULL, -- SHA-256 of the document text
+    query_hash VARCHAR(64) NOT NULL, -- SHA-256 of the normalized (lowercased, whitespace-collapsed) query
+    query_text TEXT NOT NULL,
+
+    -- Textract QUERY_RESULT
+    answer TEXT,
+    confidence FLOAT,
+    page INTEGER,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_textract_answer_cache_key
+    ON textract_answer_cache(document_hash, query_hash);
+
+COMMENT ON TABLE textract_answer_cache IS 'Textract query answers reused across runs of the same document';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 012 completed successfully!';
+    RAISE NOTICE 'Created table: textract_answer_cache';
+END $$;
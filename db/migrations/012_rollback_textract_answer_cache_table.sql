@@ -0,0 +1,12 @@
+-- Rollback Migration 012: Drop textract_answer_cache table
+-- Date: 2026-10-18
+-- Warning: the next run of every document submits all of its queries to Textract again.
+
+DROP TABLE IF EXISTS textract_answer_cache;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 012 completed successfully!';
+    RAISE NOTICE 'Dropped table: textract_answer_cache';
+END $$;
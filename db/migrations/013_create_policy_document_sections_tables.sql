@@ -0,0 +1,48 @@
+-- Migration: Create policy_document_versions and policy_document_sections tables
+-- Purpose: A processed policy document is stored section by section (content hash, LLM analysis and
+--          generated DRL rules per section). Reprocessing a revised version of the same bank/policy
+--          only re-analyzes the sections whose text changed and reuses the rest.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS policy_document_versions (
+    id SERIAL PRIMARY KEY,
+    bank_id VARCHAR(50) NOT NULL REFERENCES banks(bank_id) ON DELETE CASCADE,
+    policy_type_id VARCHAR(50) NOT NULL REFERENCES policy_types(policy_type_id) ON DELETE CASCADE,
+    document_hash VARCHAR(64) NOT NULL, -- SHA-256 of the document text
+    source_document VARCHAR(500),
+
+    schema JSONB, -- Dynamic schema the section rules were generated against
+    section_count INTEGER DEFAULT 0,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS policy_document_sections (
+    id SERIAL PRIMARY KEY,
+    version_id INTEGER NOT NULL REFERENCES policy_document_versions(id) ON DELETE CASCADE,
+    section_order INTEGER NOT NULL,
+    section_key VARCHAR(300) NOT NULL, -- Section number + title, unique within a version
+    section_number VARCHAR(50),
+    section_title VARCHAR(255),
+    content_hash VARCHAR(64) NOT NULL, -- SHA-256 of the whitespace-normalized section text
+
+    analysis JSONB, -- {"policies": [...], "queries": [...]}
+    rule_body TEXT -- DRL rules generated from the section (no package/declare statements)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_policy_document_versions_key
+    ON policy_document_versions(bank_id, policy_type_id, document_hash);
+CREATE INDEX IF NOT EXISTS idx_policy_document_versions_latest
+    ON policy_document_versions(bank_id, policy_type_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_policy_document_sections_version
+    ON policy_document_sections(version_id, section_order);
+
+COMMENT ON TABLE policy_document_versions IS 'Processed policy document versions used for incremental reprocessing';
+COMMENT ON TABLE policy_document_sections IS 'Per-section analysis and DRL rules of a policy document version';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 013 completed successfully!';
+    RAISE NOTICE 'Created tables: policy_document_versions, policy_document_sections';
+END $$;
@@ -0,0 +1,13 @@
+-- Rollback Migration 013: Drop policy_document_versions and policy_document_sections tables
+-- Date: 2026-10-18
+-- Warning: the next incremental run of every policy processes all of its sections again.
+
+DROP TABLE IF EXISTS policy_document_sections;
+DROP TABLE IF EXISTS policy_document_versions;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 013 completed successfully!';
+    RAISE NOTICE 'Dropped tables: policy_document_sections, policy_document_versions';
+END $$;
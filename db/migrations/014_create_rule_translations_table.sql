@@ -0,0 +1,25 @@
+-- Migration: Create rule_translations table
+-- Purpose: Plain-English translations of DRL rules are cached by a hash of the normalized WHEN/THEN
+--          clauses, so unchanged rules are not sent to the LLM again on reprocessing or rule updates.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS rule_translations (
+    id SERIAL PRIMARY KEY,
+    clause_hash VARCHAR(64) NOT NULL, -- SHA-256 of the normalized WHEN/THEN clauses
+    model VARCHAR(100) NOT NULL,
+    requirement TEXT NOT NULL, -- Plain-English requirement statement
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rule_translations_key
+    ON rule_translations(clause_hash, model);
+
+COMMENT ON TABLE rule_translations IS 'Cached plain-English translations of DRL rules';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 014 completed successfully!';
+    RAISE NOTICE 'Created table: rule_translations';
+END $$;
@@ -0,0 +1,12 @@
+-- Rollback Migration 014: Drop rule_translations table
+-- Date: 2026-10-18
+-- Warning: every rule is translated by the LLM again on the next run.
+
+DROP TABLE IF EXISTS rule_translations;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 014 completed successfully!';
+    RAISE NOTICE 'Dropped table: rule_translations';
+END $$;
@@ -0,0 +1,62 @@
+-- Migration: Create llm_call_metrics and llm_run_metrics tables
+-- Purpose: Per-call LLM latency, token usage, retries and cost, attributed to agent and workflow
+--          step, plus one rollup per workflow run. Feeds the per-agent percentile endpoint.
+-- Date: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS llm_call_metrics (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) NOT NULL, -- Workflow run the call belongs to
+    agent VARCHAR(100),
+    step VARCHAR(100),
+    provider VARCHAR(50),
+    model VARCHAR(100),
+
+    latency_ms DOUBLE PRECISION NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    tokens_estimated BOOLEAN DEFAULT false, -- Provider did not report usage
+    retries INTEGER DEFAULT 0,
+    cached BOOLEAN DEFAULT false, -- Answered from the LLM response cache
+    status VARCHAR(20) NOT NULL DEFAULT 'success',
+    cost_usd DOUBLE PRECISION,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_call_metrics_agent_created
+    ON llm_call_metrics(agent, created_at);
+CREATE INDEX IF NOT EXISTS idx_llm_call_metrics_run
+    ON llm_call_metrics(run_id);
+
+CREATE TABLE IF NOT EXISTS llm_run_metrics (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) UNIQUE NOT NULL,
+    bank_id VARCHAR(50),
+    policy_type_id VARCHAR(50),
+    container_id VARCHAR(200),
+    document_hash VARCHAR(64),
+
+    total_calls INTEGER DEFAULT 0,
+    total_latency_ms DOUBLE PRECISION DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cost_usd DOUBLE PRECISION,
+    summary JSONB, -- Totals plus per-agent and per-step rollups
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_run_metrics_bank_policy
+    ON llm_run_metrics(bank_id, policy_type_id);
+CREATE INDEX IF NOT EXISTS idx_llm_run_metrics_created_at
+    ON llm_run_metrics(created_at);
+
+COMMENT ON TABLE llm_call_metrics IS 'Latency, tokens, retries and cost of each LLM call of a workflow run';
+COMMENT ON TABLE llm_run_metrics IS 'Per-run LLM usage rollup (totals, per agent, per step)';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 015 completed successfully!';
+    RAISE NOTICE 'Created tables: llm_call_metrics, llm_run_metrics';
+END $$;
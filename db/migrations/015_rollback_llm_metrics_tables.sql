@@ -0,0 +1,12 @@
+-- Rollback Migration 015: Drop llm_call_metrics and llm_run_metrics tables
+-- Date: 2026-10-18
+
+DROP TABLE IF EXISTS llm_call_metrics;
+DROP TABLE IF EXISTS llm_run_metrics;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 015 completed successfully!';
+    RAISE NOTICE 'Dropped tables: llm_call_metrics, llm_run_metrics';
+END $$;
@@ -0,0 +1,42 @@
+-- Migration: Rebuild the keyset listing indexes on coalesced sort keys
+-- Purpose: Container, test case and test execution listings sort by COALESCE of their nullable sort
+--          columns (a missing timestamp as 1970-01-01, a missing priority as 2147483647), so rows with
+--          NULL keys are neither skipped nor repeated across pages. The indexes from migration 009 are on
+--          the raw columns and no longer match that ORDER BY; these expression indexes do.
+-- Verify with: python3 rule-agent/benchmark_query_plans.py
+-- Date: 2026-10-18
+--
+-- Note: on a busy production database run each DROP/CREATE INDEX below with CONCURRENTLY
+--       (outside a transaction block) to avoid holding write locks while the index builds.
+
+-- list_containers / list_containers_page / iter_containers:
+-- ORDER BY COALESCE(deployed_at, '1970-01-01') DESC, id DESC
+DROP INDEX IF EXISTS idx_containers_deployed_at_id;
+CREATE INDEX IF NOT EXISTS idx_containers_deployed_at_id
+    ON rule_containers((COALESCE(deployed_at, '1970-01-01 00:00:00')) DESC, id DESC);
+
+-- get_test_cases / get_test_cases_page / iter_test_cases: bank + policy, active only,
+-- ORDER BY COALESCE(priority, 2147483647), COALESCE(created_at, '1970-01-01'), id
+DROP INDEX IF EXISTS idx_test_cases_active_listing;
+CREATE INDEX IF NOT EXISTS idx_test_cases_active_listing
+    ON test_cases(bank_id, policy_type_id, (COALESCE(priority, 2147483647)),
+                  (COALESCE(created_at, '1970-01-01 00:00:00')), id)
+    WHERE is_active = true;
+
+-- get_test_executions / get_test_executions_page(test_case_id=...):
+-- ORDER BY COALESCE(executed_at, '1970-01-01') DESC, id DESC
+DROP INDEX IF EXISTS idx_test_executions_case_executed_at;
+CREATE INDEX IF NOT EXISTS idx_test_executions_case_executed_at
+    ON test_case_executions(test_case_id, (COALESCE(executed_at, '1970-01-01 00:00:00')) DESC, id DESC);
+
+-- Refresh planner statistics (expression indexes collect their own statistics)
+ANALYZE rule_containers;
+ANALYZE test_cases;
+ANALYZE test_case_executions;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 016 completed successfully!';
+    RAISE NOTICE 'Rebuilt container, test case and test execution listing indexes on coalesced sort keys';
+END $$;
@@ -0,0 +1,23 @@
+-- Rollback Migration 016: Restore the raw-column keyset listing indexes of migration 009
+-- Date: 2026-10-18
+-- Note: roll back DatabaseService.py as well; its listings order by the coalesced sort keys.
+
+DROP INDEX IF EXISTS idx_test_executions_case_executed_at;
+CREATE INDEX IF NOT EXISTS idx_test_executions_case_executed_at
+    ON test_case_executions(test_case_id, executed_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_test_cases_active_listing;
+CREATE INDEX IF NOT EXISTS idx_test_cases_active_listing
+    ON test_cases(bank_id, policy_type_id, priority, created_at, id)
+    WHERE is_active = true;
+
+DROP INDEX IF EXISTS idx_containers_deployed_at_id;
+CREATE INDEX IF NOT EXISTS idx_containers_deployed_at_id
+    ON rule_containers(deployed_at DESC, id DESC);
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 016 completed successfully!';
+    RAISE NOTICE 'Restored raw-column container, test case and test execution listing indexes';
+END $$;
@@ -0,0 +1,21 @@
+-- Migration: Add lease columns to workflow_jobs
+-- Purpose: The API process whose job queue runs a job renews its heartbeat; queued or running jobs
+--          whose lease expired (owner process gone) are failed as orphaned instead of staying running.
+-- Date: 2026-10-18
+
+ALTER TABLE workflow_jobs
+    ADD COLUMN IF NOT EXISTS owner_id VARCHAR(100),
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_owner
+    ON workflow_jobs(owner_id) WHERE status IN ('queued', 'running');
+
+COMMENT ON COLUMN workflow_jobs.owner_id IS 'hostname:pid of the API process that owns the job';
+COMMENT ON COLUMN workflow_jobs.heartbeat_at IS 'Last lease renewal by the owning process';
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 017 completed successfully!';
+    RAISE NOTICE 'Added columns: owner_id, heartbeat_at to workflow_jobs';
+END $$;
@@ -0,0 +1,15 @@
+-- Rollback Migration 017: Remove lease columns from workflow_jobs
+-- Date: 2026-10-18
+
+DROP INDEX IF EXISTS idx_workflow_jobs_owner;
+
+ALTER TABLE workflow_jobs
+    DROP COLUMN IF EXISTS heartbeat_at,
+    DROP COLUMN IF EXISTS owner_id;
+
+-- Display success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback migration 017 completed successfully!';
+    RAISE NOTICE 'Dropped columns: owner_id, heartbeat_at from workflow_jobs';
+END $$;
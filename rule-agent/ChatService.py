@@ -13,7 +13,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 #
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from RuleAIAgent import RuleAIAgent
 from AIAgent import AIAgent
@@ -24,10 +24,13 @@ from ADSService import ADSService
 from DroolsService import DroolsService
 from UnderwritingWorkflow import UnderwritingWorkflow
 from RuleCacheService import get_rule_cache
+from LLMResponseCache import get_llm_cache
+from LLMGovernor import get_llm_governor_stats
 from DatabaseService import get_database_service
 from S3Service import S3Service
 from DroolsHierarchicalMapper import DroolsHierarchicalMapper
-import json,os
+from JobQueue import get_job_queue
+import json,os,time
 from Utils import find_descriptors
 from werkzeug.utils import secure_filename
 
@@ -111,6 +114,9 @@ underwritingWorkflow = UnderwritingWorkflow(llm)
 # create S3 Service for file uploads
 s3Service = S3Service()
 
+# create background job queue for long-running workflows
+jobQueue = get_job_queue()
+
 def ingestAllDocuments(directory_path):
     """Reads all PDF files in a directory and returns a list of document to load.
 
@@ -164,6 +170,17 @@ def upload_policy():
         'status': 'deprecated'
     }), 400
 
+def _bool_param(data, name, default=False):
+    """Boolean flag from the JSON body (true/false or "true"/"false"), else the query string"""
+    value = data.get(name)
+    if value is None:
+        value = request.args.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
 @app.route(ROUTE + '/process_policy_from_s3', methods=['POST', 'OPTIONS'])
 def process_policy_from_s3():
     """Process a policy PDF from S3 URL through the underwriting workflow"""
@@ -189,6 +206,28 @@ def process_policy_from_s3():
     s3_url = data['s3_url']
     policy_type = data['policy_type']
     bank_id = data['bank_id']
+    # Resume mode: reuse checkpointed outputs of steps a previous run already finished
+    resume = _bool_param(data, 'resume')
+    # Artifact cache: reuse stage outputs of an identical document processed earlier
+    use_cache = _bool_param(data, 'use_cache', default=True)
+    # Incremental mode: only reprocess sections that changed since the previous version of this policy
+    incremental = _bool_param(data, 'incremental')
+
+    # Asynchronous mode: queue the workflow and return a job ID immediately
+    run_async = _bool_param(data, 'async')
+    if run_async:
+        try:
+            job = jobQueue.submit_process_policy(s3_url=s3_url, policy_type=policy_type, bank_id=bank_id,
+                                                 resume=resume, use_cache=use_cache, incremental=incremental)
+            return jsonify({
+                'status': 'queued',
+                'job_id': job['job_id'],
+                'status_url': f"{ROUTE}/api/v1/jobs/{job['job_id']}",
+                'events_url': f"{ROUTE}/api/v1/jobs/{job['job_id']}?stream=true",
+                'cancel_url': f"{ROUTE}/api/v1/jobs/{job['job_id']}/cancel"
+            }), 202
+        except Exception as e:
+            return jsonify({'error': str(e), 'status': 'failed'}), 500
 
     # Process through workflow with S3 URL
     # container_id is auto-generated from bank_id and policy_type
@@ -198,7 +237,10 @@ def process_policy_from_s3():
         result = underwritingWorkflow.process_policy_document(
             s3_url=s3_url,
             policy_type=policy_type,
-            bank_id=bank_id
+            bank_id=bank_id,
+            resume=resume,
+            use_cache=use_cache,
+            incremental=incremental
         )
         return jsonify(result)
     except Exception as e:
@@ -551,6 +593,43 @@ def get_cached_rules():
             "message": str(e)
         }), 500
 
+@app.route(ROUTE + '/llm_cache/status', methods=['GET'])
+def get_llm_cache_status():
+    """
+    Get LLM response cache statistics (mode, size, hits/misses overall and per agent)
+    """
+    try:
+        return jsonify({
+            "status": "success",
+            "llm_cache_stats": get_llm_cache().get_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route(ROUTE + '/llm_cache/clear', methods=['POST', 'OPTIONS'])
+def clear_llm_cache():
+    """
+    Delete all stored LLM responses
+    """
+    # Handle OPTIONS preflight request
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    try:
+        deleted = get_llm_cache().clear()
+        return jsonify({
+            "status": "success",
+            "message": f"Deleted {deleted} cached LLM response(s)"
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
 # ============================================================================
 # CUSTOMER-FACING API ENDPOINTS (Database-backed)
 # ============================================================================
@@ -664,6 +743,8 @@ def query_policies():
     - include_rules: Include extracted rules (optional, default: false)
     - include_hierarchical_rules: Include hierarchical rules tree (optional, default: false)
     - include_test_cases: Include test cases (optional, default: false)
+    - test_cases_limit / test_cases_cursor: keyset pagination of the included test cases; pass
+      test_cases_next_cursor from the previous page (category counts are only returned unpaged)
     """
     try:
         bank_id = request.args.get('bank_id')
@@ -767,7 +848,16 @@ def query_policies():
             response_data["hierarchical_rules_count"] = len(hierarchical_rules)
 
         # Include test cases if requested
-        if include_test_cases:
+        test_cases_limit = request.args.get('test_cases_limit', type=int)
+        test_cases_cursor = request.args.get('test_cases_cursor')
+        if include_test_cases and (test_cases_limit is not None or test_cases_cursor):
+            page = db_service.get_test_cases_page(bank_id, policy_type, is_active=True,
+                                                  limit=test_cases_limit, cursor=test_cases_cursor)
+            response_data["test_cases"] = page['items']
+            response_data["test_cases_count"] = len(page['items'])
+            response_data["test_cases_next_cursor"] = page['next_cursor']
+            response_data["test_cases_has_more"] = page['has_more']
+        elif include_test_cases:
             test_cases = db_service.get_test_cases(
                 bank_id=bank_id,
                 policy_type_id=policy_type,
@@ -786,6 +876,8 @@ def query_policies():
             response_data["test_cases_by_category"] = category_stats
 
         return jsonify(response_data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -844,7 +936,7 @@ def update_policy_rules():
         print(f"{'='*60}")
         
         # Get existing container
-        container = db_service.get_active_container(normalized_bank, normalized_type)
+        container = db_service.get_active_container(normalized_bank, normalized_type, use_primary=True)
         if not container:
             return jsonify({
                 "status": "error",
@@ -1123,7 +1215,7 @@ def update_hierarchical_rules():
         print(f"{'='*60}")
         
         # Verify container exists (optional check, but good for validation)
-        container = db_service.get_active_container(normalized_bank, normalized_type)
+        container = db_service.get_active_container(normalized_bank, normalized_type, use_primary=True)
         if not container and update_drl:
             return jsonify({
                 "status": "error",
@@ -1168,11 +1260,13 @@ def update_hierarchical_rules():
                 print("Step 2: Regenerating DRL from updated hierarchical rules...")
                 print("="*60)
                 
-                # Get all hierarchical rules (with updates applied)
+                # Get all hierarchical rules (with updates applied) from the primary - a replica
+                # may not have the updates yet, and the DRL would be rebuilt from stale rules
                 hierarchical_rules = db_service.get_hierarchical_rules(
                     bank_id=normalized_bank,
                     policy_type_id=normalized_type,
-                    active_only=True
+                    active_only=True,
+                    use_primary=True
                 )
                 
                 if not hierarchical_rules:
@@ -1321,8 +1415,8 @@ def evaluate_policy():
         applicant = data['applicant']
         policy_data = data.get('policy', {})
 
-        # Get the active container for this bank+policy
-        container = db_service.get_active_container(bank_id, policy_type)
+        # Get the active container for this bank+policy (lightweight projection - no S3 URLs needed here)
+        container = db_service.get_active_container_summary(bank_id, policy_type)
 
         if not container:
             return jsonify({
@@ -1341,8 +1435,8 @@ def evaluate_policy():
 
             if fresh_endpoint:
                 print(f"DEBUG: Health check PASSED! Endpoint: {fresh_endpoint}")
-                # Refresh container data from database after health check
-                container = db_service.get_active_container(bank_id, policy_type)
+                # Refresh container data from the primary - the health check just wrote it
+                container = db_service.get_active_container_summary(bank_id, policy_type, use_primary=True)
                 print(f"DEBUG: Refreshed container - Status: {container['status']}, Health: {container['health_status']}")
             else:
                 print(f"DEBUG: Health check FAILED - container not responsive")
@@ -1385,11 +1479,13 @@ def evaluate_policy():
             # Map Drools decision to hierarchical rules
             hierarchical_rules_result = None
             try:
-                # Get hierarchical rules from database
+                # Get hierarchical rules from the primary, so they match the rules the container
+                # was just (re)deployed with
                 hierarchical_rules = db_service.get_hierarchical_rules(
                     bank_id=bank_id,
                     policy_type_id=policy_type,
-                    active_only=True
+                    active_only=True,
+                    use_primary=True
                 )
 
                 if hierarchical_rules:
@@ -1460,42 +1556,103 @@ def evaluate_policy():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def stream_json_list(envelope, list_key, items):
+    """
+    Stream a JSON object whose `list_key` array is written item by item.
+
+    `envelope` holds the fixed top-level fields. The array is followed by a "count" field, and by an
+    "error" field if the underlying iterator fails part-way (the status code is already sent by then).
+    """
+    def generate():
+        yield json.dumps(envelope)[:-1] + f', "{list_key}": ['
+        count = 0
+        error = None
+        try:
+            for item in items:
+                yield (', ' if count else '') + json.dumps(item)
+                count += 1
+        except Exception as e:
+            print(f"Error while streaming {list_key}: {e}")
+            error = str(e)
+        tail = {"count": count}
+        if error:
+            tail["error"] = error
+        yield '], ' + json.dumps(tail)[1:]
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def pagination_args():
+    """Read keyset pagination query parameters: (limit, cursor, stream)"""
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    stream = request.args.get('stream', 'false').lower() == 'true'
+    return limit, cursor, stream
+
+
+def deployment_summary(c):
+    return {
+        "id": c['id'],
+        "container_id": c['container_id'],
+        "bank_id": c['bank_id'],
+        "policy_type_id": c['policy_type_id'],
+        "endpoint": c['endpoint'],
+        "status": c['status'],
+        "health_status": c['health_status'],
+        "platform": c['platform'],
+        "version": c['version'],
+        "is_active": c['is_active'],
+        "deployed_at": c['deployed_at'],
+        "s3_jar_url": c['s3_jar_url'],
+        "s3_drl_url": c['s3_drl_url'],
+        "s3_excel_url": c['s3_excel_url']
+    }
+
+
 @app.route(ROUTE + '/api/v1/deployments', methods=['GET'])
 def list_deployments():
-    """List all rule deployments (admin endpoint)"""
+    """
+    List all rule deployments (admin endpoint)
+
+    Query parameters:
+    - bank_id, policy_type, status, active_only: filters
+    - limit / cursor: keyset pagination (newest first); pass next_cursor from the previous page
+    - stream: stream the full result as JSON instead of building it in memory (default: false)
+    """
     try:
         bank_id = request.args.get('bank_id')
         policy_type = request.args.get('policy_type')
         status = request.args.get('status')
         active_only = request.args.get('active_only', 'false').lower() == 'true'
+        limit, cursor, stream = pagination_args()
+        filters = dict(bank_id=bank_id, policy_type_id=policy_type, status=status, active_only=active_only)
+
+        if stream:
+            return stream_json_list(
+                {"status": "success"},
+                "deployments",
+                (deployment_summary(c) for c in db_service.iter_containers(**filters))
+            )
 
-        containers = db_service.list_containers(
-            bank_id=bank_id,
-            policy_type_id=policy_type,
-            status=status,
-            active_only=active_only
-        )
+        if limit is not None or cursor:
+            page = db_service.list_containers_page(limit=limit, cursor=cursor, **filters)
+            return jsonify({
+                "status": "success",
+                "count": len(page['items']),
+                "deployments": [deployment_summary(c) for c in page['items']],
+                "next_cursor": page['next_cursor'],
+                "has_more": page['has_more']
+            })
+
+        containers = db_service.list_containers(**filters)
 
         return jsonify({
             "status": "success",
             "total": len(containers),
-            "deployments": [{
-                "id": c['id'],
-                "container_id": c['container_id'],
-                "bank_id": c['bank_id'],
-                "policy_type_id": c['policy_type_id'],
-                "endpoint": c['endpoint'],
-                "status": c['status'],
-                "health_status": c['health_status'],
-                "platform": c['platform'],
-                "version": c['version'],
-                "is_active": c['is_active'],
-                "deployed_at": c['deployed_at'],
-                "s3_jar_url": c['s3_jar_url'],
-                "s3_drl_url": c['s3_drl_url'],
-                "s3_excel_url": c['s3_excel_url']
-            } for c in containers]
+            "deployments": [deployment_summary(c) for c in containers]
         })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -1571,6 +1728,278 @@ def get_deployment(deployment_id):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route(ROUTE + '/api/v1/requests/<int:request_id>/payloads', methods=['GET'])
+def get_request_payloads(request_id):
+    """Get the full request/response payloads of a logged rule request (admin endpoint)"""
+    try:
+        payloads = db_service.get_request_payloads(request_id)
+        if not payloads:
+            return jsonify({
+                "status": "not_found",
+                "message": f"Request {request_id} not found"
+            }), 404
+        return jsonify({"status": "success", **payloads})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/test-executions/<int:execution_id>/payloads', methods=['GET'])
+def get_test_execution_payloads(execution_id):
+    """Get the full request/response payloads of a test execution (admin endpoint)"""
+    try:
+        payloads = db_service.get_test_execution_payloads(execution_id)
+        if not payloads:
+            return jsonify({
+                "status": "not_found",
+                "message": f"Test execution {execution_id} not found"
+            }), 404
+        return jsonify({"status": "success", **payloads})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/test-cases', methods=['GET'])
+def list_test_cases():
+    """
+    List the active test cases of a bank and policy type, ordered by priority and creation time
+
+    Query parameters:
+    - bank_id, policy_type: required
+    - category: optional filter (positive, negative, boundary, edge_case)
+    - limit / cursor: keyset pagination; pass next_cursor from the previous page
+    - stream: stream the full result as JSON instead of building it in memory (default: false)
+    """
+    try:
+        bank_id = request.args.get('bank_id')
+        policy_type = request.args.get('policy_type')
+        category = request.args.get('category')
+
+        if not bank_id or not policy_type:
+            return jsonify({
+                "status": "error",
+                "message": "Both bank_id and policy_type query parameters are required"
+            }), 400
+
+        limit, cursor, stream = pagination_args()
+
+        if stream:
+            return stream_json_list(
+                {"status": "success", "bank_id": bank_id, "policy_type": policy_type},
+                "test_cases",
+                db_service.iter_test_cases(bank_id, policy_type, category=category)
+            )
+
+        if limit is not None or cursor:
+            page = db_service.get_test_cases_page(bank_id, policy_type, category=category,
+                                                  limit=limit, cursor=cursor)
+            return jsonify({
+                "status": "success",
+                "bank_id": bank_id,
+                "policy_type": policy_type,
+                "count": len(page['items']),
+                "test_cases": page['items'],
+                "next_cursor": page['next_cursor'],
+                "has_more": page['has_more']
+            })
+
+        test_cases = db_service.get_test_cases(bank_id, policy_type, category=category)
+
+        return jsonify({
+            "status": "success",
+            "bank_id": bank_id,
+            "policy_type": policy_type,
+            "count": len(test_cases),
+            "test_cases": test_cases
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/test-executions', methods=['GET'])
+def list_test_executions():
+    """
+    List test executions, newest first (payloads excluded, see /test-executions/<id>/payloads)
+
+    Query parameters:
+    - test_case_id, container_id: optional filters
+    - limit / cursor: keyset pagination; pass next_cursor from the previous page
+    - stream: stream the full history as JSON instead of building it in memory (default: false)
+    """
+    try:
+        test_case_id = request.args.get('test_case_id', type=int)
+        container_id = request.args.get('container_id')
+        limit, cursor, stream = pagination_args()
+        filters = dict(test_case_id=test_case_id, container_id=container_id)
+
+        if stream:
+            return stream_json_list(
+                {"status": "success"},
+                "executions",
+                db_service.iter_test_executions(**filters)
+            )
+
+        if limit is not None or cursor:
+            page = db_service.get_test_executions_page(limit=limit, cursor=cursor, **filters)
+            return jsonify({
+                "status": "success",
+                "count": len(page['items']),
+                "executions": page['items'],
+                "next_cursor": page['next_cursor'],
+                "has_more": page['has_more']
+            })
+
+        executions = db_service.get_test_executions(**filters)
+
+        return jsonify({
+            "status": "success",
+            "count": len(executions),
+            "executions": executions
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+JOB_FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+def job_event_stream(job_id, poll_interval):
+    """Server-sent events for a job: a 'progress' event whenever the job row changes, then 'done'"""
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def generate():
+        last_update = None
+        idle_polls = 0
+        while True:
+            job = jobQueue.get_job(job_id, include_result=False)
+            if job is None:
+                yield sse('error', {"message": f"Job {job_id} not found"})
+                return
+            if job['updated_at'] != last_update:
+                last_update = job['updated_at']
+                idle_polls = 0
+                yield sse('progress', job)
+            else:
+                idle_polls += 1
+                if idle_polls * poll_interval >= 15:
+                    # Comment line keeps proxies from closing an idle connection
+                    idle_polls = 0
+                    yield ": keep-alive\n\n"
+            if job['status'] in JOB_FINAL_STATUSES:
+                yield sse('done', jobQueue.get_job(job_id))
+                return
+            time.sleep(poll_interval)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route(ROUTE + '/api/v1/jobs', methods=['GET'])
+def list_jobs():
+    """List recent workflow jobs (newest first), optionally filtered by status and bank"""
+    try:
+        jobs = jobQueue.list_jobs(
+            status=request.args.get('status'),
+            bank_id=request.args.get('bank_id'),
+            limit=request.args.get('limit', 50, type=int)
+        )
+        return jsonify({"status": "success", "count": len(jobs), "jobs": jobs})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get workflow job status, per-step progress and (once finished) the workflow result.
+
+    Pass stream=true (or Accept: text/event-stream) to receive progress as server-sent events.
+    """
+    try:
+        stream = (request.args.get('stream', 'false').lower() == 'true'
+                  or request.accept_mimetypes.best == 'text/event-stream')
+        if jobQueue.get_job(job_id, include_result=False) is None:
+            return jsonify({"status": "not_found", "message": f"Job {job_id} not found"}), 404
+        if stream:
+            poll_interval = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "1.0"))
+            return job_event_stream(job_id, poll_interval)
+        return jsonify({"status": "success", "job": jobQueue.get_job(job_id)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/jobs/<job_id>/cancel', methods=['POST', 'OPTIONS'])
+def cancel_job(job_id):
+    """Cancel a workflow job: queued jobs never start, running jobs stop after their current step"""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    try:
+        job = jobQueue.cancel(job_id)
+        if job is None:
+            return jsonify({"status": "not_found", "message": f"Job {job_id} not found"}), 404
+        if job['status'] not in ('queued', 'running', 'cancelled'):
+            return jsonify({
+                "status": "error",
+                "message": f"Job {job_id} already finished with status '{job['status']}'"
+            }), 409
+        return jsonify({"status": "success", "job": job})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/jobs/<job_id>/resume', methods=['POST', 'OPTIONS'])
+def resume_job(job_id):
+    """Re-run a failed or cancelled job as a new job, resuming from its first incomplete step"""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    try:
+        job = jobQueue.get_job(job_id, include_result=False)
+        if job is None:
+            return jsonify({"status": "not_found", "message": f"Job {job_id} not found"}), 404
+        if job['status'] in ('queued', 'running'):
+            return jsonify({
+                "status": "error",
+                "message": f"Job {job_id} is still {job['status']}"
+            }), 409
+
+        new_job = jobQueue.resume(job_id)
+        return jsonify({
+            'status': 'queued',
+            'job_id': new_job['job_id'],
+            'resumed_from': job_id,
+            'status_url': f"{ROUTE}/api/v1/jobs/{new_job['job_id']}",
+            'events_url': f"{ROUTE}/api/v1/jobs/{new_job['job_id']}?stream=true",
+            'cancel_url': f"{ROUTE}/api/v1/jobs/{new_job['job_id']}/cancel"
+        }), 202
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route(ROUTE + '/api/v1/checkpoints/<document_hash>', methods=['GET', 'DELETE'])
+def workflow_checkpoints(document_hash):
+    """List the checkpointed workflow steps of a document, or delete them to force a full re-run"""
+    try:
+        if request.method == 'DELETE':
+            deleted = db_service.delete_workflow_checkpoints(document_hash)
+            return jsonify({"status": "success", "document_hash": document_hash, "deleted": deleted})
+
+        checkpoints = db_service.list_workflow_checkpoints(document_hash)
+        return jsonify({
+            "status": "success",
+            "document_hash": document_hash,
+            "checkpoints": checkpoints,
+            "count": len(checkpoints)
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @app.route(ROUTE + '/api/v1/discovery', methods=['GET'])
 def service_discovery():
     """Service discovery endpoint - list all banks with their available policies"""
@@ -1597,6 +2026,28 @@ def get_extracted_rules():
                 "message": "Both bank_id and policy_type query parameters are required"
             }), 400
 
+        limit, cursor, stream = pagination_args()
+
+        if stream:
+            return stream_json_list(
+                {"status": "success", "bank_id": bank_id, "policy_type": policy_type},
+                "rules",
+                db_service.iter_extracted_rules(bank_id, policy_type, active_only=True)
+            )
+
+        if limit is not None or cursor:
+            page = db_service.get_extracted_rules_page(bank_id, policy_type, active_only=True,
+                                                       limit=limit, cursor=cursor)
+            return jsonify({
+                "status": "success",
+                "bank_id": bank_id,
+                "policy_type": policy_type,
+                "rule_count": len(page['items']),
+                "rules": page['items'],
+                "next_cursor": page['next_cursor'],
+                "has_more": page['has_more']
+            })
+
         # Fetch extracted rules from database
         rules = db_service.get_extracted_rules(bank_id, policy_type, active_only=True)
 
@@ -1607,6 +2058,8 @@ def get_extracted_rules():
             "rule_count": len(rules),
             "rules": rules
         })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching extracted rules: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1630,6 +2083,55 @@ def health_check():
             "error": str(e)
         }), 503
 
+@app.route(ROUTE + '/api/v1/metrics/database', methods=['GET'])
+def database_metrics():
+    """Connection pool configuration, utilisation and checkout wait times (admin endpoint)"""
+    try:
+        return jsonify({
+            "status": "success",
+            "database": db_service.get_pool_metrics()
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route(ROUTE + '/api/v1/metrics/llm', methods=['GET'])
+def llm_metrics():
+    """
+    LLM call latency percentiles, token usage and cost per agent over time (admin endpoint)
+
+    Query parameters:
+        hours: Look-back window in hours (default 24)
+        bucket: Time bucket: hour (default), day or week
+        agent: Only this agent (e.g. RuleGeneratorAgent)
+    """
+    try:
+        hours = int(request.args.get('hours', 24))
+        bucket = request.args.get('bucket', 'hour')
+        agent = request.args.get('agent')
+        if bucket not in ('hour', 'day', 'week'):
+            return jsonify({"status": "error", "message": "bucket must be one of: hour, day, week"}), 400
+        return jsonify({
+            "status": "success",
+            "hours": hours,
+            "bucket": bucket,
+            "metrics": db_service.get_llm_latency_percentiles(hours=hours, bucket=bucket, agent=agent)
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route(ROUTE + '/api/v1/metrics/llm/governor', methods=['GET'])
+def llm_governor_metrics():
+    """LLM admission control per provider: adaptive concurrency limit, queues, rate limits and queue waits"""
+    try:
+        return jsonify({
+            "status": "success",
+            "governors": get_llm_governor_stats()
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # File upload endpoint
 @app.route(ROUTE + '/upload_file', methods=['POST', 'OPTIONS'])
 def upload_file():
@@ -1638,6 +2140,8 @@ def upload_file():
 
     Accepts multipart/form-data with a file field.
     Files are stored in S3 with organized folder structure: uploads/YYYY-MM-DD/filename_timestamp.ext
+    The upload is streamed from the request's spooled file in parts (multipart upload above
+    S3_MULTIPART_THRESHOLD_MB), so memory per upload stays bounded; UPLOAD_MAX_FILE_MB caps the size.
 
     Returns:
         - 200: File uploaded successfully with S3 URL
@@ -1669,7 +2173,7 @@ def upload_file():
         
         # Get optional parameters
         folder = request.form.get('folder', 'uploads')  # Default folder: 'uploads'
-        max_file_size = 100 * 1024 * 1024  # 100 MB limit
+        max_file_size = int(float(os.getenv("UPLOAD_MAX_FILE_MB", "100")) * 1024 * 1024)
         
         # Validate folder name (prevent path traversal)
         if '..' in folder or '/' in folder or '\\' in folder:
@@ -1679,9 +2183,11 @@ def upload_file():
                 'error_code': 'INVALID_FOLDER'
             }), 400
         
-        # Read file content
-        file_content = file.read()
-        file_size = len(file_content)
+        # Size of the uploaded file (werkzeug spools large uploads to disk) without reading it
+        file_stream = file.stream
+        file_stream.seek(0, os.SEEK_END)
+        file_size = file_stream.tell()
+        file_stream.seek(0)
         
         # Validate file size
         if file_size == 0:
@@ -1705,7 +2211,7 @@ def upload_file():
         
         # Upload to S3
         upload_result = s3Service.upload_file_to_s3(
-            file_content=file_content,
+            file_content=file_stream,
             filename=original_filename,
             folder=folder
         )
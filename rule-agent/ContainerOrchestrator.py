@@ -129,8 +129,8 @@ class ContainerOrchestrator:
         Returns:
             Endpoint URL or None if not found or not healthy
         """
-        # Get container from database
-        container = self.db_service.get_container_by_id(container_id)
+        # Get container routing/health columns from database
+        container = self.db_service.get_container_summary_by_id(container_id, use_primary=True)
         if not container or not container['is_active']:
             return None
 
@@ -643,7 +643,8 @@ class ContainerOrchestrator:
 
     def _get_next_available_port(self) -> int:
         """Get next available port for Docker containers from database"""
-        containers = self.db_service.list_containers(active_only=True)
+        # Port allocation must see containers registered moments ago, so bypass read replicas
+        containers = self.db_service.list_containers(active_only=True, use_primary=True)
         used_ports = [c['port'] for c in containers if c.get('port') is not None]
 
         port = self.base_port
@@ -18,21 +18,40 @@ from CreateLLMLocal import createLLMLocal
 from CreateLLMWatson import  createLLMWatson
 from CreateLLMBAM import  createLLMBAM
 from CreateLLMOpenAI import createLLMOpenAI
+from LLMResponseCache import set_llm_tiers, wrap_llm
 
 def createLLM():
+    """
+    Provider LLM for LLM_TYPE, wrapped in the LLM response cache (see LLMResponseCache)
+
+    With LLM_SMALL_MODEL_NAME set, a small-tier model (on LLM_SMALL_TYPE, default LLM_TYPE) is
+    created too; agents listed as small in LLM_AGENT_TIERS use it (see LLMTiers).
+    """
     llm_type = os.getenv("LLM_TYPE","LOCAL_OLLAMA")
+    llm = wrap_llm(_createProviderLLM(llm_type), llm_type)
+
+    small_model = os.getenv("LLM_SMALL_MODEL_NAME")
+    if llm is not None and small_model:
+        small_type = os.getenv("LLM_SMALL_TYPE", llm_type)
+        print(f"Small-tier model: {small_model} ({small_type})")
+        small = wrap_llm(_createProviderLLM(small_type, small_model), small_type)
+        if small is not None:
+            set_llm_tiers(llm, small)
+    return llm
+
+def _createProviderLLM(llm_type, model_name=None):
     if llm_type == "LOCAL_OLLAMA":
         print("Using LLM Service: Ollama")
-        return createLLMLocal()
+        return createLLMLocal(model_name)
     elif llm_type == "BAM":
         print("Using LLM Service: IBM BAM")
-        return createLLMBAM()
+        return createLLMBAM(model_name)
     elif llm_type == "WATSONX":
         print("Using LLM Service: IBM watsonx.ai")
-        return createLLMWatson()
+        return createLLMWatson(model_name)
     elif llm_type == "OPENAI":
         print("Using LLM Service: OpenAI")
-        return createLLMOpenAI()
+        return createLLMOpenAI(model_name)
     else:
         print ("Env variable LLM_TYPE not defined.")
         return None
@@ -18,14 +18,14 @@ from genai.extensions.langchain import LangChainChatInterface
 from genai.schema import TextGenerationParameters, TextGenerationReturnOptions
 from genai import Client, Credentials
 
-def createLLMBAM():
+def createLLMBAM(model_name=None):
     if not 'WATSONX_APIKEY' in os.environ:
         print('Please set env variable WATSONX_APIKEY to your IBM Generative AI key')
         exit()
     if not 'WATSONX_URL' in os.environ:
         print('Please set env variable WATSONX_URL to your IBM Generative AI  endpoint URL')
         exit()
-    watson_model=os.getenv("WATSONX_MODEL_NAME","mistralai/mistral-7b-instruct-v0-2")
+    watson_model=model_name or os.getenv("WATSONX_MODEL_NAME","mistralai/mistral-7b-instruct-v0-2")
     api_key = os.getenv("WATSONX_APIKEY")
     api_url = os.getenv("WATSONX_URL")
 
@@ -17,9 +17,9 @@ from langchain_community.llms import Ollama
 import os
 
 
-def createLLMLocal():
+def createLLMLocal(model_name=None):
     ollama_server_url=os.getenv("OLLAMA_SERVER_URL","http://localhost:11434")
-    ollama_model=os.getenv("OLLAMA_MODEL_NAME","mistral")
+    ollama_model=model_name or os.getenv("OLLAMA_MODEL_NAME","mistral")
     print("Using Ollma Server: "+str(ollama_server_url))
 
     # Deterministic generation: temperature=0 ensures same input -> same output
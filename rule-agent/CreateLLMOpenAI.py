@@ -16,13 +16,13 @@
 from langchain_openai import ChatOpenAI
 import os
 
-def createLLMOpenAI():
+def createLLMOpenAI(model_name=None):
     """
     Create and configure an OpenAI LLM instance
 
     Environment variables:
     - OPENAI_API_KEY: Your OpenAI API key (required)
-    - OPENAI_MODEL_NAME: Model to use (default: gpt-4)
+    - OPENAI_MODEL_NAME: Model to use (default: gpt-4, overridden by model_name)
     - OPENAI_TEMPERATURE: Temperature for responses (default: 0.7)
     - OPENAI_MAX_TOKENS: Maximum tokens in response (default: None)
     """
@@ -31,7 +31,7 @@ def createLLMOpenAI():
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is required for OpenAI integration")
 
-    model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+    model_name = model_name or os.getenv("OPENAI_MODEL_NAME", "gpt-4")
     temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.0"))
     max_tokens = os.getenv("OPENAI_MAX_TOKENS")
 
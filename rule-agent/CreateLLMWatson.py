@@ -18,7 +18,7 @@ from langchain_ibm import ChatWatsonx
 from ibm_watsonx_ai.metanames import GenTextParamsMetaNames
             
 
-def createLLMWatson():
+def createLLMWatson(model_name=None):
     if not 'WATSONX_APIKEY' in os.environ:
         print('Please set env variable WATSONX_APIKEY to your IBM watsonx.ai service API Key')
         exit()
@@ -28,7 +28,7 @@ def createLLMWatson():
     if not 'WATSONX_PROJECT_ID' in os.environ:
         print('Please set env variable WATSONX_PROJECT_ID to your IBM watsonx.ai Project ID')
         exit()
-    watsonx_model=os.getenv("WATSONX_MODEL_NAME","mistralai/mistral-7b-instruct-v0-2")
+    watsonx_model=model_name or os.getenv("WATSONX_MODEL_NAME","mistralai/mistral-7b-instruct-v0-2")
     api_key = os.getenv("WATSONX_APIKEY")
     api_url = os.getenv("WATSONX_URL")
     project_id = os.getenv("WATSONX_PROJECT_ID")
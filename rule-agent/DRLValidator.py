@@ -18,6 +18,7 @@ import tempfile
 import subprocess
 import json
 from typing import Dict, Optional, Tuple
+from LLMResponseCache import scoped_llm
 
 class DRLValidator:
     """
@@ -35,7 +36,7 @@ class DRLValidator:
         Args:
             llm: Language model instance for fixing DRL syntax errors
         """
-        self.llm = llm
+        self.llm = scoped_llm(llm, "DRLValidator")
 
     def validate_and_fix_drl(self, drl_content: str, schema: Dict, bank_id: str,
                              policy_type: str, max_attempts: int = 3) -> Tuple[bool, str, str]:
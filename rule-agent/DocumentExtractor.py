@@ -13,16 +13,78 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 #
+import mmap
+import multiprocessing
 import os
 import tempfile
-from typing import Dict, Optional
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
 import boto3
-from io import BytesIO
+
+from S3Service import s3_transfer_config
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.xlsx', '.xls', '.docx', '.txt', '.text')
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide pool for PDF page extraction (spawned, like the workflow job pool)"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            print(f"✓ PDF extraction pool started with {workers} worker process(es)")
+        return _pdf_pool
+
+
+def _reset_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        _pdf_pool = None
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """
+    Text of pages [start, end) of a PDF file
+
+    Runs in the worker processes: the file is memory-mapped, so the workers share the page cache
+    instead of each holding a copy of the document.
+    """
+    import PyPDF2
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = PyPDF2.PdfReader(mapped)
+        return [reader.pages[i].extract_text() or '' for i in range(start, min(end, len(reader.pages)))]
+
+
+def page_offsets_of(pages: List[str]) -> List[int]:
+    """Start offset of each page in the newline-joined text of the pages"""
+    offsets, position = [], 0
+    for page in pages:
+        offsets.append(position)
+        position += len(page) + 1
+    return offsets
+
 
 class DocumentExtractor:
     """
     Multi-format document text extraction service
     Supports: PDF, Excel (.xlsx, .xls), Word (.docx), and text files
+
+    Documents are read from files, never from in-memory copies: S3 objects are downloaded to a
+    temporary file first. PDFs with many pages are split into page ranges that a process pool
+    extracts in parallel from the memory-mapped file; .xlsx workbooks are read row by row in
+    read-only mode. PDF results carry page_offsets (start offset of each page in the text) for
+    page_number lookups.
+
+    Configuration (environment):
+        DOCUMENT_EXTRACTION_WORKERS: processes for PDF page ranges (default min(4, CPUs); 1 disables)
+        DOCUMENT_PDF_PARALLEL_MIN_PAGES: smallest PDF extracted in parallel (default 64)
+        DOCUMENT_PDF_PAGES_PER_TASK: pages per page range (default 32)
     """
 
     def __init__(self):
@@ -31,6 +93,10 @@ class DocumentExtractor:
         self.aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
         self.aws_region = os.getenv("AWS_REGION", "us-east-1")
 
+        self.workers = int(os.getenv("DOCUMENT_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.parallel_min_pages = int(os.getenv("DOCUMENT_PDF_PARALLEL_MIN_PAGES", "64"))
+        self.pages_per_task = max(1, int(os.getenv("DOCUMENT_PDF_PAGES_PER_TASK", "32")))
+
         self.isConfigured = self.aws_access_key is not None and self.aws_secret_key is not None
 
         if self.isConfigured:
@@ -61,6 +127,7 @@ class DocumentExtractor:
             Dictionary with:
                 - text: Extracted text content
                 - format: Detected file format (pdf, excel, word, text)
+                - pages, page_offsets: Page count and start offset of each page in text (PDF)
                 - error: Error message if extraction failed
         """
         if not self.isConfigured:
@@ -85,122 +152,198 @@ class DocumentExtractor:
             file_extension = os.path.splitext(s3_key)[1].lower()
 
             print(f"Extracting text from S3: {s3_bucket}/{s3_key} (format: {file_extension})")
+            if file_extension not in SUPPORTED_EXTENSIONS:
+                return self._unsupported_format(file_extension)
 
-            # Download file from S3
-            response = self.s3_client.get_object(Bucket=s3_bucket, Key=s3_key)
-            file_content = response['Body'].read()
+            # Download to a temporary file (ranged GETs for large objects) instead of into memory
+            with tempfile.NamedTemporaryFile(suffix=file_extension) as spooled:
+                self.s3_client.download_fileobj(s3_bucket, s3_key, spooled, Config=s3_transfer_config())
+                spooled.flush()
 
-            # Route to appropriate extractor
-            if file_extension == '.pdf':
-                text = self._extract_from_pdf(file_content)
-                return {"text": text, "format": "pdf", "s3_bucket": s3_bucket, "s3_key": s3_key}
+                result = self._extract_file(spooled.name, file_extension)
+            if "error" not in result:
+                result.update({"s3_bucket": s3_bucket, "s3_key": s3_key})
+            return result
 
-            elif file_extension in ['.xlsx', '.xls']:
-                text = self._extract_from_excel(file_content)
-                return {"text": text, "format": "excel", "s3_bucket": s3_bucket, "s3_key": s3_key}
+        except Exception as e:
+            print(f"Error extracting text from S3: {e}")
+            return {"error": str(e), "text": "", "format": "unknown"}
 
-            elif file_extension == '.docx':
-                text = self._extract_from_word(file_content)
-                return {"text": text, "format": "word", "s3_bucket": s3_bucket, "s3_key": s3_key}
+    def _extract_file(self, path: str, file_extension: str) -> Dict:
+        """Route a local file to the extractor of its format"""
+        if file_extension == '.pdf':
+            text, page_offsets = self._extract_from_pdf(path)
+            return {"text": text, "format": "pdf", "pages": len(page_offsets), "page_offsets": page_offsets}
 
-            elif file_extension in ['.txt', '.text']:
-                text = file_content.decode('utf-8', errors='ignore')
-                return {"text": text, "format": "text", "s3_bucket": s3_bucket, "s3_key": s3_key}
+        elif file_extension in ['.xlsx', '.xls']:
+            text = self._extract_from_excel(path, file_extension)
+            return {"text": text, "format": "excel"}
 
-            else:
-                return {
-                    "error": f"Unsupported file format: {file_extension}. Supported: .pdf, .xlsx, .xls, .docx, .txt",
-                    "text": "",
-                    "format": "unknown"
-                }
+        elif file_extension == '.docx':
+            text = self._extract_from_word(path)
+            return {"text": text, "format": "word"}
 
-        except Exception as e:
-            print(f"Error extracting text from S3: {e}")
-            return {"error": str(e), "text": "", "format": "unknown"}
+        elif file_extension in ['.txt', '.text']:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+            return {"text": text, "format": "text"}
 
-    def _extract_from_pdf(self, file_content: bytes) -> str:
+        else:
+            return self._unsupported_format(file_extension)
+
+    @staticmethod
+    def _unsupported_format(file_extension: str) -> Dict:
+        return {
+            "error": f"Unsupported file format: {file_extension}. Supported: .pdf, .xlsx, .xls, .docx, .txt",
+            "text": "",
+            "format": "unknown"
+        }
+
+    def _extract_from_pdf(self, path: str) -> Tuple[str, List[int]]:
         """
-        Extract text from PDF file content
+        Extract text from a PDF file
 
         Args:
-            file_content: PDF file bytes
+            path: PDF file path
 
         Returns:
-            Extracted text
+            Extracted text (pages joined by newlines) and the start offset of each page
         """
         import PyPDF2
 
         try:
-            pdf_file = BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            with open(path, 'rb') as f:
+                page_count = len(PyPDF2.PdfReader(f).pages)
 
-            text_parts = []
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_parts.append(page.extract_text())
+            pages = None
+            if self.workers > 1 and page_count >= self.parallel_min_pages:
+                pages = self._extract_pdf_parallel(path, page_count)
+            if pages is None:
+                pages = _extract_pdf_pages(path, 0, page_count)
 
-            text = '\n'.join(text_parts)
-            print(f"✓ Extracted {len(text)} characters from PDF ({len(pdf_reader.pages)} pages)")
-            return text
+            text = '\n'.join(pages)
+            print(f"✓ Extracted {len(text)} characters from PDF ({page_count} pages)")
+            return text, page_offsets_of(pages)
 
         except Exception as e:
             print(f"Error extracting text from PDF: {e}")
-            return f"[PDF extraction error: {str(e)}]"
+            return f"[PDF extraction error: {str(e)}]", []
 
-    def _extract_from_excel(self, file_content: bytes) -> str:
+    def _extract_pdf_parallel(self, path: str, page_count: int) -> Optional[List[str]]:
+        """Pages of a PDF extracted as page ranges on the process pool (None if the pool failed)"""
+        ranges = [(start, min(start + self.pages_per_task, page_count))
+                  for start in range(0, page_count, self.pages_per_task)]
+        try:
+            pool = _get_pdf_pool(self.workers)
+            futures = [pool.submit(_extract_pdf_pages, path, start, end) for start, end in ranges]
+            pages = []
+            for future in futures:
+                pages.extend(future.result())
+            print(f"  {len(ranges)} page ranges extracted on {self.workers} processes")
+            return pages
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM kill): start a fresh pool next time, extract in-process now
+            _reset_pdf_pool()
+            print(f"⚠ PDF extraction pool failed ({e}), extracting pages sequentially")
+            return None
+
+    def _extract_from_excel(self, path: str, file_extension: str = '.xlsx') -> str:
         """
-        Extract text from Excel file content
+        Extract text from an Excel file
         Converts tables and cells into structured text
 
+        .xlsx workbooks are streamed row by row (openpyxl read-only mode), so memory does not grow
+        with the sheet size; legacy .xls files go through pandas.
+
         Args:
-            file_content: Excel file bytes
+            path: Excel file path
+            file_extension: .xlsx or .xls
 
         Returns:
             Extracted text in structured format
         """
-        import pandas as pd
-
         try:
-            excel_file = BytesIO(file_content)
-
-            # Read all sheets
-            excel_data = pd.read_excel(excel_file, sheet_name=None, engine='openpyxl')
-
             text_parts = []
-            for sheet_name, df in excel_data.items():
+            sheets = self._excel_sheet_rows(path) if file_extension == '.xlsx' else self._xls_sheet_rows(path)
+            sheet_count = 0
+            for sheet_name, rows in sheets:
+                sheet_count += 1
                 text_parts.append(f"\n{'='*60}")
                 text_parts.append(f"SHEET: {sheet_name}")
                 text_parts.append(f"{'='*60}\n")
 
-                # Convert DataFrame to formatted text
-                # Use markdown-like table format for better LLM understanding
-                if not df.empty:
-                    # Add column headers
-                    headers = ' | '.join(str(col) for col in df.columns)
-                    text_parts.append(headers)
-                    text_parts.append('-' * len(headers))
-
-                    # Add rows
-                    for idx, row in df.iterrows():
-                        row_text = ' | '.join(str(val) if pd.notna(val) else '' for val in row)
-                        text_parts.append(row_text)
+                # Markdown-like table format for better LLM understanding
+                headers = next(rows, None)
+                first_row = next(rows, None)
+                if headers is None or first_row is None:
+                    continue
+                header_text = ' | '.join(headers)
+                text_parts.append(header_text)
+                text_parts.append('-' * len(header_text))
+                text_parts.append(' | '.join(first_row))
+                for row in rows:
+                    text_parts.append(' | '.join(row))
 
-                    text_parts.append("")  # Empty line between sheets
+                text_parts.append("")  # Empty line between sheets
 
             text = '\n'.join(text_parts)
-            print(f"✓ Extracted {len(text)} characters from Excel ({len(excel_data)} sheets)")
+            print(f"✓ Extracted {len(text)} characters from Excel ({sheet_count} sheets)")
             return text
 
         except Exception as e:
             print(f"Error extracting text from Excel: {e}")
             return f"[Excel extraction error: {str(e)}]"
 
-    def _extract_from_word(self, file_content: bytes) -> str:
+    @staticmethod
+    def _excel_sheet_rows(path: str):
+        """(sheet name, row iterator) per sheet of an .xlsx workbook; the first row is the header"""
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield sheet.title, DocumentExtractor._sheet_rows(sheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _sheet_rows(values):
+        """Cell texts of the non-empty rows, padded or cut to the header width"""
+        width = None
+        for row in values:
+            if not any(value is not None and value != '' for value in row):
+                continue
+            if width is None:
+                # Header row, with pandas' names for unnamed columns
+                while row and row[-1] is None:
+                    row = row[:-1]
+                width = len(row)
+                yield [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(row)]
+                continue
+            cells = ['' if value is None else str(value) for value in row[:width]]
+            yield cells + [''] * (width - len(cells))
+
+    @staticmethod
+    def _xls_sheet_rows(path: str):
+        """(sheet name, row iterator) per sheet of a legacy .xls workbook"""
+        import pandas as pd
+
+        def rows(df):
+            if df.empty:
+                return
+            yield [str(col) for col in df.columns]
+            for row in df.itertuples(index=False, name=None):
+                yield ['' if pd.isna(value) else str(value) for value in row]
+
+        for sheet_name, df in pd.read_excel(path, sheet_name=None).items():
+            yield sheet_name, rows(df)
+
+    def _extract_from_word(self, path: str) -> str:
         """
-        Extract text from Word (.docx) file content
+        Extract text from a Word (.docx) file
 
         Args:
-            file_content: Word file bytes
+            path: Word file path
 
         Returns:
             Extracted text
@@ -208,8 +351,7 @@ class DocumentExtractor:
         from docx import Document
 
         try:
-            word_file = BytesIO(file_content)
-            doc = Document(word_file)
+            doc = Document(path)
 
             text_parts = []
 
@@ -252,33 +394,7 @@ class DocumentExtractor:
         """
         try:
             file_extension = os.path.splitext(file_path)[1].lower()
-
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-
-            # Route to appropriate extractor
-            if file_extension == '.pdf':
-                text = self._extract_from_pdf(file_content)
-                return {"text": text, "format": "pdf"}
-
-            elif file_extension in ['.xlsx', '.xls']:
-                text = self._extract_from_excel(file_content)
-                return {"text": text, "format": "excel"}
-
-            elif file_extension == '.docx':
-                text = self._extract_from_word(file_content)
-                return {"text": text, "format": "word"}
-
-            elif file_extension in ['.txt', '.text']:
-                text = file_content.decode('utf-8', errors='ignore')
-                return {"text": text, "format": "text"}
-
-            else:
-                return {
-                    "error": f"Unsupported file format: {file_extension}",
-                    "text": "",
-                    "format": "unknown"
-                }
+            return self._extract_file(file_path, file_extension)
 
         except Exception as e:
             print(f"Error extracting text from local file: {e}")
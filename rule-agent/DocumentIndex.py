@@ -0,0 +1,261 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Words that precede the number of a named section ("SECTION 4: Eligibility")
+SECTION_PREFIXES = {"section", "part", "chapter", "article"}
+
+# Top-level section headings ("ARTICLE II: ELIGIBILITY", "Section 4 - Income", "3. COVERAGE TIERS")
+SECTION_HEADING = re.compile(
+    r'^[ \t]*(?:(?:ARTICLE|Article|SECTION|Section|PART|Part|CHAPTER|Chapter)\s+[A-Z0-9]+\b(?!\.\d)'
+    r'|\d+\.?[ \t]+[A-Z][A-Z0-9 ,&/()-]{3,}$)',
+    re.MULTILINE
+)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split a document at its top-level section headings
+
+    Returns (title, body) pairs in document order; the title is the heading line (the first line
+    of the document for text before the first heading) and bodies keep their heading.
+    """
+    starts = [match.start() for match in SECTION_HEADING.finditer(text)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        body = text[start:end].strip()
+        if body:
+            sections.append((body.split('\n', 1)[0].strip()[:80], body))
+    return sections
+
+
+# Section and article numbers in the clause references the LLM gives ("Art II, Sec 2.1", "Section 3.2.1")
+CLAUSE_SECTION = re.compile(r'\bSec(?:tion)?\.?\s*(\d+(?:\.\d+)*)', re.IGNORECASE)
+CLAUSE_ARTICLE = re.compile(r'\bArt(?:icle)?\.?\s*([IVXLC]+|\d+)\b', re.IGNORECASE)
+
+
+def page_number_at(page_offsets: List[int], offset: int) -> int:
+    """1-based page of a text offset, page_offsets being the start offset of each page"""
+    return max(1, bisect_right(page_offsets, offset))
+
+
+def clause_offset(text: str, clause_reference: str) -> Optional[int]:
+    """
+    Offset of the heading a clause reference points to, or None if it is not found
+
+    The section number is searched as a heading ("Section 2.1", or "2.1" at the start of a line
+    for dotted numbers) after the referenced article heading, if any.
+    """
+    if not clause_reference:
+        return None
+    article = CLAUSE_ARTICLE.search(clause_reference)
+    section = CLAUSE_SECTION.search(clause_reference)
+
+    start = None
+    if article:
+        match = re.search(rf'^[ \t]*ARTICLE\s+{re.escape(article.group(1))}\b', text, re.IGNORECASE | re.MULTILINE)
+        start = match.start() if match else None
+    if section:
+        number = re.escape(section.group(1))
+        prefix = r'(?:Section\s+)?' if '.' in section.group(1) else r'Section\s+'
+        pattern = re.compile(rf'^[ \t]*{prefix}{number}\b(?!\.\d)', re.IGNORECASE | re.MULTILINE)
+        match = pattern.search(text, start or 0)
+        if match:
+            return match.start()
+    return start
+
+
+def resolve_page_numbers(items: List[Dict], text: str, page_offsets: List[int],
+                         children_key: str = 'dependencies') -> int:
+    """
+    Set the page_number of items (and their children) from the page their clause_reference is on
+
+    LLM page numbers are estimates; items whose clause is not found keep theirs.
+
+    Returns:
+        Number of items whose page was resolved
+    """
+    if not page_offsets:
+        return 0
+    resolved = 0
+    for item in items or []:
+        offset = clause_offset(text, item.get('clause_reference'))
+        if offset is not None:
+            item['page_number'] = page_number_at(page_offsets, offset)
+            resolved += 1
+        resolved += resolve_page_numbers(item.get(children_key) or [], text, page_offsets, children_key)
+    return resolved
+
+
+def normalize_heading(text: str) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation of a heading or title"""
+    return ' '.join(text.lower().split()).strip(' .:-–—')
+
+
+def normalize_section_number(number: str) -> str:
+    return number.strip().lower().rstrip('.:)')
+
+
+class DocumentIndex:
+    """
+    Line offsets and a heading lookup of a document, built in one pass.
+
+    Section boundaries are resolved with dictionary lookups instead of scanning every line of
+    the document for every section, so slicing S sections out of an N-line document costs
+    O(N + S) instead of O(S × N). Headings are indexed by their leading section number and by
+    their normalized title (case, whitespace and trailing punctuation ignored).
+
+    Sections whose heading does not appear on a line of its own fall back to the substring
+    search TableOfContentsExtractor used before the index (number and title anywhere in a line).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split('\n')
+
+        # Offset of the first character of each line (plus the end of the text)
+        self.line_starts = [0]
+        for line in self.lines:
+            self.line_starts.append(self.line_starts[-1] + len(line) + 1)
+
+        self.by_number: Dict[str, List[int]] = {}
+        self.by_title: Dict[str, List[int]] = {}
+        self.line_titles: List[str] = []
+        for i, line in enumerate(self.lines):
+            tokens = line.split(None, 2)
+            title = ""
+            if tokens:
+                number_token, rest = tokens[0], tokens[1:]
+                if number_token.lower() in SECTION_PREFIXES and rest:
+                    number_token, rest = rest[0], rest[1:]
+                self.by_number.setdefault(normalize_section_number(number_token), []).append(i)
+                title = normalize_heading(' '.join(rest))
+                if title:
+                    self.by_title.setdefault(title, []).append(i)
+                full_line = normalize_heading(line)
+                if full_line and full_line != title:
+                    self.by_title.setdefault(full_line, []).append(i)
+            self.line_titles.append(title)
+
+    @staticmethod
+    def _first_after(candidates: List[int], after: int) -> Optional[int]:
+        """First line index in the sorted list that is greater than after"""
+        position = bisect_right(candidates, after)
+        return candidates[position] if position < len(candidates) else None
+
+    def find_heading(self, section: Dict, after: int = -1) -> Optional[int]:
+        """
+        Line index of a section heading, searching lines after the given index
+
+        Returns:
+            Line index, or None if the heading is not on a line of its own
+        """
+        number = normalize_section_number(section.get("section_number", "") or "")
+        title = normalize_heading(section.get("section_title", "") or "")
+
+        if number and title:
+            # Number and title on one line, or the title on the line after the number
+            for i in self.by_number.get(number, [])[bisect_right(self.by_number.get(number, []), after):]:
+                if self.line_titles[i] == title or (
+                        i + 1 < len(self.lines) and normalize_heading(self.lines[i + 1]) == title):
+                    return i
+
+        if title:
+            found = self._first_after(self.by_title.get(title, []), after)
+            if found is not None:
+                return found
+
+        if number and not title:
+            return self._first_after(self.by_number.get(number, []), after)
+        return None
+
+    def _scan_start(self, section: Dict) -> Optional[int]:
+        """Substring search for a section start (fallback for headings not found by lookup)"""
+        section_title = section.get("section_title", "")
+        section_num = section.get("section_number", "")
+        lines = self.lines
+        for i, line in enumerate(lines):
+            line_stripped = line.strip()
+            if section_num in line and section_title in line:
+                return i
+            if section_num and line_stripped.startswith(section_num):
+                if section_title in line or (i + 1 < len(lines) and section_title in lines[i + 1]):
+                    return i
+            if section_title and len(section_title) > 5 and section_title in line:
+                return i
+        return None
+
+    def _scan_end(self, next_section: Dict, start: int) -> Optional[int]:
+        """Substring search for the start of the next section (fallback)"""
+        next_title = next_section.get("section_title", "")
+        next_num = next_section.get("section_number", "")
+        lines = self.lines
+        for i in range(start + 1, len(lines)):
+            if next_num and next_title and next_num in lines[i] and next_title in lines[i]:
+                return i
+            if next_num and lines[i].strip().startswith(next_num):
+                return i
+            if next_title and len(next_title) > 5 and next_title in lines[i]:
+                return i
+        return None
+
+    def section_span(self, section: Dict, next_section: Dict = None) -> Optional[Tuple[int, int]]:
+        """
+        Line range [start, end) of a section
+
+        Args:
+            section: Section metadata (with line_number if available)
+            next_section: Next section metadata (for boundary detection)
+
+        Returns:
+            (start_line, end_line), or None if the section start was not found
+        """
+        if "line_number" in section:
+            start = section["line_number"]
+            end = next_section.get("line_number", len(self.lines)) if next_section else len(self.lines)
+            return start, end
+
+        start = self.find_heading(section)
+        if start is None:
+            start = self._scan_start(section)
+            if start is None:
+                return None
+
+        end = None
+        if next_section:
+            end = self.find_heading(next_section, after=start)
+            if end is None:
+                end = self._scan_end(next_section, start)
+        return start, end if end is not None else len(self.lines)
+
+    def slice_lines(self, start: int, end: int) -> str:
+        """Text of lines [start, end) as one slice of the document (no per-line join)"""
+        start = max(0, min(start, len(self.lines)))
+        end = max(start, min(end, len(self.lines)))
+        if start == end:
+            return ""
+        return self.text[self.line_starts[start]:self.line_starts[end] - 1]
+
+    def section_content(self, section: Dict, next_section: Dict = None) -> str:
+        span = self.section_span(section, next_section)
+        if span is None:
+            return ""
+        return self.slice_lines(*span)
@@ -3,12 +3,18 @@ Dynamic Schema Generator
 Extracts field definitions from policy documents using LLM to generate dynamic Drools schemas
 """
 
-import json
 import logging
 from typing import Dict, List, Any, Optional
+from LLMResponseCache import scoped_llm
+from PolicyRetrieval import context_budget
+from StreamingJSON import IncrementalJSONParser, stream_json
 
 logger = logging.getLogger(__name__)
 
+# Retrieval query for the policy passages that define applicant and policy data
+SCHEMA_CONTEXT_QUERY = ("applicant age income credit score health smoker occupation eligibility requirements "
+                        "coverage amount policy term premium type limits")
+
 
 class DynamicSchemaGenerator:
     """
@@ -23,12 +29,13 @@ class DynamicSchemaGenerator:
         Args:
             llm: Language model instance for schema extraction
         """
-        self.llm = llm
+        self.llm = scoped_llm(llm, "DynamicSchemaGenerator")
 
     def generate_schema_from_policy(self,
                                     policy_text: str,
                                     extracted_queries: List[Dict[str, Any]] = None,
-                                    policy_type: str = "insurance") -> Dict[str, Any]:
+                                    policy_type: str = "insurance",
+                                    retrieval_index=None) -> Dict[str, Any]:
         """
         Generate dynamic schema definitions from policy document
 
@@ -36,6 +43,9 @@ class DynamicSchemaGenerator:
             policy_text: Full policy document text
             extracted_queries: Previously extracted queries/rules from the document
             policy_type: Type of policy (insurance, loan, etc.)
+            retrieval_index: PolicyRetrievalIndex of the document; when given, the prompt carries
+                             the passages relevant to the requirements (POLICY_CONTEXT_TOKENS budget)
+                             instead of the first 10000 characters
 
         Returns:
             Dictionary containing:
@@ -62,8 +72,15 @@ class DynamicSchemaGenerator:
         # Analyze queries to identify required fields dynamically
         required_fields = self._analyze_queries_for_fields(extracted_queries if extracted_queries else [], policy_type)
 
+        if retrieval_index is not None:
+            policy_context = retrieval_index.select(query_texts + [SCHEMA_CONTEXT_QUERY],
+                                                    context_budget("DynamicSchemaGenerator"),
+                                                    "DynamicSchemaGenerator")
+        else:
+            policy_context = f"{policy_text[:10000]}... (truncated for brevity)"
+
         # Create the prompt for LLM with dynamic field requirements
-        prompt = self._create_schema_extraction_prompt(policy_text, queries_context, policy_type, required_fields)
+        prompt = self._create_schema_extraction_prompt(policy_context, queries_context, policy_type, required_fields)
 
         try:
             print("\n" + "="*80)
@@ -73,18 +90,21 @@ class DynamicSchemaGenerator:
             print("...")
             print("="*80)
 
-            response = self.llm.invoke(prompt)
-            response_text = response.content if hasattr(response, 'content') else str(response)
-
-            print("\n" + "="*80)
-            print("DEBUG: SCHEMA GENERATION - LLM RESPONSE")
-            print("="*80)
-            print(response_text[:3000])  # First 3000 chars
-            print("...")
-            print("="*80)
-
-            # Parse JSON from response
-            schema = self._parse_schema_response(response_text)
+            # Stream the response; fields are reported as soon as they are complete and an answer
+            # cut off by the output limit is continued rather than regenerated
+            parser = IncrementalJSONParser(
+                lambda entity, field: print(f"  ✓ {entity}: {field.get('field_name')}")
+                if isinstance(field, dict) else None,
+                element_depth=2)
+            try:
+                schema = self._validate_schema(stream_json(self.llm, prompt, parser, label="Schema fields"))
+            finally:
+                print("\n" + "="*80)
+                print("DEBUG: SCHEMA GENERATION - LLM RESPONSE")
+                print("="*80)
+                print(parser.text()[:3000])  # First 3000 chars
+                print("...")
+                print("="*80)
 
             print("\n" + "="*80)
             print("DEBUG: GENERATED SCHEMA")
@@ -199,7 +219,7 @@ class DynamicSchemaGenerator:
             'policy_hints': policy_hints
         }
 
-    def _create_schema_extraction_prompt(self, policy_text: str, queries_context: str, policy_type: str, required_fields: Dict[str, set] = None) -> str:
+    def _create_schema_extraction_prompt(self, policy_context: str, queries_context: str, policy_type: str, required_fields: Dict[str, set] = None) -> str:
         """Create the LLM prompt for schema extraction"""
 
         # Build required fields hint from query analysis
@@ -231,7 +251,7 @@ class DynamicSchemaGenerator:
 Your task is to analyze the policy document and extract ALL data fields that would be needed to evaluate applications according to this policy.
 
 # Policy Document:
-{policy_text[:10000]}... (truncated for brevity)
+{policy_context}
 
 {queries_context}
 {required_fields_hint}
@@ -345,41 +365,18 @@ CRITICAL: Be comprehensive - extract ALL fields mentioned or implied by the poli
 
 Generate the schema now:"""
 
-    def _parse_schema_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse schema from LLM response"""
-        try:
-            # Try to extract JSON from markdown code blocks
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
-            else:
-                # Try to find JSON object directly
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                json_text = response_text[json_start:json_end].strip()
-
-            # Parse JSON
-            schema = json.loads(json_text)
-
-            # Validate structure
-            if not isinstance(schema.get('applicant_fields'), list):
-                raise ValueError("applicant_fields must be a list")
-            if not isinstance(schema.get('policy_fields'), list):
-                raise ValueError("policy_fields must be a list")
-            if not isinstance(schema.get('field_mappings'), dict):
-                raise ValueError("field_mappings must be a dictionary")
-
-            return schema
-
-        except Exception as e:
-            logger.error(f"Error parsing schema JSON: {e}")
-            logger.debug(f"Response text: {response_text[:500]}")
-            raise
+    def _validate_schema(self, schema: Any) -> Dict[str, Any]:
+        """Validate the schema parsed from the streamed LLM response"""
+        if not isinstance(schema, dict):
+            raise ValueError("schema must be a JSON object")
+        if not isinstance(schema.get('applicant_fields'), list):
+            raise ValueError("applicant_fields must be a list")
+        if not isinstance(schema.get('policy_fields'), list):
+            raise ValueError("policy_fields must be a list")
+        if not isinstance(schema.get('field_mappings'), dict):
+            raise ValueError("field_mappings must be a dictionary")
+
+        return schema
 
     def _generate_minimal_schema(self, policy_type: str) -> Dict[str, Any]:
         """Generate minimal schema as fallback when LLM fails"""
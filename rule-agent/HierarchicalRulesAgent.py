@@ -3,14 +3,62 @@ Hierarchical Rules Agent
 Analyzes policy documents and generates hierarchical rules with parent-child dependencies
 """
 
-import json
+import os
 from typing import Dict, List, Any
+from DocumentIndex import split_sections
+from LLMConcurrency import map_chunks
+from LLMResponseCache import scoped_llm
+from StreamingJSON import IncrementalJSONParser, stream_json
+
+SECTION_PROMPT = """You are an expert underwriting rules analyst. The excerpt below is part of a {policy_type} policy document ({sections}). Generate the hierarchical underwriting rules stated in THIS excerpt only.
+
+IMPORTANT INSTRUCTIONS:
+1. Create a tree structure with parent rules and child dependencies, at most 3 levels deep
+2. **AT MOST 8 RULES IN TOTAL** for this excerpt, with 1-3 top-level rules named after the requirement category (e.g., "Eligibility Verification", "Income Requirements") so that categories found in other excerpts can be merged
+3. Each rule should have:
+   - id: Dot notation (e.g., "1", "1.1", "1.1.1")
+   - name: Brief descriptive name (max 10 words)
+   - description: Brief explanation (max 20 words)
+   - expected: Brief condition (max 15 words)
+   - actual: "To be evaluated" (standard placeholder)
+   - confidence: 0.9 (use fixed value to save tokens)
+   - passed: null
+   - page_number: Integer (estimate if unsure)
+   - clause_reference: Brief reference (e.g., "Art II, Sec 2.1")
+   - dependencies: Array of child rules
+4. If the excerpt states no underwriting requirements (e.g., definitions or signatures only), return []
+5. **CRITICAL**: Return ONLY a valid JSON array - no markdown, no explanation
+
+POLICY EXCERPT:
+{text}
+
+Example element:
+{{"id": "1", "name": "Age Requirement Check", "description": "Verify applicant age is within acceptable range", "expected": "Age between 18 and 65", "actual": "To be evaluated", "confidence": 0.9, "passed": null, "page_number": 3, "clause_reference": "Art II, Sec 2.1", "dependencies": []}}
+
+Generate the hierarchical rules for this excerpt now:"""
+
+
+def _rule_key(rule: Dict[str, Any]) -> str:
+    """Rules with the same name (case and spacing ignored) are the same rule across sections"""
+    return ' '.join(str(rule.get('name', '')).lower().split())
 
 
 class HierarchicalRulesAgent:
     """
     Uses LLM to generate hierarchical rules from policy documents.
     Rules are organized in a tree structure with parent-child dependencies.
+
+    Policies longer than one chunk are processed map-reduce: the text is split at its top-level
+    section headings into chunks of bounded size, a rule subtree is generated per chunk
+    concurrently, and the subtrees are merged into one tree (rules with the same name merged
+    level by level) with renumbered dot-notation ids. Prompt size and the calls in flight stay
+    bounded however long the document is. A chunk that still fails after its retries fails the
+    whole generation rather than leaving its sections out of the tree.
+
+    Configuration (environment):
+        HIERARCHICAL_RULES_MODE: auto (map-reduce above one chunk, default), single or map_reduce
+        HIERARCHICAL_RULES_CHUNK_CHARS: maximum characters of policy text per prompt (default 12000)
+        LLM_CHUNK_TIMEOUT_SECONDS / LLM_CHUNK_RETRIES: per-chunk limits (see LLMConcurrency.map_chunks)
     """
 
     def __init__(self, llm):
@@ -19,7 +67,9 @@ class HierarchicalRulesAgent:
 
         :param llm: Language model instance (e.g., ChatOpenAI)
         """
-        self.llm = llm
+        self.llm = scoped_llm(llm, "HierarchicalRulesAgent")
+        self.mode = os.getenv("HIERARCHICAL_RULES_MODE", "auto").lower()
+        self.chunk_chars = max(1000, int(os.getenv("HIERARCHICAL_RULES_CHUNK_CHARS", "12000")))
 
     def generate_hierarchical_rules(self, policy_text: str, policy_type: str = "general") -> List[Dict[str, Any]]:
         """
@@ -29,6 +79,8 @@ class HierarchicalRulesAgent:
         :param policy_type: Type of policy (insurance, loan, etc.)
         :return: List of root-level rules with nested dependencies
         """
+        if self.mode == "map_reduce" or (self.mode == "auto" and len(policy_text) > self.chunk_chars):
+            return self._generate_map_reduce(policy_text, policy_type)
 
         prompt = f"""You are an expert underwriting rules analyst. Analyze the following {policy_type} policy document and generate a hierarchical structure of underwriting rules.
 
@@ -132,159 +184,151 @@ Generate comprehensive hierarchical rules now:"""
 
         try:
             print("🤖 Invoking LLM to generate hierarchical rules...")
-
-            # Get response from LLM
-            response = self.llm.invoke(prompt)
-            response_text = response.content if hasattr(response, 'content') else str(response)
-
-            print(f"✓ LLM response received ({len(response_text)} characters)")
-
-            # Clean up response - remove markdown code blocks if present
-            response_text = response_text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
-
-            # Parse JSON response with error recovery
-            try:
-                hierarchical_rules = json.loads(response_text)
-            except json.JSONDecodeError as parse_error:
-                print(f"⚠ Initial JSON parse failed: {parse_error}")
-                print(f"⚠ Attempting to repair truncated JSON...")
-
-                # Try to repair truncated JSON
-                response_text = self._repair_truncated_json(response_text)
-
-                try:
-                    hierarchical_rules = json.loads(response_text)
-                    print(f"✓ Successfully repaired and parsed JSON")
-                except json.JSONDecodeError as e:
-                    # If repair fails, save the response for debugging and raise
-                    print(f"✗ JSON repair failed: {e}")
-                    print(f"Response preview (first 1000 chars): {response_text[:1000]}")
-                    print(f"Response preview (last 500 chars): {response_text[-500:]}")
-                    raise ValueError(f"LLM did not return valid JSON even after repair: {e}")
-
-            # Validate structure
-            if not isinstance(hierarchical_rules, list):
-                raise ValueError("Expected a list of rules at the top level")
-
-            # Count total rules
-            def count_rules(rules):
-                count = len(rules)
-                for rule in rules:
-                    if rule.get('dependencies'):
-                        count += count_rules(rule['dependencies'])
-                return count
-
-            total_rules = count_rules(hierarchical_rules)
-            print(f"✓ Generated {len(hierarchical_rules)} top-level rules with {total_rules} total rules in hierarchy")
-
-            # Print tree structure for verification
-            def print_tree(rules, indent=0):
-                for rule in rules:
-                    print(f"{'  ' * indent}├─ {rule['id']}: {rule['name']}")
-                    if rule.get('dependencies'):
-                        print_tree(rule['dependencies'], indent + 1)
-
-            print("\n📋 Hierarchical Rules Structure:")
-            print_tree(hierarchical_rules)
-
+            hierarchical_rules = self._stream_rules(prompt, "Hierarchical rules")
+            self._report(hierarchical_rules)
             return hierarchical_rules
 
         except Exception as e:
             print(f"✗ Error generating hierarchical rules: {e}")
             raise
 
-    def _repair_truncated_json(self, json_text: str) -> str:
+    def _stream_rules(self, prompt: str, label: str) -> List[Dict[str, Any]]:
+        """Generate one rule tree from a prompt"""
+        # Stream the response; root rules are reported as soon as they are complete and an
+        # answer cut off by the output limit is continued rather than regenerated
+        parser = IncrementalJSONParser(
+            lambda _, rule: print(f"  ✓ Rule {rule.get('id')}: {rule.get('name')}")
+            if isinstance(rule, dict) else None)
+        try:
+            rules = stream_json(self.llm, prompt, parser, label=label)
+        except ValueError as e:
+            print(f"Response preview (first 1000 chars): {parser.text()[:1000]}")
+            raise ValueError(f"LLM did not return valid JSON: {e}")
+
+        print(f"✓ LLM response received ({len(parser.text())} characters)")
+
+        # Validate structure
+        if not isinstance(rules, list):
+            raise ValueError("Expected a list of rules at the top level")
+        return rules
+
+    def _report(self, hierarchical_rules: List[Dict[str, Any]]):
+        # Count total rules
+        def count_rules(rules):
+            count = len(rules)
+            for rule in rules:
+                if rule.get('dependencies'):
+                    count += count_rules(rule['dependencies'])
+            return count
+
+        total_rules = count_rules(hierarchical_rules)
+        print(f"✓ Generated {len(hierarchical_rules)} top-level rules with {total_rules} total rules in hierarchy")
+
+        # Print tree structure for verification
+        def print_tree(rules, indent=0):
+            for rule in rules:
+                print(f"{'  ' * indent}├─ {rule['id']}: {rule['name']}")
+                if rule.get('dependencies'):
+                    print_tree(rule['dependencies'], indent + 1)
+
+        print("\n📋 Hierarchical Rules Structure:")
+        print_tree(hierarchical_rules)
+
+    def _generate_map_reduce(self, policy_text: str, policy_type: str) -> List[Dict[str, Any]]:
+        """Generate a subtree per section chunk concurrently, then merge them into one tree"""
+        chunks = self.chunk_policy(policy_text)
+        print(f"🤖 Generating hierarchical rules for {len(chunks)} section chunks "
+              f"(up to {self.chunk_chars} characters each)...")
+
+        def generate_subtree(chunk):
+            prompt = SECTION_PROMPT.format(policy_type=policy_type, sections=chunk["sections"], text=chunk["text"])
+            return self._stream_rules(prompt, f"Rules for {chunk['sections'][:60]}")
+
+        # Failed chunks were already retried (LLM_CHUNK_RETRIES); a tree missing their sections
+        # would be saved and checkpointed as if complete, so the generation fails instead. The
+        # answers of the other chunks stay in the LLM response cache for the rerun.
+        subtrees = map_chunks(generate_subtree, chunks, label="section chunk")
+        failed_chunks = [chunk["sections"] for chunk, tree in zip(chunks, subtrees) if tree is None]
+        if failed_chunks:
+            raise ValueError(f"{len(failed_chunks)} of {len(chunks)} section chunks failed after retries: "
+                             + "; ".join(sections[:60] for sections in failed_chunks))
+
+        hierarchical_rules = self.merge_subtrees(subtrees)
+        self._report(hierarchical_rules)
+        return hierarchical_rules
+
+    def chunk_policy(self, policy_text: str) -> List[Dict[str, str]]:
+        """
+        Split a policy into chunks of at most chunk_chars characters at its top-level section headings
+
+        Consecutive short sections share a chunk; a section longer than a chunk is split at
+        paragraph boundaries (a single oversized paragraph is cut).
+
+        :return: Chunks as {"sections": heading(s) covered, "text": chunk text}
+        """
+        pieces = []
+        for title, body in split_sections(policy_text):
+            if len(body) <= self.chunk_chars:
+                pieces.append((title, body))
+                continue
+            part = ""
+            for paragraph in body.split('\n\n'):
+                while len(paragraph) > self.chunk_chars:
+                    if part:
+                        pieces.append((title, part))
+                        part = ""
+                    pieces.append((title, paragraph[:self.chunk_chars]))
+                    paragraph = paragraph[self.chunk_chars:]
+                if part and len(part) + len(paragraph) + 2 > self.chunk_chars:
+                    pieces.append((title, part))
+                    part = ""
+                part = f"{part}\n\n{paragraph}" if part else paragraph
+            if part:
+                pieces.append((title, part))
+
+        chunks, titles, texts, size = [], [], [], 0
+        for title, text in pieces:
+            if texts and size + len(text) + 2 > self.chunk_chars:
+                chunks.append({"sections": ", ".join(dict.fromkeys(titles)), "text": "\n\n".join(texts)})
+                titles, texts, size = [], [], 0
+            titles.append(title)
+            texts.append(text)
+            size += len(text) + 2
+        if texts:
+            chunks.append({"sections": ", ".join(dict.fromkeys(titles)), "text": "\n\n".join(texts)})
+        return chunks
+
+    def merge_subtrees(self, subtrees: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """
-        Attempt to repair truncated JSON by closing open brackets/braces and strings
+        Merge per-section rule trees into one tree
 
-        :param json_text: Potentially truncated JSON text
-        :return: Repaired JSON text
+        Rules with the same name at the same level (e.g. an "Eligibility Verification" category
+        found in two sections) become one rule whose children are merged the same way; ids are
+        then renumbered in dot notation ("1", "1.1", "1.1.1") in document order.
         """
-        import re
-
-        # Find the last complete character
-        json_text = json_text.rstrip()
-
-        # Count open/close brackets and braces
-        open_brackets = json_text.count('[')
-        close_brackets = json_text.count(']')
-        open_braces = json_text.count('{')
-        close_braces = json_text.count('}')
-
-        # Check if we're in the middle of a string (odd number of quotes before last char)
-        # Find the last quote position
-        last_quote_pos = max(json_text.rfind('"'), json_text.rfind("'"))
-
-        if last_quote_pos > 0:
-            # Count quotes before this position
-            quotes_before = json_text[:last_quote_pos].count('"')
-
-            # If odd number of quotes, we're in an unterminated string
-            if quotes_before % 2 == 1:
-                print(f"⚠ Detected unterminated string at position {last_quote_pos}")
-
-                # Try to find a safe place to truncate
-                # Look backwards for the last complete JSON object
-                # Simple heuristic: find last "}," or last complete field
-
-                # Find the last complete property before the truncation
-                # Pattern: "field": "value" or "field": number or "field": {...}
-                safe_cutoff = max(
-                    json_text.rfind('},'),
-                    json_text.rfind('],'),
-                    json_text.rfind('",'),
-                    json_text.rfind(': null,'),
-                    json_text.rfind(': true,'),
-                    json_text.rfind(': false,')
-                )
-
-                if safe_cutoff > 0:
-                    print(f"⚠ Truncating JSON at safe position: {safe_cutoff}")
-                    json_text = json_text[:safe_cutoff + 1]  # Keep the comma
-
-                    # Recount after truncation
-                    open_brackets = json_text.count('[')
-                    close_brackets = json_text.count(']')
-                    open_braces = json_text.count('{')
-                    close_braces = json_text.count('}')
-
-        # Remove incomplete fields at the end (various patterns)
-        # Pattern 1: "field": (no value at all)
-        json_text = re.sub(r',\s*"[^"]*"\s*:\s*$', '', json_text)
-
-        # Pattern 2: "field": "incomplete_value (unterminated string)
-        json_text = re.sub(r',\s*"[^"]*"\s*:\s*"[^"]*$', '', json_text)
-
-        # Pattern 3: "field": { (incomplete object)
-        json_text = re.sub(r',\s*"[^"]*"\s*:\s*\{\s*$', '', json_text)
-
-        # Pattern 4: "field": [ (incomplete array)
-        json_text = re.sub(r',\s*"[^"]*"\s*:\s*\[\s*$', '', json_text)
-
-        # Pattern 5: "field":}  or "field":]  (missing value before close bracket)
-        json_text = re.sub(r'"[^"]*"\s*:\s*([}\]])', r'\1', json_text)
-
-        # Remove trailing commas before closing brackets
-        json_text = re.sub(r',\s*([}\]])', r'\1', json_text)
-
-        # Close unclosed braces
-        if open_braces > close_braces:
-            print(f"⚠ Closing {open_braces - close_braces} unclosed braces")
-            json_text += '}' * (open_braces - close_braces)
-
-        # Close unclosed brackets
-        if open_brackets > close_brackets:
-            print(f"⚠ Closing {open_brackets - close_brackets} unclosed brackets")
-            json_text += ']' * (open_brackets - close_brackets)
-
-        return json_text
+        merged: List[Dict[str, Any]] = []
+        for tree in subtrees:
+            self._merge_into(merged, tree)
+        self._renumber(merged)
+        return merged
+
+    def _merge_into(self, target: List[Dict[str, Any]], rules: List[Dict[str, Any]]):
+        by_key = {_rule_key(rule): rule for rule in target}
+        for rule in rules:
+            if not isinstance(rule, dict) or not _rule_key(rule):
+                continue
+            children = rule.get('dependencies') or []
+            existing = by_key.get(_rule_key(rule))
+            if existing is None:
+                existing = dict(rule, dependencies=[])
+                target.append(existing)
+                by_key[_rule_key(rule)] = existing
+            self._merge_into(existing.setdefault('dependencies', []), children if isinstance(children, list) else [])
+
+    def _renumber(self, rules: List[Dict[str, Any]], prefix: str = ""):
+        for index, rule in enumerate(rules, 1):
+            rule['id'] = f"{prefix}{index}"
+            self._renumber(rule.get('dependencies') or [], f"{rule['id']}.")
 
     def validate_rule_structure(self, rule: Dict[str, Any]) -> bool:
         """
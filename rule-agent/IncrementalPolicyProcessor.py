@@ -0,0 +1,328 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import hashlib
+from typing import Any, Callable, Dict, List, Optional
+
+from LLMConcurrency import bounded_map
+from TableOfContentsExtractor import get_toc_extractor
+from WorkflowScheduler import resource_slot
+
+SECTION_UNCHANGED = "unchanged"
+SECTION_CHANGED = "changed"
+SECTION_ADDED = "added"
+
+
+def section_content_hash(content: str) -> str:
+    """SHA-256 of the section text with whitespace collapsed (re-flowed text counts as unchanged)"""
+    return hashlib.sha256(' '.join(content.split()).encode('utf-8')).hexdigest()
+
+
+def merge_schemas(base: Optional[Dict[str, Any]], extra: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Union of two dynamic schemas. Fields of base keep their definition; fields of extra are
+    added when base has no field of the same name.
+    """
+    if not base or not extra:
+        return base or extra
+    merged = dict(base)
+    for key in ('applicant_fields', 'policy_fields'):
+        fields = list(base.get(key, []))
+        names = {field.get('field_name') for field in fields}
+        fields.extend(field for field in extra.get(key, []) if field.get('field_name') not in names)
+        merged[key] = fields
+    merged['field_mappings'] = {**extra.get('field_mappings', {}), **base.get('field_mappings', {})}
+    return merged
+
+
+class IncrementalPolicyProcessor:
+    """
+    Reprocesses a revised policy document section by section.
+
+    The document is split into its table-of-contents sections and each section is hashed. The
+    hashes are compared with the per-section snapshot stored for the previous version of the
+    same bank/policy: sections whose text is unchanged reuse their stored LLM analysis, Textract
+    answers and DRL rules, and only changed or new sections are analyzed, queried and turned into
+    rules. The section rules are then merged into one DRL file for validation and deployment, so
+    the cost of reprocessing follows the size of the change rather than the size of the document.
+
+    Sections are matched by content hash first, so a section that only moved or was renumbered
+    in the table of contents is still reused. The first run for a bank/policy has no snapshot to
+    compare against and processes every section (and stores the snapshot for the next run).
+    """
+
+    def __init__(self, llm, db_service, rule_generator, schema_generator, textract):
+        self.llm = llm
+        self.db_service = db_service
+        self.rule_generator = rule_generator
+        self.schema_generator = schema_generator
+        self.textract = textract
+
+    def _map_sections(self, fn: Callable, sections: List[Dict]) -> List[Any]:
+        """
+        Run fn over sections concurrently, results in section order
+
+        Bounded by the LLM provider cap; each call also holds a slot of the process-wide "llm"
+        resource, so section calls share WORKFLOW_LLM_CONCURRENCY with the steps of concurrent
+        workflows. (Callers run as steps without a resource, so no slot is held while waiting.)
+        """
+        def run(section):
+            with resource_slot("llm"):
+                return fn(section)
+
+        return bounded_map(run, sections)
+
+    def prepare(self, document_text: str, bank_id: str, policy_type_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Split the document into sections and diff them against the previous version
+
+        Returns:
+            Plan dict (sections with their diff status, previous version info), or None when the
+            document has no usable section structure
+        """
+        toc_extractor = get_toc_extractor(self.llm)
+        sections = toc_extractor.extract_sections(document_text)
+        if not sections:
+            print("⚠ No sections found in document, incremental processing not possible")
+            return None
+
+        previous = self.db_service.get_latest_policy_document_version(bank_id, policy_type_id)
+        previous_sections = previous['sections'] if previous else []
+        previous_by_hash = {s['content_hash']: s for s in previous_sections}
+        previous_keys = {s['section_key'] for s in previous_sections}
+
+        plan_sections = []
+        seen_keys = set()
+        for section in sections:
+            key = ' '.join(f"{section.get('section_number', '')} {section.get('section_title', '')}".lower().split())
+            base_key, n = key, 1
+            while key in seen_keys:
+                n += 1
+                key = f"{base_key}#{n}"
+            seen_keys.add(key)
+
+            content = section['content']
+            entry = {
+                "section_key": key,
+                "section_number": section.get("section_number"),
+                "section_title": section.get("section_title"),
+                "content": content,
+                "content_hash": section_content_hash(content),
+                "analysis": None,
+                "rule_body": None
+            }
+
+            stored = previous_by_hash.get(entry["content_hash"])
+            if stored and self._is_reusable(stored):
+                entry.update(status=SECTION_UNCHANGED, analysis=stored['analysis'], rule_body=stored['rule_body'])
+            else:
+                entry["status"] = SECTION_CHANGED if key in previous_keys else SECTION_ADDED
+            plan_sections.append(entry)
+
+        reused_hashes = {s["content_hash"] for s in plan_sections if s["status"] == SECTION_UNCHANGED}
+        removed = [s['section_key'] for s in previous_sections
+                   if s['content_hash'] not in reused_hashes and s['section_key'] not in seen_keys]
+
+        plan = {
+            "previous_document_hash": previous['document_hash'] if previous else None,
+            "previous_schema": previous.get('schema') if previous else None,
+            "sections": plan_sections,
+            "removed": removed
+        }
+        summary = self.summary(plan)
+        print(f"✓ Section diff against {plan['previous_document_hash'] or 'no previous version'}: "
+              f"{summary['unchanged']} unchanged, {summary['changed']} changed, "
+              f"{summary['added']} added, {summary['removed']} removed")
+        return plan
+
+    @staticmethod
+    def _is_reusable(stored: Dict[str, Any]) -> bool:
+        """A stored section is reusable if its analysis succeeded and its rules (if any) were generated"""
+        analysis = stored.get('analysis')
+        if analysis is None:
+            return False
+        return stored.get('rule_body') is not None or not analysis.get('queries')
+
+    @staticmethod
+    def pending_sections(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [s for s in plan["sections"] if s["status"] != SECTION_UNCHANGED]
+
+    def summary(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        counts = {SECTION_UNCHANGED: 0, SECTION_CHANGED: 0, SECTION_ADDED: 0}
+        for section in plan["sections"]:
+            counts[section["status"]] += 1
+        pending = self.pending_sections(plan)
+        total_chars = sum(len(s["content"]) for s in plan["sections"])
+        return {
+            "previous_document_hash": plan["previous_document_hash"],
+            "total_sections": len(plan["sections"]),
+            **counts,
+            "removed": len(plan["removed"]),
+            "changed_sections": [s["section_key"] for s in pending],
+            "removed_sections": plan["removed"],
+            "reprocessed_fraction": round(sum(len(s["content"]) for s in pending) / total_chars, 3) if total_chars else 0
+        }
+
+    def analyze(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyze the changed sections and combine them with the stored analysis of the others
+
+        Returns:
+            Analysis in the format of PolicyAnalyzerAgent.analyze_policy (queries, key_sections,
+            rule_categories)
+        """
+        toc_extractor = get_toc_extractor(self.llm)
+        pending = self.pending_sections(plan)
+        print(f"Analyzing {len(pending)} of {len(plan['sections'])} sections...")
+
+        def analyze_section(section):
+            section_result = toc_extractor.analyze_section(section, section["content"])
+            if section_result.get("status") != "success":
+                print(f"  ⚠ Analysis failed for {section['section_key']}: {section_result.get('error')}")
+                return None
+            policies = section_result.get("policies", [])
+            queries = []
+            for policy in policies:
+                query = policy.get("textract_query")
+                if query and query not in queries:
+                    queries.append(query)
+            return {"policies": policies, "queries": queries}
+
+        for section, analysis in zip(pending, self._map_sections(analyze_section, pending)):
+            section["analysis"] = analysis
+
+        queries, policies = [], []
+        for section in plan["sections"]:
+            analysis = section["analysis"] or {}
+            policies.extend(analysis.get("policies", []))
+            for query in analysis.get("queries", []):
+                if query not in queries:
+                    queries.append(query)
+
+        return {
+            "queries": queries,
+            "key_sections": [f"{s['section_number']} - {s['section_title']}" for s in plan["sections"][:10]],
+            "rule_categories": list({p.get("policy_type") for p in policies if p.get("policy_type")}),
+            "extraction_method": "incremental_toc",
+            "total_sections_analyzed": len(pending),
+            "section_diff": self.summary(plan)
+        }
+
+    def reuse_textract_answers(self, plan: Dict[str, Any], document_hash: str) -> int:
+        """Copy the previous version's Textract answers for the queries of unchanged sections"""
+        if not plan["previous_document_hash"]:
+            return 0
+        queries = [query for section in plan["sections"] if section["status"] == SECTION_UNCHANGED
+                   for query in (section["analysis"] or {}).get("queries", [])]
+        copied = self.textract.copy_cached_answers(plan["previous_document_hash"], document_hash, queries)
+        if copied:
+            print(f"✓ Reused {copied} Textract answers of unchanged sections")
+        return copied
+
+    def generate_schema(self, plan: Dict[str, Any], policy_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Extend the previous version's schema with fields needed by the changed sections
+
+        Keeping the previous field names means the stored rules of unchanged sections still
+        match the schema they are deployed with.
+        """
+        pending = [s for s in self.pending_sections(plan) if s["analysis"] and s["analysis"].get("queries")]
+        previous_schema = plan["previous_schema"]
+        if not pending and previous_schema:
+            print("✓ No changed sections with policies, reusing previous schema")
+            return previous_schema
+
+        changed_text = "\n\n".join(s["content"] for s in pending) if previous_schema else \
+            "\n\n".join(s["content"] for s in plan["sections"])
+        changed_queries = [q for s in (pending if previous_schema else plan["sections"])
+                           for q in (s["analysis"] or {}).get("queries", [])]
+        schema = self.schema_generator.generate_schema_from_policy(
+            policy_text=changed_text,
+            extracted_queries=changed_queries,
+            policy_type=policy_type
+        )
+        return merge_schemas(previous_schema, schema)
+
+    def generate_rules(self, plan: Dict[str, Any], extracted_data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Generate DRL rules for the changed sections and merge them with the stored rules of the
+        unchanged sections (the rule generator must already hold the schema)
+
+        Returns:
+            Dict in the format of RuleGeneratorAgent.generate_rules
+        """
+        answers = extracted_data.get('queries', {}) if isinstance(extracted_data, dict) else {}
+        metadata = extracted_data.get('metadata', {}) if isinstance(extracted_data, dict) else {}
+
+        pending = [s for s in self.pending_sections(plan) if s["analysis"] is not None]
+        for section in pending:
+            if not section["analysis"].get("queries"):
+                section["rule_body"] = ""
+        pending = [s for s in pending if s["analysis"].get("queries")]
+        print(f"Generating rules for {len(pending)} changed sections...")
+
+        def generate_section_rules(section):
+            section_data = {
+                'queries': {q: answers[q] for q in section["analysis"]["queries"] if q in answers},
+                'metadata': metadata
+            }
+            return self.rule_generator.generate_rules(section_data, policy_text=section["content"])
+
+        explanations = []
+        for section, rules in zip(pending, self._map_sections(generate_section_rules, pending)):
+            rule_body = self.rule_generator.extract_rule_body(rules.get('drl', ''))
+            # Failed generations stay None so the section is regenerated on the next run
+            section["rule_body"] = rule_body or None
+            if rules.get('explanation'):
+                explanations.append(f"[{section['section_number']} {section['section_title']}]\n{rules['explanation']}")
+
+        rule_bodies = [s["rule_body"] for s in plan["sections"] if s["rule_body"]]
+        if not rule_bodies:
+            return {'drl': "// No DRL rules generated", 'decision_table': "",
+                    'explanation': "\n\n".join(explanations), 'raw_response': ""}
+
+        return {
+            'drl': self.rule_generator.assemble_drl(rule_bodies),
+            'decision_table': "",
+            'explanation': "\n\n".join(explanations),
+            'raw_response': ""
+        }
+
+    def save_snapshot(self, plan: Dict[str, Any], bank_id: str, policy_type_id: str, document_hash: str,
+                      schema: Optional[Dict[str, Any]], source_document: str = None,
+                      regenerate_changed: bool = False) -> int:
+        """
+        Store the sections of this version so the next revision can be diffed against it
+
+        Call once the merged rules are deployed. Sections whose analysis or rule generation failed
+        are left out, so the next run processes them again; so are the sections whose rules were
+        generated by this run when regenerate_changed is set (the validator had to fix the merged
+        DRL, so their stored bodies would not compile).
+        """
+        sections = [section for section in plan["sections"] if self._is_reusable(section) and not (
+            regenerate_changed and section["status"] != SECTION_UNCHANGED and section["rule_body"])]
+        skipped = len(plan["sections"]) - len(sections)
+        if skipped:
+            print(f"⚠ Section snapshot leaves out {skipped} section(s) to be regenerated on the next run")
+        return self.db_service.save_policy_document_version(
+            bank_id=bank_id,
+            policy_type_id=policy_type_id,
+            document_hash=document_hash,
+            sections=[{key: section[key] for key in (
+                'section_key', 'section_number', 'section_title', 'content_hash', 'analysis', 'rule_body'
+            )} for section in sections],
+            schema=schema,
+            source_document=source_document
+        )
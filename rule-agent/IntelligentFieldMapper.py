@@ -6,6 +6,8 @@ Uses LLM to dynamically map test data fields to Drools schema fields
 import json
 import logging
 from typing import Dict, Any, Optional
+from LLMResponseCache import scoped_llm
+from LLMTiers import invoke_with_escalation
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +52,7 @@ class IntelligentFieldMapper:
             llm: Language model instance for intelligent mapping
             schema: Schema dictionary from DynamicSchemaGenerator
         """
-        self.llm = llm
+        self.llm = scoped_llm(llm, "IntelligentFieldMapper")
         self.schema = schema or {}
         self.mapping_cache = {}  # Cache for performance
 
@@ -209,11 +211,11 @@ class IntelligentFieldMapper:
         prompt = self._create_mapping_prompt(test_data, schema_context, entity_type)
 
         try:
-            response = self.llm.invoke(prompt)
-            response_text = response.content if hasattr(response, 'content') else str(response)
-
-            # Parse mapping from response
-            mapping = self._parse_mapping_response(response_text)
+            # Parse mapping from response (retried on the large model if the small one fails)
+            mapping = invoke_with_escalation(
+                self.llm, prompt,
+                lambda response: self._parse_mapping_response(
+                    response.content if hasattr(response, 'content') else str(response)))
 
             # Cache the mapping
             self.mapping_cache[cache_key] = mapping
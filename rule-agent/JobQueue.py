@@ -0,0 +1,270 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from DatabaseService import get_database_service
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE_PROCESS_POLICY = 'process_policy'
+
+# Per-process workflow instance, created on first use inside a worker process
+_worker_workflow = None
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so step results can be stored in JSONB columns"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def _get_worker_workflow():
+    global _worker_workflow
+    if _worker_workflow is None:
+        from CreateLLM import createLLM
+        from UnderwritingWorkflow import UnderwritingWorkflow
+        _worker_workflow = UnderwritingWorkflow(createLLM())
+    return _worker_workflow
+
+
+def run_process_policy_job(job_id: str, s3_url: str, policy_type: str, bank_id: str, resume: bool = False,
+                           use_cache: bool = True, incremental: bool = False) -> str:
+    """
+    Worker-process entry point: run UnderwritingWorkflow.process_policy_document for one job.
+
+    Each finished step is written to the job row as it completes. Cancellation is cooperative:
+    the cancel flag is read back with every step update and the workflow stops at the next
+    step boundary. With resume=True, steps checkpointed by an earlier run are replayed.
+
+    Returns:
+        Final job status
+    """
+    db = get_database_service()
+    if db.is_workflow_job_cancel_requested(job_id):
+        return 'cancelled'
+
+    db.update_workflow_job(job_id, status='running', started_at=datetime.utcnow(), worker_pid=os.getpid())
+    print(f"[job {job_id}] Started in worker process {os.getpid()}")
+
+    def on_step(step_name, step_result):
+        print(f"[job {job_id}] Step finished: {step_name}")
+        return db.record_workflow_job_step(job_id, step_name, _json_safe(step_result))
+
+    try:
+        result = _get_worker_workflow().process_policy_document(
+            s3_url=s3_url,
+            policy_type=policy_type,
+            bank_id=bank_id,
+            progress_callback=on_step,
+            resume=resume,
+            use_cache=use_cache,
+            incremental=incremental
+        )
+    except Exception as e:
+        logger.exception(f"Workflow job {job_id} crashed")
+        db.update_workflow_job(job_id, status='failed', error_message=str(e), finished_at=datetime.utcnow())
+        return 'failed'
+
+    status = result.get('status')
+    if status not in ('completed', 'cancelled'):
+        status = 'failed'
+    db.update_workflow_job(
+        job_id,
+        status=status,
+        result=_json_safe(result),
+        error_message=result.get('error'),
+        finished_at=datetime.utcnow()
+    )
+    print(f"[job {job_id}] Finished with status: {status}")
+    return status
+
+
+class WorkflowJobQueue:
+    """
+    Runs long underwriting workflows outside the HTTP request.
+
+    Jobs are recorded in the workflow_jobs table and executed by a bounded pool of worker
+    processes (spawned, so each worker builds its own LLM clients and database engine).
+    Progress, results and cancellation requests all go through the database, so status
+    queries work from any API process.
+
+    Each job is leased to the API process that queued it (owner hostname:pid): a heartbeat thread
+    renews the leases of its jobs, and jobs whose lease expired (their owner restarted or died) are
+    failed as orphaned, at startup and on every heartbeat. Jobs of sibling API processes that are
+    still alive keep running.
+
+    Configuration (environment):
+        WORKFLOW_JOB_WORKERS: number of worker processes (default 2)
+        WORKFLOW_JOB_HEARTBEAT_SECONDS: lease renewal interval (default 30)
+        WORKFLOW_JOB_LEASE_SECONDS: time without renewal after which a job is orphaned (default 120)
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(os.getenv("WORKFLOW_JOB_WORKERS", "2"))
+        self.heartbeat_seconds = float(os.getenv("WORKFLOW_JOB_HEARTBEAT_SECONDS", "30"))
+        self.lease_seconds = max(float(os.getenv("WORKFLOW_JOB_LEASE_SECONDS", "120")), 2 * self.heartbeat_seconds)
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.db_service = get_database_service()
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._fail_orphaned_jobs()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True, name="workflow-job-heartbeat")
+        self._heartbeat.start()
+
+    def _fail_orphaned_jobs(self):
+        """Fail jobs whose owner stopped renewing their lease (its worker processes are gone)"""
+        try:
+            self.db_service.fail_orphaned_workflow_jobs("Interrupted: owning server process stopped",
+                                                        self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Could not clean up orphaned workflow jobs: {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_seconds):
+            try:
+                self.db_service.renew_workflow_job_leases(self.owner_id)
+            except Exception as e:
+                logger.warning(f"Could not renew workflow job leases: {e}")
+            self._fail_orphaned_jobs()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                print(f"✓ Workflow job pool started with {self.max_workers} worker process(es)")
+            return self._executor
+
+    def submit_process_policy(self, s3_url: str, policy_type: str, bank_id: str,
+                              resume: bool = False, use_cache: bool = True,
+                              incremental: bool = False) -> Dict[str, Any]:
+        """Queue a process_policy_from_s3 run and return the job record"""
+        job_id = str(uuid.uuid4())
+        job = self.db_service.create_workflow_job(
+            job_id=job_id,
+            job_type=JOB_TYPE_PROCESS_POLICY,
+            bank_id=bank_id,
+            policy_type_id=policy_type,
+            s3_url=s3_url,
+            params={'s3_url': s3_url, 'policy_type': policy_type, 'bank_id': bank_id, 'resume': resume,
+                    'use_cache': use_cache, 'incremental': incremental},
+            owner_id=self.owner_id
+        )
+
+        try:
+            future = self._get_executor().submit(
+                run_process_policy_job, job_id, s3_url, policy_type, bank_id, resume, use_cache, incremental
+            )
+        except BrokenProcessPool:
+            # A worker died hard (e.g. OOM kill); start a fresh pool and retry once
+            with self._lock:
+                self._executor = None
+            future = self._get_executor().submit(
+                run_process_policy_job, job_id, s3_url, policy_type, bank_id, resume, use_cache, incremental
+            )
+
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._on_job_done(job_id, f))
+        return job
+
+    def _on_job_done(self, job_id: str, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker process itself failed, so it could not record the outcome
+            logger.error(f"Workflow job {job_id} worker failed: {error}")
+            self.db_service.update_workflow_job(
+                job_id, status='failed', error_message=f"Worker failure: {error}", finished_at=datetime.utcnow()
+            )
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Re-run a finished job as a new job in resume mode, reusing the checkpoints it left behind.
+
+        Returns:
+            The new job record, or None if the original job does not exist
+        """
+        job = self.db_service.get_workflow_job(job_id, include_result=False)
+        if job is None:
+            return None
+        params = job.get('params') or {}
+        return self.submit_process_policy(
+            s3_url=params.get('s3_url', job.get('s3_url')),
+            policy_type=params.get('policy_type', job.get('policy_type_id')),
+            bank_id=params.get('bank_id', job.get('bank_id')),
+            resume=True,
+            use_cache=params.get('use_cache', True),
+            incremental=params.get('incremental', False)
+        )
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at their next step boundary.
+
+        Returns:
+            Updated job record, or None if the job does not exist
+        """
+        job = self.db_service.request_workflow_job_cancel(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return job
+
+    def get_job(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        return self.db_service.get_workflow_job(job_id, include_result=include_result)
+
+    def list_jobs(self, status: str = None, bank_id: str = None, limit: int = 50):
+        return self.db_service.list_workflow_jobs(status=status, bank_id=bank_id, limit=limit)
+
+    def shutdown(self, wait: bool = False):
+        self._stopped.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Singleton instance
+_job_queue_instance = None
+
+
+def get_job_queue() -> WorkflowJobQueue:
+    """Get or create workflow job queue singleton"""
+    global _job_queue_instance
+    if _job_queue_instance is None:
+        _job_queue_instance = WorkflowJobQueue()
+    return _job_queue_instance
@@ -0,0 +1,223 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Sequence
+
+from LLMMetrics import llm_attempt
+
+# Concurrent LLM calls a single fan-out (e.g. per-section analysis) may issue, per LLM_TYPE.
+# A local Ollama server serializes requests, hosted APIs accept more in parallel.
+DEFAULT_PROVIDER_CONCURRENCY = {
+    "LOCAL_OLLAMA": 2,
+    "BAM": 4,
+    "WATSONX": 4,
+    "OPENAI": 8,
+}
+
+
+def get_llm_concurrency() -> int:
+    """
+    Concurrency cap for LLM fan-outs of the configured provider
+
+    Configuration (environment):
+        LLM_MAX_CONCURRENCY_<LLM_TYPE>: cap for one provider (e.g. LLM_MAX_CONCURRENCY_OPENAI)
+        LLM_MAX_CONCURRENCY: cap for every provider
+    """
+    llm_type = os.getenv("LLM_TYPE", "LOCAL_OLLAMA").upper()
+    value = os.getenv(f"LLM_MAX_CONCURRENCY_{llm_type}") or os.getenv("LLM_MAX_CONCURRENCY")
+    if value:
+        return max(1, int(value))
+    return DEFAULT_PROVIDER_CONCURRENCY.get(llm_type, 4)
+
+
+# Calls in flight of the enclosing bounded_map. A call abandoned on timeout keeps its slot until
+# its thread returns, so retries cannot push the open LLM requests past the map's cap.
+_call_slots: contextvars.ContextVar[Optional[threading.Semaphore]] = contextvars.ContextVar(
+    "llm_call_slots", default=None)
+
+
+def call_with_timeout(fn: Callable[[Any], Any], item: Any, timeout: Optional[float]) -> Any:
+    """
+    Call fn(item), raising TimeoutError if it does not return within timeout seconds
+
+    The call runs on a daemon thread that is abandoned (not killed) on timeout, so a hung LLM
+    request no longer blocks the caller but may still finish in the background. Inside
+    bounded_map the thread first takes one of the map's slots and releases it when it returns;
+    waiting for a slot counts against the same timeout.
+    """
+    if not timeout:
+        return fn(item)
+
+    slots = _call_slots.get()
+    if slots is not None and not slots.acquire(timeout=timeout):
+        raise TimeoutError(f"No LLM call slot freed up within {timeout:g}s (earlier calls still running)")
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn(item)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            if slots is not None:
+                slots.release()
+
+    # The call thread inherits the caller's context (run, step and attempt of the LLM metrics)
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target,), daemon=True, name="llm-call")
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"LLM call did not finish within {timeout:g}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _call_with_retries(fn: Callable[[Any], Any], item: Any, retries: int, retry_delay: float,
+                       should_retry: Optional[Callable[[Any], bool]], timeout: Optional[float]) -> Any:
+    delay = retry_delay
+    for attempt in range(retries + 1):
+        last_attempt = attempt == retries
+        try:
+            with llm_attempt(attempt):
+                result = call_with_timeout(fn, item, timeout)
+        except Exception:
+            if last_attempt:
+                raise
+        else:
+            if last_attempt or should_retry is None or not should_retry(result):
+                return result
+        time.sleep(delay)
+        delay *= 2
+
+
+def bounded_map(fn: Callable[[Any], Any], items: Sequence[Any], max_workers: int = None,
+                retries: int = 0, retry_delay: float = 1.0,
+                should_retry: Optional[Callable[[Any], bool]] = None,
+                on_result: Optional[Callable[[int, Any], None]] = None,
+                timeout: float = None) -> List[Any]:
+    """
+    Apply fn to every item on a bounded thread pool and return the results in item order
+
+    A call is retried (with doubling delay) when it raises, times out, or when
+    should_retry(result) is True. After the last attempt the exception is re-raised, or the
+    last result is kept.
+
+    Args:
+        fn: Function of one item
+        items: Items to process
+        max_workers: Concurrency cap (default: get_llm_concurrency())
+        retries: Extra attempts per item
+        retry_delay: Delay before the first retry in seconds
+        should_retry: Predicate marking a returned result as failed
+        on_result: Called as on_result(index, result) on the calling thread as items finish
+                   (in completion order), e.g. for progress output
+        timeout: Seconds one attempt may take (default: no limit). A timed-out attempt still
+                 counts against max_workers until its call returns.
+    """
+    if not items:
+        return []
+
+    workers = min(len(items), max_workers or get_llm_concurrency())
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-map") as pool:
+        token = _call_slots.set(threading.Semaphore(workers))
+        try:
+            futures = {
+                pool.submit(contextvars.copy_context().run,
+                            _call_with_retries, fn, item, retries, retry_delay, should_retry, timeout): index
+                for index, item in enumerate(items)
+            }
+        finally:
+            _call_slots.reset(token)
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result:
+                on_result(index, results[index])
+    return results
+
+
+def map_chunks(fn: Callable[[Any], Any], chunks: Sequence[Any], label: str = "chunk",
+               max_workers: int = None, timeout: float = None, retries: int = None) -> List[Optional[Any]]:
+    """
+    Map an LLM call over document chunks concurrently, tolerating failed chunks
+
+    Results are returned in chunk order; a chunk that still fails (or times out) after its
+    retries is logged and returns None, so the caller's reduce step skips it. Per-chunk timings
+    are printed as chunks finish.
+
+    Configuration (environment):
+        LLM_CHUNK_TIMEOUT_SECONDS: time one chunk attempt may take (default 300)
+        LLM_CHUNK_RETRIES: retries of a failed chunk (default 1)
+    """
+    if timeout is None:
+        timeout = float(os.getenv("LLM_CHUNK_TIMEOUT_SECONDS", "300"))
+    if retries is None:
+        retries = int(os.getenv("LLM_CHUNK_RETRIES", "1"))
+    total = len(chunks)
+    workers = min(total, max_workers or get_llm_concurrency()) if total else 0
+    print(f"  Running {workers} {label}s at a time (timeout {timeout:g}s, {retries} retries)...")
+
+    def run(chunk):
+        started = time.perf_counter()
+        try:
+            result = _call_with_retries(fn, chunk, retries, 1.0, None, timeout)
+            return {"result": result, "error": None, "seconds": time.perf_counter() - started}
+        except Exception as e:
+            return {"result": None, "error": e, "seconds": time.perf_counter() - started}
+
+    def report(index, outcome):
+        if outcome["error"] is None:
+            print(f"  ✓ {label} {index + 1}/{total} done in {outcome['seconds']:.1f}s")
+        else:
+            print(f"  ⚠ Error in {label} {index + 1}/{total} after {outcome['seconds']:.1f}s: {outcome['error']}")
+
+    map_started = time.perf_counter()
+    outcomes = bounded_map(run, chunks, max_workers=max_workers, on_result=report)
+    if outcomes:
+        busy = sum(o["seconds"] for o in outcomes)
+        print(f"  {total} {label}s in {time.perf_counter() - map_started:.1f}s "
+              f"(sum of {label} times {busy:.1f}s)")
+    return [o["result"] for o in outcomes]
+
+
+def dedupe(items: Iterable[Any], key: Callable[[Any], Hashable] = None) -> List[Any]:
+    """
+    Remove duplicates, keeping the first occurrence and the original order
+
+    Dicts and lists (e.g. structured queries or policies) are compared by their JSON content
+    unless a key function is given.
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        if key is not None:
+            item_key = key(item)
+        elif isinstance(item, (dict, list)):
+            item_key = json.dumps(item, sort_keys=True, default=str)
+        else:
+            item_key = item
+        if item_key in seen:
+            continue
+        seen.add(item_key)
+        unique.append(item)
+    return unique
@@ -0,0 +1,351 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from LLMConcurrency import get_llm_concurrency
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process slots are not available
+    fcntl = None
+
+# Priority classes, in admission order
+PRIORITY_INTERACTIVE = "interactive"  # Chat and other request/response endpoints
+PRIORITY_BATCH = "batch"              # Policy ingestion workflows
+PRIORITY_RANKS = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def set_llm_priority(priority: str) -> contextvars.Token:
+    """Admit the LLM calls made from now on (and in threads started from here) with this priority"""
+    return _current_priority.set(priority)
+
+
+def reset_llm_priority(token: contextvars.Token):
+    _current_priority.reset(token)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an exception from a provider client is a rate-limit (HTTP 429) response"""
+    if 'ratelimit' in type(error).__name__.lower():
+        return True
+    if getattr(error, 'status_code', None) == 429 or getattr(getattr(error, 'response', None), 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'too many requests' in message
+
+
+def _env_for_provider(name: str, provider: str, default: str) -> str:
+    """LLM_GOVERNOR_<NAME>_<PROVIDER>, then LLM_GOVERNOR_<NAME>"""
+    return os.getenv(f"LLM_GOVERNOR_{name}_{provider}") or os.getenv(f"LLM_GOVERNOR_{name}", default)
+
+
+class _Budget:
+    """Per-minute budget refilled continuously (token bucket); a limit of 0 means unlimited"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.available = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.per_minute, self.available + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (requests larger than the budget wait for a full bucket)"""
+        if not self.per_minute:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.per_minute) - self.available
+        return max(0.0, needed * 60.0 / self.per_minute)
+
+    def consume(self, amount: float):
+        if self.per_minute:
+            self.available -= amount
+
+
+class _SharedSlots:
+    """
+    Concurrency slots shared by all processes on the host, as flock()ed files in a directory
+
+    The last `reserved` slots are kept for interactive calls: batch calls only take the others,
+    so batch work in any number of processes (e.g. the job-queue workers) leaves the reserved
+    slots free, and interactive calls try the reserved slots first. Within a priority class slots
+    go to whichever waiting process polls first (no cross-process FIFO order).
+    """
+
+    def __init__(self, directory: str, provider: str, slots: int, reserved: int = 0):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f"{provider.lower()}-slot-{i}.lock") for i in range(slots)]
+        self.reserved = max(0, min(reserved, slots - 1))
+
+    def _candidates(self, priority: str):
+        if priority == PRIORITY_INTERACTIVE:
+            return list(reversed(self.paths))
+        return self.paths[:len(self.paths) - self.reserved]
+
+    def acquire(self, priority: str = PRIORITY_BATCH, timeout: float = None) -> Optional[int]:
+        """File descriptor of the locked slot, or None if none was free within the timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        candidates = self._candidates(priority)
+        while True:
+            for path in candidates:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    @staticmethod
+    def release(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class LLMGovernor:
+    """
+    Process-wide admission controller for the LLM calls of one provider.
+
+    Every live (non-cached) call waits for admission. Calls are admitted in priority order
+    (interactive before batch, then first come first served) while the number of calls in flight
+    is below the adaptive concurrency limit and the per-minute request and token budgets allow.
+    The limit follows AIMD: it grows by 1/limit per successful call up to the configured maximum
+    and halves (at most once per second) when the provider answers with a rate-limit error.
+    Rate-limited calls are retried here with backoff, so agents only fall back once the retries
+    are exhausted. With LLM_GOVERNOR_LOCK_DIR set, calls also hold one of the maximum-concurrency
+    slots shared by all processes on the host (e.g. the job-queue workers); priority across
+    processes is limited to the slots reserved for interactive calls (see _SharedSlots).
+
+    Configuration (environment, each also as LLM_GOVERNOR_<NAME>_<LLM_TYPE>):
+        LLM_GOVERNOR_ENABLED: admission control on (default true)
+        LLM_GOVERNOR_MAX_CONCURRENCY: upper bound of the adaptive limit
+                                      (default: LLM_MAX_CONCURRENCY_<LLM_TYPE>, see LLMConcurrency)
+        LLM_GOVERNOR_REQUESTS_PER_MINUTE: request budget (default 0, unlimited)
+        LLM_GOVERNOR_TOKENS_PER_MINUTE: prompt + completion token budget (default 0, unlimited)
+        LLM_GOVERNOR_RATE_LIMIT_RETRIES: retries of a rate-limited call (default 4)
+        LLM_GOVERNOR_LOCK_DIR: directory of the cross-process slot files (default: not shared)
+        LLM_GOVERNOR_INTERACTIVE_SLOTS: cross-process slots batch calls may not take
+                                        (default 1 when the maximum concurrency is above 1)
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.enabled = os.getenv("LLM_GOVERNOR_ENABLED", "true").lower() == "true"
+        self.max_concurrency = max(1, int(_env_for_provider("MAX_CONCURRENCY", provider, "0")) or get_llm_concurrency())
+        self.limit = float(self.max_concurrency)
+        self.requests = _Budget(float(_env_for_provider("REQUESTS_PER_MINUTE", provider, "0")))
+        self.tokens = _Budget(float(_env_for_provider("TOKENS_PER_MINUTE", provider, "0")))
+        self.rate_limit_retries = int(_env_for_provider("RATE_LIMIT_RETRIES", provider, "4"))
+
+        self.shared_slots = None
+        lock_dir = os.getenv("LLM_GOVERNOR_LOCK_DIR")
+        if lock_dir:
+            if fcntl is None:
+                print("⚠ LLM_GOVERNOR_LOCK_DIR needs fcntl (not available on this platform), limiting per process")
+            else:
+                reserved = int(_env_for_provider("INTERACTIVE_SLOTS", provider,
+                                                 "1" if self.max_concurrency > 1 else "0"))
+                self.shared_slots = _SharedSlots(lock_dir, provider, self.max_concurrency, reserved)
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.rate_limit_retried = 0
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITY_RANKS}
+        self._queued = {priority: 0 for priority in PRIORITY_RANKS}
+
+    def _acquire(self, priority: str, tokens: int) -> float:
+        """Wait for admission; returns the queue wait in milliseconds"""
+        started = time.monotonic()
+        ticket = (PRIORITY_RANKS.get(priority, 1), next(self._seq))
+        # Batch calls leave the shared slots reserved for interactive calls to them here as well,
+        # so a batch call waiting for a shared slot never blocks an interactive one of this process
+        reserved = self.shared_slots.reserved if self.shared_slots and priority != PRIORITY_INTERACTIVE else 0
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self._queued[priority] += 1
+            while True:
+                if self._queue[0] == ticket and self.in_flight < max(1, int(self.limit) - reserved):
+                    now = time.monotonic()
+                    budget_wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                    if budget_wait == 0:
+                        break
+                    self._cond.wait(min(budget_wait, 1.0))
+                else:
+                    self._cond.wait(1.0)
+            heapq.heappop(self._queue)
+            self._queued[priority] -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            wait_ms = (time.monotonic() - started) * 1000
+            self._waits[priority].append(wait_ms)
+            # The next ticket may be admissible too
+            self._cond.notify_all()
+        return wait_ms
+
+    def _release(self, rate_limited: bool = False, token_correction: int = 0):
+        with self._cond:
+            self.in_flight -= 1
+            self.tokens.consume(token_correction)
+            if rate_limited:
+                self.rate_limited += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def call(self, fn: Callable[[], Any], prompt_tokens: int,
+             completion_tokens: Callable[[Any], int] = None) -> Tuple[Any, float]:
+        """
+        Run one LLM call under admission control
+
+        Args:
+            fn: The provider call
+            prompt_tokens: Estimated prompt tokens, charged to the token budget on admission
+            completion_tokens: Function of the response returning its completion tokens, charged
+                               after the call
+
+        Returns:
+            (response, total queue wait in milliseconds)
+        """
+        if not self.enabled:
+            return fn(), 0.0
+
+        priority = _current_priority.get()
+        total_wait_ms = 0.0
+        delay = 2.0
+        for attempt in range(self.rate_limit_retries + 1):
+            total_wait_ms += self._acquire(priority, prompt_tokens)
+            slot = self.shared_slots.acquire(priority) if self.shared_slots else None
+            rate_limited, used = False, 0
+            try:
+                response = fn()
+                if completion_tokens:
+                    used = completion_tokens(response)
+                return response, total_wait_ms
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not rate_limited or attempt == self.rate_limit_retries:
+                    raise
+                self.rate_limit_retried += 1
+                print(f"⚠ {self.provider} rate limit, retrying in {delay:g}s")
+            finally:
+                if slot is not None:
+                    self.shared_slots.release(slot)
+                self._release(rate_limited, used)
+            time.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    @contextmanager
+    def admission(self, prompt_tokens: int):
+        """
+        Hold one admission for the duration of the block (streamed calls)
+
+        Yields a dict with the queue wait ("wait_ms"); set "completion_tokens" in it to charge the
+        token budget. A rate-limit error raised in the block lowers the limit but is not retried.
+        """
+        admission = {"wait_ms": 0.0, "completion_tokens": 0}
+        if not self.enabled:
+            yield admission
+            return
+
+        priority = _current_priority.get()
+        admission["wait_ms"] = self._acquire(priority, prompt_tokens)
+        slot = self.shared_slots.acquire(priority) if self.shared_slots else None
+        rate_limited = False
+        try:
+            yield admission
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            raise
+        finally:
+            if slot is not None:
+                self.shared_slots.release(slot)
+            self._release(rate_limited, admission["completion_tokens"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        def percentile(values, pct: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))], 1)
+
+        with self._cond:
+            waits = {priority: list(values) for priority, values in self._waits.items()}
+            return {
+                "provider": self.provider,
+                "enabled": self.enabled,
+                "concurrency_limit": int(self.limit),
+                "max_concurrency": self.max_concurrency,
+                "cross_process": self.shared_slots is not None,
+                "interactive_slots": self.shared_slots.reserved if self.shared_slots else None,
+                "in_flight": self.in_flight,
+                "queued": dict(self._queued),
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "rate_limit_retries": self.rate_limit_retried,
+                "requests_per_minute": self.requests.per_minute or None,
+                "tokens_per_minute": self.tokens.per_minute or None,
+                "queue_wait_ms": {priority: {
+                    "samples": len(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "max": round(max(values), 1) if values else None
+                } for priority, values in waits.items()}
+            }
+
+
+# One governor per provider, shared by every LLM client of the process
+_governors: Dict[str, LLMGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_llm_governor(provider: str) -> LLMGovernor:
+    """Get the process-wide LLMGovernor of a provider (LLM_TYPE)"""
+    provider = provider.upper()
+    with _governors_lock:
+        if provider not in _governors:
+            _governors[provider] = LLMGovernor(provider)
+        return _governors[provider]
+
+
+def get_llm_governor_stats() -> Dict[str, Any]:
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {governor.provider: governor.get_stats() for governor in governors}
@@ -0,0 +1,200 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Run, workflow step and retry attempt of the LLM calls made on the current thread. Thread pools
+# of the workflow (StepScheduler, bounded_map) copy the context into their workers.
+_current_run: contextvars.ContextVar = contextvars.ContextVar("llm_run", default=None)
+_current_step: contextvars.ContextVar = contextvars.ContextVar("llm_step", default=None)
+_current_attempt: contextvars.ContextVar = contextvars.ContextVar("llm_attempt", default=0)
+
+
+@contextmanager
+def llm_step(step: str):
+    """Attribute LLM calls made inside the block to a workflow step"""
+    token = _current_step.set(step)
+    try:
+        yield
+    finally:
+        _current_step.reset(token)
+
+
+@contextmanager
+def llm_attempt(attempt: int):
+    """Mark LLM calls made inside the block as retry number `attempt` (0 = first try)"""
+    token = _current_attempt.set(attempt)
+    try:
+        yield
+    finally:
+        _current_attempt.reset(token)
+
+
+def current_llm_attempt() -> int:
+    """Retry number of the LLM calls made on the current thread (0 = first try)"""
+    return _current_attempt.get()
+
+
+def token_usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt tokens, completion tokens) reported by the provider, None where not reported"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        return usage.get('input_tokens'), usage.get('output_tokens')
+    metadata = getattr(response, 'response_metadata', None) or {}
+    usage = metadata.get('token_usage') or metadata.get('usage') or {}
+    prompt = usage.get('prompt_tokens', usage.get('input_token_count'))
+    completion = usage.get('completion_tokens', usage.get('generated_token_count'))
+    if prompt is None and 'prompt_eval_count' in metadata:
+        # Ollama
+        prompt, completion = metadata.get('prompt_eval_count'), metadata.get('eval_count')
+    return prompt, completion
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) for providers that do not report usage"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+class LLMRunMetrics:
+    """
+    LLM calls of one workflow run, with per-agent and per-step rollups.
+
+    Configuration (environment):
+        LLM_COST_PER_1K_PROMPT_TOKENS: price of 1000 prompt tokens (default 0, no cost reported)
+        LLM_COST_PER_1K_COMPLETION_TOKENS: price of 1000 completion tokens (default 0)
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_at = datetime.utcnow()
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.prompt_price = float(os.getenv("LLM_COST_PER_1K_PROMPT_TOKENS", "0"))
+        self.completion_price = float(os.getenv("LLM_COST_PER_1K_COMPLETION_TOKENS", "0"))
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        if not self.prompt_price and not self.completion_price:
+            return None
+        return round((prompt_tokens or 0) / 1000 * self.prompt_price +
+                     (completion_tokens or 0) / 1000 * self.completion_price, 6)
+
+    def record(self, call: Dict[str, Any]):
+        call["cost_usd"] = 0.0 if call["cached"] else self.cost(call["prompt_tokens"], call["completion_tokens"])
+        with self._lock:
+            self.calls.append(call)
+
+    @staticmethod
+    def _rollup(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latencies = [c["latency_ms"] for c in calls if not c["cached"]]
+        costs = [c["cost_usd"] for c in calls if c["cost_usd"] is not None]
+        return {
+            "calls": len(calls),
+            "cached_calls": sum(1 for c in calls if c["cached"]),
+            "errors": sum(1 for c in calls if c["status"] != "success"),
+            "retries": sum(1 for c in calls if c["retries"]),
+            "total_latency_ms": round(sum(c["latency_ms"] for c in calls), 1),
+            "total_queue_wait_ms": round(sum(c["queue_wait_ms"] for c in calls), 1),
+            "p50_latency_ms": _percentile(latencies, 50),
+            "p95_latency_ms": _percentile(latencies, 95),
+            "max_latency_ms": round(max(latencies), 1) if latencies else None,
+            "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in calls),
+            "completion_tokens": sum(c["completion_tokens"] or 0 for c in calls),
+            "cost_usd": round(sum(costs), 6) if costs else None
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self.calls)
+
+        def grouped(field: str) -> Dict[str, Any]:
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for call in calls:
+                groups.setdefault(call[field] or "unscoped", []).append(call)
+            rollups = {name: self._rollup(group) for name, group in groups.items()}
+            # Most expensive first
+            return dict(sorted(rollups.items(), key=lambda item: item[1]["total_latency_ms"], reverse=True))
+
+        return {
+            "run_id": self.run_id,
+            "totals": self._rollup(calls),
+            "tokens_estimated": any(c["tokens_estimated"] for c in calls),
+            "by_agent": grouped("agent"),
+            "by_step": grouped("step"),
+            "by_model": grouped("model")
+        }
+
+
+def begin_llm_run(run: LLMRunMetrics) -> contextvars.Token:
+    """Collect the LLM calls made from now on (and in threads started from here) into run"""
+    return _current_run.set(run)
+
+
+def end_llm_run(token: contextvars.Token):
+    _current_run.reset(token)
+
+
+@contextmanager
+def track_llm_run(run: LLMRunMetrics):
+    """Collect the LLM calls made inside the block into run"""
+    token = begin_llm_run(run)
+    try:
+        yield run
+    finally:
+        end_llm_run(token)
+
+
+def record_llm_call(agent: Optional[str], provider: str, model: Optional[str], prompt: str,
+                    response: Any, latency_ms: float, cached: bool, error: Exception = None,
+                    queue_wait_ms: float = 0.0):
+    """Record one LLM call in the current run (no-op outside a tracked run)"""
+    run = _current_run.get()
+    if run is None:
+        return
+    prompt_tokens, completion_tokens = token_usage(response) if response is not None else (None, None)
+    estimated = False
+    if prompt_tokens is None:
+        prompt_tokens, estimated = estimate_tokens(prompt), True
+    if completion_tokens is None and response is not None:
+        text = response if isinstance(response, str) else str(getattr(response, 'content', '') or '')
+        completion_tokens, estimated = estimate_tokens(text), True
+    run.record({
+        "agent": agent,
+        "step": _current_step.get(),
+        "provider": provider,
+        "model": model,
+        "latency_ms": round(latency_ms, 1),
+        "queue_wait_ms": round(queue_wait_ms, 1),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens or 0,
+        "tokens_estimated": estimated,
+        "retries": _current_attempt.get(),
+        "cached": cached,
+        "status": "success" if error is None else "error",
+        "error": str(error)[:500] if error is not None else None,
+        "created_at": datetime.utcnow()
+    })
@@ -0,0 +1,470 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+
+from LLMGovernor import get_llm_governor
+from LLMMetrics import current_llm_attempt, estimate_tokens, record_llm_call, token_usage
+from LLMTiers import TIER_LARGE, TIER_SMALL, agent_tier
+
+# LLM_CACHE_MODE values
+MODE_OFF = "off"              # Every call goes to the provider
+MODE_READWRITE = "readwrite"  # Serve hits, store misses (opted-out agents bypass the cache)
+MODE_RECORD = "record"        # Every call goes to the provider and is stored, for every agent
+MODE_REPLAY = "replay"        # Serve stored responses only (no TTL); a miss raises LLMCacheMissError
+CACHE_MODES = (MODE_OFF, MODE_READWRITE, MODE_RECORD, MODE_REPLAY)
+
+
+class LLMCacheMissError(RuntimeError):
+    """Raised in replay mode when a prompt has no stored response"""
+
+
+def llm_settings(llm) -> Dict[str, Any]:
+    """Model name and temperature of a LangChain LLM (across the Ollama, OpenAI and watsonx clients)"""
+    model = None
+    for attr in ('model_name', 'model_id', 'model'):
+        model = getattr(llm, attr, None)
+        if model:
+            break
+    temperature = getattr(llm, 'temperature', None)
+    if temperature is None:
+        params = getattr(llm, 'params', None) or getattr(llm, 'parameters', None)
+        if isinstance(params, dict):
+            temperature = params.get('temperature')
+        elif params is not None:
+            temperature = getattr(params, 'temperature', None)
+    return {"model": str(model) if model else None, "temperature": temperature}
+
+
+def prompt_text(prompt: Any) -> str:
+    """Text of an LLM input: a string, a formatted prompt template or a list of messages"""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, PromptValue):
+        return prompt.to_string()
+    return json.dumps(prompt, sort_keys=True, default=lambda m: message_to_dict(m)
+                      if isinstance(m, BaseMessage) else str(m))
+
+
+def _serialize_response(response: Any) -> str:
+    if isinstance(response, BaseMessage):
+        return json.dumps({"kind": "message", "message": message_to_dict(response)})
+    return json.dumps({"kind": "text", "text": response if isinstance(response, str) else str(response)})
+
+
+def _deserialize_response(data: str) -> Any:
+    entry = json.loads(data)
+    if entry["kind"] == "message":
+        return messages_from_dict([entry["message"]])[0]
+    return entry["text"]
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses in a SQLite file.
+
+    Responses are keyed by (provider, model, temperature, prompt hash) plus any call options
+    (e.g. stop sequences), so identical prompts across reruns, tenants and tests are answered
+    from disk. Entries older than the TTL are treated as misses; after each write the least
+    recently used entries are evicted until the file is within its size limit. SQLite handles
+    concurrent access from the API process and the job-queue workers.
+
+    Retries (calls inside llm_attempt(n) with n > 0) skip the lookup and overwrite the entry, and
+    callers discard a response they could not use, so a rejected answer is not served again.
+
+    Configuration (environment):
+        LLM_CACHE_MODE: off, readwrite (default), record or replay
+        LLM_CACHE_PATH: SQLite file (default /data/llm_cache/llm_cache.sqlite)
+        LLM_CACHE_MAX_MB: size limit in MB (default 256)
+        LLM_CACHE_TTL_HOURS: entry lifetime, 0 for no expiry (default 168)
+        LLM_CACHE_DISABLED_AGENTS: comma-separated agents that bypass the cache in readwrite
+                                   mode (e.g. DRLValidator,TestCaseGenerator)
+    """
+
+    def __init__(self, path: str = None, mode: str = None, max_bytes: int = None, ttl_seconds: float = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", "/data/llm_cache/llm_cache.sqlite")
+        self.mode = (mode or os.getenv("LLM_CACHE_MODE", MODE_READWRITE)).lower()
+        if self.mode not in CACHE_MODES:
+            print(f"⚠ Unknown LLM_CACHE_MODE '{self.mode}', using {MODE_READWRITE}")
+            self.mode = MODE_READWRITE
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+        self.disabled_agents = {a.strip() for a in os.getenv("LLM_CACHE_DISABLED_AGENTS", "").split(',') if a.strip()}
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.evictions = 0
+        self.discarded = 0
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+
+        if self.mode != MODE_OFF:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    agent TEXT,
+                    response TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses(last_used)")
+            self._conn.commit()
+        print(f"LLM response cache: {self.mode}" + (f" at {self.path}" if self._conn else ""))
+
+    @staticmethod
+    def make_key(provider: str, model: Optional[str], temperature: Any, prompt: str,
+                 options: Dict[str, Any] = None) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        key = json.dumps([provider, model, temperature, prompt_hash, options or {}],
+                         sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def reads_for(self, agent: Optional[str]) -> bool:
+        """Whether calls of this agent are answered from the cache"""
+        if self.mode == MODE_REPLAY:
+            return True
+        return self.mode == MODE_READWRITE and agent not in self.disabled_agents
+
+    def reads_for_attempt(self, agent: Optional[str]) -> bool:
+        """Whether the current call of this agent is answered from the cache (retries go to the provider)"""
+        if self.mode == MODE_REPLAY:
+            return True
+        return self.reads_for(agent) and current_llm_attempt() == 0
+
+    def writes_for(self, agent: Optional[str]) -> bool:
+        """Whether responses of this agent are stored"""
+        if self.mode == MODE_RECORD:
+            return True
+        return self.mode == MODE_READWRITE and agent not in self.disabled_agents
+
+    def _count(self, agent: Optional[str], outcome: str):
+        counts = self.by_agent.setdefault(agent or "default", {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+        if outcome == "hits":
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, key: str, agent: Optional[str] = None) -> Optional[Any]:
+        """Stored response for a key, or None (expired entries count as misses)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (key,)).fetchone()
+            if row and self.mode != MODE_REPLAY and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self._count(agent, "misses")
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self._count(agent, "hits")
+        return _deserialize_response(row[0])
+
+    def put(self, key: str, response: Any, provider: str = None, model: str = None, agent: str = None):
+        data = _serialize_response(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(cache_key, provider, model, agent, response, size_bytes, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, agent, data, len(data.encode('utf-8')), now, now))
+            self._conn.commit()
+            self.stores += 1
+            self._evict()
+
+    def discard(self, key: str) -> bool:
+        """Delete a stored response (e.g. one the caller could not parse); whether there was one"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,)).rowcount
+            self._conn.commit()
+            self.discarded += deleted
+        return deleted > 0
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is within its size limit"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute(
+                "SELECT cache_key, size_bytes FROM llm_responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._conn.commit()
+        self.evictions += evicted
+        print(f"LLM response cache evicted {evicted} response(s)")
+
+    def clear(self) -> int:
+        if self._conn is None:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM llm_responses").rowcount
+            self._conn.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries, total = 0, 0
+        if self._conn is not None:
+            with self._lock:
+                entries, total = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "path": self.path if self._conn else None,
+            "entries": entries,
+            "total_size_mb": round(total / (1024 * 1024), 2),
+            "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "ttl_hours": round(self.ttl_seconds / 3600, 2) if self.ttl_seconds else None,
+            "disabled_agents": sorted(self.disabled_agents),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stores": self.stores,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "discarded": self.discarded,
+            "by_agent": {agent: dict(counts) for agent, counts in self.by_agent.items()}
+        }
+
+
+def _completion_tokens(response: Any) -> int:
+    completion = token_usage(response)[1]
+    if completion is None:
+        text = response if isinstance(response, str) else str(getattr(response, 'content', ''))
+        completion = estimate_tokens(text)
+    return completion
+
+
+class CachingLLM(Runnable):
+    """
+    LLM wrapper returned by createLLM that answers repeated prompts from the response cache,
+    sends the others through the provider's admission controller (see LLMGovernor) and records
+    every call (latency, tokens, retries, agent and step; see LLMMetrics).
+
+    Works wherever the provider client did: llm.invoke(prompt), llm.stream(prompt) and
+    prompt | llm chains.
+    Attributes (model_name, temperature, ...) are read through to the wrapped client. Agents
+    label their calls with for_agent(name), which drives the per-agent opt-out and metrics and
+    routes the agent to its model tier (see LLMTiers).
+    """
+
+    def __init__(self, llm, provider: str, cache: LLMResponseCache, agent: str = None,
+                 tiers: Dict[str, "CachingLLM"] = None):
+        self.wrapped_llm = llm
+        self.provider = provider
+        self.cache = cache
+        self.agent = agent
+        self.tiers = tiers  # Tier name -> unscoped CachingLLM, when a small tier is configured
+        self.escalation = None  # Large-tier LLM of an agent routed to the small tier
+        self.settings = llm_settings(llm)
+        self.governor = get_llm_governor(provider)
+
+    def __getattr__(self, name):
+        # Only called for attributes the wrapper does not define
+        if name == "wrapped_llm":
+            raise AttributeError(name)
+        return getattr(self.wrapped_llm, name)
+
+    def for_agent(self, agent: str) -> "CachingLLM":
+        """The LLM of the agent's tier, with calls attributed to the agent"""
+        tier = agent_tier(agent)
+        tiered = (self.tiers or {}).get(tier)
+        if tiered is not None and tiered.wrapped_llm is not self.wrapped_llm:
+            return tiered.for_agent(agent)
+        scoped = CachingLLM(self.wrapped_llm, self.provider, self.cache, agent, self.tiers)
+        large = (self.tiers or {}).get(TIER_LARGE)
+        if tier == TIER_SMALL and large is not None and large.wrapped_llm is not self.wrapped_llm:
+            scoped.escalation = CachingLLM(large.wrapped_llm, large.provider, large.cache, agent, self.tiers)
+        return scoped
+
+    def invoke(self, input: Any, config=None, **kwargs) -> Any:
+        prompt = prompt_text(input)
+        started = time.perf_counter()
+        response, cached, queue_wait_ms, error = None, False, 0.0, None
+        try:
+            response, cached, queue_wait_ms = self._invoke(input, prompt, config, kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            record_llm_call(self.agent, self.provider, self.settings["model"], prompt, response,
+                            (time.perf_counter() - started) * 1000, cached, error, queue_wait_ms)
+
+    def stream(self, input: Any, config=None, **kwargs) -> Iterator[Any]:
+        """
+        Stream the response chunk by chunk; a cached response is yielded as one chunk
+
+        The stream holds one admission of the LLM governor while it runs. Once it is exhausted,
+        the aggregated response is cached and the call recorded like an invoke.
+        """
+        prompt = prompt_text(input)
+        started = time.perf_counter()
+        response, cached, queue_wait_ms, error, finished = None, False, 0.0, None, False
+        reads, writes = self.cache.reads_for_attempt(self.agent), self.cache.writes_for(self.agent)
+        key = None
+        if reads or writes:
+            key = self._cache_key(prompt, kwargs)
+        try:
+            if reads:
+                hit = self.cache.get(key, self.agent)
+                if hit is not None:
+                    response, cached = hit, True
+                    yield hit
+                    return
+                if self.cache.mode == MODE_REPLAY:
+                    raise LLMCacheMissError(
+                        f"No recorded response for {self.agent or 'LLM'} prompt (key {key[:12]}) in replay mode")
+
+            with self.governor.admission(estimate_tokens(prompt)) as admission:
+                queue_wait_ms = admission["wait_ms"]
+                for chunk in self.wrapped_llm.stream(input, config, **kwargs):
+                    response = chunk if response is None else response + chunk
+                    yield chunk
+                finished = True
+                if response is not None:
+                    admission["completion_tokens"] = _completion_tokens(response)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # A consumer that stops reading leaves a partial response, which is not cached
+            if writes and finished and response is not None:
+                try:
+                    self.cache.put(key, response, self.provider, self.settings["model"], self.agent)
+                except Exception as e:
+                    print(f"⚠ Could not store LLM response: {e}")
+            record_llm_call(self.agent, self.provider, self.settings["model"], prompt, response,
+                            (time.perf_counter() - started) * 1000, cached, error, queue_wait_ms)
+
+    def discard_response(self, input: Any, **kwargs) -> bool:
+        """
+        Drop the cached response to an input, e.g. when the caller could not parse or validate it
+
+        Returns:
+            Whether a stored response was deleted
+        """
+        if self.cache.mode in (MODE_OFF, MODE_REPLAY) or not (
+                self.cache.reads_for(self.agent) or self.cache.writes_for(self.agent)):
+            return False
+        try:
+            return self.cache.discard(self._cache_key(prompt_text(input), kwargs))
+        except Exception as e:
+            print(f"⚠ Could not discard LLM response: {e}")
+            return False
+
+    def _cache_key(self, prompt: str, kwargs: Dict[str, Any]) -> str:
+        return self.cache.make_key(self.provider, self.settings["model"], self.settings["temperature"],
+                                   prompt, kwargs)
+
+    def _call_provider(self, input: Any, prompt: str, config, kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+        """Provider call under the LLM governor's admission control: (response, queue wait ms)"""
+        return self.governor.call(lambda: self.wrapped_llm.invoke(input, config, **kwargs),
+                                  estimate_tokens(prompt), _completion_tokens)
+
+    def _invoke(self, input: Any, prompt: str, config, kwargs: Dict[str, Any]) -> Tuple[Any, bool, float]:
+        """(response, whether it came from the cache, queue wait ms)"""
+        reads, writes = self.cache.reads_for_attempt(self.agent), self.cache.writes_for(self.agent)
+        if not reads and not writes:
+            response, queue_wait_ms = self._call_provider(input, prompt, config, kwargs)
+            return response, False, queue_wait_ms
+
+        key = self._cache_key(prompt, kwargs)
+        if reads:
+            cached = self.cache.get(key, self.agent)
+            if cached is not None:
+                return cached, True, 0.0
+            if self.cache.mode == MODE_REPLAY:
+                raise LLMCacheMissError(
+                    f"No recorded response for {self.agent or 'LLM'} prompt (key {key[:12]}) in replay mode")
+
+        response, queue_wait_ms = self._call_provider(input, prompt, config, kwargs)
+        if writes:
+            try:
+                self.cache.put(key, response, self.provider, self.settings["model"], self.agent)
+            except Exception as e:
+                print(f"⚠ Could not store LLM response: {e}")
+        return response, False, queue_wait_ms
+
+
+def scoped_llm(llm, agent: str):
+    """LLM whose calls are attributed to an agent (unwrapped clients are returned unchanged)"""
+    if isinstance(llm, CachingLLM):
+        return llm.for_agent(agent)
+    return llm
+
+
+def unwrap_llm(llm):
+    """Provider client behind a CachingLLM"""
+    return llm.wrapped_llm if isinstance(llm, CachingLLM) else llm
+
+
+# Singleton instance
+_llm_cache_instance = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get singleton instance of LLMResponseCache"""
+    global _llm_cache_instance
+    with _llm_cache_lock:
+        if _llm_cache_instance is None:
+            _llm_cache_instance = LLMResponseCache()
+    return _llm_cache_instance
+
+
+def set_llm_tiers(large: CachingLLM, small: CachingLLM):
+    """Let agents configured for the small tier (LLM_AGENT_TIERS) use small, escalating to large"""
+    tiers = {TIER_LARGE: large, TIER_SMALL: small}
+    large.tiers = tiers
+    small.tiers = tiers
+
+
+def wrap_llm(llm, provider: str):
+    """Wrap a provider client in the response cache and call instrumentation"""
+    if llm is None:
+        return None
+    return CachingLLM(llm, provider, get_llm_cache())
@@ -0,0 +1,89 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import os
+from typing import Any, Callable, Dict, TypeVar
+
+# Model tiers. The large tier is the model configured by LLM_TYPE; the small tier is
+# LLM_SMALL_MODEL_NAME on LLM_SMALL_TYPE (default: the same provider).
+TIER_LARGE = "large"
+TIER_SMALL = "small"
+
+T = TypeVar("T")
+
+
+def get_agent_tiers() -> Dict[str, str]:
+    """
+    Tier per agent from LLM_AGENT_TIERS (e.g. "IntelligentFieldMapper=small,TestCaseGenerator=small")
+
+    Agents not listed use the large tier.
+    """
+    tiers = {}
+    for entry in os.getenv("LLM_AGENT_TIERS", "").split(','):
+        agent, _, tier = entry.partition('=')
+        if agent.strip() and tier.strip():
+            tiers[agent.strip()] = tier.strip().lower()
+    return tiers
+
+
+def agent_tier(agent: str) -> str:
+    return get_agent_tiers().get(agent, TIER_LARGE)
+
+
+def run_with_escalation(llm, call: Callable[[Any], T]) -> T:
+    """
+    Run call(llm), escalating to the large tier when it fails
+
+    Agents routed to the small tier carry an `escalation` LLM (the large tier, see
+    CachingLLM.for_agent). When call raises with the small model (typically because its output
+    could not be parsed), it is run once more with the large model; otherwise the error propagates.
+    """
+    try:
+        return call(llm)
+    except Exception as e:
+        larger = getattr(llm, 'escalation', None)
+        if larger is None:
+            raise
+        print(f"⚠ {getattr(llm, 'agent', None) or 'LLM'}: could not use small-tier output ({e}), "
+              f"escalating to {larger.settings.get('model') or 'the large model'}")
+        return call(larger)
+
+
+def discard_response(llm, prompt: Any):
+    """Drop the cached response of a CachingLLM to a prompt (a no-op for unwrapped clients)"""
+    discard = getattr(llm, 'discard_response', None)
+    if callable(discard):
+        discard(prompt)
+
+
+def invoke_with_escalation(llm, prompt: Any, parse: Callable[[Any], T]) -> T:
+    """
+    Invoke an agent's LLM and parse the response, escalating to the large tier on parse failure
+
+    Args:
+        llm: The agent's LLM
+        prompt: LLM input (string, prompt value or messages)
+        parse: Function of the response returning the parsed result; raises if unusable
+    """
+    def call(tier_llm):
+        response = tier_llm.invoke(prompt)
+        try:
+            return parse(response)
+        except Exception:
+            # An unusable answer must not be served from the response cache on the next try
+            discard_response(tier_llm, prompt)
+            raise
+
+    return run_with_escalation(llm, call)
@@ -0,0 +1,225 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback keeps the store usable without the optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBlobBackend:
+    """Stores blobs as files under a local directory, fanned out by hash prefix"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        Path(self.root_dir).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never observe a partially written blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class S3BlobBackend:
+    """Stores blobs as S3 objects under a key prefix"""
+
+    def __init__(self, bucket: str, prefix: str, s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client(
+                's3',
+                region_name=os.getenv("AWS_REGION", "us-east-1"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+            )
+        self.s3_client = s3_client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+
+    def put(self, key: str, data: bytes):
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(key))
+            return response['Body'].read()
+        except Exception as e:
+            logger.warning(f"Payload blob {key} could not be read from S3: {e}")
+            return None
+
+
+class PayloadStore:
+    """
+    Keeps large JSON payloads (KIE batch requests/responses) out of Postgres rows.
+
+    Payloads whose serialized size is at or below the inline threshold are returned unchanged
+    for storage in the JSONB column. Larger ones are compressed (zstd, or zlib when zstandard
+    is not installed) and written once to a content-addressed blob keyed by the SHA-256 of the
+    serialized JSON; the row keeps only that hash. Identical payloads therefore share one blob.
+
+    Configuration (environment):
+        PAYLOAD_INLINE_MAX_BYTES: inline threshold in bytes (default 8192)
+        PAYLOAD_STORE_BACKEND: 'local' (default) or 's3'
+        PAYLOAD_STORE_DIR: directory for the local backend (default /data/payload_store)
+        PAYLOAD_STORE_S3_PREFIX: key prefix for the S3 backend (default payload-blobs)
+    """
+
+    def __init__(self, backend=None, inline_max_bytes: int = None, cache_size: int = 128):
+        self.inline_max_bytes = inline_max_bytes if inline_max_bytes is not None else int(
+            os.getenv("PAYLOAD_INLINE_MAX_BYTES", "8192"))
+        self.backend = backend or self._backend_from_env()
+        self.codec = 'zst' if zstandard else 'zlib'
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _backend_from_env():
+        backend = os.getenv("PAYLOAD_STORE_BACKEND", "local").lower()
+        if backend == 's3':
+            return S3BlobBackend(
+                bucket=os.getenv("AWS_S3_BUCKET", "uw-data-extraction"),
+                prefix=os.getenv("PAYLOAD_STORE_S3_PREFIX", "payload-blobs")
+            )
+        return LocalBlobBackend(os.getenv("PAYLOAD_STORE_DIR", "/data/payload_store"))
+
+    @staticmethod
+    def _serialize(payload: Any) -> bytes:
+        return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+    @staticmethod
+    def _blob_key(digest: str, codec: str) -> str:
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.json.{codec}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zst':
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return zlib.compress(data, 6)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == 'zst':
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd-compressed payload blobs")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def offload(self, payload: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Decide where a payload lives.
+
+        Returns:
+            (inline_payload, None) for small payloads, or (None, reference) once a large payload
+            has been written to the blob store. If the blob write fails the payload stays inline.
+        """
+        if payload is None:
+            return None, None
+
+        data = self._serialize(payload)
+        if len(data) <= self.inline_max_bytes:
+            return payload, None
+
+        digest = hashlib.sha256(data).hexdigest()
+        reference = f"{self.codec}:{digest}"
+        key = self._blob_key(digest, self.codec)
+        try:
+            if not self.backend.exists(key):
+                self.backend.put(key, self._compress(data))
+        except Exception as e:
+            logger.warning(f"Payload blob write failed, storing {len(data)} bytes inline: {e}")
+            return payload, None
+        return None, reference
+
+    def load(self, reference: str) -> Any:
+        """Fetch and decode the payload behind a reference (recently used payloads are kept in memory)"""
+        with self._lock:
+            if reference in self._cache:
+                self._cache.move_to_end(reference)
+                return self._cache[reference]
+
+        codec, digest = reference.split(':', 1)
+        blob = self.backend.get(self._blob_key(digest, codec))
+        if blob is None:
+            raise KeyError(f"Payload blob not found: {reference}")
+        payload = json.loads(self._decompress(blob, codec))
+
+        with self._lock:
+            self._cache[reference] = payload
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    def resolve(self, inline_payload: Any, reference: Optional[str]) -> Any:
+        """Return the payload for a row, whether it was stored inline or offloaded"""
+        if reference:
+            return self.load(reference)
+        return inline_payload
+
+
+# Singleton instance
+_payload_store_instance = None
+
+
+def get_payload_store() -> PayloadStore:
+    """Get or create payload store singleton"""
+    global _payload_store_instance
+    if _payload_store_instance is None:
+        _payload_store_instance = PayloadStore()
+    return _payload_store_instance
@@ -16,8 +16,17 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from typing import List, Dict
+from LLMConcurrency import dedupe, map_chunks
 import json
 import os
+from LLMResponseCache import scoped_llm
+
+
+def _query_key(query) -> str:
+    """Dedup key of a query (plain string or dict with query_text): case and whitespace insensitive"""
+    text = query.get('query_text', '') if isinstance(query, dict) else str(query)
+    return ' '.join(text.lower().split())
+
 
 class PolicyAnalyzerAgent:
     """
@@ -31,7 +40,7 @@ class PolicyAnalyzerAgent:
     """
 
     def __init__(self, llm):
-        self.llm = llm
+        self.llm = scoped_llm(llm, "PolicyAnalyzerAgent")
         self.use_toc_mode = os.getenv("USE_TOC_EXTRACTION", "true").lower() == "true"
 
         self.analysis_prompt = ChatPromptTemplate.from_messages([
@@ -286,26 +295,23 @@ IMPORTANT:
 
         print(f"  Analyzing document in {len(chunks)} chunks...")
 
+        # Chunks are independent, so they are analyzed concurrently; results are merged in chunk order
+        results = map_chunks(lambda chunk: self.chain.invoke({"document_text": chunk}), chunks)
+
         all_queries = []
         all_sections = []
         all_categories = []
-
-        for i, chunk in enumerate(chunks):
-            try:
-                print(f"  Processing chunk {i+1}/{len(chunks)}...")
-                result = self.chain.invoke({"document_text": chunk})
-
-                all_queries.extend(result.get("queries", []))
-                all_sections.extend(result.get("key_sections", []))
-                all_categories.extend(result.get("rule_categories", []))
-
-            except Exception as e:
-                print(f"  ⚠ Error in chunk {i+1}: {e}")
-
-        # Deduplicate while preserving order
-        unique_queries = list(dict.fromkeys(all_queries))
-        unique_sections = list(dict.fromkeys(all_sections))
-        unique_categories = list(dict.fromkeys(all_categories))
+        for result in results:
+            if not result:
+                continue
+            all_queries.extend(result.get("queries", []))
+            all_sections.extend(result.get("key_sections", []))
+            all_categories.extend(result.get("rule_categories", []))
+
+        # Deduplicate while preserving order (overlapping chunks repeat queries, possibly re-worded in case/spacing)
+        unique_queries = dedupe(all_queries, key=_query_key)
+        unique_sections = dedupe(all_sections)
+        unique_categories = dedupe(all_categories)
 
         print(f"  ✓ Combined analysis: {len(unique_queries)} unique queries from {len(chunks)} chunks")
 
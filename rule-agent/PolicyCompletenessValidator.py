@@ -17,6 +17,17 @@ import re
 from typing import Dict, List, Set
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from LLMConcurrency import dedupe, map_chunks
+from LLMResponseCache import scoped_llm
+
+
+def _policy_key(policy: Dict) -> str:
+    """Dedup key of an extracted policy: its statement, case and whitespace insensitive"""
+    statement = policy.get('policy_statement') if isinstance(policy, dict) else None
+    if not statement:
+        return repr(policy)
+    return ' '.join(str(statement).lower().split())
+
 
 class PolicyCompletenessValidator:
     """
@@ -30,7 +41,7 @@ class PolicyCompletenessValidator:
     """
 
     def __init__(self, llm):
-        self.llm = llm
+        self.llm = scoped_llm(llm, "PolicyCompletenessValidator")
 
         # Common policy indicators (patterns that suggest a policy/rule)
         self.policy_patterns = [
@@ -184,30 +195,29 @@ Extract ALL policies comprehensively.""")
         # Split into chunks if document is too large
         chunks = self._chunk_document(document_text, max_chunk_size)
 
-        all_policies = []
-        all_sections = set()
-
-        for i, chunk in enumerate(chunks):
-            print(f"Analyzing chunk {i+1}/{len(chunks)} ({len(chunk)} chars)...")
+        print(f"Analyzing {len(document_text)} chars in {len(chunks)} chunks...")
 
-            try:
-                result = self.chain.invoke({"document_text": chunk})
+        # Chunks are independent, so they are analyzed concurrently; results are merged in chunk order
+        results = map_chunks(lambda chunk: self.chain.invoke({"document_text": chunk}), chunks)
 
-                policies = result.get("policies", [])
-                all_policies.extend(policies)
-
-                sections = result.get("document_sections_analyzed", [])
-                all_sections.update(sections)
-
-                print(f"  Found {len(policies)} policies in chunk {i+1}")
-
-            except Exception as e:
-                print(f"  Error analyzing chunk {i+1}: {e}")
+        all_policies = []
+        all_sections = []
+        for i, result in enumerate(results):
+            if not result:
+                continue
+            policies = result.get("policies", [])
+            all_policies.extend(policies)
+            all_sections.extend(result.get("document_sections_analyzed", []))
+            print(f"  Found {len(policies)} policies in chunk {i+1}")
+
+        # A policy repeated across chunks (e.g. restated in a summary section) is counted once
+        all_policies = dedupe(all_policies, key=_policy_key)
+        all_sections = dedupe(all_sections)
 
         return {
             "total_policies_found": len(all_policies),
             "policies": all_policies,
-            "document_sections_analyzed": list(all_sections),
+            "document_sections_analyzed": all_sections,
             "chunks_analyzed": len(chunks)
         }
 
@@ -0,0 +1,238 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from DocumentIndex import split_sections
+from LLMMetrics import estimate_tokens
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "if", "in",
+    "is", "it", "its", "must", "not", "of", "on", "or", "shall", "such", "that", "the", "this",
+    "to", "will", "with", "which", "may", "any", "all", "each", "been", "than"
+}
+
+# Reciprocal rank fusion constant (Cormack et al.): higher values flatten the rank weighting
+RRF_K = 60
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def _tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text.lower()) if t not in STOPWORDS]
+
+
+def _get_embeddings():
+    """Process-wide FastEmbed model (the embedding model AIAgent uses), loaded on first use"""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            from langchain_community.embeddings import FastEmbedEmbeddings
+            _embeddings = FastEmbedEmbeddings()
+        return _embeddings
+
+
+def context_budget(agent: str) -> int:
+    """Policy-context token budget of an agent: POLICY_CONTEXT_TOKENS_<AGENT>, then POLICY_CONTEXT_TOKENS"""
+    return int(os.getenv(f"POLICY_CONTEXT_TOKENS_{agent.upper()}") or os.getenv("POLICY_CONTEXT_TOKENS", "3000"))
+
+
+class PolicyRetrievalIndex:
+    """
+    Retrieval index over the passages of one policy document, built once after text extraction.
+
+    The document is split at its section headings into passages of bounded size. Passages are
+    ranked for a set of task queries by BM25 and, when enabled, by embedding similarity (FastEmbed,
+    computed on first use); the rankings are combined by reciprocal rank fusion. select() returns
+    the best passages that fit an agent's token budget, in document order under their section
+    headings, so each agent's prompt carries only the parts of the policy relevant to its task.
+
+    Configuration (environment):
+        POLICY_RETRIEVAL_ENABLED: give agents retrieved context instead of the leading part of the
+                                  document (default true)
+        POLICY_RETRIEVAL_EMBEDDINGS: add embedding similarity to BM25 (default true)
+        POLICY_RETRIEVAL_PASSAGE_CHARS: maximum passage size (default 1500)
+        POLICY_CONTEXT_TOKENS: token budget of the selected context (default 3000), per agent as
+                               POLICY_CONTEXT_TOKENS_<AGENT> (e.g. POLICY_CONTEXT_TOKENS_RULEGENERATORAGENT)
+    """
+
+    def __init__(self, text: str, passage_chars: int = None, use_embeddings: bool = None):
+        started = time.perf_counter()
+        self.passage_chars = passage_chars or int(os.getenv("POLICY_RETRIEVAL_PASSAGE_CHARS", "1500"))
+        if use_embeddings is None:
+            use_embeddings = os.getenv("POLICY_RETRIEVAL_EMBEDDINGS", "true").lower() == "true"
+        self.use_embeddings = use_embeddings
+        self.total_tokens = estimate_tokens(text)
+        self.passages = self._split_passages(text)
+
+        # BM25 statistics
+        self._terms = [Counter(_tokenize(p["text"])) for p in self.passages]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequency = Counter()
+        for terms in self._terms:
+            document_frequency.update(terms.keys())
+        n = len(self.passages)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+        self._vectors = None
+        self._lock = threading.Lock()
+        self.selections: Dict[str, Dict[str, Any]] = {}
+        print(f"✓ Policy retrieval index: {n} passages ({self.total_tokens} tokens) "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """What the selected context depends on (for checkpoint keys)"""
+        return {"passage_chars": self.passage_chars, "embeddings": self.use_embeddings}
+
+    def _split_passages(self, text: str) -> List[Dict[str, Any]]:
+        passages = []
+        for title, body in split_sections(text):
+            part = ""
+            for paragraph in re.split(r'\n\s*\n', body):
+                paragraph = paragraph.strip()
+                while len(paragraph) > self.passage_chars:
+                    if part:
+                        passages.append({"section": title, "text": part})
+                        part = ""
+                    passages.append({"section": title, "text": paragraph[:self.passage_chars]})
+                    paragraph = paragraph[self.passage_chars:]
+                if not paragraph:
+                    continue
+                if part and len(part) + len(paragraph) + 2 > self.passage_chars:
+                    passages.append({"section": title, "text": part})
+                    part = ""
+                part = f"{part}\n\n{paragraph}" if part else paragraph
+            if part:
+                passages.append({"section": title, "text": part})
+        for position, passage in enumerate(passages):
+            passage["position"] = position
+            passage["tokens"] = estimate_tokens(passage["text"])
+        return passages
+
+    def _bm25_ranking(self, query: str, k1: float = 1.5, b: float = 0.75) -> List[int]:
+        terms = set(_tokenize(query))
+        scores = []
+        for index, passage_terms in enumerate(self._terms):
+            score = 0.0
+            for term in terms:
+                tf = passage_terms.get(term)
+                if tf:
+                    norm = k1 * (1 - b + b * self._lengths[index] / (self._avg_length or 1))
+                    score += self._idf[term] * tf * (k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((score, index))
+        return [index for _, index in sorted(scores, reverse=True)]
+
+    def _embedding_ranking(self, query: str) -> List[int]:
+        with self._lock:
+            if self._vectors is None:
+                embeddings = _get_embeddings()
+                self._vectors = [self._normalize(v) for v in embeddings.embed_documents([p["text"] for p in self.passages])]
+        query_vector = self._normalize(_get_embeddings().embed_query(query))
+        scores = [(sum(q * v for q, v in zip(query_vector, vector)), index) for index, vector in enumerate(self._vectors)]
+        return [index for _, index in sorted(scores, reverse=True)]
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def rank(self, queries: Sequence[str]) -> List[int]:
+        """Passage indices by fused relevance to any of the queries, best first"""
+        fused: Dict[int, float] = {}
+        for query in queries:
+            if not query or not query.strip():
+                continue
+            rankings = [self._bm25_ranking(query)]
+            if self.use_embeddings:
+                try:
+                    rankings.append(self._embedding_ranking(query))
+                except Exception as e:
+                    print(f"⚠ Embedding retrieval unavailable, using BM25 only: {e}")
+                    self.use_embeddings = False
+            for ranking in rankings:
+                for rank, index in enumerate(ranking):
+                    fused[index] = fused.get(index, 0.0) + 1.0 / (RRF_K + rank + 1)
+        return [index for index, _ in sorted(fused.items(), key=lambda item: item[1], reverse=True)]
+
+    def _fill_budget(self, indices: Iterable[int], token_budget: int) -> List[int]:
+        """Passages taken in the given order while they fit the budget"""
+        chosen, used, seen = [], 0, set()
+        for index in indices:
+            tokens = self.passages[index]["tokens"]
+            # Repeated boilerplate (endorsements, schedules) would spend the budget twice
+            text = " ".join(self.passages[index]["text"].split())
+            if used + tokens <= token_budget and text not in seen:
+                chosen.append(index)
+                seen.add(text)
+                used += tokens
+            if token_budget - used < 50:
+                break
+        return chosen
+
+    def select(self, queries: Sequence[str], token_budget: int, label: str = "context") -> str:
+        """
+        The passages most relevant to the queries that fit token_budget, in document order
+
+        Documents within the budget are returned whole. Repeated passages are selected once, and
+        passages are grouped under their section heading so the LLM keeps the clause references.
+        When no passage matches the queries (e.g. no queries, or none of their terms occur), the
+        leading passages that fit the budget are returned, as the agents did before retrieval.
+        """
+        if self.total_tokens <= token_budget:
+            chosen = list(range(len(self.passages)))
+        else:
+            chosen = self._fill_budget(self.rank(queries), token_budget)
+            if not chosen:
+                print(f"  ⚠ No passages match the {label} queries, using the leading passages")
+                chosen = self._fill_budget(range(len(self.passages)), token_budget)
+            chosen.sort()
+
+        parts, section = [], None
+        for index in chosen:
+            passage = self.passages[index]
+            if passage["section"] != section:
+                section = passage["section"]
+                parts.append(f"[{section}]")
+            parts.append(passage["text"])
+        context = "\n\n".join(parts)
+
+        selected_tokens = sum(self.passages[i]["tokens"] for i in chosen)
+        self.selections[label] = {
+            "passages": len(chosen),
+            "total_passages": len(self.passages),
+            "tokens": selected_tokens,
+            "document_tokens": self.total_tokens,
+            "reduction": round(1 - selected_tokens / self.total_tokens, 3) if self.total_tokens else 0.0
+        }
+        print(f"  Policy context for {label}: {len(chosen)}/{len(self.passages)} passages, "
+              f"{selected_tokens}/{self.total_tokens} tokens")
+        return context
+
+
+def build_retrieval_index(text: str) -> Optional[PolicyRetrievalIndex]:
+    """Retrieval index of an extracted document, or None when POLICY_RETRIEVAL_ENABLED is false"""
+    if os.getenv("POLICY_RETRIEVAL_ENABLED", "true").lower() != "true" or not text:
+        return None
+    return PolicyRetrievalIndex(text)
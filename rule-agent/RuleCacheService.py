@@ -16,29 +16,313 @@
 import hashlib
 import json
 import os
-from typing import Dict, Optional, List
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, List
 from pathlib import Path
 from datetime import datetime
 
-class RuleCacheService:
+# Workflow stages cached by default: LLM analysis, Textract answers, schema and the generated/validated DRL
+DEFAULT_CACHED_STAGES = "query_generation,data_extraction,schema_generation,rule_generation,drl_validation"
+
+# Stage name used by cache_rules()/get_cached_rules() for whole rule-generation results
+RULES_STAGE = "rules"
+
+# Database checkpoint step prefix, keeping cache entries apart from resume checkpoints
+DB_STEP_PREFIX = "artifact:"
+
+# Eviction brings the cache down to this share of its limits
+EVICT_TARGET_RATIO = 0.9
+
+
+class LocalArtifactBackend:
     """
-    Caches generated rules based on policy document content hash
-    Ensures identical documents always produce identical rules
+    Stores artifacts as JSON files: {root}/{hash[:2]}/{document_hash}/{stage}--{config_hash}.json
+
+    Files are written to a temp file and renamed into place, so readers never see partial writes.
+    Reads refresh the file mtime, which serves as the last-used time for LRU eviction.
+    """
+
+    name = "local"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        Path(self.root_dir).mkdir(parents=True, exist_ok=True)
+
+    def _document_dir(self, document_hash: str) -> str:
+        return os.path.join(self.root_dir, document_hash[:2], document_hash)
+
+    def _path(self, document_hash: str, stage: str, config_hash: str) -> str:
+        return os.path.join(self._document_dir(document_hash), f"{stage}--{config_hash}.json")
+
+    def read(self, document_hash: str, stage: str, config_hash: str) -> Optional[Dict[str, Any]]:
+        path = self._path(document_hash, stage, config_hash)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def write(self, entry: Dict[str, Any]) -> int:
+        path = self._path(entry["document_hash"], entry["stage"], entry["config_hash"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, default=str).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return len(data)
+
+    def delete(self, document_hash: str, stage: str = None, config_hash: str = None) -> int:
+        if stage is not None and config_hash is not None:
+            try:
+                os.remove(self._path(document_hash, stage, config_hash))
+            except FileNotFoundError:
+                return 0
+            try:
+                os.rmdir(self._document_dir(document_hash))  # only succeeds once the directory is empty
+            except OSError:
+                pass
+            return 1
+
+        document_dir = self._document_dir(document_hash)
+        if not os.path.isdir(document_dir):
+            return 0
+        count = len([f for f in os.listdir(document_dir) if f.endswith('.json')])
+        shutil.rmtree(document_dir, ignore_errors=True)
+        return count
+
+    def clear(self):
+        if os.path.exists(self.root_dir):
+            shutil.rmtree(self.root_dir, ignore_errors=True)
+        Path(self.root_dir).mkdir(parents=True, exist_ok=True)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                if not filename.endswith('.json') or '--' not in filename:
+                    continue
+                stage, config_hash = filename[:-len('.json')].rsplit('--', 1)
+                try:
+                    stat = os.stat(os.path.join(dirpath, filename))
+                except FileNotFoundError:
+                    continue  # evicted or replaced concurrently
+                entries.append({
+                    "document_hash": os.path.basename(dirpath),
+                    "stage": stage,
+                    "config_hash": config_hash,
+                    "size_bytes": stat.st_size,
+                    "last_used": stat.st_mtime
+                })
+        return entries
+
 
-    This provides 100% deterministic rule generation by caching based on
-    document content rather than relying solely on LLM temperature settings.
+class S3ArtifactBackend:
     """
+    Stores artifacts as S3 objects: {prefix}/{document_hash}/{stage}--{config_hash}.json
 
-    def __init__(self, cache_dir: str = None):
+    S3 puts are atomic per object. S3 has no access time, so eviction uses LastModified.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str, s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client(
+                's3',
+                region_name=os.getenv("AWS_REGION", "us-east-1"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+            )
+        self.s3_client = s3_client
+
+    def _key(self, document_hash: str, stage: str, config_hash: str) -> str:
+        return f"{self.prefix}/{document_hash}/{stage}--{config_hash}.json"
+
+    def read(self, document_hash: str, stage: str, config_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(document_hash, stage, config_hash))
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def write(self, entry: Dict[str, Any]) -> int:
+        data = json.dumps(entry, default=str).encode('utf-8')
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(entry["document_hash"], entry["stage"], entry["config_hash"]),
+            Body=data,
+            ContentType='application/json'
+        )
+        return len(data)
+
+    def _list_objects(self, prefix: str):
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield obj
+
+    def _delete_keys(self, keys: List[str]) -> int:
+        for i in range(0, len(keys), 1000):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in keys[i:i + 1000]], 'Quiet': True}
+            )
+        return len(keys)
+
+    def delete(self, document_hash: str, stage: str = None, config_hash: str = None) -> int:
+        if stage is not None and config_hash is not None:
+            return self._delete_keys([self._key(document_hash, stage, config_hash)])
+        return self._delete_keys([obj['Key'] for obj in self._list_objects(f"{self.prefix}/{document_hash}/")])
+
+    def clear(self):
+        self._delete_keys([obj['Key'] for obj in self._list_objects(f"{self.prefix}/")])
+
+    def entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        for obj in self._list_objects(f"{self.prefix}/"):
+            relative = obj['Key'][len(self.prefix) + 1:]
+            if '/' not in relative or not relative.endswith('.json'):
+                continue
+            document_hash, filename = relative.split('/', 1)
+            stage, config_hash = filename[:-len('.json')].rsplit('--', 1)
+            entries.append({
+                "document_hash": document_hash,
+                "stage": stage,
+                "config_hash": config_hash,
+                "size_bytes": obj['Size'],
+                "last_used": obj['LastModified'].timestamp()
+            })
+        return entries
+
+
+class DatabaseArtifactBackend:
+    """
+    Stores artifacts in the workflow_checkpoints table under 'artifact:<stage>' steps.
+
+    Large artifacts are offloaded to the payload store by DatabaseService. Sizes are not tracked,
+    so only the entry limit applies; eviction uses the write time.
+    """
+
+    name = "db"
+
+    def __init__(self, db_service=None):
+        if db_service is None:
+            from DatabaseService import get_database_service
+            db_service = get_database_service()
+        self.db_service = db_service
+
+    def read(self, document_hash: str, stage: str, config_hash: str) -> Optional[Dict[str, Any]]:
+        checkpoint = self.db_service.get_workflow_checkpoint(document_hash, DB_STEP_PREFIX + stage, config_hash)
+        return checkpoint['output'] if checkpoint else None
+
+    def write(self, entry: Dict[str, Any]) -> int:
+        self.db_service.save_workflow_checkpoint(
+            entry["document_hash"], DB_STEP_PREFIX + entry["stage"], entry["config_hash"], entry
+        )
+        return 0
+
+    def delete(self, document_hash: str, stage: str = None, config_hash: str = None) -> int:
+        if stage is not None and config_hash is not None:
+            return self.db_service.delete_workflow_checkpoints(
+                document_hash, step=DB_STEP_PREFIX + stage, config_hash=config_hash)
+        return self.db_service.delete_workflow_checkpoints(document_hash, step_prefix=DB_STEP_PREFIX)
+
+    def clear(self):
+        self.db_service.delete_workflow_checkpoints(step_prefix=DB_STEP_PREFIX)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return [{
+            "document_hash": c['document_hash'],
+            "stage": c['step'][len(DB_STEP_PREFIX):],
+            "config_hash": c['config_hash'],
+            "size_bytes": 0,
+            "last_used": datetime.fromisoformat(c['created_at']).timestamp() if c['created_at'] else 0
+        } for c in self.db_service.list_workflow_checkpoints(step_prefix=DB_STEP_PREFIX)]
+
+
+class RuleCacheService:
+    """
+    Content-addressed cache of workflow stage outputs.
+
+    Each artifact is keyed by the document content hash, the stage name and a hash of the stage
+    configuration (LLM settings and the stage's inputs), so a re-upload of an identical policy
+    reuses the LLM analysis, Textract answers, schema and DRL instead of recomputing them, while
+    any change to the document, the model or an upstream output produces a new key.
+
+    The cache is bounded: when a limit is exceeded the least recently used artifacts are evicted
+    until the cache is 10% below both the size and the entry limits. Listing the backend is O(n), so writes
+    only add to a running size and count taken at the last listing; the backend is listed again
+    when that estimate crosses a limit, or after RULE_CACHE_EVICT_INTERVAL_SECONDS to pick up
+    writes of other processes sharing the backend.
+
+    Configuration (environment):
+        RULE_CACHE_ENABLED: use the cache from the underwriting workflow (default true)
+        RULE_CACHE_BACKEND: 'local' (default), 's3' or 'db'
+        RULE_CACHE_DIR: directory for the local backend (default /data/rule_cache)
+        RULE_CACHE_S3_PREFIX: key prefix for the S3 backend (default rule-cache)
+        RULE_CACHE_MAX_MB: size limit in MB (default 1024, not applied to the db backend)
+        RULE_CACHE_MAX_ENTRIES: entry limit (default 5000)
+        RULE_CACHE_STAGES: comma-separated workflow stages to cache
+        RULE_CACHE_EVICT_INTERVAL_SECONDS: maximum time between eviction listings (default 300)
+    """
+
+    def __init__(self, cache_dir: str = None, backend=None, max_bytes: int = None, max_entries: int = None):
         """
         Initialize the rule cache service
 
         Args:
-            cache_dir: Directory to store cache files (defaults to /data/rule_cache)
+            cache_dir: Directory for the local backend (defaults to /data/rule_cache)
+            backend: Storage backend (defaults to RULE_CACHE_BACKEND)
+            max_bytes: Size limit in bytes
+            max_entries: Entry limit
         """
         self.cache_dir = cache_dir or os.getenv("RULE_CACHE_DIR", "/data/rule_cache")
-        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
-        print(f"Rule cache initialized at: {self.cache_dir}")
+        self.backend = backend or self._backend_from_env(self.cache_dir)
+        self.enabled = os.getenv("RULE_CACHE_ENABLED", "true").lower() == "true"
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv("RULE_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RULE_CACHE_MAX_ENTRIES", "5000"))
+        self.stages = {s.strip() for s in os.getenv("RULE_CACHE_STAGES", DEFAULT_CACHED_STAGES).split(',') if s.strip()}
+        self.evict_interval = float(os.getenv("RULE_CACHE_EVICT_INTERVAL_SECONDS", "300"))
+        self._evict_lock = threading.Lock()
+        # Size and count at the last listing plus the writes since (None: not listed yet)
+        self._tracked_bytes = None
+        self._tracked_count = 0
+        self._last_listed = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        print(f"Rule cache initialized ({self.backend.name} backend)" +
+              (f" at: {self.cache_dir}" if self.backend.name == "local" else ""))
+
+    @staticmethod
+    def _backend_from_env(cache_dir: str):
+        backend = os.getenv("RULE_CACHE_BACKEND", "local").lower()
+        if backend == 's3':
+            return S3ArtifactBackend(
+                bucket=os.getenv("AWS_S3_BUCKET", "uw-data-extraction"),
+                prefix=os.getenv("RULE_CACHE_S3_PREFIX", "rule-cache")
+            )
+        if backend == 'db':
+            return DatabaseArtifactBackend()
+        return LocalArtifactBackend(cache_dir)
 
     def compute_document_hash(self, document_content: str, queries: list = None) -> str:
         """
@@ -72,33 +356,118 @@ class RuleCacheService:
         hash_obj = hashlib.sha256(hash_input.encode('utf-8'))
         return hash_obj.hexdigest()
 
-    def get_cached_rules(self, document_hash: str) -> Optional[Dict]:
-        """
-        Retrieve cached rules for a document hash
+    def is_cached_stage(self, stage: str) -> bool:
+        return self.enabled and stage in self.stages
 
-        Args:
-            document_hash: SHA-256 hash of the document
+    def get_artifact(self, document_hash: str, stage: str, config_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a cached stage output
 
         Returns:
-            Cached rule data or None if not found
+            Cache entry (document_hash, stage, config_hash, timestamp, data) or None on a miss
         """
-        cache_file = os.path.join(self.cache_dir, f"{document_hash}.json")
+        try:
+            entry = self.backend.read(document_hash, stage, config_hash)
+        except Exception as e:
+            print(f"⚠ Error reading cached {stage} artifact: {e}")
+            entry = None
 
-        if not os.path.exists(cache_file):
-            print(f"Cache miss: {document_hash[:16]}...")
+        if entry is None:
+            self.misses += 1
             return None
+        self.hits += 1
+        return entry
+
+    def put_artifact(self, document_hash: str, stage: str, config_hash: str, data: Any) -> bool:
+        """Cache a stage output, then evict least recently used artifacts beyond the limits"""
+        entry = {
+            "document_hash": document_hash,
+            "stage": stage,
+            "config_hash": config_hash,
+            "timestamp": datetime.now().isoformat(),
+            "data": data
+        }
+        try:
+            size = self.backend.write(entry)
+        except Exception as e:
+            print(f"⚠ Error caching {stage} artifact: {e}")
+            return False
 
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
+            if self._eviction_due(size):
+                self.evict()
+        except Exception as e:
+            print(f"⚠ Rule cache eviction failed: {e}")
+        return True
+
+    def _eviction_due(self, written_bytes: int) -> bool:
+        """Count a write (replacements are counted as new entries) and decide whether to list the backend"""
+        with self._evict_lock:
+            if self._tracked_bytes is None:
+                return True
+            self._tracked_bytes += written_bytes
+            self._tracked_count += 1
+            return (self._tracked_bytes > self.max_bytes or self._tracked_count > self.max_entries
+                    or time.monotonic() - self._last_listed >= self.evict_interval)
+
+    def evict(self) -> int:
+        """Delete least recently used artifacts when the cache exceeds its size or entry limit"""
+        with self._evict_lock:
+            entries = self.backend.entries()
+            total_bytes = sum(e["size_bytes"] for e in entries)
+            count = len(entries)
+            self._last_listed = time.monotonic()
+            if total_bytes <= self.max_bytes and count <= self.max_entries:
+                self._tracked_bytes, self._tracked_count = total_bytes, count
+                return 0
+
+            # Evict below the limits, so the next listing is only due after a share of the capacity
+            target_bytes, target_count = self.max_bytes * EVICT_TARGET_RATIO, int(self.max_entries * EVICT_TARGET_RATIO)
+            evicted = 0
+            for entry in sorted(entries, key=lambda e: e["last_used"]):
+                if total_bytes <= target_bytes and count <= target_count:
+                    break
+                self.backend.delete(entry["document_hash"], entry["stage"], entry["config_hash"])
+                total_bytes -= entry["size_bytes"]
+                count -= 1
+                evicted += 1
+
+            self._tracked_bytes, self._tracked_count = total_bytes, count
+            self.evictions += evicted
+            print(f"Rule cache evicted {evicted} artifact(s)")
+            return evicted
 
-            print(f"✓ Cache hit: {document_hash[:16]}... (saved: {cached_data.get('timestamp')})")
-            return cached_data
+    def get_cached_rules(self, document_hash: str) -> Optional[Dict]:
+        """
+        Retrieve all cached artifacts for a document hash
 
-        except Exception as e:
-            print(f"⚠ Error reading cache file: {e}")
+        Args:
+            document_hash: SHA-256 hash of the document
+
+        Returns:
+            Dict with the document hash and its artifacts by stage, or None if nothing is cached
+        """
+        artifacts = {}
+        for entry in self.backend.entries():
+            if entry["document_hash"] != document_hash:
+                continue
+            cached = self.get_artifact(document_hash, entry["stage"], entry["config_hash"])
+            if cached is not None:
+                artifacts.setdefault(entry["stage"], []).append(cached)
+
+        if not artifacts:
+            print(f"Cache miss: {document_hash[:16]}...")
             return None
 
+        print(f"✓ Cache hit: {document_hash[:16]}... ({len(artifacts)} stage(s))")
+        rules = artifacts.get(RULES_STAGE, [])
+        return {
+            "document_hash": document_hash,
+            "timestamp": max(a["timestamp"] for stage in artifacts.values() for a in stage),
+            "rule_data": rules[0]["data"] if rules else None,
+            "artifacts": artifacts
+        }
+
     def cache_rules(self, document_hash: str, rule_data: Dict) -> None:
         """
         Cache generated rules for future use
@@ -107,78 +476,53 @@ class RuleCacheService:
             document_hash: SHA-256 hash of the document
             rule_data: Complete rule generation result (DRL, queries, extracted data, etc.)
         """
-        cache_file = os.path.join(self.cache_dir, f"{document_hash}.json")
-
-        try:
-            # Add metadata
-            cache_entry = {
-                "document_hash": document_hash,
-                "timestamp": datetime.now().isoformat(),
-                "rule_data": rule_data
-            }
-
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_entry, f, indent=2)
-
+        if self.put_artifact(document_hash, RULES_STAGE, hashlib.sha256(b"").hexdigest(), rule_data):
             print(f"✓ Rules cached: {document_hash[:16]}...")
 
-        except Exception as e:
-            print(f"⚠ Error caching rules: {e}")
-
     def clear_cache(self, document_hash: str = None) -> None:
         """
-        Clear cached rules
+        Clear cached artifacts
 
         Args:
             document_hash: Specific hash to clear, or None to clear all
         """
         if document_hash:
-            cache_file = os.path.join(self.cache_dir, f"{document_hash}.json")
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
-                print(f"Cleared cache for: {document_hash[:16]}...")
+            deleted = self.backend.delete(document_hash)
+            if deleted:
+                print(f"Cleared cache for: {document_hash[:16]}... ({deleted} artifact(s))")
             else:
                 print(f"No cache found for: {document_hash[:16]}...")
         else:
-            # Clear all cache files
-            import shutil
-            if os.path.exists(self.cache_dir):
-                shutil.rmtree(self.cache_dir)
-                Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
-                print("✓ All cache cleared")
+            self.backend.clear()
+            print("✓ All cache cleared")
 
     def list_cached_documents(self) -> List[Dict]:
         """
         List all cached document hashes with metadata
 
         Returns:
-            List of dicts with hash, timestamp, and summary info
+            List of dicts with hash, last use time, cached stages and size
         """
-        if not os.path.exists(self.cache_dir):
-            return []
-
-        cached_docs = []
-        cache_files = [f for f in os.listdir(self.cache_dir) if f.endswith('.json')]
-
-        for cache_file in cache_files:
-            document_hash = cache_file.replace('.json', '')
-            cache_path = os.path.join(self.cache_dir, cache_file)
-
-            try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-
-                cached_docs.append({
-                    "document_hash": document_hash,
-                    "timestamp": cache_data.get("timestamp"),
-                    "container_id": cache_data.get("rule_data", {}).get("container_id"),
-                    "has_drl": "drl" in cache_data.get("rule_data", {})
-                })
-            except Exception as e:
-                print(f"⚠ Error reading cache file {cache_file}: {e}")
+        documents = {}
+        for entry in self.backend.entries():
+            doc = documents.setdefault(entry["document_hash"], {
+                "document_hash": entry["document_hash"],
+                "timestamp": 0,
+                "stages": [],
+                "size_bytes": 0
+            })
+            doc["timestamp"] = max(doc["timestamp"], entry["last_used"])
+            doc["stages"].append(entry["stage"])
+            doc["size_bytes"] += entry["size_bytes"]
+
+        cached_docs = list(documents.values())
+        for doc in cached_docs:
+            doc["timestamp"] = datetime.fromtimestamp(doc["timestamp"]).isoformat() if doc["timestamp"] else None
+            doc["stages"] = sorted(set(doc["stages"]))
+            doc["has_drl"] = "rule_generation" in doc["stages"] or "drl_validation" in doc["stages"]
 
         # Sort by timestamp (newest first)
-        cached_docs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        cached_docs.sort(key=lambda x: x.get("timestamp") or "", reverse=True)
         return cached_docs
 
     def get_cache_stats(self) -> Dict:
@@ -188,29 +532,36 @@ class RuleCacheService:
         Returns:
             Dictionary with cache statistics
         """
-        cached_docs = self.list_cached_documents()
-
-        total_size = 0
-        if os.path.exists(self.cache_dir):
-            for cache_file in os.listdir(self.cache_dir):
-                cache_path = os.path.join(self.cache_dir, cache_file)
-                if os.path.isfile(cache_path):
-                    total_size += os.path.getsize(cache_path)
+        entries = self.backend.entries()
+        total_size = sum(e["size_bytes"] for e in entries)
+        lookups = self.hits + self.misses
 
         return {
-            "cache_directory": self.cache_dir,
-            "total_cached_documents": len(cached_docs),
+            "backend": self.backend.name,
+            "cache_directory": self.cache_dir if self.backend.name == "local" else None,
+            "enabled": self.enabled,
+            "cached_stages": sorted(self.stages),
+            "total_cached_documents": len({e["document_hash"] for e in entries}),
+            "total_artifacts": len(entries),
             "total_cache_size_bytes": total_size,
-            "total_cache_size_mb": round(total_size / (1024 * 1024), 2)
+            "total_cache_size_mb": round(total_size / (1024 * 1024), 2),
+            "max_cache_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions
         }
 
 
 # Singleton instance
 _cache_instance = None
+_cache_lock = threading.Lock()
 
 def get_rule_cache() -> RuleCacheService:
     """Get singleton instance of RuleCacheService"""
     global _cache_instance
-    if _cache_instance is None:
-        _cache_instance = RuleCacheService()
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = RuleCacheService()
     return _cache_instance
@@ -15,10 +15,17 @@
 #
 from langchain_core.prompts import ChatPromptTemplate
 import pandas as pd
-from typing import Dict
+from typing import Dict, List
 import json
 import os
 import io
+from LLMResponseCache import scoped_llm
+from PolicyRetrieval import context_budget
+
+# Retrieval query for the passages the rule prompt asks the LLM to extract directly
+RULE_CONTEXT_QUERY = ("risk calculation premium multiplier scoring points risk category decline reject approve "
+                      "minimum maximum threshold requirement")
+
 
 class RuleGeneratorAgent:
     """
@@ -26,7 +33,7 @@ class RuleGeneratorAgent:
     """
 
     def __init__(self, llm, schema: Dict = None):
-        self.llm = llm
+        self.llm = scoped_llm(llm, "RuleGeneratorAgent")
         self.schema = schema  # Dynamic schema from DynamicSchemaGenerator
 
         self.rule_generation_prompt = ChatPromptTemplate.from_messages([
@@ -575,12 +582,15 @@ end
 
         return drl
 
-    def generate_rules(self, extracted_data: Dict, policy_text: str = None) -> Dict[str, str]:
+    def generate_rules(self, extracted_data: Dict, policy_text: str = None, retrieval_index=None) -> Dict[str, str]:
         """
         Generate Drools rules from extracted data and/or full policy text
 
         :param extracted_data: Data extracted by Textract (may be incomplete)
         :param policy_text: Full policy document text (fallback for incomplete extractions)
+        :param retrieval_index: PolicyRetrievalIndex of the document; the fallback then carries the
+                                passages relevant to the unanswered queries (POLICY_CONTEXT_TOKENS
+                                budget) instead of the first 20000 characters
         :return: Dictionary with 'drl', 'decision_table', and 'explanation' keys
         """
         try:
@@ -622,7 +632,14 @@ end
 
                     if coverage < 50:  # Less than 50% coverage
                         print(f"⚠ Low query coverage ({coverage:.1f}%). Including policy text for direct extraction.")
-                        llm_input += f"\n\nFULL POLICY TEXT (for extracting missing rules):\n\n{policy_text[:20000]}\n\nIMPORTANT: Extract risk calculation rules, premium multipliers, and scoring systems directly from the policy text above if they are missing from the extracted data."
+                        if retrieval_index is not None:
+                            unanswered = [query for query, q_data in queries_dict.items() if not q_data.get('answer')]
+                            policy_context = retrieval_index.select(unanswered + [RULE_CONTEXT_QUERY],
+                                                                    context_budget("RuleGeneratorAgent"),
+                                                                    "RuleGeneratorAgent")
+                        else:
+                            policy_context = policy_text[:20000]
+                        llm_input += f"\n\nFULL POLICY TEXT (for extracting missing rules):\n\n{policy_context}\n\nIMPORTANT: Extract risk calculation rules, premium multipliers, and scoring systems directly from the policy text above if they are missing from the extracted data."
 
             print("\n" + "="*80)
             print("DEBUG: RULE GENERATION - LLM INPUT")
@@ -702,6 +719,71 @@ end
                 'raw_response': ""
             }
 
+    def extract_rule_body(self, drl: str) -> str:
+        """Return the rules of a generated DRL without its package and declare statements"""
+        if not drl or drl.startswith('//'):
+            return ""
+        return self._remove_declare_statements(drl).strip()
+
+    def assemble_drl(self, rule_bodies: List[str]) -> str:
+        """
+        Build one DRL file from rules generated separately (e.g. per policy section)
+
+        The bodies are stripped of package/declare statements and combined under the current
+        dynamic schema. Import and global statements are moved above the rules, identical rules
+        (e.g. the "Initialize Decision" rule every generation emits) are kept once, and different
+        rules sharing a name get a numeric suffix so the merged package compiles.
+        """
+        import re
+        header_lines = []
+        rule_lines = []
+        seen_rules = set()
+        name_counts = {}
+
+        for body in rule_bodies:
+            block = None
+            for line in self._remove_declare_statements(body or "").split('\n'):
+                stripped = line.strip()
+                if block is None and stripped.startswith(('import ', 'global ')):
+                    if stripped not in header_lines:
+                        header_lines.append(stripped)
+                    continue
+
+                if block is None:
+                    if re.match(r'^rule\s+["\']', stripped):
+                        block = [line]
+                    else:
+                        rule_lines.append(line)
+                    continue
+
+                block.append(line)
+                if stripped != 'end':
+                    continue
+
+                # End of a rule block: drop exact duplicates, rename clashing names
+                normalized = ' '.join(' '.join(block).split())
+                if normalized not in seen_rules:
+                    seen_rules.add(normalized)
+                    match = re.match(r'^(\s*rule\s+)(["\'])(.+?)\2(.*)$', block[0])
+                    if match:
+                        name = match.group(3)
+                        name_counts[name] = name_counts.get(name, 0) + 1
+                        if name_counts[name] > 1:
+                            block[0] = f'{match.group(1)}"{name} ({name_counts[name]})"{match.group(4)}'
+                    rule_lines.extend(block)
+                block = None
+
+            if block:
+                rule_lines.extend(block)
+            rule_lines.append("")
+
+        drl = "package com.underwriting.rules;\n\n"
+        if header_lines:
+            drl += '\n'.join(header_lines) + "\n\n"
+        drl += self._generate_dynamic_declare_statements() + "\n"
+        drl += re.sub(r'\n{3,}', '\n\n', '\n'.join(rule_lines)).strip() + "\n"
+        return drl
+
     def _remove_declare_statements(self, drl: str) -> str:
         """
         Remove declare statements from DRL (we'll use our dynamic ones)
@@ -0,0 +1,233 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from CreateLLMOpenAI import createLLMOpenAI
+from LLMConcurrency import bounded_map
+from LLMResponseCache import wrap_llm
+from LLMTiers import TIER_SMALL, agent_tier, discard_response
+
+BATCH_PROMPT = """Transform each of the following technical Drools rules into a clear, user-friendly requirement statement.
+
+{rules}
+
+Instructions:
+1. For each rule, write a concise, natural language statement that explains what the rule checks
+2. Focus on the business requirement, not technical implementation
+3. Use simple language that a non-technical user can understand
+4. Include specific values and thresholds mentioned in the rule
+5. Format: a single clear statement or short paragraph (maximum 2-3 sentences) per rule
+6. Do NOT include technical terms like "Applicant", "$applicant", "Decision", etc.
+7. Use phrases like "must be", "should be", "required", etc.
+
+Example transformations:
+- Technical: "WHEN: $applicant : Applicant( age < 18 || age > 65 ) THEN: $decision.setApproved(false)"
+- User-friendly: "Applicant must be between 18 and 65 years old"
+
+- Technical: "WHEN: $applicant : Applicant( creditScore < 600 ) THEN: $decision.setApproved(false)"
+- User-friendly: "Minimum credit score of 600 is required"
+
+Return ONLY a JSON array with one object per rule, in the same order:
+[{{"id": 1, "requirement": "..."}}, {{"id": 2, "requirement": "..."}}]"""
+
+
+def rule_clause_hash(when_clause: str, then_clause: str) -> str:
+    """Hash of a rule's normalized WHEN/THEN clauses (whitespace and trailing semicolons ignored)"""
+    def normalize(clause: str) -> str:
+        return ' '.join(clause.split()).rstrip(';')
+    data = f"{normalize(when_clause)}\n{normalize(then_clause)}"
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class RuleHumanizer:
+    """
+    Translates DRL rules into plain-English requirement statements.
+
+    Rules are sent to OpenAI in batches (many rules per prompt) on one reused client per model,
+    with a bounded number of batches in flight. The clients are created like every agent's
+    (createLLMOpenAI wrapped by wrap_llm), so the calls go through the LLM governor, the response
+    cache and the LLM call metrics. Translations are cached by a hash of the normalized
+    WHEN/THEN clauses and the model, in memory and in the rule_translations table, so rules that
+    did not change are never translated again. Rules the LLM could not translate go through the
+    fallback transformation and are not cached.
+
+    With RuleHumanizer=small in LLM_AGENT_TIERS and an OpenAI small-tier model (see LLMTiers),
+    batches go to LLM_SMALL_MODEL_NAME and are retried on OPENAI_MODEL_NAME when the small
+    model's answer cannot be parsed.
+
+    Configuration (environment):
+        OPENAI_API_KEY / OPENAI_MODEL_NAME: translation model (without a key, rules are returned
+                                            in technical WHEN/THEN form)
+        OPENAI_TEMPERATURE: sampling temperature, as for the other OpenAI calls (default 0.0)
+        RULE_HUMANIZER_BATCH_SIZE: rules per prompt (default 20)
+        RULE_HUMANIZER_CONCURRENCY: batches in flight (default 4)
+        RULE_HUMANIZER_MEMORY_ENTRIES: in-process cache size (default 5000)
+    """
+
+    def __init__(self, fallback: Callable[[str, str, str], str], db_service=None):
+        self.fallback = fallback
+        self.db_service = db_service
+        self.model = os.getenv('OPENAI_MODEL_NAME', 'gpt-4')
+        self.escalation_model = None
+        small_model = os.getenv("LLM_SMALL_MODEL_NAME")
+        small_type = os.getenv("LLM_SMALL_TYPE", os.getenv("LLM_TYPE", "LOCAL_OLLAMA"))
+        if agent_tier("RuleHumanizer") == TIER_SMALL and small_model and small_type == "OPENAI":
+            self.model, self.escalation_model = small_model, self.model
+        self.batch_size = max(1, int(os.getenv("RULE_HUMANIZER_BATCH_SIZE", "20")))
+        self.concurrency = max(1, int(os.getenv("RULE_HUMANIZER_CONCURRENCY", "4")))
+        self.memory_entries = int(os.getenv("RULE_HUMANIZER_MEMORY_ENTRIES", "5000"))
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._llms: Dict[str, Any] = {}
+
+    def _get_llm(self, model: str):
+        """One governed, cached client per model for all batches (created on first use)"""
+        with self._lock:
+            if model not in self._llms:
+                self._llms[model] = wrap_llm(createLLMOpenAI(model), "OPENAI").for_agent("RuleHumanizer")
+            return self._llms[model]
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for h in hashes:
+                if h in self._memory:
+                    self._memory.move_to_end(h)
+                    found[h] = self._memory[h]
+        missing = [h for h in hashes if h not in found]
+        if missing and self.db_service is not None:
+            try:
+                stored = self.db_service.get_rule_translations(missing, self.model)
+                found.update(stored)
+                self._remember(stored)
+            except Exception as e:
+                print(f"⚠ Could not read cached rule translations: {e}")
+        return found
+
+    def _remember(self, translations: Dict[str, str]):
+        with self._lock:
+            for h, text in translations.items():
+                self._memory[h] = text
+                self._memory.move_to_end(h)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, translations: Dict[str, str]):
+        self._remember(translations)
+        if self.db_service is not None and translations:
+            try:
+                self.db_service.save_rule_translations(translations, self.model)
+            except Exception as e:
+                print(f"⚠ Could not save rule translations: {e}")
+
+    def _translate_batch(self, batch: List[Tuple[str, str, str]], model: str) -> List[Optional[str]]:
+        """Translate one batch of (rule_name, when, then); None for rules without a usable answer"""
+        rules_text = "\n\n".join(
+            f"Rule {i}: {name}\nWHEN: {when_clause}\nTHEN: {then_clause}"
+            for i, (name, when_clause, then_clause) in enumerate(batch, 1)
+        )
+        llm = self._get_llm(model)
+        prompt = BATCH_PROMPT.format(rules=rules_text)
+        response = llm.invoke(prompt)
+        content = response.content.strip()
+        start, end = content.find('['), content.rfind(']')
+        try:
+            if start == -1 or end == -1:
+                raise ValueError("No JSON array in response")
+            items = json.loads(content[start:end + 1])
+        except ValueError:
+            # An unusable answer must not be served from the response cache on the retry
+            discard_response(llm, prompt)
+            raise
+
+        translations: List[Optional[str]] = [None] * len(batch)
+        for item in items:
+            try:
+                index = int(item.get("id")) - 1
+            except (TypeError, ValueError, AttributeError):
+                continue
+            text = str(item.get("requirement") or "").strip()
+            # Short answers are not usable, same threshold as the single-rule transformation
+            if 0 <= index < len(batch) and len(text) >= 10:
+                translations[index] = text
+        return translations
+
+    def transform(self, rules: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Translate (rule_name, when_clause, then_clause) tuples, returning texts in the same order
+        """
+        if not rules:
+            return []
+        if not os.getenv('OPENAI_API_KEY'):
+            print("⚠ OpenAI API key not configured, returning technical format")
+            return [f"WHEN: {when_clause}\nTHEN: {then_clause}" for _, when_clause, then_clause in rules]
+
+        hashes = [rule_clause_hash(when_clause, then_clause) for _, when_clause, then_clause in rules]
+        cached = self._lookup(list(dict.fromkeys(hashes)))
+
+        # Identical clauses under different rule names are translated once
+        pending = OrderedDict()
+        for rule, h in zip(rules, hashes):
+            if h not in cached and h not in pending:
+                pending[h] = rule
+        print(f"  Rule translations: {len(rules) - sum(1 for h in hashes if h not in cached)} cached, "
+              f"{len(pending)} to translate")
+
+        pending_hashes = list(pending.keys())
+        batches = [pending_hashes[i:i + self.batch_size] for i in range(0, len(pending_hashes), self.batch_size)]
+
+        def translate(batch_hashes):
+            batch = [pending[h] for h in batch_hashes]
+            try:
+                try:
+                    return self._translate_batch(batch, self.model)
+                except ValueError as e:
+                    # Unparseable answer (json.JSONDecodeError is a ValueError): try the large model
+                    if not self.escalation_model:
+                        raise
+                    print(f"⚠ Could not parse {self.model} rule translations ({e}), "
+                          f"escalating to {self.escalation_model}")
+                    return self._translate_batch(batch, self.escalation_model)
+            except Exception as e:
+                print(f"⚠ Error transforming {len(batch_hashes)} rules with OpenAI: {e}")
+                return [None] * len(batch_hashes)
+
+        translated = {}
+        for batch_hashes, texts in zip(batches, bounded_map(translate, batches, max_workers=self.concurrency,
+                                                            retries=1, should_retry=lambda t: all(x is None for x in t))):
+            translated.update({h: text for h, text in zip(batch_hashes, texts) if text})
+        self._store(translated)
+        cached.update(translated)
+
+        untranslated = sum(1 for h in hashes if h not in cached)
+        if untranslated:
+            print(f"⚠ {untranslated} of {len(rules)} rules could not be translated, using the fallback transformation")
+
+        results = []
+        for (rule_name, when_clause, then_clause), h in zip(rules, hashes):
+            text = cached.get(h)
+            if text is None:
+                try:
+                    text = self.fallback(rule_name, when_clause, then_clause)
+                except Exception:
+                    text = f"Rule: {rule_name}"
+            results.append(text)
+        return results
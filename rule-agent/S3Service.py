@@ -14,19 +14,79 @@
 #    limitations under the License.
 #
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 import os
-from typing import Dict, Optional
+import tempfile
+import threading
+from io import BytesIO
+from typing import BinaryIO, Dict, Optional, Union
 from datetime import datetime
 
+MB = 1024 * 1024
+
+
+def s3_transfer_config() -> TransferConfig:
+    """
+    Transfer manager settings shared by S3 uploads and downloads
+
+    Objects above the threshold are uploaded in parts and downloaded as ranged GETs, a few parts
+    at a time, so a transfer holds about part size x concurrency in memory whatever the object size.
+
+    Configuration (environment):
+        S3_MULTIPART_THRESHOLD_MB: size from which transfers are split into parts (default 8)
+        S3_MULTIPART_PART_SIZE_MB: part size (default 8; S3 requires at least 5)
+        S3_TRANSFER_CONCURRENCY: parts in flight per transfer (default 4)
+    """
+    return TransferConfig(
+        multipart_threshold=int(float(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8")) * MB),
+        multipart_chunksize=int(float(os.getenv("S3_MULTIPART_PART_SIZE_MB", "8")) * MB),
+        max_concurrency=int(os.getenv("S3_TRANSFER_CONCURRENCY", "4"))
+    )
+
+
+def upload_error_code(error: Exception) -> Optional[str]:
+    """
+    S3 error code of a failed upload
+
+    The transfer manager raises the ClientError itself or wraps it in an S3UploadFailedError
+    (upload_file, multipart parts), so the exception chain is searched for it.
+    """
+    cause = error
+    while cause is not None:
+        if isinstance(cause, ClientError):
+            return cause.response.get('Error', {}).get('Code')
+        cause = cause.__cause__ or cause.__context__
+    return None
+
+
+class _TransferProgress:
+    """Byte counter for transfer manager callbacks (called from its worker threads)"""
+
+    def __init__(self):
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_transferred: int):
+        with self._lock:
+            self.bytes += bytes_transferred
+
+
 class S3Service:
     """
     Handles S3 operations for policy documents and generated rules
+
+    Uploads and downloads go through the boto3 transfer manager (see s3_transfer_config): uploads
+    stream from files or file objects in parts, and downloads land in spooled temporary files
+    (S3_SPOOL_MAX_MEMORY_MB in memory, default 8, the rest on disk).
     """
 
     def __init__(self):
         self.bucket_name = os.getenv("AWS_S3_BUCKET", "uw-data-extraction")
         self.region = os.getenv("AWS_REGION", "us-east-1")
+        self.transfer_config = s3_transfer_config()
+        self.spool_max_memory = int(float(os.getenv("S3_SPOOL_MAX_MEMORY_MB", "8")) * MB)
 
         # Initialize S3 client
         try:
@@ -60,7 +120,7 @@ class S3Service:
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
             # Download file
-            self.s3_client.download_file(self.bucket_name, s3_key, local_path)
+            self.s3_client.download_file(self.bucket_name, s3_key, local_path, Config=self.transfer_config)
 
             file_size = os.path.getsize(local_path)
             print(f"✓ Downloaded {s3_key} from S3 ({file_size} bytes)")
@@ -136,7 +196,8 @@ class S3Service:
                 local_jar_path,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs={'ContentType': 'application/java-archive'}
+                ExtraArgs={'ContentType': 'application/java-archive'},
+                Config=self.transfer_config
             )
 
             # Generate S3 URL
@@ -153,12 +214,13 @@ class S3Service:
                 "bucket": self.bucket_name,
                 "file_size": file_size
             }
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
+        except (ClientError, S3UploadFailedError) as e:
+            error_code = upload_error_code(e) or 'Unknown'
             return {
                 "status": "error",
                 "message": f"S3 upload failed: {error_code}",
-                "error": str(e)
+                "error": str(e),
+                "error_code": error_code
             }
         except Exception as e:
             return {
@@ -189,7 +251,8 @@ class S3Service:
                 local_drl_path,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs={'ContentType': 'text/plain'}
+                ExtraArgs={'ContentType': 'text/plain'},
+                Config=self.transfer_config
             )
 
             s3_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
@@ -234,23 +297,50 @@ class S3Service:
             print(f"Error generating presigned URL: {e}")
             return None
 
-    def read_pdf_from_s3(self, s3_key: str) -> Optional[bytes]:
+    def download_to_spool(self, s3_key: str, s3_bucket: str = None) -> Optional[BinaryIO]:
         """
-        Read PDF file content from S3 directly into memory (no local file needed)
+        Download an S3 object into a spooled temporary file (ranged GETs for large objects)
+
+        Small objects stay in memory; larger ones roll over to disk, so memory stays bounded
+        whatever the object size. The caller closes the file, which deletes it.
 
-        :param s3_key: S3 key of the PDF file
-        :return: PDF file bytes or None
+        :param s3_key: S3 key of the object
+        :param s3_bucket: S3 bucket (default: the configured bucket)
+        :return: Spooled file positioned at the start, or None if the object cannot be read
+        """
+        if not self.s3_client:
+            return None
+
+        spooled = tempfile.SpooledTemporaryFile(max_size=self.spool_max_memory)
+        try:
+            self.s3_client.download_fileobj(s3_bucket or self.bucket_name, s3_key, spooled,
+                                            Config=self.transfer_config)
+            # Parts are written at their offsets, in any order
+            size = spooled.seek(0, os.SEEK_END)
+            spooled.seek(0)
+            print(f"✓ Downloaded {size} bytes from S3: {s3_key}")
+            return spooled
+        except ClientError as e:
+            spooled.close()
+            print(f"Error downloading from S3: {e}")
+            return None
+
+    def get_object_etag(self, s3_bucket: str, s3_key: str) -> Optional[str]:
+        """
+        Get the ETag of an S3 object (changes whenever the object content changes)
+
+        :param s3_bucket: S3 bucket name
+        :param s3_key: S3 key of the object
+        :return: ETag without quotes, or None if the object cannot be read
         """
         if not self.s3_client:
             return None
 
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
-            pdf_bytes = response['Body'].read()
-            print(f"✓ Read {len(pdf_bytes)} bytes from S3: {s3_key}")
-            return pdf_bytes
+            response = self.s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
+            return response.get('ETag', '').strip('"') or None
         except ClientError as e:
-            print(f"Error reading PDF from S3: {e}")
+            print(f"Error reading S3 object metadata: {e}")
             return None
 
     def parse_s3_url(self, s3_url: str) -> Dict[str, str]:
@@ -322,7 +412,8 @@ class S3Service:
                 s3_key,
                 ExtraArgs={
                     'ContentType': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                }
+                },
+                Config=self.transfer_config
             )
 
             s3_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
@@ -344,11 +435,14 @@ class S3Service:
                 "message": f"Error uploading Excel to S3: {str(e)}"
             }
 
-    def upload_file_to_s3(self, file_content: bytes, filename: str, folder: str = "uploads") -> Dict:
+    def upload_file_to_s3(self, file_content: Union[bytes, BinaryIO], filename: str, folder: str = "uploads") -> Dict:
         """
         Upload any file to S3 in a specified folder
-        
-        :param file_content: File content as bytes
+
+        File objects are streamed in parts by the transfer manager (multipart above the
+        threshold), so the content never has to be held in memory as a whole.
+
+        :param file_content: File content as bytes, or a readable binary file object
         :param filename: Original filename
         :param folder: S3 folder path (default: "uploads")
         :return: Upload result with S3 URL and key
@@ -375,21 +469,27 @@ class S3Service:
             content_type = self._get_content_type(safe_filename)
             
             # Upload file to S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata={
-                    'original-filename': safe_filename,
-                    'upload-timestamp': timestamp
-                }
+            body = BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+            progress = _TransferProgress()
+            self.s3_client.upload_fileobj(
+                body,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': {
+                        'original-filename': safe_filename,
+                        'upload-timestamp': timestamp
+                    }
+                },
+                Config=self.transfer_config,
+                Callback=progress
             )
             
             # Generate S3 URL
             s3_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
             
-            file_size = len(file_content)
+            file_size = progress.bytes
             print(f"✓ Uploaded file to S3: {s3_key} ({file_size} bytes)")
             
             return {
@@ -404,9 +504,9 @@ class S3Service:
                 "file_size": file_size,
                 "content_type": content_type
             }
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error'].get('Message', str(e))
+        except (ClientError, S3UploadFailedError) as e:
+            error_code = upload_error_code(e) or 'Unknown'
+            error_message = e.response['Error'].get('Message', str(e)) if isinstance(e, ClientError) else str(e)
             return {
                 "status": "error",
                 "message": f"S3 upload failed: {error_code}",
@@ -0,0 +1,288 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import json
+import os
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from LLMTiers import discard_response
+
+# finish_reason (OpenAI), done_reason (Ollama) and stop_reason (watsonx) values of a completion
+# cut off by the output token limit
+LENGTH_FINISH_REASONS = ("length", "max_tokens", "token_limit")
+
+CONTINUATION_PROMPT = """{prompt}
+
+Your previous answer was cut off by the output length limit. It ended with:
+...{tail}
+
+Continue the JSON exactly where it stopped: output only the remaining elements and the closing
+brackets, starting with the next element. Do not repeat anything already written and do not wrap
+the output in code fences."""
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text of a streamed chunk (message chunk of a chat model or string of a completion model)"""
+    if isinstance(chunk, str):
+        return chunk
+    content = getattr(chunk, 'content', None)
+    return content if isinstance(content, str) else str(content or '')
+
+
+def finish_reason(chunk: Any) -> Optional[str]:
+    """Why the provider ended the completion, when the (last) chunk reports it"""
+    metadata = getattr(chunk, 'response_metadata', None) or {}
+    return metadata.get('finish_reason') or metadata.get('done_reason') or metadata.get('stop_reason')
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for the JSON value in an LLM answer, fed chunk by chunk as it streams.
+
+    Text before the first '[' or '{' (prose, code fences) and after the value closes is ignored.
+    A bracket in the prose ("the rules [as requested]") is not mistaken for the value: when the
+    candidate value closes without parsing, or a code fence appears inside it, the parser drops it
+    and rescans from the character after its opening bracket.
+    Every object or array that closes directly inside an array at nesting depth element_depth
+    (1: items of a top-level array; 2: items of the arrays of a top-level object, e.g. the
+    applicant_fields of a schema) is parsed right away and passed to
+    on_element(array_key, element), array_key being the key of the enclosing array in its
+    object (None for a top-level array).
+
+    After each complete element (and each container opened or closed at or above element_depth)
+    the parser remembers a resume point. When the answer is cut off, rewind() drops the partial
+    element so a continuation can be fed in, and closed_text() closes the open containers there.
+    """
+
+    def __init__(self, on_element: Callable[[Optional[str], Any], None] = None, element_depth: int = 1):
+        self.on_element = on_element
+        self.element_depth = element_depth
+        self._started_at = time.perf_counter()
+        self._reset()
+
+    def _reset(self):
+        self.elements: List[Tuple[Optional[str], Any]] = []
+        self.first_element_ms: Optional[float] = None
+        self._text: List[str] = []
+        self._length = 0
+        self._stack: List[list] = []  # [bracket, key of the container in its parent object]
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._pending_key = None
+        self._element_start = None
+        self._needs_comma = False
+        self._resume_point = None
+        self._resuming = False
+        self._continued = False
+        self.started = False
+        self.complete = False
+
+    def text(self) -> str:
+        """JSON text received so far (from the opening bracket of the value)"""
+        return ''.join(self._text)
+
+    def value(self) -> Any:
+        return json.loads(self.text())
+
+    def _append(self, ch: str):
+        self._text.append(ch)
+        self._length += 1
+
+    def _mark_resume_point(self, needs_comma: bool):
+        self._needs_comma = needs_comma
+        self._resume_point = (self._length, [list(entry) for entry in self._stack], needs_comma)
+
+    def feed(self, text: str):
+        for ch in text:
+            if self.complete:
+                return
+            if not self.started:
+                if ch not in '[{':
+                    continue
+                self.started = True
+            if self._resuming:
+                # Skip fences and prose up to the continuation proper, adding a missing comma
+                if ch not in '[{"]},':
+                    continue
+                self._resuming = False
+                if ch == ',' and not self._needs_comma:
+                    continue
+                if ch in '[{"' and self._needs_comma:
+                    self._append(',')
+            self._consume(ch)
+
+    def _consume(self, ch: str):
+        position = self._length
+        self._append(ch)
+
+        if self._in_string:
+            self._string.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._last_string = ''.join(self._string)
+            return
+
+        if ch == '`' and not self._continued:
+            # A code fence cannot be part of a JSON value: the candidate was prose
+            self._restart()
+        elif ch == '"':
+            self._in_string = True
+            self._string = [ch]
+        elif ch == ':':
+            if self._last_string is not None:
+                try:
+                    self._pending_key = json.loads(self._last_string)
+                except ValueError:
+                    self._pending_key = None
+        elif ch == ',':
+            self._pending_key = None
+            self._last_string = None
+        elif ch in '[{':
+            depth = len(self._stack)
+            if depth == self.element_depth and self._stack[-1][0] == '[':
+                self._element_start = position
+            key = self._pending_key if depth and self._stack[-1][0] == '{' else None
+            self._stack.append([ch, key])
+            self._pending_key = None
+            self._last_string = None
+            if len(self._stack) <= self.element_depth:
+                self._mark_resume_point(needs_comma=False)
+        elif ch in ']}':
+            if not self._stack:
+                return
+            self._stack.pop()
+            self._pending_key = None
+            self._last_string = None
+            depth = len(self._stack)
+            if depth == 0:
+                if not self._continued and not self._parses():
+                    self._restart()
+                    return
+                self.complete = True
+            elif depth == self.element_depth and self._element_start is not None:
+                self._emit(self.text()[self._element_start:], self._stack[-1][1])
+                self._element_start = None
+            if depth <= self.element_depth:
+                self._mark_resume_point(needs_comma=True)
+
+    def _parses(self) -> bool:
+        try:
+            json.loads(self.text())
+            return True
+        except ValueError:
+            return False
+
+    def _restart(self):
+        """Drop a candidate value that is not JSON and rescan the text after its opening bracket"""
+        rest = self.text()[1:]
+        self._reset()
+        self.feed(rest)
+
+    def _emit(self, element_text: str, key: Optional[str]):
+        try:
+            element = json.loads(element_text)
+        except ValueError:
+            return  # Left to the parse of the whole value
+        if self.first_element_ms is None:
+            self.first_element_ms = (time.perf_counter() - self._started_at) * 1000
+        self.elements.append((key, element))
+        if self.on_element:
+            self.on_element(key, element)
+
+    def rewind(self):
+        """Drop everything after the last resume point and accept a continuation"""
+        if self._resume_point is None:
+            return
+        length, stack, needs_comma = self._resume_point
+        text = self.text()[:length]
+        self._text, self._length = [text], length
+        self._stack = [list(entry) for entry in stack]
+        self._needs_comma = needs_comma
+        self._in_string = self._escape = False
+        self._last_string = self._pending_key = self._element_start = None
+        self._resuming = True
+        self._continued = True
+
+    def closed_text(self) -> str:
+        """JSON up to the last resume point with the containers still open there closed"""
+        length, stack, _ = self._resume_point if self._resume_point else (0, [], False)
+        return self.text()[:length] + ''.join(']' if bracket == '[' else '}' for bracket, _ in reversed(stack))
+
+
+def stream_json(llm, prompt: str, parser: IncrementalJSONParser = None, label: str = "LLM",
+                max_continuations: int = None) -> Any:
+    """
+    Stream an LLM answer into an IncrementalJSONParser and return the parsed JSON value
+
+    Elements reach parser.on_element as soon as they close. A completion that ends before the JSON
+    value closes (the provider reports the output limit, or the stream simply stops) is continued
+    from the last complete element with a continuation prompt, up to max_continuations times,
+    instead of repeating the whole request; if it is still incomplete, the complete elements are
+    returned (the containers closed after the last one).
+
+    Configuration (environment):
+        LLM_STREAMING: stream completions (default true; false invokes and parses the whole answer)
+        LLM_STREAM_MAX_CONTINUATIONS: continuation prompts per answer (default 2)
+
+    Raises:
+        ValueError: The answer contains no JSON value or does not parse
+    """
+    parser = parser or IncrementalJSONParser()
+    streaming = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    if max_continuations is None:
+        max_continuations = int(os.getenv("LLM_STREAM_MAX_CONTINUATIONS", "2"))
+
+    request, requests = prompt, []
+    try:
+        for continuation in range(max_continuations + 1):
+            requests.append(request)
+            reason = None
+            for chunk in (llm.stream(request) if streaming else [llm.invoke(request)]):
+                parser.feed(chunk_text(chunk))
+                reason = finish_reason(chunk) or reason
+            if not parser.started:
+                raise ValueError(f"{label} response contains no JSON")
+            if parser.complete:
+                value = parser.value()
+                if parser.elements:
+                    print(f"✓ {label}: {len(parser.elements)} elements streamed "
+                          f"(first after {parser.first_element_ms:.0f} ms"
+                          f"{f', continuations: {continuation}' if continuation else ''})")
+                return value
+            if continuation == max_continuations:
+                break
+
+            parser.rewind()
+            cause = "output token limit" if reason in LENGTH_FINISH_REASONS else "stream ended inside the JSON"
+            print(f"⚠ {label}: answer cut off ({cause}) after "
+                  f"{len(parser.elements)} elements, requesting continuation {continuation + 1}/{max_continuations}")
+            request = CONTINUATION_PROMPT.format(prompt=prompt, tail=parser.text()[-1500:])
+
+        parser.rewind()
+        print(f"⚠ {label}: answer still incomplete, keeping the {len(parser.elements)} complete elements")
+        return json.loads(parser.closed_text())
+    except ValueError:
+        # Do not serve the unparseable answer (the original request and its continuations) from the
+        # response cache when the caller retries
+        for sent in requests:
+            discard_response(llm, sent)
+        raise
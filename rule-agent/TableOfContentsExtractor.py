@@ -13,10 +13,15 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 #
+import os
 import re
 from typing import Dict, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from DocumentIndex import DocumentIndex
+from LLMConcurrency import bounded_map, get_llm_concurrency
+from LLMResponseCache import scoped_llm
+from LLMTiers import invoke_with_escalation
 
 class TableOfContentsExtractor:
     """
@@ -33,10 +38,17 @@ class TableOfContentsExtractor:
     - ✅ Structured approach - clear hierarchy
     - ✅ Progress tracking - know what's been processed
     - ✅ Better for long documents - divide and conquer
+
+    Configuration (environment):
+        TOC_SECTION_CONCURRENCY: sections analyzed at once (default: LLM provider cap, see LLMConcurrency)
+        TOC_SECTION_RETRIES: retries of a failed section analysis (default 2)
     """
 
     def __init__(self, llm):
-        self.llm = llm
+        self.llm = scoped_llm(llm, "TableOfContentsExtractor")
+        self.max_concurrency = int(os.getenv("TOC_SECTION_CONCURRENCY", "0")) or get_llm_concurrency()
+        self.section_retries = int(os.getenv("TOC_SECTION_RETRIES", "2"))
+        self._document_index = None
 
         # Prompt for TOC extraction
         self.toc_prompt = ChatPromptTemplate.from_messages([
@@ -122,8 +134,11 @@ Section Content:
 Extract ALL policies from this section. Remember: ONLY extract policies that are explicitly written in the content above. If there are no policies in this content, return an empty list.""")
         ])
 
-        self.toc_chain = self.toc_prompt | self.llm | JsonOutputParser()
-        self.section_chain = self.section_analysis_prompt | self.llm | JsonOutputParser()
+        self.json_parser = JsonOutputParser()
+
+    def _invoke_json(self, prompt: ChatPromptTemplate, inputs: Dict) -> Dict:
+        """Run a prompt and parse its JSON answer, escalating to the large model tier on parse failure"""
+        return invoke_with_escalation(self.llm, prompt.invoke(inputs), self.json_parser.invoke)
 
     def extract_toc(self, document_text: str) -> Dict:
         """
@@ -141,7 +156,7 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
 
         try:
             # Extract TOC using LLM
-            result = self.toc_chain.invoke({"document_text": document_text[:50000]})
+            result = self._invoke_json(self.toc_prompt, {"document_text": document_text[:50000]})
 
             # Flatten TOC for easier processing
             flat_toc = self._flatten_toc(result.get("toc", []))
@@ -259,11 +274,22 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
 
         return sections
 
+    def _get_document_index(self, document_text: str) -> DocumentIndex:
+        """Index of the document being processed, built once and reused for all its sections"""
+        index = self._document_index
+        if index is None or index.text is not document_text:
+            index = DocumentIndex(document_text)
+            self._document_index = index
+        return index
+
     def extract_section_content(self, document_text: str, section: Dict,
                                next_section: Dict = None) -> str:
         """
         Extract content for a specific section
 
+        Section boundaries are looked up in a DocumentIndex of the document (line offsets and
+        headings), which is built on the first call and reused while the same text is processed.
+
         Args:
             document_text: Full document text
             section: Section metadata (with line_number if available)
@@ -272,90 +298,15 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
         Returns:
             Section content as string
         """
-        lines = document_text.split('\n')
-
-        # If we have line numbers, use them
-        if "line_number" in section:
-            start_line = section["line_number"]
-            end_line = next_section.get("line_number", len(lines)) if next_section else len(lines)
-
-            content_lines = lines[start_line:end_line]
-            content = '\n'.join(content_lines)
-            print(f"  DEBUG: Extracted content using line numbers {start_line} to {end_line}: {len(content)} chars")
-            return content
-
-        # Otherwise, search for section by title
-        section_title = section.get("section_title", "")
-        section_num = section.get("section_number", "")
-
-        print(f"  DEBUG: Searching for section '{section_num}' - '{section_title}'")
-
-        # Find section start - use flexible matching
-        start_idx = None
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-
-            # Try multiple matching strategies
-            # Strategy 1: Both number and title in same line
-            if section_num in line and section_title in line:
-                start_idx = i
-                print(f"  DEBUG: Found section at line {i} (both in same line)")
-                break
-
-            # Strategy 2: Number followed by title (possibly on next line or same line)
-            if section_num and line_stripped.startswith(section_num):
-                # Check if title is on same line or next line
-                if section_title in line:
-                    start_idx = i
-                    print(f"  DEBUG: Found section at line {i} (title on same line)")
-                    break
-                elif i + 1 < len(lines) and section_title in lines[i + 1]:
-                    start_idx = i
-                    print(f"  DEBUG: Found section at line {i} (title on next line)")
-                    break
-
-            # Strategy 3: Title match only (as fallback)
-            if section_title and len(section_title) > 5 and section_title in line:
-                start_idx = i
-                print(f"  DEBUG: Found section at line {i} (title match only)")
-                break
-
-        if start_idx is None:
-            print(f"  DEBUG: Could not find section start for '{section_num}' - '{section_title}'")
+        index = self._get_document_index(document_text)
+        span = index.section_span(section, next_section)
+        if span is None:
+            print(f"  DEBUG: Could not find section start for "
+                  f"'{section.get('section_number', '')}' - '{section.get('section_title', '')}'")
             return ""
 
-        # Find section end (next section or end of document)
-        end_idx = len(lines)
-        if next_section:
-            next_title = next_section.get("section_title", "")
-            next_num = next_section.get("section_number", "")
-
-            print(f"  DEBUG: Looking for next section: '{next_num}' - '{next_title}'")
-
-            for i in range(start_idx + 1, len(lines)):
-                line_stripped = lines[i].strip()
-
-                # Strategy 1: Both number and title in same line
-                if (next_num and next_title and next_num in lines[i] and next_title in lines[i]):
-                    end_idx = i
-                    print(f"  DEBUG: Found next section at line {i} (both number and title)")
-                    break
-
-                # Strategy 2: Line starts with next section number
-                elif next_num and line_stripped.startswith(next_num):
-                    end_idx = i
-                    print(f"  DEBUG: Found next section at line {i} (by number)")
-                    break
-
-                # Strategy 3: Title match only (as fallback) - same as start matching
-                elif next_title and len(next_title) > 5 and next_title in lines[i]:
-                    end_idx = i
-                    print(f"  DEBUG: Found next section at line {i} (by title)")
-                    break
-
-        content_lines = lines[start_idx:end_idx]
-        content = '\n'.join(content_lines)
-        print(f"  DEBUG: Extracted {len(content)} chars from lines {start_idx} to {end_idx}")
+        content = index.slice_lines(*span)
+        print(f"  DEBUG: Extracted {len(content)} chars from lines {span[0]} to {span[1]}")
         return content
 
     def analyze_section(self, section: Dict, section_content: str) -> Dict:
@@ -370,7 +321,7 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
             Dict with extracted policies and metadata
         """
         try:
-            result = self.section_chain.invoke({
+            result = self._invoke_json(self.section_analysis_prompt, {
                 "section_number": section.get("section_number", ""),
                 "section_title": section.get("section_title", ""),
                 "section_content": section_content[:15000]  # Limit section size
@@ -396,6 +347,28 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
                 "error": str(e)
             }
 
+    def extract_sections(self, document_text: str) -> List[Dict]:
+        """
+        Split a document into its TOC sections
+
+        Args:
+            document_text: Full document text
+
+        Returns:
+            Section metadata dicts with a 'content' key, in document order
+            (sections shorter than 30 characters are skipped)
+        """
+        toc = self.extract_toc(document_text)["toc"]
+
+        sections = []
+        for i, section in enumerate(toc):
+            next_section = toc[i + 1] if i + 1 < len(toc) else None
+            section_content = self.extract_section_content(document_text, section, next_section)
+            if len(section_content.strip()) < 30:
+                continue
+            sections.append(dict(section, content=section_content))
+        return sections
+
     def process_document_by_toc(self, document_text: str) -> Dict:
         """
         Process entire document section-by-section using TOC
@@ -425,29 +398,44 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
             print(f"  ... and {len(toc) - 20} more sections")
 
         # Step 2: Process each section
+        # Sections are independent, so they are analyzed concurrently (bounded per LLM provider);
+        # results are merged in document order
         print("\n" + "-"*60)
-        print("Processing sections...")
+        print(f"Processing sections ({self.max_concurrency} concurrent)...")
         print("-"*60)
 
-        all_section_results = []
-        all_policies = []
-        all_queries = []
-
+        sections_to_analyze = []
         for i, section in enumerate(toc):
-            print(f"\n[{i+1}/{total_sections}] Analyzing: {section['section_number']} - {section['section_title']}")
-
             # Extract section content
             next_section = toc[i + 1] if i + 1 < len(toc) else None
             section_content = self.extract_section_content(document_text, section, next_section)
 
             if len(section_content.strip()) < 30:
+                print(f"\n[{i+1}/{total_sections}] {section['section_number']} - {section['section_title']}")
                 print(f"  ⚠ Section too short ({len(section_content)} chars), skipping...")
                 continue
+            sections_to_analyze.append((i, section, section_content))
+
+        def report_section(index, section_result):
+            i, section, _ = sections_to_analyze[index]
+            print(f"\n[{i+1}/{total_sections}] Analyzed: {section['section_number']} - {section['section_title']}")
+            if section_result.get("status") == "success":
+                print(f"  ✓ Found {len(section_result.get('policies', []))} policies in this section")
+            else:
+                print(f"  ✗ Analysis failed after {self.section_retries + 1} attempts: {section_result.get('error')}")
+
+        all_section_results = bounded_map(
+            lambda item: self.analyze_section(item[1], item[2]),
+            sections_to_analyze,
+            max_workers=self.max_concurrency,
+            retries=self.section_retries,
+            should_retry=lambda section_result: section_result.get("status") != "success",
+            on_result=report_section
+        )
 
-            # Analyze section
-            section_result = self.analyze_section(section, section_content)
-            all_section_results.append(section_result)
-
+        all_policies = []
+        all_queries = []
+        for section_result in all_section_results:
             policies = section_result.get("policies", [])
             all_policies.extend(policies)
 
@@ -457,8 +445,6 @@ Extract ALL policies from this section. Remember: ONLY extract policies that are
                 if query and query not in all_queries:
                     all_queries.append(query)
 
-            print(f"  ✓ Found {len(policies)} policies in this section")
-
         # Step 3: Compile results
         print("\n" + "="*60)
         print("SECTION-BY-SECTION EXTRACTION COMPLETE")
@@ -22,6 +22,9 @@ Automatically generates comprehensive test cases using LLM based on policy docum
 import json
 import logging
 from typing import List, Dict, Any, Optional
+from LLMResponseCache import scoped_llm
+from LLMTiers import run_with_escalation
+from StreamingJSON import IncrementalJSONParser, stream_json
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +41,7 @@ class TestCaseGenerator:
         Args:
             llm: Language model instance for test case generation
         """
-        self.llm = llm
+        self.llm = scoped_llm(llm, "TestCaseGenerator")
 
     def generate_test_cases(self,
                           drl_content: str,
@@ -162,38 +165,16 @@ class TestCaseGenerator:
 
         return json.dumps(example, indent=2)
 
-    def _parse_test_cases(self, response_text: str) -> List[Dict[str, Any]]:
-        """Parse test cases from LLM response"""
-        try:
-            # Try to extract JSON from markdown code blocks
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
-            else:
-                # Try to find JSON array directly
-                json_start = response_text.find("[")
-                json_end = response_text.rfind("]") + 1
-                json_text = response_text[json_start:json_end].strip()
-
-            # Parse JSON
-            test_cases = json.loads(json_text)
-
-            # Add metadata
-            for tc in test_cases:
-                tc['is_auto_generated'] = True
-                tc['generation_method'] = 'llm'
+    def _tag_test_cases(self, test_cases: Any) -> List[Dict[str, Any]]:
+        """Validate the parsed test cases and add generation metadata"""
+        if not isinstance(test_cases, list):
+            raise ValueError("Expected a JSON array of test cases")
 
-            return test_cases
+        for tc in test_cases:
+            tc['is_auto_generated'] = True
+            tc['generation_method'] = 'llm'
 
-        except Exception as e:
-            logger.error(f"Error parsing test cases JSON: {e}")
-            logger.debug(f"Response text: {response_text[:500]}")
-            return []
+        return test_cases
 
     def _generate_test_cases_from_drl(self, drl_content: str, schema: Dict[str, Any], policy_type: str) -> List[Dict[str, Any]]:
         """
@@ -318,18 +299,28 @@ Generate the test cases now:"""
             print("...")
             print("="*80)
 
-            response = self.llm.invoke(prompt)
-            response_text = response.content if hasattr(response, 'content') else str(response)
-
-            print("\n" + "="*80)
-            print("DEBUG: DRL-BASED TEST CASE GENERATION - LLM RESPONSE")
-            print("="*80)
-            print(response_text[:3000])  # First 3000 chars
-            print("...")
-            print("="*80)
-
-            # Parse JSON from response
-            test_cases = self._parse_test_cases(response_text)
+            def generate(llm):
+                # Test cases are reported as they stream in; a cut-off answer is continued
+                parser = IncrementalJSONParser(
+                    lambda _, tc: print(f"  ✓ Test case: {tc.get('test_case_name', 'Unknown')}")
+                    if isinstance(tc, dict) else None)
+                try:
+                    parsed = stream_json(llm, prompt, parser, label="DRL-based test cases")
+                finally:
+                    print("\n" + "="*80)
+                    print("DEBUG: DRL-BASED TEST CASE GENERATION - LLM RESPONSE")
+                    print("="*80)
+                    print(parser.text()[:3000])  # First 3000 chars
+                    print("...")
+                    print("="*80)
+
+                parsed = self._tag_test_cases(parsed)
+                if not parsed:
+                    raise ValueError("no test cases could be parsed from the response")
+                return parsed
+
+            # Retried on the large model if the small one returns unparseable output
+            test_cases = run_with_escalation(self.llm, generate)
 
             print("\n" + "="*80)
             print(f"DEBUG: GENERATED {len(test_cases)} DRL-BASED TEST CASES")
@@ -14,17 +14,74 @@
 #    limitations under the License.
 #
 import boto3
+import hashlib
 import os
 import time
+from collections import deque
 from typing import Dict, List, Optional
 
+# AWS Textract limit: Maximum 30 queries per API call
+MAX_QUERIES_PER_CALL = 30
+
+# Error codes returned when the account's Textract request rate or job quota is exceeded
+THROTTLING_ERROR_CODES = ('ThrottlingException', 'ProvisionedThroughputExceededException', 'LimitExceededException')
+
+
+def _is_throttling_error(error: Exception) -> bool:
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in THROTTLING_ERROR_CODES or any(c in str(error) for c in THROTTLING_ERROR_CODES)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query (Textract treats these as duplicates)"""
+    return ' '.join(query.strip().lower().split())
+
+
+class TextractAnswerCache:
+    """
+    Persistent Textract answers keyed by (document content hash, normalized query text)
+
+    Backed by the textract_answer_cache table. Only answered queries are stored, so queries
+    Textract could not answer are asked again on the next run.
+    """
+
+    def __init__(self, db_service=None):
+        if db_service is None:
+            from DatabaseService import get_database_service
+            db_service = get_database_service()
+        self.db_service = db_service
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        return hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()
+
+    def lookup(self, document_hash: str, queries: List[str]) -> Dict[str, Dict]:
+        """Return {query: {'answer', 'confidence', 'page', 'cached'}} for the cached queries"""
+        hashes = {query: self.query_hash(query) for query in queries}
+        rows = self.db_service.get_textract_answers(document_hash, list(set(hashes.values())))
+        return {
+            query: {'answer': rows[h]['answer'], 'confidence': rows[h]['confidence'], 'page': rows[h]['page'],
+                    'cached': True}
+            for query, h in hashes.items() if h in rows
+        }
+
+    def store(self, document_hash: str, query_results: Dict[str, Dict]):
+        self.db_service.save_textract_answers(document_hash, [{
+            'query_hash': self.query_hash(query),
+            'query_text': query,
+            'answer': data.get('answer'),
+            'confidence': data.get('confidence'),
+            'page': data.get('page')
+        } for query, data in query_results.items() if data.get('answer')])
+
+
 class TextractService:
     """
     AWS Textract service for extracting structured data from policy documents
     Supports both synchronous (single-page) and asynchronous (multi-page) operations
     """
 
-    def __init__(self):
+    def __init__(self, textract_client=None, answer_cache=None):
         """
         Initialize AWS Textract client
 
@@ -32,14 +89,36 @@ class TextractService:
         - AWS_ACCESS_KEY_ID: AWS access key
         - AWS_SECRET_ACCESS_KEY: AWS secret key
         - AWS_REGION: AWS region (default: us-east-1)
+        - TEXTRACT_MAX_CONCURRENT_JOBS: analysis jobs running at once per document (default 4)
+        - TEXTRACT_POLL_INITIAL_SECONDS: first status poll delay (default 1)
+        - TEXTRACT_POLL_MAX_SECONDS: poll delay cap for the exponential backoff (default 10)
+        - TEXTRACT_JOB_TIMEOUT_SECONDS: per-job timeout (default 300)
+        - TEXTRACT_ANSWER_CACHE_ENABLED: reuse answers per document and query (default true)
+
+        :param textract_client: Client to use instead of creating a boto3 one (e.g. a local stub in tests)
+        :param answer_cache: Answer cache to use instead of the database-backed TextractAnswerCache
         """
         self.aws_access_key = os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
         self.aws_region = os.getenv("AWS_REGION", "us-east-1")
 
+        # Batch job scheduling: stay within the account's concurrent job and request rate quotas
+        self.max_concurrent_jobs = max(1, int(os.getenv("TEXTRACT_MAX_CONCURRENT_JOBS", "4")))
+        self.poll_initial_seconds = float(os.getenv("TEXTRACT_POLL_INITIAL_SECONDS", "1"))
+        self.poll_max_seconds = float(os.getenv("TEXTRACT_POLL_MAX_SECONDS", "10"))
+        self.job_timeout_seconds = float(os.getenv("TEXTRACT_JOB_TIMEOUT_SECONDS", "300"))
+
+        # Created on first use so the service can be constructed without a database
+        self.answer_cache = answer_cache
+        self.answer_cache_enabled = answer_cache is not None or (
+            os.getenv("TEXTRACT_ANSWER_CACHE_ENABLED", "true").lower() == "true")
+
         self.isConfigured = self.aws_access_key is not None and self.aws_secret_key is not None
 
-        if self.isConfigured:
+        if textract_client is not None:
+            self.textract_client = textract_client
+            self.isConfigured = True
+        elif self.isConfigured:
             try:
                 self.textract_client = boto3.client(
                     'textract',
@@ -58,7 +137,8 @@ class TextractService:
     def analyze_document(self, document_path: Optional[str] = None,
                         s3_bucket: Optional[str] = None,
                         s3_key: Optional[str] = None,
-                        queries: List[str] = []) -> Dict:
+                        queries: List[str] = [],
+                        document_hash: Optional[str] = None) -> Dict:
         """
         Use Textract to extract data based on queries
         Automatically uses async API for multi-page documents
@@ -67,6 +147,8 @@ class TextractService:
         :param s3_bucket: S3 bucket name (optional if document_path provided)
         :param s3_key: S3 object key (optional if document_path provided)
         :param queries: List of questions to ask about the document
+        :param document_hash: Hash of the document text; when given, queries already answered for
+                              this document come from the answer cache and only the rest go to Textract
         :return: Extracted data with answers and confidence scores
         """
         if not self.isConfigured:
@@ -88,6 +170,8 @@ class TextractService:
 
                 # For S3 documents, use async API (supports multi-page)
                 print("Using asynchronous Textract API (supports multi-page documents)...")
+                if document_hash:
+                    return self._analyze_document_cached(s3_bucket, s3_key, queries, document_hash)
                 return self._analyze_document_async(s3_bucket, s3_key, queries)
 
             elif document_path:
@@ -154,26 +238,101 @@ class TextractService:
             print(f"Error detecting text with Textract: {e}")
             return f"Textract text detection failed: {str(e)}"
 
+    def copy_cached_answers(self, source_document_hash: str, target_document_hash: str, queries: List[str]) -> int:
+        """
+        Reuse the cached answers of one document for another (e.g. for the queries of policy
+        sections that did not change between two versions of a document)
+
+        Returns:
+            Number of answers copied
+        """
+        answer_cache = self._get_answer_cache()
+        if answer_cache is None or not queries or source_document_hash == target_document_hash:
+            return 0
+        try:
+            answers = answer_cache.lookup(source_document_hash, queries)
+            answer_cache.store(target_document_hash, answers)
+            return len(answers)
+        except Exception as e:
+            print(f"⚠ Could not copy cached Textract answers: {e}")
+            return 0
+
+    def _get_answer_cache(self) -> Optional[TextractAnswerCache]:
+        if self.answer_cache is None and self.answer_cache_enabled:
+            try:
+                self.answer_cache = TextractAnswerCache()
+            except Exception as e:
+                print(f"⚠ Textract answer cache unavailable: {e}")
+                self.answer_cache_enabled = False
+        return self.answer_cache
+
+    def _analyze_document_cached(self, s3_bucket: str, s3_key: str, queries: List[str], document_hash: str) -> Dict:
+        """
+        Answer queries from the per-document answer cache and submit only the rest to Textract
+
+        New answers are added to the cache. The merged result lists queries in request order.
+        """
+        answer_cache = self._get_answer_cache()
+        cached = {}
+        if answer_cache is not None:
+            try:
+                cached = answer_cache.lookup(document_hash, queries)
+            except Exception as e:
+                print(f"⚠ Textract answer cache lookup failed: {e}")
+
+        uncached = [q for q in queries if q not in cached]
+        print(f"Textract answer cache: {len(cached)} cached, {len(uncached)} to submit")
+
+        if uncached:
+            result = self._analyze_document_async(s3_bucket, s3_key, uncached)
+        else:
+            result = {"queries": {}, "metadata": {"total_blocks": 0}}
+
+        fresh = result.get("queries", {})
+        if answer_cache is not None and fresh:
+            try:
+                answer_cache.store(document_hash, fresh)
+            except Exception as e:
+                print(f"⚠ Could not update Textract answer cache: {e}")
+
+        if not cached:
+            return result
+
+        merged = {}
+        for query in queries:
+            if query in fresh:
+                merged[query] = fresh[query]
+            elif query in cached:
+                merged[query] = cached[query]
+
+        merged_result = dict(result)
+        merged_result["queries"] = merged
+        merged_result["metadata"] = dict(result.get("metadata", {}),
+                                         cached_queries=len(cached),
+                                         submitted_queries=len(uncached),
+                                         queries_extracted=len(merged))
+        return merged_result
+
     def _analyze_document_async(self, s3_bucket: str, s3_key: str, queries: List[str]) -> Dict:
         """
         Use asynchronous Textract API for multi-page documents with queries
         Supports batch processing for queries exceeding AWS Textract's 30 query limit
 
+        All batch jobs are submitted up front (up to TEXTRACT_MAX_CONCURRENT_JOBS at a time) and
+        tracked by a single poller, so batches run concurrently instead of back to back.
+
         :param s3_bucket: S3 bucket name
         :param s3_key: S3 object key
         :param queries: List of questions to ask about the document
         :return: Extracted data with answers and confidence scores
         """
-        # AWS Textract limit: Maximum 30 queries per API call
-        MAX_QUERIES_PER_CALL = 30
-
         # Deduplicate queries (case-insensitive, strip whitespace)
         # AWS Textract rejects duplicate queries
         original_count = len(queries)
         seen = set()
         deduplicated_queries = []
         for q in queries:
-            normalized = q.strip().lower()
+            normalized = normalize_query(q)
             if normalized not in seen:
                 seen.add(normalized)
                 deduplicated_queries.append(q)
@@ -186,50 +345,40 @@ class TextractService:
         if len(queries) > MAX_QUERIES_PER_CALL:
             print(f"📊 Batch processing: {len(queries)} queries will be processed in batches of {MAX_QUERIES_PER_CALL}")
             num_batches = (len(queries) + MAX_QUERIES_PER_CALL - 1) // MAX_QUERIES_PER_CALL
-            print(f"   Total batches: {num_batches}")
+            print(f"   Total batches: {num_batches} (up to {self.max_concurrent_jobs} running concurrently)")
 
             # Split queries into batches
             query_batches = [queries[i:i + MAX_QUERIES_PER_CALL]
                            for i in range(0, len(queries), MAX_QUERIES_PER_CALL)]
 
-            # Process each batch and merge results
-            all_query_results = {}
             total_start_time = time.time()
+            batch_results = self._run_textract_jobs(s3_bucket, s3_key, query_batches)
 
-            for batch_num, batch_queries in enumerate(query_batches, 1):
-                print(f"\n{'='*60}")
-                print(f"Processing batch {batch_num}/{num_batches} ({len(batch_queries)} queries)")
-                print(f"{'='*60}")
-
-                # Process this batch
-                batch_result = self._process_single_textract_batch(
-                    s3_bucket, s3_key, batch_queries,
-                    batch_num, len(batch_queries)
-                )
-
+            # Merge in batch order (not completion order) so identical inputs give identical output
+            all_query_results = {}
+            failed_batches = []
+            for batch_num, batch_result in enumerate(batch_results, 1):
                 if "error" in batch_result:
-                    print(f"✗ Batch {batch_num} failed: {batch_result['error']}")
-                    # Continue with other batches even if one fails
+                    # Other batches still contribute their answers
+                    failed_batches.append(batch_num)
                     continue
-
-                # Merge query results
-                batch_query_results = batch_result.get("queries", {})
-                all_query_results.update(batch_query_results)
-
-                print(f"✓ Batch {batch_num} completed: {len(batch_query_results)} queries extracted")
+                all_query_results.update(batch_result.get("queries", {}))
 
             total_elapsed = time.time() - total_start_time
             print(f"\n{'='*60}")
             print(f"✓ Batch processing complete!")
             print(f"   Total time: {total_elapsed:.1f}s")
             print(f"   Total queries processed: {len(all_query_results)}/{len(queries)}")
+            if failed_batches:
+                print(f"   Failed batches: {failed_batches}")
             print(f"{'='*60}\n")
 
             return {
                 "queries": all_query_results,
                 "metadata": {
-                    "total_blocks": 0,
+                    "total_blocks": sum(r.get("metadata", {}).get("total_blocks", 0) for r in batch_results),
                     "batch_count": num_batches,
+                    "failed_batches": failed_batches,
                     "total_queries": len(queries),
                     "queries_extracted": len(all_query_results),
                     "total_time_seconds": total_elapsed
@@ -253,88 +402,150 @@ class TextractService:
         :param total_queries: Total number of queries across all batches
         :return: Extracted data for this batch
         """
-        try:
-            # Start async analysis job
-            print(f"Starting Textract job for batch {batch_num}...")
-            print(f"DEBUG: S3 bucket={s3_bucket}, key={s3_key}")
-
-            response = self.textract_client.start_document_analysis(
-                DocumentLocation={
-                    'S3Object': {
-                        'Bucket': s3_bucket,
-                        'Name': s3_key
-                    }
-                },
-                FeatureTypes=['QUERIES'],
-                QueriesConfig={
-                    'Queries': [{'Text': q, 'Alias': f'Q{i}'}
-                               for i, q in enumerate(queries)]
+        return self._run_textract_jobs(s3_bucket, s3_key, [queries], first_batch_num=batch_num)[0]
+
+    def _start_textract_job(self, s3_bucket: str, s3_key: str, queries: List[str]) -> str:
+        response = self.textract_client.start_document_analysis(
+            DocumentLocation={
+                'S3Object': {
+                    'Bucket': s3_bucket,
+                    'Name': s3_key
                 }
+            },
+            FeatureTypes=['QUERIES'],
+            QueriesConfig={
+                'Queries': [{'Text': q, 'Alias': f'Q{i}'}
+                           for i, q in enumerate(queries)]
+            }
+        )
+        return response['JobId']
+
+    def _collect_textract_result(self, job_id: str, first_page: Dict, queries: List[str]) -> Dict:
+        """Page through a finished job's results and parse them"""
+        all_blocks = first_page.get('Blocks', [])
+        next_token = first_page.get('NextToken')
+        result = first_page
+
+        # Handle pagination if multiple result pages
+        while next_token:
+            result = self.textract_client.get_document_analysis(
+                JobId=job_id,
+                NextToken=next_token
             )
+            all_blocks.extend(result.get('Blocks', []))
+            next_token = result.get('NextToken')
 
-            job_id = response['JobId']
-            print(f"✓ Textract job started: {job_id}")
-            print("Waiting for job to complete...")
-
-            # Poll for completion
-            max_wait_time = 300  # 5 minutes max
-            poll_interval = 2    # Poll every 2 seconds
-            elapsed_time = 0
+        # Build response in same format as synchronous API
+        response_data = {
+            'Blocks': all_blocks,
+            'DocumentMetadata': result.get('DocumentMetadata', {})
+        }
+        return self._parse_textract_response(response_data, queries)
 
-            while elapsed_time < max_wait_time:
-                time.sleep(poll_interval)
-                elapsed_time += poll_interval
+    def _run_textract_jobs(self, s3_bucket: str, s3_key: str, query_batches: List[List[str]],
+                           first_batch_num: int = 1) -> List[Dict]:
+        """
+        Run one Textract analysis job per query batch and wait for all of them
 
-                result = self.textract_client.get_document_analysis(JobId=job_id)
-                status = result['JobStatus']
+        Jobs are started as long as fewer than max_concurrent_jobs are running; the rest start as
+        earlier jobs finish. A single loop polls every running job, each with its own exponential
+        backoff (poll_initial_seconds doubling up to poll_max_seconds), and parses each job's
+        results as soon as it succeeds. Throttled start/poll calls are retried with backoff.
 
-                if status == 'SUCCEEDED':
-                    print(f"✓ Textract job completed successfully (took {elapsed_time}s)")
-
-                    # Collect all pages of results
-                    all_blocks = result.get('Blocks', [])
-                    next_token = result.get('NextToken')
-
-                    # Handle pagination if multiple result pages
-                    while next_token:
-                        result = self.textract_client.get_document_analysis(
-                            JobId=job_id,
-                            NextToken=next_token
-                        )
-                        all_blocks.extend(result.get('Blocks', []))
-                        next_token = result.get('NextToken')
-
-                    # Build response in same format as synchronous API
-                    response_data = {
-                        'Blocks': all_blocks,
-                        'DocumentMetadata': result.get('DocumentMetadata', {})
-                    }
+        :return: One result per batch, in batch order ({"error": ...} for failed batches)
+        """
+        results: List[Optional[Dict]] = [None] * len(query_batches)
+        pending = deque(enumerate(query_batches))
+        active = {}  # job_id -> tracking info
+        start_backoff = self.poll_initial_seconds
+        next_start_at = 0.0
+
+        while pending or active:
+            now = time.monotonic()
+
+            # Submit queued batches while there is room under the concurrency limit
+            while pending and len(active) < self.max_concurrent_jobs and now >= next_start_at:
+                index, batch_queries = pending[0]
+                batch_num = first_batch_num + index
+                try:
+                    job_id = self._start_textract_job(s3_bucket, s3_key, batch_queries)
+                except Exception as e:
+                    if _is_throttling_error(e):
+                        print(f"  Textract throttled job start for batch {batch_num}, retrying in {start_backoff:.1f}s")
+                        next_start_at = now + start_backoff
+                        start_backoff = min(start_backoff * 2, self.poll_max_seconds)
+                        break
+                    print(f"✗ Could not start Textract job for batch {batch_num}: {e}")
+                    results[index] = {"error": f"Async Textract analysis failed: {str(e)}"}
+                    pending.popleft()
+                    continue
 
-                    return self._parse_textract_response(response_data, queries)
+                pending.popleft()
+                start_backoff = self.poll_initial_seconds
+                print(f"✓ Textract job started for batch {batch_num} ({len(batch_queries)} queries): {job_id}")
+                active[job_id] = {
+                    "index": index,
+                    "batch_num": batch_num,
+                    "queries": batch_queries,
+                    "started_at": now,
+                    "interval": self.poll_initial_seconds,
+                    "next_poll_at": now + self.poll_initial_seconds
+                }
 
+            # Sleep until the next job is due for a poll (or the next throttled start may be retried)
+            wake_at = min((job["next_poll_at"] for job in active.values()), default=next_start_at)
+            if pending and len(active) < self.max_concurrent_jobs:
+                wake_at = min(wake_at, next_start_at)
+            delay = wake_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            now = time.monotonic()
+            for job_id, job in list(active.items()):
+                if job["next_poll_at"] > now:
+                    continue
+                elapsed = now - job["started_at"]
+                try:
+                    response = self.textract_client.get_document_analysis(JobId=job_id)
+                except Exception as e:
+                    if not _is_throttling_error(e):
+                        print(f"✗ Error polling Textract job for batch {job['batch_num']}: {e}")
+                        results[job["index"]] = {"error": f"Async Textract analysis failed: {str(e)}"}
+                        del active[job_id]
+                        continue
+                    response = {'JobStatus': 'IN_PROGRESS'}  # throttled poll: back off and try again
+
+                status = response['JobStatus']
+                if status == 'SUCCEEDED':
+                    print(f"✓ Textract job for batch {job['batch_num']} completed (took {elapsed:.1f}s)")
+                    try:
+                        results[job["index"]] = self._collect_textract_result(job_id, response, job["queries"])
+                    except Exception as e:
+                        print(f"✗ Error reading Textract results for batch {job['batch_num']}: {e}")
+                        results[job["index"]] = {"error": f"Async Textract analysis failed: {str(e)}"}
+                    del active[job_id]
                 elif status == 'FAILED':
-                    error_msg = result.get('StatusMessage', 'Unknown error')
-                    print(f"✗ Textract job failed: {error_msg}")
-                    return {"error": f"Textract job failed: {error_msg}"}
-
+                    error_msg = response.get('StatusMessage', 'Unknown error')
+                    print(f"✗ Textract job for batch {job['batch_num']} failed: {error_msg}")
+                    results[job["index"]] = {"error": f"Textract job failed: {error_msg}"}
+                    del active[job_id]
                 elif status in ['IN_PROGRESS', 'PARTIAL_SUCCESS']:
-                    print(f"  Job status: {status} ({elapsed_time}s elapsed)")
-                    continue
+                    if elapsed >= self.job_timeout_seconds:
+                        print(f"✗ Textract job for batch {job['batch_num']} timed out after {self.job_timeout_seconds:.0f}s")
+                        results[job["index"]] = {
+                            "error": f"Textract job timed out after {self.job_timeout_seconds:.0f}s"
+                        }
+                        del active[job_id]
+                        continue
+                    print(f"  Batch {job['batch_num']} job status: {status} ({elapsed:.1f}s elapsed)")
+                    job["interval"] = min(job["interval"] * 2, self.poll_max_seconds)
+                    job["next_poll_at"] = now + job["interval"]
                 else:
-                    print(f"✗ Unexpected job status: {status}")
-                    return {"error": f"Unexpected job status: {status}"}
-
-            # Timeout
-            print(f"✗ Textract job timed out after {max_wait_time}s")
-            return {"error": f"Textract job timed out after {max_wait_time}s"}
+                    print(f"✗ Unexpected job status for batch {job['batch_num']}: {status}")
+                    results[job["index"]] = {"error": f"Unexpected job status: {status}"}
+                    del active[job_id]
 
-        except Exception as e:
-            print(f"✗ Error in async Textract analysis: {e}")
-            print(f"  Exception type: {type(e).__name__}")
-            print(f"  Exception details: {str(e)}")
-            import traceback
-            print(f"  Traceback: {traceback.format_exc()}")
-            return {"error": f"Async Textract analysis failed: {str(e)}"}
+        return results
 
     def _parse_textract_response(self, response: Dict, queries: List[str]) -> Dict:
         """
@@ -390,7 +601,8 @@ class TextractService:
                     results["queries"][query_map[query_alias]] = {
                         'answer': answer,
                         'confidence': confidence,
-                        'alias': query_alias
+                        'alias': query_alias,
+                        'page': block.get('Page')
                     }
             elif block_type == 'QUERY':
                 query_blocks.append(block)
@@ -24,18 +24,54 @@ from S3Service import S3Service
 from ExcelRulesExporter import ExcelRulesExporter
 from DatabaseService import get_database_service
 from DocumentExtractor import DocumentExtractor
+from DocumentIndex import clause_offset, page_number_at, resolve_page_numbers
 from DynamicSchemaGenerator import DynamicSchemaGenerator
 from IntelligentFieldMapper import IntelligentFieldMapper
 from DRLValidator import DRLValidator
+from WorkflowScheduler import StepScheduler
+from WorkflowCheckpoints import StepCheckpointer, content_hash, llm_config
+from RuleCacheService import get_rule_cache
+from IncrementalPolicyProcessor import IncrementalPolicyProcessor
+from RuleHumanizer import RuleHumanizer
+from LLMMetrics import LLMRunMetrics, begin_llm_run, end_llm_run
+from LLMGovernor import PRIORITY_BATCH, set_llm_priority, reset_llm_priority
+from PolicyRetrieval import build_retrieval_index, context_budget
 from PyPDF2 import PdfReader
 import json
 import os
-import io
 from typing import Dict, List, Optional
-from langchain_openai import ChatOpenAI
 import hashlib
+import uuid
 from datetime import datetime
 
+
+class WorkflowCancelled(BaseException):
+    """
+    Raised at a step boundary when the caller asked the running workflow to stop.
+
+    Derives from BaseException (like KeyboardInterrupt) so the per-step `except Exception`
+    handlers do not record it as a step failure and carry on with the next step.
+    """
+
+
+class WorkflowSteps(dict):
+    """
+    Step results dict that reports each finished step to a progress callback.
+
+    The callback receives (step_name, step_result) and returns True when the workflow should stop,
+    in which case WorkflowCancelled is raised at that step boundary.
+    """
+
+    def __init__(self, progress_callback):
+        super().__init__()
+        self.progress_callback = progress_callback
+
+    def __setitem__(self, step_name, step_result):
+        super().__setitem__(step_name, step_result)
+        if self.progress_callback(step_name, step_result):
+            raise WorkflowCancelled(f"Cancelled after step '{step_name}'")
+
+
 class UnderwritingWorkflow:
     """
     Orchestrates the complete underwriting workflow:
@@ -67,6 +103,10 @@ class UnderwritingWorkflow:
         self.excel_exporter = ExcelRulesExporter()
         self.db_service = get_database_service()
         self.document_extractor = DocumentExtractor()
+        self.incremental_processor = IncrementalPolicyProcessor(
+            llm, self.db_service, self.rule_generator, self.schema_generator, self.textract
+        )
+        self.rule_humanizer = RuleHumanizer(self._fallback_transformation, self.db_service)
 
         # Validate Textract is configured (required for PDF query-based extraction)
         if not self.textract.isConfigured:
@@ -75,13 +115,26 @@ class UnderwritingWorkflow:
 
     def process_policy_document(self, s3_url: str,
                                 policy_type: str = "general",
-                                bank_id: str = None) -> Dict:
+                                bank_id: str = None,
+                                progress_callback=None,
+                                resume: bool = False,
+                                use_cache: bool = True,
+                                incremental: bool = False) -> Dict:
         """
         Complete workflow to process a policy document and generate rules
 
         :param s3_url: S3 URL to policy PDF (required)
         :param policy_type: Type of policy (general, life, health, auto, property, loan, insurance, etc.)
         :param bank_id: Bank/Tenant identifier (e.g., 'chase', 'bofa', 'wells-fargo')
+        :param progress_callback: Optional callable(step_name, step_result) invoked as each step finishes;
+                                  returning True cancels the workflow at that step boundary
+        :param resume: Reuse checkpointed outputs of steps that already finished for this document
+                       and configuration, restarting from the first incomplete step
+        :param use_cache: Reuse cached stage outputs (analysis, Textract answers, schema, DRL) of an
+                          identical document processed earlier (see RuleCacheService)
+        :param incremental: Diff the document's sections against the previous version of the same
+                            bank/policy and only re-analyze and regenerate rules for changed sections
+                            (see IncrementalPolicyProcessor; requires bank_id)
         :return: Result dictionary with all workflow steps
         """
 
@@ -111,10 +164,22 @@ class UnderwritingWorkflow:
             "bank_id": bank_id,
             "container_id": container_id,
             "version": version,
-            "steps": {},
+            "steps": WorkflowSteps(progress_callback) if progress_callback else {},
             "status": "in_progress"
         }
 
+        # Independent steps run concurrently; per-step timings are reported in result["step_timings"]
+        scheduler = StepScheduler()
+        # Step outputs are checkpointed per document/config; in resume mode finished steps are replayed
+        checkpoints = StepCheckpointer(self.db_service, resume=resume,
+                                       artifact_cache=get_rule_cache() if use_cache else None)
+        llm_settings = llm_config(self.llm)
+        # Every LLM call of this run (including those on step threads) is recorded for result["llm_metrics"]
+        llm_run = LLMRunMetrics(str(uuid.uuid4()))
+        llm_run_token = begin_llm_run(llm_run)
+        # Ingestion yields to interactive (chat) LLM calls in the provider's admission queue
+        llm_priority_token = set_llm_priority(PRIORITY_BATCH)
+
         try:
             # Step 0.1: Ensure bank exists in database (auto-create if missing)
             if bank_id:
@@ -213,7 +278,16 @@ class UnderwritingWorkflow:
             print("="*60)
 
             # Use new DocumentExtractor to handle multiple formats
-            extraction_result = self.document_extractor.extract_text_from_s3(s3_url)
+            # The text is not known yet, so this checkpoint is keyed by the S3 object version (ETag)
+            source_etag = self.s3_service.get_object_etag(s3_bucket, s3_key)
+            source_hash = content_hash({"s3_url": s3_url, "etag": source_etag}) if source_etag else None
+            extraction_result = scheduler.run(
+                "text_extraction",
+                checkpoints.wrap("text_extraction", source_hash, {}, self.document_extractor.extract_text_from_s3,
+                                 keep=lambda output: "error" not in output),
+                s3_url,
+                resource="s3"
+            )
 
             if "error" in extraction_result:
                 result["status"] = "failed"
@@ -222,11 +296,14 @@ class UnderwritingWorkflow:
 
             document_text = extraction_result["text"]
             document_format = extraction_result["format"]
+            # Start offset of each page (PDF), to turn clause references into page numbers
+            page_offsets = extraction_result.get("page_offsets") or []
 
             result["steps"]["text_extraction"] = {
                 "status": "success",
                 "format": document_format,
                 "length": len(document_text),
+                "pages": extraction_result.get("pages"),
                 "preview": document_text[:500] + "..." if len(document_text) > 500 else document_text
             }
             print(f"✓ Detected format: {document_format.upper()}")
@@ -236,16 +313,131 @@ class UnderwritingWorkflow:
             document_hash = hashlib.sha256(document_text.encode('utf-8')).hexdigest()
             result["document_hash"] = document_hash
 
+            # Retrieval index of the document: schema and rule generation get the passages relevant
+            # to their task under a token budget instead of the leading part of the text
+            retrieval_index = build_retrieval_index(document_text)
+            retrieval_settings = retrieval_index.settings if retrieval_index else None
+            if retrieval_index is not None:
+                result["policy_context"] = retrieval_index.selections
+
+            # Step 4.6: Generate and save hierarchical rules using LLM
+            # Only needs the policy text, so it runs in the background alongside Steps 2-6
+            hierarchical_future = None
+            if bank_id and policy_type:
+                def generate_hierarchical_rules_step():
+                    try:
+                        print("\n" + "="*60)
+                        print("Step 4.6: Generating hierarchical rules with LLM...")
+                        print("="*60)
+
+                        # Generate hierarchical rules from policy text
+                        generate_rules = checkpoints.wrap(
+                            "hierarchical_rules", document_hash,
+                            {"llm": llm_settings, "policy_type": policy_type,
+                             "mode": self.hierarchical_rules_agent.mode,
+                             "chunk_chars": self.hierarchical_rules_agent.chunk_chars},
+                            self.hierarchical_rules_agent.generate_hierarchical_rules,
+                            keep=bool
+                        )
+                        hierarchical_rules = generate_rules(
+                            policy_text=document_text,
+                            policy_type=policy_type
+                        )
+
+                        # Save to database (use normalized IDs)
+                        if hierarchical_rules:
+                            resolved = resolve_page_numbers(hierarchical_rules, document_text, page_offsets)
+                            if resolved:
+                                print(f"✓ Resolved page numbers of {resolved} rules from their clause references")
+                            saved_rule_ids = self.db_service.save_hierarchical_rules(
+                                bank_id=normalized_bank if bank_id else None,
+                                policy_type_id=normalized_type,
+                                rules_tree=hierarchical_rules,
+                                document_hash=document_hash,
+                                source_document=s3_key
+                            )
+
+                            print(f"✓ Saved {len(saved_rule_ids)} hierarchical rules to database")
+                            result["steps"]["save_hierarchical_rules"] = {
+                                "status": "success",
+                                "count": len(saved_rule_ids),
+                                "top_level_rules": len(hierarchical_rules),
+                                "rule_ids": saved_rule_ids
+                            }
+                        else:
+                            print("⚠ No hierarchical rules generated")
+                            result["steps"]["save_hierarchical_rules"] = {
+                                "status": "warning",
+                                "message": "No hierarchical rules generated"
+                            }
+                        return hierarchical_rules
+
+                    except Exception as e:
+                        print(f"⚠ Failed to generate/save hierarchical rules: {e}")
+                        import traceback
+                        traceback.print_exc()
+                        result["steps"]["save_hierarchical_rules"] = {
+                            "status": "error",
+                            "message": str(e)
+                        }
+                        return None
+
+                hierarchical_future = scheduler.submit(
+                    "save_hierarchical_rules", generate_hierarchical_rules_step, resource="llm"
+                )
+
+            # Step 1.5: Diff document sections against the previous version (incremental mode)
+            # Section analysis and rule generation below then only run for changed sections
+            incremental_plan = None
+            if incremental and bank_id:
+                print("\n" + "="*60)
+                print("Step 1.5: Diffing document sections against the previous version...")
+                print("="*60)
+
+                try:
+                    incremental_plan = scheduler.run(
+                        "section_diff", self.incremental_processor.prepare,
+                        document_text, normalized_bank, normalized_type
+                    )
+                except Exception as e:
+                    print(f"⚠ Section diff failed, processing the full document: {e}")
+                if incremental_plan is not None:
+                    result["steps"]["section_diff"] = {
+                        "status": "success",
+                        **self.incremental_processor.summary(incremental_plan)
+                    }
+            elif incremental:
+                print("⚠ Incremental processing requires bank_id, processing the full document")
+
             # Step 2: LLM generates extraction queries by analyzing the document
             print("\n" + "="*60)
             print("Step 2: LLM analyzing document and generating extraction queries...")
             print("="*60)
 
-            analysis = self.policy_analyzer.analyze_policy(document_text)
+            analysis = None
+            if incremental_plan is not None:
+                # Section analyses run on their own bounded pool (see LLMConcurrency)
+                analysis = scheduler.run("query_generation", self.incremental_processor.analyze, incremental_plan)
+                if analysis.get("queries"):
+                    self.incremental_processor.reuse_textract_answers(incremental_plan, document_hash)
+                else:
+                    print("⚠ No queries from section analysis, falling back to full document analysis")
+                    incremental_plan = None
+                    analysis = None
+
+            if analysis is None:
+                analysis = scheduler.run(
+                    "query_generation",
+                    checkpoints.wrap("query_generation", document_hash, {"llm": llm_settings},
+                                     self.policy_analyzer.analyze_policy,
+                                     keep=lambda output: bool(output.get("queries"))),
+                    document_text,
+                    resource="llm"
+                )
             queries = analysis.get("queries", [])
             result["steps"]["query_generation"] = {
                 "status": "success",
-                "method": "llm_generated",
+                "method": "incremental_sections" if incremental_plan is not None else "llm_generated",
                 "queries": queries,
                 "count": len(queries),
                 "key_sections": analysis.get("key_sections", []),
@@ -280,11 +472,92 @@ class UnderwritingWorkflow:
                 else:
                     query_strings.append(str(q))
 
+            # Step 3.3: Generate dynamic schema from policy document
+            # Needs only the text and the queries, so it runs while Textract processes the document
+            def generate_schema_step():
+                print("\n" + "="*60)
+                print("Step 3.3: Generating dynamic schema from policy document...")
+                print("="*60)
+
+                try:
+                    if incremental_plan is not None:
+                        # Previous schema extended with the fields of changed sections
+                        dynamic_schema = self.incremental_processor.generate_schema(incremental_plan, policy_type)
+                    else:
+                        # Generate schema with LLM analyzing the policy document
+                        generate_schema = checkpoints.wrap(
+                            "schema_generation", document_hash,
+                            {"llm": llm_settings, "queries": content_hash(queries), "policy_type": policy_type,
+                             "context": retrieval_settings and dict(retrieval_settings, tokens=context_budget("DynamicSchemaGenerator"))},
+                            self.schema_generator.generate_schema_from_policy
+                        )
+                        dynamic_schema = generate_schema(
+                            policy_text=document_text,
+                            extracted_queries=queries,
+                            policy_type=policy_type,
+                            retrieval_index=retrieval_index
+                        )
+
+                    # Update the field mapper with the schema
+                    self.field_mapper.update_schema(dynamic_schema)
+
+                    # Update the rule generator with the schema
+                    self.rule_generator.update_schema(dynamic_schema)
+
+                    # Log the schema for verification
+                    applicant_field_count = len(dynamic_schema.get('applicant_fields', []))
+                    policy_field_count = len(dynamic_schema.get('policy_fields', []))
+                    mapping_count = len(dynamic_schema.get('field_mappings', {}))
+
+                    print(f"✓ Generated dynamic schema:")
+                    print(f"  - {applicant_field_count} applicant fields")
+                    print(f"  - {policy_field_count} policy fields")
+                    print(f"  - {mapping_count} field mappings")
+
+                    # Print field details
+                    print("\n  Applicant fields:")
+                    for field in dynamic_schema.get('applicant_fields', [])[:5]:  # Show first 5
+                        print(f"    - {field['field_name']} ({field['field_type']}): {field.get('description', '')[:50]}")
+                    if applicant_field_count > 5:
+                        print(f"    ... and {applicant_field_count - 5} more")
+
+                    print("\n  Policy fields:")
+                    for field in dynamic_schema.get('policy_fields', [])[:5]:  # Show first 5
+                        print(f"    - {field['field_name']} ({field['field_type']}): {field.get('description', '')[:50]}")
+                    if policy_field_count > 5:
+                        print(f"    ... and {policy_field_count - 5} more")
+
+                    result["steps"]["schema_generation"] = {
+                        "status": "success",
+                        "applicant_fields": applicant_field_count,
+                        "policy_fields": policy_field_count,
+                        "field_mappings": mapping_count,
+                        "schema": dynamic_schema
+                    }
+
+                except Exception as e:
+                    print(f"⚠ Failed to generate dynamic schema: {e}")
+                    print(f"  Continuing with default schema...")
+                    result["steps"]["schema_generation"] = {
+                        "status": "error",
+                        "error": str(e),
+                        "fallback": "using_default_schema"
+                    }
+                    # The RuleGeneratorAgent will use its fallback minimal schema
+
+            schema_future = scheduler.submit("schema_generation", generate_schema_step, resource="llm")
+
             # Use S3 document directly with Textract
-            extracted_data = self.textract.analyze_document(
+            extracted_data = scheduler.run(
+                "data_extraction",
+                checkpoints.wrap("data_extraction", document_hash, {"queries": content_hash(query_strings)},
+                                 self.textract.analyze_document,
+                                 keep=lambda output: isinstance(output, dict) and "error" not in output),
                 s3_bucket=s3_bucket,
                 s3_key=s3_key,
-                queries=query_strings
+                queries=query_strings,
+                document_hash=document_hash,
+                resource="textract"
             )
 
             result["steps"]["data_extraction"] = {
@@ -294,65 +567,8 @@ class UnderwritingWorkflow:
             }
             print(f"✓ Extracted data from {len(queries)} queries using AWS Textract")
 
-            # Step 3.3: Generate dynamic schema from policy document
-            print("\n" + "="*60)
-            print("Step 3.3: Generating dynamic schema from policy document...")
-            print("="*60)
-
-            try:
-                # Generate schema with LLM analyzing the policy document
-                dynamic_schema = self.schema_generator.generate_schema_from_policy(
-                    policy_text=document_text,
-                    extracted_queries=queries,
-                    policy_type=policy_type
-                )
-
-                # Update the field mapper with the schema
-                self.field_mapper.update_schema(dynamic_schema)
-
-                # Update the rule generator with the schema
-                self.rule_generator.update_schema(dynamic_schema)
-
-                # Log the schema for verification
-                applicant_field_count = len(dynamic_schema.get('applicant_fields', []))
-                policy_field_count = len(dynamic_schema.get('policy_fields', []))
-                mapping_count = len(dynamic_schema.get('field_mappings', {}))
-
-                print(f"✓ Generated dynamic schema:")
-                print(f"  - {applicant_field_count} applicant fields")
-                print(f"  - {policy_field_count} policy fields")
-                print(f"  - {mapping_count} field mappings")
-
-                # Print field details
-                print("\n  Applicant fields:")
-                for field in dynamic_schema.get('applicant_fields', [])[:5]:  # Show first 5
-                    print(f"    - {field['field_name']} ({field['field_type']}): {field.get('description', '')[:50]}")
-                if applicant_field_count > 5:
-                    print(f"    ... and {applicant_field_count - 5} more")
-
-                print("\n  Policy fields:")
-                for field in dynamic_schema.get('policy_fields', [])[:5]:  # Show first 5
-                    print(f"    - {field['field_name']} ({field['field_type']}): {field.get('description', '')[:50]}")
-                if policy_field_count > 5:
-                    print(f"    ... and {policy_field_count - 5} more")
-
-                result["steps"]["schema_generation"] = {
-                    "status": "success",
-                    "applicant_fields": applicant_field_count,
-                    "policy_fields": policy_field_count,
-                    "field_mappings": mapping_count,
-                    "schema": dynamic_schema
-                }
-
-            except Exception as e:
-                print(f"⚠ Failed to generate dynamic schema: {e}")
-                print(f"  Continuing with default schema...")
-                result["steps"]["schema_generation"] = {
-                    "status": "error",
-                    "error": str(e),
-                    "fallback": "using_default_schema"
-                }
-                # The RuleGeneratorAgent will use its fallback minimal schema
+            # Rule generation needs the schema, so wait for Step 3.3 to finish
+            schema_future.result()
 
             # Step 3.5: Save extraction queries and Textract responses to database
             if bank_id and policy_type:
@@ -384,7 +600,10 @@ class UnderwritingWorkflow:
                             'extraction_method': 'textract'
                         }
 
-                        # Add page and clause if available
+                        # Add page and clause if available (the page the clause is on, when it is found)
+                        offset = clause_offset(document_text, clause_reference) if page_offsets else None
+                        if offset is not None:
+                            page_number = page_number_at(page_offsets, offset)
                         if page_number is not None:
                             query_data['page_number'] = page_number
                         if clause_reference:
@@ -447,7 +666,29 @@ class UnderwritingWorkflow:
                 print("  Will supplement with full policy text for missing rules.")
 
             # Generate rules - pass policy text to enable direct extraction when Textract coverage is low
-            rules = self.rule_generator.generate_rules(extracted_data, policy_text=document_text)
+            schema_for_rules = result["steps"].get("schema_generation", {}).get("schema")
+            if incremental_plan is not None:
+                # Rules of changed sections are generated on a bounded pool (see LLMConcurrency) and
+                # merged with the stored rules of unchanged sections. The section snapshot is saved
+                # once the merged rules are deployed (Step 5)
+                rules = scheduler.run(
+                    "rule_generation", self.incremental_processor.generate_rules, incremental_plan, extracted_data
+                )
+            else:
+                rules = scheduler.run(
+                    "rule_generation",
+                    checkpoints.wrap(
+                        "rule_generation", document_hash,
+                        {"llm": llm_settings, "data": content_hash(extracted_data), "schema": content_hash(schema_for_rules),
+                         "context": retrieval_settings and dict(retrieval_settings, tokens=context_budget("RuleGeneratorAgent"))},
+                        self.rule_generator.generate_rules,
+                        keep=lambda output: bool(output.get('drl'))
+                    ),
+                    extracted_data,
+                    policy_text=document_text,
+                    retrieval_index=retrieval_index,
+                    resource="llm"
+                )
             drl_content = rules.get('drl', '')
 
             # Check if DRL generation actually worked
@@ -470,155 +711,131 @@ class UnderwritingWorkflow:
                 print(f"✓ Generated decision table")
 
             # Step 4.5: Save extracted rules to database (from DRL content)
+            # Runs in the background (one LLM call per rule) while the DRL is validated and deployed
+            drools_rules_future = None
             if bank_id and policy_type and rules.get('drl'):
-                try:
-                    print("\n" + "="*60)
-                    print("Step 4.5: Parsing and saving rules from DRL to database...")
-                    print("="*60)
-
-                    # Parse DRL content to extract actual rules
-                    drl_content = rules.get('drl', '')
-                    rules_for_db = self._parse_drl_rules(drl_content)
-
-                    if rules_for_db:
-                        # Save to database (use normalized IDs)
-                        saved_ids = self.db_service.save_extracted_rules(
-                            bank_id=normalized_bank if bank_id else None,
-                            policy_type_id=normalized_type,
-                            rules=rules_for_db,
-                            source_document=s3_key,
-                            document_hash=document_hash
-                        )
+                def save_drools_rules_step(drl_content):
+                    try:
+                        print("\n" + "="*60)
+                        print("Step 4.5: Parsing and saving rules from DRL to database...")
+                        print("="*60)
+
+                        # Parse DRL content to extract actual rules
+                        rules_for_db = self._parse_drl_rules(drl_content)
+
+                        if rules_for_db:
+                            # Save to database (use normalized IDs)
+                            saved_ids = self.db_service.save_extracted_rules(
+                                bank_id=normalized_bank if bank_id else None,
+                                policy_type_id=normalized_type,
+                                rules=rules_for_db,
+                                source_document=s3_key,
+                                document_hash=document_hash
+                            )
+
+                            print(f"✓ Saved {len(saved_ids)} Drools rules to database")
+                            result["steps"]["save_drools_rules"] = {
+                                "status": "success",
+                                "count": len(saved_ids),
+                                "rule_ids": saved_ids
+                            }
+                        else:
+                            print("⚠ No parseable rules found in DRL content")
 
-                        print(f"✓ Saved {len(saved_ids)} Drools rules to database")
+                    except Exception as e:
+                        print(f"⚠ Failed to save Drools rules to database: {e}")
                         result["steps"]["save_drools_rules"] = {
-                            "status": "success",
-                            "count": len(saved_ids),
-                            "rule_ids": saved_ids
-                        }
-                    else:
-                        print("⚠ No parseable rules found in DRL content")
-
-                except Exception as e:
-                    print(f"⚠ Failed to save Drools rules to database: {e}")
-                    result["steps"]["save_drools_rules"] = {
-                        "status": "error",
-                        "message": str(e)
-                    }
-
-            # Step 4.6: Generate and save hierarchical rules using LLM
-            if bank_id and policy_type:
-                try:
-                    print("\n" + "="*60)
-                    print("Step 4.6: Generating hierarchical rules with LLM...")
-                    print("="*60)
-
-                    # Generate hierarchical rules from policy text
-                    hierarchical_rules = self.hierarchical_rules_agent.generate_hierarchical_rules(
-                        policy_text=document_text,
-                        policy_type=policy_type
-                    )
-
-                    # Save to database (use normalized IDs)
-                    if hierarchical_rules:
-                        saved_rule_ids = self.db_service.save_hierarchical_rules(
-                            bank_id=normalized_bank if bank_id else None,
-                            policy_type_id=normalized_type,
-                            rules_tree=hierarchical_rules,
-                            document_hash=document_hash,
-                            source_document=s3_key
-                        )
-
-                        print(f"✓ Saved {len(saved_rule_ids)} hierarchical rules to database")
-                        result["steps"]["save_hierarchical_rules"] = {
-                            "status": "success",
-                            "count": len(saved_rule_ids),
-                            "top_level_rules": len(hierarchical_rules),
-                            "rule_ids": saved_rule_ids
-                        }
-                    else:
-                        print("⚠ No hierarchical rules generated")
-                        result["steps"]["save_hierarchical_rules"] = {
-                            "status": "warning",
-                            "message": "No hierarchical rules generated"
+                            "status": "error",
+                            "message": str(e)
                         }
 
-                except Exception as e:
-                    print(f"⚠ Failed to generate/save hierarchical rules: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    result["steps"]["save_hierarchical_rules"] = {
-                        "status": "error",
-                        "message": str(e)
-                    }
+                drools_rules_future = scheduler.submit(
+                    "save_drools_rules", save_drools_rules_step, rules['drl'], resource="llm"
+                )
 
             # Step 4.7: Generate and save test cases
+            # Runs in the background; only Step 7 (test execution) waits for it
+            test_cases_future = None
             if bank_id and policy_type:
-                try:
-                    print("\n" + "="*60)
-                    print("Step 4.7: Generating test cases...")
-                    print("="*60)
-
-                    # Get schema from the result steps (it was stored during schema generation)
-                    schema_data = result["steps"].get("schema_generation", {}).get("schema")
-
-                    if not schema_data:
-                        logger.warning("Schema not available - using minimal fallback schema")
-                        schema_data = {
-                            "applicant_fields": [],
-                            "policy_fields": []
-                        }
-
-                    # Generate test cases from DRL rules ONLY (no policy-based generation)
-                    test_cases = self.test_case_generator.generate_test_cases(
-                        drl_content=rules['drl'],  # Generate tests from actual deployed rules
-                        schema=schema_data,  # Pass the generated schema for field name consistency
-                        policy_type=policy_type
-                    )
+                def generate_test_cases_step(drl_content):
+                    try:
+                        print("\n" + "="*60)
+                        print("Step 4.7: Generating test cases...")
+                        print("="*60)
+
+                        # Get schema from the result steps (it was stored during schema generation)
+                        schema_data = result["steps"].get("schema_generation", {}).get("schema")
+
+                        if not schema_data:
+                            logger.warning("Schema not available - using minimal fallback schema")
+                            schema_data = {
+                                "applicant_fields": [],
+                                "policy_fields": []
+                            }
 
-                    if test_cases:
-                        # Save to database
-                        saved_test_case_ids = self.db_service.save_test_cases(
-                            bank_id=normalized_bank if bank_id else None,
-                            policy_type_id=normalized_type,
-                            test_cases=test_cases,
-                            document_hash=document_hash,
-                            source_document=s3_url
+                        # Generate test cases from DRL rules ONLY (no policy-based generation)
+                        generate_tests = checkpoints.wrap(
+                            "test_case_generation", document_hash,
+                            {"llm": llm_settings, "drl": content_hash(drl_content),
+                             "schema": content_hash(schema_data), "policy_type": policy_type},
+                            self.test_case_generator.generate_test_cases,
+                            keep=bool
+                        )
+                        test_cases = generate_tests(
+                            drl_content=drl_content,  # Generate tests from actual deployed rules
+                            schema=schema_data,  # Pass the generated schema for field name consistency
+                            policy_type=policy_type
                         )
 
-                        print(f"✓ Generated and saved {len(saved_test_case_ids)} test cases")
-
-                        # Reload ONLY the newly generated test cases by their IDs
-                        # This prevents duplicate test cases from previous runs
-                        test_cases = self.db_service.get_test_cases_by_ids(saved_test_case_ids)
-                        print(f"✓ Reloaded {len(test_cases)} newly generated test cases with database IDs")
-
-                        result["steps"]["generate_test_cases"] = {
-                            "status": "success",
-                            "count": len(saved_test_case_ids),
-                            "test_case_ids": saved_test_case_ids,
-                            "categories": {
-                                "positive": len([tc for tc in test_cases if tc.get('category') == 'positive']),
-                                "negative": len([tc for tc in test_cases if tc.get('category') == 'negative']),
-                                "boundary": len([tc for tc in test_cases if tc.get('category') == 'boundary']),
-                                "edge_case": len([tc for tc in test_cases if tc.get('category') == 'edge_case'])
+                        if test_cases:
+                            # Save to database
+                            saved_test_case_ids = self.db_service.save_test_cases(
+                                bank_id=normalized_bank if bank_id else None,
+                                policy_type_id=normalized_type,
+                                test_cases=test_cases,
+                                document_hash=document_hash,
+                                source_document=s3_url
+                            )
+
+                            print(f"✓ Generated and saved {len(saved_test_case_ids)} test cases")
+
+                            # Reload ONLY the newly generated test cases by their IDs
+                            # This prevents duplicate test cases from previous runs
+                            test_cases = self.db_service.get_test_cases_by_ids(saved_test_case_ids)
+                            print(f"✓ Reloaded {len(test_cases)} newly generated test cases with database IDs")
+
+                            result["steps"]["generate_test_cases"] = {
+                                "status": "success",
+                                "count": len(saved_test_case_ids),
+                                "test_case_ids": saved_test_case_ids,
+                                "categories": {
+                                    "positive": len([tc for tc in test_cases if tc.get('category') == 'positive']),
+                                    "negative": len([tc for tc in test_cases if tc.get('category') == 'negative']),
+                                    "boundary": len([tc for tc in test_cases if tc.get('category') == 'boundary']),
+                                    "edge_case": len([tc for tc in test_cases if tc.get('category') == 'edge_case'])
+                                }
                             }
-                        }
-                    else:
-                        print("⚠ No test cases generated")
+                        else:
+                            print("⚠ No test cases generated")
+                            result["steps"]["generate_test_cases"] = {
+                                "status": "warning",
+                                "message": "No test cases generated"
+                            }
+                        return test_cases
+
+                    except Exception as e:
+                        print(f"⚠ Failed to generate/save test cases: {e}")
+                        import traceback
+                        traceback.print_exc()
                         result["steps"]["generate_test_cases"] = {
-                            "status": "warning",
-                            "message": "No test cases generated"
+                            "status": "error",
+                            "message": str(e)
                         }
+                        return None
 
-                except Exception as e:
-                    print(f"⚠ Failed to generate/save test cases: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    result["steps"]["generate_test_cases"] = {
-                        "status": "error",
-                        "message": str(e)
-                    }
+                test_cases_future = scheduler.submit(
+                    "generate_test_cases", generate_test_cases_step, rules['drl'], resource="llm"
+                )
 
             # NOTE: Test harness generation moved to Step 8 (after test execution)
             # This allows us to populate the Excel with actual test results
@@ -631,7 +848,15 @@ class UnderwritingWorkflow:
             # Use schema from result if available
             schema_for_validation = result.get("steps", {}).get("schema_generation", {}).get("schema", {})
 
-            is_valid, validated_drl, validation_message = self.drl_validator.validate_and_fix_drl(
+            is_valid, validated_drl, validation_message = scheduler.run(
+                "drl_validation",
+                checkpoints.wrap(
+                    "drl_validation", document_hash,
+                    {"llm": llm_settings, "drl": content_hash(rules['drl']), "schema": content_hash(schema_for_validation)},
+                    self.drl_validator.validate_and_fix_drl,
+                    keep=lambda output: bool(output[0])
+                ),
+                resource="llm",
                 drl_content=rules['drl'],
                 schema=schema_for_validation,
                 bank_id=bank_id or "unknown",
@@ -670,10 +895,13 @@ class UnderwritingWorkflow:
 
                 # Try automated deployment (KJar creation, Maven build, deployment)
                 # Pass the version generated at the start of the workflow for consistency
-                deployment_result = self.drools_deployment.deploy_rules_automatically(
+                deployment_result = scheduler.run(
+                    "deployment",
+                    self.drools_deployment.deploy_rules_automatically,
                     rules['drl'],
                     container_id,
-                    version=version
+                    version=version,
+                    resource="maven"
                 )
                 result["steps"]["deployment"] = deployment_result
 
@@ -690,6 +918,17 @@ class UnderwritingWorkflow:
                 if "steps" in deployment_result and "create_kjar" in deployment_result["steps"]:
                     result["steps"]["kjar_creation"] = deployment_result["steps"]["create_kjar"]
 
+                # Only rules that compiled and deployed may be reused by the next incremental run
+                if incremental_plan is not None and deployment_result["status"] == "success":
+                    try:
+                        self.incremental_processor.save_snapshot(
+                            incremental_plan, normalized_bank, normalized_type, document_hash, schema_for_rules,
+                            source_document=s3_key,
+                            regenerate_changed=result["steps"]["drl_validation"]["drl_fixed"]
+                        )
+                    except Exception as e:
+                        print(f"⚠ Failed to save section snapshot: {e}")
+
             # Step 6: Upload JAR and DRL to S3 if built successfully
             if deployment_result.get("steps", {}).get("build", {}).get("status") == "success":
                 print("\n" + "="*60)
@@ -703,10 +942,18 @@ class UnderwritingWorkflow:
 
                 s3_upload_results = {}
 
+                # Read the DRL up front: its upload step deletes the temp file and Excel export needs the content
+                drl_content = None
+                if drl_path and os.path.exists(drl_path):
+                    with open(drl_path, 'r', encoding='utf-8') as f:
+                        drl_content = f.read()
+
+                # The JAR, DRL and Excel uploads and the policy pre-signed URL are independent,
+                # so they run concurrently (bounded by the S3 concurrency limit)
+
                 # Upload JAR file
-                if jar_path and os.path.exists(jar_path):
+                def upload_jar_step():
                     jar_upload = self.s3_service.upload_jar_to_s3(jar_path, container_id, version)
-                    s3_upload_results["jar"] = jar_upload
                     if jar_upload["status"] == "success":
                         print(f"✓ JAR uploaded to S3: {jar_upload['s3_url']}")
                         result["jar_s3_url"] = jar_upload["s3_url"]
@@ -723,16 +970,11 @@ class UnderwritingWorkflow:
                         print(f"✓ Temporary JAR file deleted: {jar_path}")
                     except Exception as e:
                         print(f"Warning: Could not delete temp JAR file: {e}")
+                    return jar_upload
 
                 # Upload DRL file
-                drl_content = None
-                if drl_path and os.path.exists(drl_path):
-                    # Read DRL content for Excel export
-                    with open(drl_path, 'r', encoding='utf-8') as f:
-                        drl_content = f.read()
-
+                def upload_drl_step():
                     drl_upload = self.s3_service.upload_drl_to_s3(drl_path, container_id, version)
-                    s3_upload_results["drl"] = drl_upload
                     if drl_upload["status"] == "success":
                         print(f"✓ DRL uploaded to S3: {drl_upload['s3_url']}")
                         result["drl_s3_url"] = drl_upload["s3_url"]
@@ -749,10 +991,10 @@ class UnderwritingWorkflow:
                         print(f"✓ Temporary DRL file deleted: {drl_path}")
                     except Exception as e:
                         print(f"Warning: Could not delete temp DRL file: {e}")
+                    return drl_upload
 
                 # Generate and upload Excel spreadsheet with rules
-                # Skip if DRL is empty or contains only fallback message
-                if drl_content and drl_content not in ["// No DRL rules generated", "// Error generating rules"]:
+                def export_excel_step():
                     try:
                         print("✓ Generating Excel spreadsheet from rules...")
                         # Use container_id as fallback if bank_id is not provided
@@ -765,7 +1007,6 @@ class UnderwritingWorkflow:
                         excel_upload = self.s3_service.upload_excel_to_s3(
                             excel_path, bank_id, policy_type, container_id, version
                         )
-                        s3_upload_results["excel"] = excel_upload
 
                         if excel_upload["status"] == "success":
                             print(f"✓ Excel spreadsheet uploaded to S3: {excel_upload['s3_url']}")
@@ -783,29 +1024,49 @@ class UnderwritingWorkflow:
                             print(f"✓ Temporary Excel file deleted: {excel_path}")
                         except Exception as e:
                             print(f"Warning: Could not delete temp Excel file: {e}")
+                        return excel_upload
 
                     except Exception as e:
                         print(f"⚠ Excel generation failed: {e}")
-                        s3_upload_results["excel"] = {
+                        return {
                             "status": "error",
                             "message": str(e)
                         }
-                else:
+
+                # Generate pre-signed URL for the original policy document
+                def presign_policy_step():
+                    policy_presigned = self.s3_service.generate_presigned_url_from_s3_url(s3_url, expiration=86400)  # 24 hours
+                    if policy_presigned:
+                        result["policy_presigned_url"] = policy_presigned
+                        print(f"✓ Generated pre-signed URL for policy document")
+
+                upload_futures = {}
+                if jar_path and os.path.exists(jar_path):
+                    upload_futures["jar"] = scheduler.submit("s3_upload_jar", upload_jar_step, resource="s3")
+                if drl_content is not None:
+                    upload_futures["drl"] = scheduler.submit("s3_upload_drl", upload_drl_step, resource="s3")
+                # Skip Excel if DRL is empty or contains only fallback message
+                if drl_content and drl_content not in ["// No DRL rules generated", "// Error generating rules"]:
+                    upload_futures["excel"] = scheduler.submit("s3_upload_excel", export_excel_step, resource="s3")
+                if s3_url:
+                    upload_futures["policy_presign"] = scheduler.submit(
+                        "s3_presign_policy", presign_policy_step, resource="s3"
+                    )
+
+                for artifact in ("jar", "drl", "excel"):
+                    if artifact in upload_futures:
+                        s3_upload_results[artifact] = upload_futures[artifact].result()
+                if "excel" not in upload_futures:
                     print("⚠ Skipping Excel generation - DRL content is empty or contains only fallback message")
                     s3_upload_results["excel"] = {
                         "status": "skipped",
                         "message": "No meaningful DRL rules to export"
                     }
+                if "policy_presign" in upload_futures:
+                    upload_futures["policy_presign"].result()
 
                 result["steps"]["s3_upload"] = s3_upload_results
 
-                # Generate pre-signed URL for the original policy document
-                if s3_url:
-                    policy_presigned = self.s3_service.generate_presigned_url_from_s3_url(s3_url, expiration=86400)  # 24 hours
-                    if policy_presigned:
-                        result["policy_presigned_url"] = policy_presigned
-                        print(f"✓ Generated pre-signed URL for policy document")
-
                 # Update database with S3 URLs
                 try:
                     print("\n" + "="*60)
@@ -839,6 +1100,18 @@ class UnderwritingWorkflow:
                     # Don't fail the workflow for database errors
                     result["database_update_error"] = str(db_error)
 
+            # Join the background steps: Step 7 needs the test cases, Steps 7.5 and 8 the hierarchical rules
+            if test_cases_future is not None:
+                generated_test_cases = test_cases_future.result()
+                if generated_test_cases is not None:
+                    test_cases = generated_test_cases
+            if hierarchical_future is not None:
+                generated_hierarchical_rules = hierarchical_future.result()
+                if generated_hierarchical_rules is not None:
+                    hierarchical_rules = generated_hierarchical_rules
+            if drools_rules_future is not None:
+                drools_rules_future.result()
+
             # Step 7: Execute test cases against deployed rules
             if bank_id and policy_type and container_id and deployment_result.get("status") == "success":
                 try:
@@ -860,7 +1133,9 @@ class UnderwritingWorkflow:
                     test_case_ids = result["steps"].get("generate_test_cases", {}).get("test_case_ids")
 
                     # Execute tests - ONLY use test cases from current workflow run
-                    execution_summary = test_executor.execute_all_tests(
+                    execution_summary = scheduler.run(
+                        "test_execution",
+                        test_executor.execute_all_tests,
                         bank_id=normalized_bank,
                         policy_type=normalized_type,
                         container_id=container_id,
@@ -1062,17 +1337,17 @@ class UnderwritingWorkflow:
 
                     print(f"✓ Test harness file ready ({file_size} bytes)")
 
-                    # Read test harness file content
-                    with open(harness_path, 'rb') as f:
-                        harness_file_content = f.read()
-
-                    # Upload test harness to S3 in same folder as JAR/DRL artifacts
+                    # Upload test harness to S3 in same folder as JAR/DRL artifacts (streamed from the file)
                     s3_folder = f"generated-rules/{container_id}/{version}"
-                    harness_upload = self.s3_service.upload_file_to_s3(
-                        file_content=harness_file_content,
-                        filename=harness_filename,
-                        folder=s3_folder
-                    )
+                    with open(harness_path, 'rb') as harness_file:
+                        harness_upload = scheduler.run(
+                            "s3_upload_test_harness",
+                            self.s3_service.upload_file_to_s3,
+                            resource="s3",
+                            file_content=harness_file,
+                            filename=harness_filename,
+                            folder=s3_folder
+                        )
 
                     if harness_upload.get("status") == "success":
                         harness_s3_url = harness_upload.get("s3_url")
@@ -1125,29 +1400,63 @@ class UnderwritingWorkflow:
             print("✓ Workflow completed successfully!")
             print("="*60)
 
+        except WorkflowCancelled as e:
+            print(f"\n⚠ Workflow cancelled: {e}")
+            result["status"] = "cancelled"
+            result["error"] = str(e)
+
         except Exception as e:
             print(f"\n✗ Error in workflow: {e}")
             result["status"] = "failed"
             result["error"] = str(e)
 
+        finally:
+            # After a failure or cancellation, background steps that have not started are cancelled
+            # and running ones are joined, so nothing writes to the database or S3 after the run
+            # ends and their LLM calls are still recorded in this run's metrics
+            scheduler.shutdown(wait=True, cancel_pending=True)
+            result["step_timings"] = scheduler.summary()
+            if checkpoints.resumed_steps:
+                result["resumed_steps"] = list(checkpoints.resumed_steps)
+            if checkpoints.cached_steps:
+                result["cached_steps"] = list(checkpoints.cached_steps)
+            end_llm_run(llm_run_token)
+            reset_llm_priority(llm_priority_token)
+            result["llm_metrics"] = llm_run.summary()
+            self._save_llm_metrics(llm_run, result, normalized_bank if bank_id else None, normalized_type,
+                                   container_id)
+
         return result
 
+    def _save_llm_metrics(self, llm_run: LLMRunMetrics, result: Dict, bank_id: Optional[str],
+                          policy_type_id: str, container_id: str):
+        """Persist the LLM calls and rollup of a run (metrics never fail the workflow)"""
+        try:
+            self.db_service.save_llm_run_metrics(
+                llm_run.run_id, result["llm_metrics"], llm_run.calls,
+                bank_id=bank_id, policy_type_id=policy_type_id, container_id=container_id,
+                document_hash=result.get("document_hash")
+            )
+            totals = result["llm_metrics"]["totals"]
+            print(f"✓ LLM usage: {totals['calls']} calls ({totals['cached_calls']} cached), "
+                  f"{totals['prompt_tokens'] + totals['completion_tokens']:,} tokens")
+        except Exception as e:
+            print(f"⚠ Could not save LLM metrics: {e}")
+
     def _extract_text_from_s3(self, s3_key: str) -> str:
-        """Extract text from S3 PDF directly into memory using PyPDF2"""
+        """Extract text from an S3 PDF using PyPDF2 (downloaded to a spooled temporary file)"""
         try:
-            # Read PDF bytes from S3 directly into memory
-            pdf_bytes = self.s3_service.read_pdf_from_s3(s3_key)
-            if not pdf_bytes:
+            pdf_file = self.s3_service.download_to_spool(s3_key)
+            if pdf_file is None:
                 return "Error: Could not read PDF from S3"
 
-            # Create a BytesIO object and use PyPDF2 to read it
-            pdf_file = io.BytesIO(pdf_bytes)
-            reader = PdfReader(pdf_file)
+            with pdf_file:
+                reader = PdfReader(pdf_file)
 
-            text = ""
-            for page_num, page in enumerate(reader.pages, 1):
-                page_text = page.extract_text()
-                text += f"\n--- Page {page_num} ---\n{page_text}"
+                text = ""
+                for page_num, page in enumerate(reader.pages, 1):
+                    page_text = page.extract_text()
+                    text += f"\n--- Page {page_num} ---\n{page_text}"
 
             print(f"✓ Extracted text from S3 PDF ({len(reader.pages)} pages)")
             return text
@@ -1170,7 +1479,8 @@ class UnderwritingWorkflow:
             rule_pattern = r'rule\s+"([^"]+)"[^w]*?when(.*?)then(.*?)end'
             matches = re.finditer(rule_pattern, drl_content, re.DOTALL | re.IGNORECASE)
 
-            for idx, match in enumerate(matches, 1):
+            parsed_rules = []
+            for match in matches:
                 rule_name = match.group(1).strip()
                 when_clause = match.group(2).strip()
                 then_clause = match.group(3).strip()
@@ -1181,12 +1491,14 @@ class UnderwritingWorkflow:
 
                 # Determine category based on rule name or content
                 category = self._categorize_rule(rule_name, when_clause)
+                parsed_rules.append((rule_name, when_clause, then_clause, category))
 
-                # Transform technical Drools rule into user-friendly text
-                user_friendly_requirement = self._transform_rule_to_user_friendly(
-                    rule_name, when_clause, then_clause
-                )
+            # Transform technical Drools rules into user-friendly text (batched and cached)
+            requirements = self.rule_humanizer.transform(
+                [(rule_name, when_clause, then_clause) for rule_name, when_clause, then_clause, _ in parsed_rules]
+            )
 
+            for (rule_name, _, _, category), user_friendly_requirement in zip(parsed_rules, requirements):
                 rules_list.append({
                     "rule_name": rule_name,
                     "requirement": user_friendly_requirement,
@@ -1215,63 +1527,9 @@ class UnderwritingWorkflow:
     def _transform_rule_to_user_friendly(self, rule_name: str, when_clause: str, then_clause: str) -> str:
         """
         Transform technical Drools WHEN/THEN clauses into user-friendly requirement text
-        using OpenAI GPT
+        using OpenAI GPT (cached by clause hash, see RuleHumanizer)
         """
-        try:
-            # Get OpenAI API key from environment
-            openai_api_key = os.getenv('OPENAI_API_KEY')
-            if not openai_api_key:
-                print("⚠ OpenAI API key not configured, returning technical format")
-                return f"WHEN: {when_clause}\nTHEN: {then_clause}"
-
-            # Initialize OpenAI client
-            llm = ChatOpenAI(
-                model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4'),
-                temperature=0.3,  # Lower temperature for consistent transformation
-                openai_api_key=openai_api_key
-            )
-
-            # Create prompt for transformation
-            prompt = f"""Transform the following technical Drools rule into a clear, user-friendly requirement statement.
-
-Rule Name: {rule_name}
-
-Technical Rule:
-WHEN: {when_clause}
-THEN: {then_clause}
-
-Instructions:
-1. Write a concise, natural language statement that explains what this rule checks
-2. Focus on the business requirement, not technical implementation
-3. Use simple language that a non-technical user can understand
-4. Include specific values and thresholds mentioned in the rule
-5. Format: Write as a single clear statement or short paragraph (maximum 2-3 sentences)
-6. Do NOT include technical terms like "Applicant", "$applicant", "Decision", etc.
-7. Use phrases like "must be", "should be", "required", etc.
-
-Example transformations:
-- Technical: "WHEN: $applicant : Applicant( age < 18 || age > 65 ) THEN: $decision.setApproved(false)"
-- User-friendly: "Applicant must be between 18 and 65 years old"
-
-- Technical: "WHEN: $applicant : Applicant( creditScore < 600 ) THEN: $decision.setApproved(false)"
-- User-friendly: "Minimum credit score of 600 is required"
-
-Now transform the rule above:"""
-
-            # Get response from OpenAI
-            response = llm.invoke(prompt)
-            user_friendly_text = response.content.strip()
-
-            # Validate response is not empty
-            if not user_friendly_text or len(user_friendly_text) < 10:
-                print(f"⚠ OpenAI returned short response for rule '{rule_name}', using fallback")
-                return self._fallback_transformation(rule_name, when_clause, then_clause)
-
-            return user_friendly_text
-
-        except Exception as e:
-            print(f"⚠ Error transforming rule '{rule_name}' with OpenAI: {e}")
-            return self._fallback_transformation(rule_name, when_clause, then_clause)
+        return self.rule_humanizer.transform([(rule_name, when_clause, then_clause)])[0]
 
     def _fallback_transformation(self, rule_name: str, when_clause: str, then_clause: str) -> str:
         """
@@ -0,0 +1,134 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Bump when a step's output format changes so older checkpoints are no longer matched
+CHECKPOINT_VERSION = 1
+
+
+def content_hash(value: Any) -> str:
+    """SHA-256 of a JSON-serializable value (key order independent)"""
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def llm_config(llm) -> Dict[str, Any]:
+    """The LLM settings that change step outputs (provider class, model and temperature)"""
+    llm = getattr(llm, 'wrapped_llm', llm)  # Provider client behind the response cache
+    model = None
+    for attr in ('model_name', 'model_id', 'model'):
+        model = getattr(llm, attr, None)
+        if model:
+            break
+    return {
+        "llm": type(llm).__name__,
+        "model": str(model) if model else None,
+        "temperature": getattr(llm, 'temperature', None)
+    }
+
+
+class StepCheckpointer:
+    """
+    Persists workflow step outputs so a failed or interrupted run can be resumed.
+
+    Each output is stored under (document hash, step, config hash), where the config hash covers
+    everything that changes the output: the LLM settings, the step's inputs (by content hash)
+    and CHECKPOINT_VERSION. Outputs are always saved; they are only read back in resume mode,
+    so a resumed run replays the steps that already finished and restarts at the first step
+    without a matching checkpoint. A changed input produces a new config hash, which makes
+    every step downstream of it run again.
+
+    When an artifact cache (RuleCacheService) is given, the stages it caches are also looked up
+    there under the same key, so re-uploading an identical policy skips
+    those stages.
+
+    Configuration (environment):
+        WORKFLOW_CHECKPOINTS_ENABLED: save step checkpoints (default true)
+    """
+
+    def __init__(self, db_service, resume: bool = False, enabled: bool = None, artifact_cache=None):
+        self.db_service = db_service
+        self.resume = resume
+        self.artifact_cache = artifact_cache
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("WORKFLOW_CHECKPOINTS_ENABLED", "true").lower() == "true")
+        self.resumed_steps: List[str] = []
+        self.cached_steps: List[str] = []
+        self._lock = threading.Lock()
+
+    def config_hash(self, step: str, config: Dict[str, Any]) -> str:
+        return content_hash({"version": CHECKPOINT_VERSION, "step": step, "config": config})
+
+    def load(self, document_hash: str, step: str, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the checkpoint of a step in resume mode, or None if the step has to run"""
+        if not (self.resume and self.enabled and document_hash):
+            return None
+        try:
+            return self.db_service.get_workflow_checkpoint(document_hash, step, self.config_hash(step, config))
+        except Exception as e:
+            print(f"⚠ Could not read checkpoint for {step}: {e}")
+            return None
+
+    def save(self, document_hash: str, step: str, config: Dict[str, Any], output: Any):
+        if not (self.enabled and document_hash):
+            return
+        try:
+            # Round-trip through JSON so tuples and datetimes are stored the way they are read back
+            output = json.loads(json.dumps(output, default=str))
+            self.db_service.save_workflow_checkpoint(document_hash, step, self.config_hash(step, config), output)
+        except Exception as e:
+            print(f"⚠ Could not save checkpoint for {step}: {e}")
+
+    def wrap(self, step: str, document_hash: str, config: Dict[str, Any], fn: Callable,
+             keep: Callable[[Any], bool] = None) -> Callable:
+        """
+        Return a checkpointed version of a step function.
+
+        In resume mode a matching checkpoint is returned instead of calling fn; failing that, a
+        matching artifact cache entry is used. Otherwise fn runs and its output is saved (and
+        cached), unless keep(output) is False (used to skip failed outputs, so a resume retries them).
+        """
+        def run(*args, **kwargs):
+            checkpoint = self.load(document_hash, step, config)
+            if checkpoint is not None:
+                print(f"↻ Resuming {step} from checkpoint ({checkpoint.get('created_at')})")
+                with self._lock:
+                    self.resumed_steps.append(step)
+                return checkpoint['output']
+
+            use_cache = bool(document_hash and self.artifact_cache and self.artifact_cache.is_cached_stage(step))
+            if use_cache:
+                cached = self.artifact_cache.get_artifact(document_hash, step, self.config_hash(step, config))
+                if cached is not None:
+                    print(f"✓ Using cached {step} artifact ({cached.get('timestamp')})")
+                    with self._lock:
+                        self.cached_steps.append(step)
+                    return cached['data']
+
+            output = fn(*args, **kwargs)
+            if output is not None and (keep is None or keep(output)):
+                self.save(document_hash, step, config, output)
+                if use_cache:
+                    self.artifact_cache.put_artifact(
+                        document_hash, step, self.config_hash(step, config), json.loads(json.dumps(output, default=str))
+                    )
+            return output
+
+        return run
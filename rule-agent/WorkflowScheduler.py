@@ -0,0 +1,142 @@
+#
+#    Copyright 2024 IBM Corp.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from LLMMetrics import llm_step
+
+# Default concurrency per external resource. Limits are process-wide, so concurrent workflows
+# in the same server process share them. Override with WORKFLOW_<RESOURCE>_CONCURRENCY.
+DEFAULT_RESOURCE_LIMITS = {
+    "llm": 4,
+    "textract": 2,
+    "maven": 1,
+    "s3": 4,
+}
+
+_resource_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_resource_lock = threading.Lock()
+
+
+def get_resource_limit(resource: str) -> int:
+    default = DEFAULT_RESOURCE_LIMITS.get(resource, 2)
+    return max(1, int(os.getenv(f"WORKFLOW_{resource.upper()}_CONCURRENCY", str(default))))
+
+
+def _get_resource_semaphore(resource: str) -> threading.BoundedSemaphore:
+    with _resource_lock:
+        if resource not in _resource_semaphores:
+            _resource_semaphores[resource] = threading.BoundedSemaphore(get_resource_limit(resource))
+        return _resource_semaphores[resource]
+
+
+@contextmanager
+def resource_slot(resource: Optional[str]):
+    """
+    Hold one concurrency slot for an external resource (llm, textract, maven, s3).
+
+    Yields the time spent waiting for the slot in milliseconds.
+    """
+    if not resource:
+        yield 0.0
+        return
+    semaphore = _get_resource_semaphore(resource)
+    wait_start = time.perf_counter()
+    semaphore.acquire()
+    try:
+        yield (time.perf_counter() - wait_start) * 1000
+    finally:
+        semaphore.release()
+
+
+class StepScheduler:
+    """
+    Runs independent workflow steps concurrently on a thread pool and records per-step timing.
+
+    Steps are plain callables. Dependencies are expressed by submitting a step only once the
+    values it needs are available (or by calling .result() on an earlier step's future), so the
+    call order in the workflow forms the DAG. Each step may name the external resource it uses;
+    the step then waits for a slot of that resource before running.
+
+    Configuration (environment):
+        WORKFLOW_MAX_PARALLEL_STEPS: thread pool size (default 6)
+        WORKFLOW_<RESOURCE>_CONCURRENCY: per-resource limit (llm 4, textract 2, maven 1, s3 4)
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(os.getenv("WORKFLOW_MAX_PARALLEL_STEPS", "6"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow-step")
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def _timed(self, step_name: str, resource: Optional[str], fn: Callable, *args, **kwargs):
+        with resource_slot(resource) as wait_ms:
+            started = time.perf_counter()
+            status = "success"
+            try:
+                with llm_step(step_name):
+                    return fn(*args, **kwargs)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                with self._lock:
+                    self.timings[step_name] = {
+                        "start_offset_ms": round((started - self._start) * 1000, 1),
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                        "resource_wait_ms": round(wait_ms, 1),
+                        "resource": resource,
+                        "thread": threading.current_thread().name,
+                        "status": status
+                    }
+
+    def run(self, step_name: str, fn: Callable, *args, resource: Optional[str] = None, **kwargs):
+        """Run a step on the calling thread (still timed and resource-limited)"""
+        return self._timed(step_name, resource, fn, *args, **kwargs)
+
+    def submit(self, step_name: str, fn: Callable, *args, resource: Optional[str] = None, **kwargs) -> Future:
+        """Start a step in the background and return its future"""
+        # The step inherits the caller's context (e.g. the workflow run its LLM calls are recorded in)
+        return self._executor.submit(contextvars.copy_context().run,
+                                     self._timed, step_name, resource, fn, *args, **kwargs)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = dict(sorted(self.timings.items(), key=lambda item: item[1]["start_offset_ms"]))
+        busy_ms = sum(t["duration_ms"] for t in steps.values())
+        total_ms = round((time.perf_counter() - self._start) * 1000, 1)
+        return {
+            "total_ms": total_ms,
+            "sum_of_step_ms": round(busy_ms, 1),
+            "parallel_speedup": round(busy_ms / total_ms, 2) if total_ms else None,
+            "steps": steps
+        }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stop the step pool
+
+        Args:
+            wait: Join the steps that are running
+            cancel_pending: Cancel the steps that have not started yet
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Prompt-size and coverage benchmark of retrieval-based policy context selection.
+
+Builds the PolicyRetrievalIndex of a policy and compares, for schema generation and rule
+generation, the policy text each agent receives:
+    - full        the whole document
+    - head        the leading part the agents used before retrieval (10000 / 20000 characters)
+    - retrieved   the passages selected under the agent's token budget (POLICY_CONTEXT_TOKENS)
+
+For each variant it reports the prompt tokens of the policy text, the reduction against the full
+document and the requirement coverage: the share of the policy's distinct requirement lines (lines with a
+number and a requirement keyword such as minimum, maximum, must, decline) that the context
+contains. --scale concatenates copies of the document to simulate 100k+ character policies (repeated
+passages are selected once; the head of such a document holds a whole copy, so compare head
+coverage on real long policies).
+
+With --with-llm, RuleGeneratorAgent also generates DRL from the head and the retrieved context
+(through createLLM, so LLM_CACHE_MODE=record / replay applies) and the benchmark reports the
+measured prompt tokens, the generated rule count and the share of the policy's requirement
+thresholds that appear in the DRL.
+
+Usage:
+    python3 benchmark_context_selection.py
+    python3 benchmark_context_selection.py --scale 6 --budget 4000 --no-embeddings
+    LLM_TYPE=OPENAI python3 benchmark_context_selection.py --with-llm
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from LLMMetrics import LLMRunMetrics, estimate_tokens, track_llm_run
+from PolicyRetrieval import PolicyRetrievalIndex
+
+DEFAULT_DOCUMENT = os.path.join(os.path.dirname(__file__), "..", "sample_life_insurance_policy.txt")
+
+REQUIREMENT_LINE = re.compile(r'\d.*\b(must|minimum|maximum|required|at least|not exceed|between|decline|'
+                              r'reject|ineligible|multiplier|points)\b|\b(must|minimum|maximum|required|at least|'
+                              r'not exceed|between|decline|reject|ineligible|multiplier|points)\b.*\d', re.IGNORECASE)
+
+# Typical extraction queries of an underwriting policy (the rule prompt retrieves by the unanswered ones)
+QUERIES = [
+    "What is the minimum and maximum age of the applicant?",
+    "What is the minimum credit score required?",
+    "What is the minimum annual income and the maximum debt-to-income ratio?",
+    "What coverage amounts are available and what are the coverage limits?",
+    "Which health conditions or lifestyle factors lead to a decline?",
+    "How is the risk category assigned?",
+    "How is the premium calculated and which multipliers apply?",
+    "What are the final approval decision criteria?"
+]
+
+
+def requirement_lines(text):
+    return sorted({line.strip() for line in text.split('\n') if line.strip() and REQUIREMENT_LINE.search(line)})
+
+
+def coverage(lines, context):
+    return sum(1 for line in lines if line in context) / len(lines) if lines else 1.0
+
+
+def scaled(text, copies):
+    return "\n\n".join([text] * max(copies, 1))
+
+
+def threshold_coverage(lines, drl):
+    numbers = {n for line in lines for n in re.findall(r'\d[\d,]*(?:\.\d+)?', line)}
+    numbers = {n.replace(',', '') for n in numbers if len(n.replace(',', '')) > 1}
+    return sum(1 for n in numbers if n in drl) / len(numbers) if numbers else 1.0
+
+
+def run_llm(text, index):
+    from CreateLLM import createLLM
+    from RuleGeneratorAgent import RuleGeneratorAgent
+
+    agent = RuleGeneratorAgent(createLLM())
+    # No answered queries: the rule prompt falls back to the policy text
+    extracted = {"queries": {query: {"answer": None} for query in QUERIES}}
+    lines = requirement_lines(text)
+    results = {}
+    for name, retrieval_index in (("head", None), ("retrieved", index)):
+        run = LLMRunMetrics(f"context-{name}")
+        started = time.perf_counter()
+        with track_llm_run(run):
+            rules = agent.generate_rules(extracted, policy_text=text, retrieval_index=retrieval_index)
+        drl = rules.get('drl', '')
+        totals = run.summary()["totals"]
+        results[name] = {
+            "prompt_tokens": totals["prompt_tokens"],
+            "seconds": round(time.perf_counter() - started, 1),
+            "drl_rules": len(re.findall(r'^\s*rule\s+"', drl, re.MULTILINE)),
+            "threshold_coverage": round(threshold_coverage(lines, drl), 3)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document", default=DEFAULT_DOCUMENT, help="Policy text file")
+    parser.add_argument("--scale", type=int, default=1, help="Concatenated copies of the document")
+    parser.add_argument("--budget", type=int, default=None, help="Context token budget (default POLICY_CONTEXT_TOKENS)")
+    parser.add_argument("--no-embeddings", action="store_true", help="BM25 only")
+    parser.add_argument("--with-llm", action="store_true", help="Also generate DRL with each context")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    if args.budget:
+        os.environ["POLICY_CONTEXT_TOKENS"] = str(args.budget)
+    budget = int(os.getenv("POLICY_CONTEXT_TOKENS", "3000"))
+
+    with open(args.document, encoding="utf-8") as f:
+        text = scaled(f.read(), args.scale)
+    lines = requirement_lines(text)
+
+    started = time.perf_counter()
+    index = PolicyRetrievalIndex(text, use_embeddings=False if args.no_embeddings else None)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    from DynamicSchemaGenerator import SCHEMA_CONTEXT_QUERY
+    from RuleGeneratorAgent import RULE_CONTEXT_QUERY
+    tasks = {
+        "schema_generation": (QUERIES + [SCHEMA_CONTEXT_QUERY], 10000),
+        "rule_generation": (QUERIES + [RULE_CONTEXT_QUERY], 20000)
+    }
+
+    full_tokens = estimate_tokens(text)
+    results = {"document": {"characters": len(text), "tokens": full_tokens, "passages": len(index.passages),
+                            "requirement_lines": len(lines), "index_build_ms": round(build_ms, 1),
+                            "embeddings": index.use_embeddings}}
+    for task, (queries, head_chars) in tasks.items():
+        started = time.perf_counter()
+        retrieved = index.select(queries, budget, task)
+        select_ms = (time.perf_counter() - started) * 1000
+        head = text[:head_chars]
+        results[task] = {
+            variant: {
+                "tokens": estimate_tokens(context),
+                "reduction": round(1 - estimate_tokens(context) / full_tokens, 3),
+                "requirement_coverage": round(coverage(lines, context), 3)
+            }
+            for variant, context in (("full", text), ("head", head), ("retrieved", retrieved))
+        }
+        results[task]["retrieved"]["select_ms"] = round(select_ms, 1)
+
+    if args.with_llm:
+        results["rule_generation_llm"] = run_llm(text, index)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    document = results["document"]
+    print(f"\nDocument: {document['characters']} chars, ~{document['tokens']} tokens, {document['passages']} passages, "
+          f"{document['requirement_lines']} requirement lines; index built in {document['index_build_ms']:.0f} ms "
+          f"({'BM25 + embeddings' if document['embeddings'] else 'BM25'}); budget {budget} tokens")
+    print(f"{'task':<20}{'context':<11}{'tokens':>9}{'reduction':>11}{'req. coverage':>15}")
+    for task in tasks:
+        for variant, measured in results[task].items():
+            print(f"{task:<20}{variant:<11}{measured['tokens']:>9}{measured['reduction']:>11.1%}"
+                  f"{measured['requirement_coverage']:>15.1%}")
+    if args.with_llm:
+        print(f"\n{'rule generation':<20}{'context':<11}{'prompt tok':>11}{'seconds':>9}{'rules':>7}{'thresholds in DRL':>19}")
+        for variant, measured in results["rule_generation_llm"].items():
+            print(f"{'':<20}{variant:<11}{measured['prompt_tokens']:>11}{measured['seconds']:>9.1f}"
+                  f"{measured['drl_rules']:>7}{measured['threshold_coverage']:>19.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the per-request DatabaseService lookups.
+
+Compares the ORM entity path (session + identity map + dict conversion) against the
+Core column-projected read path for:
+    - active container lookup (evaluate-policy path)
+    - container lookup by container_id
+    - hierarchical rules tree
+    - test cases (PostgreSQL only - JSONB/ARRAY columns)
+
+Seeds a throwaway bank/policy, runs each lookup N times and reports per-call latency.
+
+Usage:
+    DATABASE_URL=postgresql://... python3 benchmark_db_reads.py --iterations 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from DatabaseService import (
+    DatabaseService, Base, Bank, PolicyType, RuleContainer, HierarchicalRule, TestCase
+)
+
+BENCH_BANK = "bench-bank"
+BENCH_POLICY = "bench-policy"
+BENCH_CONTAINER = "bench-bank-bench-policy-underwriting-rules"
+
+
+# Reference implementations: the ORM lookups as they were before the Core read path
+def orm_get_active_container(db, bank_id, policy_type_id):
+    with db.get_session() as session:
+        container = session.query(RuleContainer).filter_by(
+            bank_id=bank_id, policy_type_id=policy_type_id, is_active=True
+        ).first()
+        return db._container_to_dict(container) if container else None
+
+
+def orm_get_container_by_id(db, container_id):
+    with db.get_session() as session:
+        container = session.query(RuleContainer).filter_by(container_id=container_id).first()
+        return db._container_to_dict(container) if container else None
+
+
+def orm_get_hierarchical_rules(db, bank_id, policy_type_id):
+    with db.get_session() as session:
+        all_rules = session.query(HierarchicalRule).filter_by(
+            bank_id=bank_id, policy_type_id=policy_type_id, is_active=True
+        ).order_by(HierarchicalRule.level, HierarchicalRule.order_index).all()
+        rules_by_id = {rule.id: {
+            'id': rule.rule_id, 'name': rule.name, 'description': rule.description,
+            'expected': rule.expected, 'actual': rule.actual, 'confidence': rule.confidence,
+            'passed': rule.passed, 'page_number': rule.page_number,
+            'clause_reference': rule.clause_reference, 'dependencies': []
+        } for rule in all_rules}
+        roots = []
+        for rule in all_rules:
+            if rule.parent_id is None:
+                roots.append(rules_by_id[rule.id])
+            elif rule.parent_id in rules_by_id:
+                rules_by_id[rule.parent_id]['dependencies'].append(rules_by_id[rule.id])
+        return roots
+
+
+def orm_get_test_cases(db, bank_id, policy_type_id):
+    with db.get_session() as session:
+        test_cases = session.query(TestCase).filter_by(
+            bank_id=bank_id, policy_type_id=policy_type_id, is_active=True
+        ).order_by(TestCase.priority, TestCase.created_at).all()
+        return [{
+            'id': tc.id, 'test_case_name': tc.test_case_name, 'description': tc.description,
+            'category': tc.category, 'priority': tc.priority, 'applicant_data': tc.applicant_data,
+            'policy_data': tc.policy_data, 'expected_decision': tc.expected_decision,
+            'expected_reasons': tc.expected_reasons, 'expected_risk_category': tc.expected_risk_category,
+            'is_auto_generated': tc.is_auto_generated, 'generation_method': tc.generation_method,
+            'created_at': tc.created_at.isoformat() if tc.created_at else None
+        } for tc in test_cases]
+
+
+def build_rules_tree(count, fanout=4):
+    """Build a hierarchical rules tree with roughly `count` nodes"""
+    roots = []
+    made = 0
+    root_idx = 0
+    while made < count:
+        root_idx += 1
+        root = {"id": str(root_idx), "name": f"Rule {root_idx}", "description": "Root rule",
+                "expected": "x >= 1", "dependencies": []}
+        made += 1
+        for child_idx in range(1, fanout + 1):
+            if made >= count:
+                break
+            rule_id = f"{root_idx}.{child_idx}"
+            root["dependencies"].append({"id": rule_id, "name": f"Rule {rule_id}",
+                                         "description": "Child rule", "expected": "y < 5",
+                                         "dependencies": []})
+            made += 1
+        roots.append(root)
+    return roots
+
+
+def seed(db, rule_count, test_case_count, with_test_cases):
+    db.create_bank(BENCH_BANK, "Benchmark Bank")
+    db.create_policy_type(BENCH_POLICY, "Benchmark Policy")
+    db.register_container({
+        "container_id": BENCH_CONTAINER,
+        "bank_id": BENCH_BANK,
+        "policy_type_id": BENCH_POLICY,
+        "platform": "docker",
+        "endpoint": "http://bench:8080/kie-server/services/rest/server",
+        "s3_policy_url": "s3://bench/policy.pdf",
+        "s3_jar_url": "s3://bench/rules.jar",
+        "s3_drl_url": "s3://bench/rules.drl",
+        "s3_excel_url": "s3://bench/rules.xlsx",
+        "status": "running",
+        "health_status": "healthy"
+    })
+    db.save_hierarchical_rules(BENCH_BANK, BENCH_POLICY, build_rules_tree(rule_count),
+                               document_hash="bench", source_document="bench.pdf")
+    if with_test_cases:
+        db.save_test_cases(BENCH_BANK, BENCH_POLICY, [{
+            "test_case_name": f"Bench case {i}",
+            "category": "positive",
+            "priority": 1 + i % 3,
+            "applicant_data": {"age": 30 + i % 40, "annualIncome": 50000 + i, "creditScore": 700},
+            "policy_data": {"coverageAmount": 250000, "termYears": 20},
+            "expected_decision": "approved",
+            "expected_reasons": []
+        } for i in range(test_case_count)], document_hash="bench")
+
+
+def cleanup(db, with_test_cases):
+    with db.get_session() as session:
+        if with_test_cases:
+            session.query(TestCase).filter_by(bank_id=BENCH_BANK).delete()
+        session.query(HierarchicalRule).filter_by(bank_id=BENCH_BANK).delete()
+        session.query(RuleContainer).filter_by(bank_id=BENCH_BANK).delete()
+        session.query(PolicyType).filter_by(policy_type_id=BENCH_POLICY).delete()
+        session.query(Bank).filter_by(bank_id=BENCH_BANK).delete()
+
+
+def time_calls(fn, iterations):
+    fn()  # warm up statement caches and the pool
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.mean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rules", type=int, default=150, help="hierarchical rules to seed")
+    parser.add_argument("--test-cases", type=int, default=100, help="test cases to seed (PostgreSQL only)")
+    parser.add_argument("--create-tables", action="store_true",
+                        help="create the benchmarked tables first (for scratch databases)")
+    args = parser.parse_args()
+
+    db = DatabaseService()
+    is_postgres = db.engine.dialect.name == "postgresql"
+
+    if args.create_tables:
+        tables = [Bank.__table__, PolicyType.__table__, RuleContainer.__table__, HierarchicalRule.__table__]
+        if is_postgres:
+            tables.append(TestCase.__table__)
+        Base.metadata.create_all(db.engine, tables=tables)
+
+    cleanup(db, is_postgres)
+    seed(db, args.rules, args.test_cases, with_test_cases=is_postgres)
+
+    cases = [
+        ("active container",
+         lambda: orm_get_active_container(db, BENCH_BANK, BENCH_POLICY),
+         lambda: db.get_active_container_summary(BENCH_BANK, BENCH_POLICY)),
+        ("container by id",
+         lambda: orm_get_container_by_id(db, BENCH_CONTAINER),
+         lambda: db.get_container_summary_by_id(BENCH_CONTAINER)),
+        (f"hierarchical rules ({args.rules})",
+         lambda: orm_get_hierarchical_rules(db, BENCH_BANK, BENCH_POLICY),
+         lambda: db.get_hierarchical_rules(BENCH_BANK, BENCH_POLICY)),
+    ]
+    if is_postgres:
+        cases.append((f"test cases ({args.test_cases})",
+                      lambda: orm_get_test_cases(db, BENCH_BANK, BENCH_POLICY),
+                      lambda: db.get_test_cases(BENCH_BANK, BENCH_POLICY)))
+
+    print("=" * 78)
+    print(f"DatabaseService read path benchmark ({db.engine.dialect.name}, {args.iterations} iterations)")
+    print("=" * 78)
+    print(f"{'lookup':<26}{'ORM mean':>10}{'Core mean':>11}{'ORM p95':>10}{'Core p95':>10}{'speedup':>10}")
+    try:
+        for name, orm_fn, core_fn in cases:
+            orm = time_calls(orm_fn, args.iterations)
+            core = time_calls(core_fn, args.iterations)
+            speedup = orm["mean"] / core["mean"] if core["mean"] else float("inf")
+            print(f"{name:<26}{orm['mean']:>9.3f}ms{core['mean']:>10.3f}ms"
+                  f"{orm['p95']:>8.3f}ms{core['p95']:>8.3f}ms{speedup:>9.2f}x")
+    finally:
+        cleanup(db, is_postgres)
+
+
+if __name__ == "__main__":
+    main()
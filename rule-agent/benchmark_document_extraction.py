@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark of DocumentExtractor on large generated fixtures.
+
+Generates a text PDF (default 1000 pages) and a multi-sheet rate table workbook (default
+3 sheets x 50000 rows), then extracts each in a fresh process with
+    - legacy    the previous extraction: whole file in a BytesIO, pages one at a time;
+                pandas read_excel with df.iterrows()
+    - current   DocumentExtractor: page ranges on the process pool from the memory-mapped file;
+                openpyxl read-only row streaming
+and reports the wall time, the peak RSS of the extracting process (and of the pool workers)
+and whether the extracted text matches the legacy text.
+
+Usage:
+    python3 benchmark_document_extraction.py
+    python3 benchmark_document_extraction.py --pages 2000 --workers 8
+    python3 benchmark_document_extraction.py --formats excel --sheets 5 --rows 100000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+LINES_PER_PAGE = 45
+
+
+def write_pdf(path, pages):
+    """Minimal text-only PDF with one content stream per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(1, pages + 1):
+        lines = [f"Section {page}.{line} Applicants must have a credit score of at least {600 + line} "
+                 f"and coverage below {page * 1000 + line} dollars." for line in range(1, LINES_PER_PAGE + 1)]
+        stream = ("BT /F1 9 Tf 40 800 Td 16 TL " + " ".join(f"({text}) Tj T*" for text in lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids).encode(), pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def write_xlsx(path, sheets, rows):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet in range(1, sheets + 1):
+        worksheet = workbook.create_sheet(f"Rates {sheet}")
+        worksheet.append(["Age", "Gender", "Smoker", "Coverage", "Risk Class", "Monthly Rate"])
+        for row in range(rows):
+            worksheet.append([18 + row % 60, "F" if row % 2 else "M", row % 3 == 0, 100000 + (row % 50) * 10000,
+                              ["Preferred", "Standard", "Substandard"][row % 3], f"{12.5 + row % 400 * 0.37:.2f}"])
+    workbook.save(path)
+
+
+def legacy_pdf(path):
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(BytesIO(f.read()))
+        return "\n".join(reader.pages[i].extract_text() for i in range(len(reader.pages)))
+
+
+def legacy_excel(path):
+    import pandas as pd
+
+    with open(path, "rb") as f:
+        excel_data = pd.read_excel(BytesIO(f.read()), sheet_name=None, engine="openpyxl")
+    parts = []
+    for sheet_name, df in excel_data.items():
+        parts.append(f"SHEET: {sheet_name}")
+        parts.append(" | ".join(str(col) for col in df.columns))
+        for _, row in df.iterrows():
+            parts.append(" | ".join(str(val) if pd.notna(val) else "" for val in row))
+    return "\n".join(parts)
+
+
+def run_variant(queue, variant, path, extension):
+    import DocumentExtractor as extractor_module
+
+    started = time.perf_counter()
+    if variant == "legacy":
+        text = legacy_pdf(path) if extension == ".pdf" else legacy_excel(path)
+        pages = None
+    else:
+        result = extractor_module.DocumentExtractor().extract_text_from_local(path)
+        text, pages = result["text"], result.get("pages")
+        if extractor_module._pdf_pool is not None:
+            extractor_module._pdf_pool.shutdown()
+    seconds = time.perf_counter() - started
+    queue.put({
+        "seconds": round(seconds, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "worker_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "characters": len(text),
+        "rows": text.count("\n") + 1,
+        "pages": pages,
+        "text": text if extension == ".pdf" else None
+    })
+
+
+def measure(variant, path, extension):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_variant, args=(queue, variant, path, extension))
+    process.start()
+    measured = queue.get()
+    process.join()
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default="pdf,excel", help="Comma-separated fixtures (pdf, excel)")
+    parser.add_argument("--pages", type=int, default=1000, help="PDF pages")
+    parser.add_argument("--sheets", type=int, default=3, help="Workbook sheets")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows per sheet")
+    parser.add_argument("--workers", type=int, default=None, help="DOCUMENT_EXTRACTION_WORKERS")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    if args.workers:
+        os.environ["DOCUMENT_EXTRACTION_WORKERS"] = str(args.workers)
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in formats:
+            extension = {"pdf": ".pdf", "excel": ".xlsx"}.get(name)
+            if extension is None:
+                print(f"⚠ Unknown format {name}, skipping")
+                continue
+            path = os.path.join(directory, f"fixture{extension}")
+            started = time.perf_counter()
+            if extension == ".pdf":
+                write_pdf(path, args.pages)
+            else:
+                write_xlsx(path, args.sheets, args.rows)
+            print(f"Generated {name} fixture: {os.path.getsize(path) / 1e6:.1f} MB "
+                  f"in {time.perf_counter() - started:.1f} s")
+
+            legacy = measure("legacy", path, extension)
+            current = measure("current", path, extension)
+            legacy_text, current_text = legacy.pop("text"), current.pop("text")
+            current["identical_text"] = legacy_text == current_text if extension == ".pdf" else None
+            results[name] = {"size_mb": round(os.path.getsize(path) / 1e6, 1), "legacy": legacy, "current": current}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"\n{'fixture':<8}{'variant':<9}{'seconds':>9}{'peak RSS MB':>13}{'workers MB':>12}{'chars':>12}{'rows':>9}")
+    for name, fixture in results.items():
+        for variant in ("legacy", "current"):
+            measured = fixture[variant]
+            print(f"{name:<8}{variant:<9}{measured['seconds']:>9.2f}{measured['peak_rss_mb']:>13.1f}"
+                  f"{measured['worker_peak_rss_mb']:>12.1f}{measured['characters']:>12}{measured['rows']:>9}")
+        legacy, current = fixture["legacy"], fixture["current"]
+        if current["seconds"]:
+            print(f"{'':<8}speedup: {legacy['seconds'] / current['seconds']:.2f}x"
+                  + ("" if current["identical_text"] is None
+                     else f", text {'identical' if current['identical_text'] else 'DIFFERS'}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
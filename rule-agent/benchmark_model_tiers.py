@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Quality and latency comparison of the large and small LLM tiers on the tiered agent steps.
+
+Runs the steps that LLM_AGENT_TIERS can route to the small model on both tiers, on the same input:
+    - toc           TableOfContentsExtractor TOC extraction of the sample policy
+    - field_mapping IntelligentFieldMapper mapping of loosely named test data onto a schema
+    - test_cases    TestCaseGenerator test cases for a small DRL rule set
+    - humanize      RuleHumanizer plain-English translation of the same rules (OpenAI only)
+
+For every tier and step it reports the median latency, the parse success rate (the answer
+could be parsed without escalation) and the agreement with the large tier (Jaccard similarity
+of the section titles, field mappings, tested rules or translated rules). Agents whose small-tier
+agreement is high and whose parse rate is close to 100% are candidates for LLM_AGENT_TIERS.
+
+The large tier is LLM_TYPE with its usual model settings; the small tier is LLM_SMALL_MODEL_NAME
+on LLM_SMALL_TYPE (default LLM_TYPE). Calls (except humanize, which uses its own OpenAI client)
+go through the LLM response cache, so a run recorded
+with LLM_CACHE_MODE=record can be repeated offline with LLM_CACHE_MODE=replay (latencies then
+measure the cache, not the models).
+
+Usage:
+    LLM_TYPE=OPENAI LLM_SMALL_MODEL_NAME=gpt-4o-mini python3 benchmark_model_tiers.py
+    LLM_TYPE=LOCAL_OLLAMA LLM_SMALL_MODEL_NAME=llama3.2:3b python3 benchmark_model_tiers.py --repeat 3
+    python3 benchmark_model_tiers.py --steps toc,field_mapping --document ../sample_life_insurance_policy.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from CreateLLM import _createProviderLLM
+from IntelligentFieldMapper import IntelligentFieldMapper
+from LLMResponseCache import wrap_llm
+from RuleHumanizer import RuleHumanizer
+from TableOfContentsExtractor import TableOfContentsExtractor
+from TestCaseGenerator import TestCaseGenerator
+
+DEFAULT_DOCUMENT = os.path.join(os.path.dirname(__file__), "..", "sample_life_insurance_policy.txt")
+STEPS = ["toc", "field_mapping", "test_cases", "humanize"]
+
+SCHEMA = {
+    "applicant_fields": [
+        {"field_name": "age", "field_type": "int", "description": "Applicant age in years",
+         "common_aliases": ["applicantAge", "years"]},
+        {"field_name": "annualIncome", "field_type": "double", "description": "Yearly gross income",
+         "common_aliases": ["income", "salary"]},
+        {"field_name": "creditScore", "field_type": "int", "description": "Credit bureau score"},
+        {"field_name": "smoker", "field_type": "boolean", "description": "Uses tobacco products"},
+        {"field_name": "health", "field_type": "String", "description": "Overall health rating"}
+    ],
+    "policy_fields": [
+        {"field_name": "coverageAmount", "field_type": "double", "description": "Requested death benefit"},
+        {"field_name": "term", "field_type": "int", "description": "Policy term in years"}
+    ]
+}
+
+TEST_DATA = {"applicantAge": 42, "yearlySalary": 85000, "fico": 710, "tobaccoUser": "no",
+             "healthStatus": "good"}
+
+DRL = """package com.underwriting.rules;
+
+rule "Age Limit"
+    when
+        $applicant : Applicant( age < 18 || age > 65 )
+        $decision : Decision()
+    then
+        $decision.setApproved(false);
+        $decision.addReason("Applicant must be between 18 and 65 years old");
+end
+
+rule "Minimum Credit Score"
+    when
+        $applicant : Applicant( creditScore < 600 )
+        $decision : Decision()
+    then
+        $decision.setApproved(false);
+        $decision.addReason("Credit score below 600");
+end
+
+rule "Coverage Income Multiple"
+    when
+        $applicant : Applicant( $income : annualIncome )
+        $policy : Policy( coverageAmount > $income * 20 )
+        $decision : Decision()
+    then
+        $decision.setApproved(false);
+        $decision.addReason("Coverage exceeds 20 times annual income");
+end
+"""
+
+RULES = [
+    ("Age Limit", "$applicant : Applicant( age < 18 || age > 65 )", "$decision.setApproved(false);"),
+    ("Minimum Credit Score", "$applicant : Applicant( creditScore < 600 )", "$decision.setApproved(false);"),
+    ("Coverage Income Multiple", "$policy : Policy( coverageAmount > $income * 20 )", "$decision.setApproved(false);")
+]
+
+
+def content(response):
+    return response.content if hasattr(response, 'content') else str(response)
+
+
+def run_toc(llm, document_text):
+    extractor = TableOfContentsExtractor(llm)
+    result = extractor._invoke_json(extractor.toc_prompt, {"document_text": document_text[:50000]})
+    return {s.get("section_title", "").strip().lower() for s in extractor._flatten_toc(result.get("toc", []))}
+
+
+def run_field_mapping(llm, document_text):
+    mapper = IntelligentFieldMapper(llm, SCHEMA)
+    prompt = mapper._create_mapping_prompt(TEST_DATA, mapper._build_schema_context(SCHEMA["applicant_fields"]),
+                                           "applicant")
+    mapping = mapper._parse_mapping_response(content(mapper.llm.invoke(prompt)))
+    return {(m.get("test_field"), m.get("schema_field")) for m in mapping["mappings"]}
+
+
+def run_test_cases(llm, document_text):
+    test_cases = TestCaseGenerator(llm)._generate_test_cases_from_drl(DRL, SCHEMA, "life_insurance")
+    if not test_cases:
+        raise ValueError("no test cases parsed")
+    return {tc.get("rule_name") for tc in test_cases}
+
+
+def run_humanize(model):
+    def run(llm, document_text):
+        texts = RuleHumanizer(lambda name, when_clause, then_clause: None)._translate_batch(RULES, model)
+        if not any(texts):
+            raise ValueError("no translations parsed")
+        # Rules with a usable translation (the wording itself differs between any two runs)
+        return {name for (name, _, _), text in zip(RULES, texts) if text}
+    return run
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def measure(name, tier, fn, llm, document_text, repeat):
+    latencies, outputs, failures = [], [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            outputs.append(fn(llm, document_text))
+        except Exception as e:
+            failures += 1
+            print(f"  ✗ {name} [{tier}]: {e}")
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "latency_ms": round(statistics.median(latencies), 1),
+        "parse_rate": round((repeat - failures) / repeat, 2),
+        "outputs": outputs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document", default=DEFAULT_DOCUMENT, help="Policy text for the TOC step")
+    parser.add_argument("--steps", default=",".join(STEPS), help=f"Comma-separated steps ({', '.join(STEPS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per tier and step (median latency)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    small_model = os.getenv("LLM_SMALL_MODEL_NAME")
+    if not small_model:
+        print("✗ Set LLM_SMALL_MODEL_NAME (and optionally LLM_SMALL_TYPE) to the small-tier model")
+        return 1
+    large_type = os.getenv("LLM_TYPE", "LOCAL_OLLAMA")
+    small_type = os.getenv("LLM_SMALL_TYPE", large_type)
+
+    with open(args.document, encoding="utf-8") as f:
+        document_text = f.read()
+
+    tiers = {
+        "large": wrap_llm(_createProviderLLM(large_type), large_type),
+        "small": wrap_llm(_createProviderLLM(small_type, small_model), small_type)
+    }
+    large_openai_model = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+    steps = {
+        "toc": {"large": run_toc, "small": run_toc},
+        "field_mapping": {"large": run_field_mapping, "small": run_field_mapping},
+        "test_cases": {"large": run_test_cases, "small": run_test_cases},
+        "humanize": {"large": run_humanize(large_openai_model), "small": run_humanize(small_model)}
+    }
+
+    results = {}
+    for name in [s.strip() for s in args.steps.split(",") if s.strip()]:
+        if name not in steps:
+            print(f"⚠ Unknown step {name}, skipping")
+            continue
+        if name == "humanize" and not (os.getenv("OPENAI_API_KEY") and small_type == "OPENAI"):
+            print("⚠ humanize needs OPENAI_API_KEY and an OpenAI small tier, skipping")
+            continue
+        print(f"Running {name}...")
+        step = {tier: measure(name, tier, steps[name][tier], tiers[tier], document_text, args.repeat)
+                for tier in ("large", "small")}
+        reference = step["large"]["outputs"][0] if step["large"]["outputs"] else None
+        for tier, measured in step.items():
+            outputs = measured.pop("outputs")
+            measured["agreement"] = (round(statistics.mean(jaccard(o, reference) for o in outputs), 2)
+                                     if outputs and reference is not None else None)
+        results[name] = step
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"\nLarge tier: {tiers['large'].settings.get('model')} ({large_type})  "
+          f"Small tier: {small_model} ({small_type})  Runs: {args.repeat}")
+    print(f"{'step':<15}{'tier':<7}{'latency ms':>12}{'parse rate':>12}{'agreement':>11}")
+    for name, step in results.items():
+        for tier, measured in step.items():
+            agreement = "-" if measured["agreement"] is None else f"{measured['agreement']:.2f}"
+            print(f"{name:<15}{tier:<7}{measured['latency_ms']:>12.1f}{measured['parse_rate']:>12.2f}{agreement:>11}")
+        large_ms, small_ms = step["large"]["latency_ms"], step["small"]["latency_ms"]
+        if small_ms:
+            print(f"{'':<15}{'speedup of the small tier:':<26}{large_ms / small_ms:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
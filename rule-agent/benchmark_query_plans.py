@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the hot DatabaseService read queries (PostgreSQL only).
+
+Seeds realistic volumes (many bank/policy combinations, each with several inactive historical
+versions next to the active one), runs ANALYZE, then executes EXPLAIN (ANALYZE, FORMAT JSON) for:
+    - active container lookup          (bank, policy, is_active)
+    - hierarchical rules tree          (bank, policy, is_active ORDER BY level, order_index)
+    - extraction queries for a document (bank, policy, document_hash, is_active ORDER BY query_order)
+    - test cases listing               (bank, policy, is_active ORDER BY COALESCE(priority, ...),
+                                        COALESCE(created_at, ...), id)
+    - test executions for a test case  (test_case_id ORDER BY COALESCE(executed_at, ...) DESC, id DESC)
+
+The listings are built from the same coalesced sort keys as DatabaseService. Every scan on the
+queried table must be an index scan (Index Scan, Index Only Scan or Bitmap Index/Heap Scan), and
+the ordered listings must be returned in index order, without a Sort node. A sequential scan or an
+extra sort is reported as a regression and the script exits non-zero, so it can run in CI after
+schema changes (see db/migrations/009_add_hot_query_indexes.sql and 016_coalesce_keyset_sort_indexes.sql).
+
+Usage:
+    DATABASE_URL=postgresql://... python3 benchmark_query_plans.py
+    DATABASE_URL=postgresql://... python3 benchmark_query_plans.py --tenants 50 --versions 6 --create-tables
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import select, bindparam, delete
+
+from DatabaseService import (
+    DatabaseService, Base, Bank, PolicyType, RuleContainer, HierarchicalRule, PolicyExtractionQuery,
+    TestCaseExecution, _ACTIVE_CONTAINER_SUMMARY_STMT, _HIERARCHICAL_RULES_STMT, _TEST_CASES_STMT,
+    _hierarchical_rules, _test_cases, _priority_sort_key, _time_sort_key
+)
+
+BENCH_PREFIX = "qp-bench"
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+_queries = PolicyExtractionQuery.__table__
+_executions = TestCaseExecution.__table__
+
+# Mirrors DatabaseService.get_extraction_queries(bank, policy, document_hash) and
+# DatabaseService.get_test_executions(test_case_id=...)
+EXTRACTION_QUERIES_STMT = select(_queries.c.id, _queries.c.query_text, _queries.c.response_text,
+                                 _queries.c.query_order).where(
+    _queries.c.bank_id == bindparam('bank_id'),
+    _queries.c.policy_type_id == bindparam('policy_type_id'),
+    _queries.c.document_hash == bindparam('document_hash'),
+    _queries.c.is_active == True  # noqa: E712
+).order_by(_queries.c.query_order)
+
+TEST_EXECUTIONS_STMT = select(_executions.c.id, _executions.c.execution_id, _executions.c.test_passed,
+                              _executions.c.executed_at).where(
+    _executions.c.test_case_id == bindparam('test_case_id')
+).order_by(_time_sort_key(_executions.c.executed_at).desc(), _executions.c.id.desc()).limit(100)
+
+
+def tenant_ids(index):
+    return f"{BENCH_PREFIX}-bank-{index}", f"{BENCH_PREFIX}-policy-{index % 5}"
+
+
+def document_hash(tenant, version):
+    return f"{BENCH_PREFIX}-{tenant}-{version}".ljust(64, "0")[:64]
+
+
+def seed(db, tenants, versions, rules, queries, test_cases, executions):
+    """Insert benchmark rows with Core bulk inserts; only the newest version of each tenant is active"""
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(Bank.__table__.insert(), [
+            {"bank_id": tenant_ids(t)[0], "bank_name": f"Plan Bench Bank {t}"} for t in range(tenants)
+        ])
+        conn.execute(PolicyType.__table__.insert(), [
+            {"policy_type_id": f"{BENCH_PREFIX}-policy-{p}", "policy_name": f"Plan Bench Policy {p}"}
+            for p in range(min(tenants, 5))
+        ])
+
+        for t in range(tenants):
+            bank_id, policy_type_id = tenant_ids(t)
+            for v in range(versions):
+                active = v == versions - 1
+                doc_hash = document_hash(t, v)
+                deployed_at = now - timedelta(days=versions - v, minutes=t)
+                conn.execute(RuleContainer.__table__.insert(), [{
+                    "container_id": f"{bank_id}-{policy_type_id}-v{v}",
+                    "bank_id": bank_id, "policy_type_id": policy_type_id,
+                    "platform": "docker", "endpoint": f"http://{bank_id}:8080/kie-server/services/rest/server",
+                    "status": "running" if active else "stopped", "health_status": "healthy",
+                    "document_hash": doc_hash, "version": v + 1, "is_active": active, "deployed_at": deployed_at
+                }])
+                conn.execute(HierarchicalRule.__table__.insert(), [{
+                    "bank_id": bank_id, "policy_type_id": policy_type_id,
+                    "rule_id": f"{r // 10 + 1}.{r % 10}", "name": f"Rule {r}",
+                    "description": "Applicant must satisfy the policy requirement", "expected": "x >= 1",
+                    "level": r % 4, "order_index": r, "document_hash": doc_hash,
+                    "source_document": "bench.pdf", "is_active": active, "created_at": deployed_at
+                } for r in range(rules)])
+                conn.execute(_queries.insert(), [{
+                    "bank_id": bank_id, "policy_type_id": policy_type_id,
+                    "query_text": f"What is the maximum coverage for tier {q}?", "response_text": f"{q * 1000}",
+                    "confidence_score": 90, "document_hash": doc_hash, "source_document": "bench.pdf",
+                    "query_order": q, "is_active": active, "created_at": deployed_at
+                } for q in range(queries)])
+                test_case_rows = conn.execute(_test_cases.insert().returning(_test_cases.c.id), [{
+                    "bank_id": bank_id, "policy_type_id": policy_type_id,
+                    "test_case_name": f"Case {c}", "category": "positive", "priority": 1 + c % 3,
+                    "applicant_data": {"age": 30 + c % 40, "creditScore": 700},
+                    "policy_data": {"coverageAmount": 250000}, "expected_decision": "approved",
+                    "document_hash": doc_hash, "is_active": active, "version": v + 1,
+                    "created_at": deployed_at + timedelta(seconds=c)
+                } for c in range(test_cases)]).all()
+                if active and executions:
+                    conn.execute(_executions.insert(), [{
+                        "test_case_id": row.id, "execution_id": f"{BENCH_PREFIX}-{row.id}-{e}",
+                        "container_id": f"{bank_id}-{policy_type_id}-v{v}", "actual_decision": "approved",
+                        "test_passed": e % 7 != 0, "execution_time_ms": 20 + e,
+                        "executed_at": now - timedelta(hours=e)
+                    } for row in test_case_rows for e in range(executions)])
+
+        for table in ("rule_containers", "hierarchical_rules", "policy_extraction_queries",
+                      "test_cases", "test_case_executions"):
+            conn.exec_driver_sql(f"ANALYZE {table}")
+
+
+def cleanup(db):
+    bank_filter = Bank.__table__.c.bank_id.like(f"{BENCH_PREFIX}-%")
+    with db.engine.begin() as conn:
+        bench_cases = select(_test_cases.c.id).where(_test_cases.c.bank_id.like(f"{BENCH_PREFIX}-%"))
+        conn.execute(delete(_executions).where(_executions.c.test_case_id.in_(bench_cases)))
+        for table in (_test_cases, _queries, _hierarchical_rules, RuleContainer.__table__):
+            conn.execute(delete(table).where(table.c.bank_id.like(f"{BENCH_PREFIX}-%")))
+        conn.execute(delete(PolicyType.__table__).where(
+            PolicyType.__table__.c.policy_type_id.like(f"{BENCH_PREFIX}-%")))
+        conn.execute(delete(Bank.__table__).where(bank_filter))
+
+
+def explain(conn, stmt, params):
+    """Run EXPLAIN (ANALYZE, FORMAT JSON) for a Core statement with bound parameters"""
+    compiled = stmt.compile(dialect=conn.dialect)
+    result = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled.string}",
+                                  {**compiled.params, **params})
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def check_plan(plan, table, ordered):
+    """
+    Return (passed, scan descriptions, sorted) for every scan touching `table`
+
+    An ordered listing also fails when the plan sorts instead of reading the index in order.
+    """
+    scans = []
+    passed = True
+    sorted_in_plan = False
+    for node in walk(plan["Plan"]):
+        node_type = node["Node Type"]
+        if node_type in ("Sort", "Incremental Sort"):
+            sorted_in_plan = True
+        if node.get("Relation Name") != table:
+            continue
+        index_names = [node["Index Name"]] if node.get("Index Name") else [
+            child["Index Name"] for child in walk(node) if child.get("Index Name")]
+        scans.append(node_type + (f" using {', '.join(index_names)}" if index_names else ""))
+        if node_type not in INDEX_NODE_TYPES:
+            passed = False
+    if ordered and sorted_in_plan:
+        passed = False
+    return passed and bool(scans), scans, sorted_in_plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=25, help="bank/policy combinations to seed")
+    parser.add_argument("--versions", type=int, default=4, help="versions per tenant (only the newest is active)")
+    parser.add_argument("--rules", type=int, default=250, help="hierarchical rules per version")
+    parser.add_argument("--queries", type=int, default=120, help="extraction queries per version")
+    parser.add_argument("--test-cases", type=int, default=80, help="test cases per version")
+    parser.add_argument("--executions", type=int, default=25, help="executions per active test case")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows for manual inspection")
+    parser.add_argument("--create-tables", action="store_true",
+                        help="create the tables and indexes first (for scratch databases)")
+    args = parser.parse_args()
+
+    db = DatabaseService()
+    if db.engine.dialect.name != "postgresql":
+        print("Query plan checks require PostgreSQL (set DATABASE_URL)")
+        return 2
+
+    if args.create_tables:
+        Base.metadata.create_all(db.engine, tables=[
+            Bank.__table__, PolicyType.__table__, RuleContainer.__table__, HierarchicalRule.__table__,
+            _queries, _test_cases, _executions
+        ])
+
+    cleanup(db)
+    print(f"Seeding {args.tenants} tenants x {args.versions} versions ...")
+    seed(db, args.tenants, args.versions, args.rules, args.queries, args.test_cases, args.executions)
+
+    probe = args.tenants // 2
+    bank_id, policy_type_id = tenant_ids(probe)
+    with db.engine.connect() as conn:
+        test_case_id = conn.execute(
+            select(_test_cases.c.id).where(_test_cases.c.bank_id == bank_id, _test_cases.c.is_active == True)  # noqa: E712
+            .limit(1)
+        ).scalar()
+
+    active_rules_stmt = _HIERARCHICAL_RULES_STMT.where(
+        _hierarchical_rules.c.is_active == True  # noqa: E712
+    ).order_by(_hierarchical_rules.c.level, _hierarchical_rules.c.order_index)
+    # Mirrors DatabaseService.get_test_cases
+    test_cases_stmt = _TEST_CASES_STMT.order_by(_priority_sort_key(_test_cases.c.priority),
+                                                _time_sort_key(_test_cases.c.created_at), _test_cases.c.id)
+    tenant = {"bank_id": bank_id, "policy_type_id": policy_type_id}
+
+    checks = [
+        ("active container", "rule_containers", _ACTIVE_CONTAINER_SUMMARY_STMT, tenant, False),
+        ("hierarchical rules", "hierarchical_rules", active_rules_stmt, tenant, True),
+        ("extraction queries", "policy_extraction_queries", EXTRACTION_QUERIES_STMT,
+         {**tenant, "document_hash": document_hash(probe, args.versions - 1)}, True),
+        ("test cases", "test_cases", test_cases_stmt, {**tenant, "is_active": True}, True),
+        ("test executions", "test_case_executions", TEST_EXECUTIONS_STMT, {"test_case_id": test_case_id}, True),
+    ]
+
+    print("=" * 78)
+    print("Hot query plan check (PostgreSQL EXPLAIN ANALYZE)")
+    print("=" * 78)
+    failures = 0
+    try:
+        with db.engine.connect() as conn:
+            for name, table, stmt, params, ordered in checks:
+                plan = explain(conn, stmt, params)
+                passed, scans, sorted_in_plan = check_plan(plan, table, ordered)
+                failures += 0 if passed else 1
+                print(f"{'PASS' if passed else 'FAIL'}  {name:<20} {plan['Execution Time']:>8.3f}ms  "
+                      f"{'; '.join(scans) or 'no scan found'}" + ("  (+sort)" if sorted_in_plan else ""))
+    finally:
+        if not args.keep:
+            cleanup(db)
+
+    print("=" * 78)
+    if failures:
+        print(f"❌ {failures} hot query plan(s) regressed to sequential scans or extra sorts")
+        return 1
+    print("✓ All hot queries use index scans, listings in index order")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -91,9 +91,11 @@ CREATE TABLE rule_requests (
     endpoint VARCHAR(255),
     http_method VARCHAR(10),
 
-    -- Payload
+    -- Payload (large payloads are offloaded to the payload store and referenced by hash)
     request_payload JSONB,
     response_payload JSONB,
+    request_payload_ref VARCHAR(80),
+    response_payload_ref VARCHAR(80),
 
     -- Performance
     execution_time_ms INTEGER,
@@ -300,9 +302,11 @@ CREATE TABLE IF NOT EXISTS test_case_executions (
     actual_reasons TEXT[],
     actual_risk_category INTEGER,
 
-    -- Full response
+    -- Full response (large payloads are offloaded to the payload store and referenced by hash)
     request_payload JSONB,
     response_payload JSONB,
+    request_payload_ref VARCHAR(80),
+    response_payload_ref VARCHAR(80),
 
     -- Test result
     test_passed BOOLEAN,
@@ -317,6 +321,148 @@ CREATE TABLE IF NOT EXISTS test_case_executions (
     executed_by VARCHAR(100)
 );
 
+-- Background workflow jobs for asynchronous policy processing (Migration 010)
+CREATE TABLE IF NOT EXISTS workflow_jobs (
+    id SERIAL PRIMARY KEY,
+    job_id VARCHAR(36) NOT NULL UNIQUE, -- UUID returned to the client
+    job_type VARCHAR(50) NOT NULL DEFAULT 'process_policy',
+
+    -- Job input
+    bank_id VARCHAR(50),
+    policy_type_id VARCHAR(50),
+    s3_url TEXT,
+    params JSONB,
+
+    -- Progress
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    current_step VARCHAR(100),
+    steps JSONB DEFAULT '{}'::jsonb, -- step name -> step result, written as each workflow step finishes
+    cancel_requested BOOLEAN DEFAULT false,
+
+    -- Outcome
+    result JSONB,
+    error_message TEXT,
+    worker_pid INTEGER,
+
+    -- Lease (Migration 017): the API process whose job queue runs the job renews heartbeat_at;
+    -- jobs whose lease expired are failed as orphaned
+    owner_id VARCHAR(100), -- hostname:pid of the owning API process
+    heartbeat_at TIMESTAMP,
+
+    -- Timestamps
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT check_workflow_job_status CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled'))
+);
+
+-- Per-step workflow outputs for resuming interrupted runs (Migration 011)
+CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+    id SERIAL PRIMARY KEY,
+    document_hash VARCHAR(64) NOT NULL,
+    step VARCHAR(100) NOT NULL,
+    config_hash VARCHAR(64) NOT NULL, -- hash of the LLM settings and step inputs that produced the output
+
+    -- Step output (outputs above PAYLOAD_INLINE_MAX_BYTES live in the payload store)
+    output JSONB,
+    output_ref VARCHAR(80),
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Textract answers reused across runs of the same document (Migration 012)
+CREATE TABLE IF NOT EXISTS textract_answer_cache (
+    id SERIAL PRIMARY KEY,
+    document_hash VARCHAR(64) NOT NULL, -- SHA-256 of the document text
+    query_hash VARCHAR(64) NOT NULL, -- SHA-256 of the normalized (lowercased, whitespace-collapsed) query
+    query_text TEXT NOT NULL,
+
+    -- Textract QUERY_RESULT
+    answer TEXT,
+    confidence FLOAT,
+    page INTEGER,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-section snapshots of processed policy documents for incremental reprocessing (Migration 013)
+CREATE TABLE IF NOT EXISTS policy_document_versions (
+    id SERIAL PRIMARY KEY,
+    bank_id VARCHAR(50) NOT NULL REFERENCES banks(bank_id) ON DELETE CASCADE,
+    policy_type_id VARCHAR(50) NOT NULL REFERENCES policy_types(policy_type_id) ON DELETE CASCADE,
+    document_hash VARCHAR(64) NOT NULL, -- SHA-256 of the document text
+    source_document VARCHAR(500),
+
+    schema JSONB, -- Dynamic schema the section rules were generated against
+    section_count INTEGER DEFAULT 0,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS policy_document_sections (
+    id SERIAL PRIMARY KEY,
+    version_id INTEGER NOT NULL REFERENCES policy_document_versions(id) ON DELETE CASCADE,
+    section_order INTEGER NOT NULL,
+    section_key VARCHAR(300) NOT NULL, -- Section number + title, unique within a version
+    section_number VARCHAR(50),
+    section_title VARCHAR(255),
+    content_hash VARCHAR(64) NOT NULL, -- SHA-256 of the whitespace-normalized section text
+
+    analysis JSONB, -- {"policies": [...], "queries": [...]}
+    rule_body TEXT -- DRL rules generated from the section (no package/declare statements)
+);
+
+-- Cached plain-English translations of DRL rules (Migration 014)
+CREATE TABLE IF NOT EXISTS rule_translations (
+    id SERIAL PRIMARY KEY,
+    clause_hash VARCHAR(64) NOT NULL, -- SHA-256 of the normalized WHEN/THEN clauses
+    model VARCHAR(100) NOT NULL,
+    requirement TEXT NOT NULL, -- Plain-English requirement statement
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- LLM call metrics and per-run rollups (Migration 015)
+CREATE TABLE IF NOT EXISTS llm_call_metrics (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) NOT NULL, -- Workflow run the call belongs to
+    agent VARCHAR(100),
+    step VARCHAR(100),
+    provider VARCHAR(50),
+    model VARCHAR(100),
+
+    latency_ms DOUBLE PRECISION NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    tokens_estimated BOOLEAN DEFAULT false, -- Provider did not report usage
+    retries INTEGER DEFAULT 0,
+    cached BOOLEAN DEFAULT false, -- Answered from the LLM response cache
+    status VARCHAR(20) NOT NULL DEFAULT 'success',
+    cost_usd DOUBLE PRECISION,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS llm_run_metrics (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) UNIQUE NOT NULL,
+    bank_id VARCHAR(50),
+    policy_type_id VARCHAR(50),
+    container_id VARCHAR(200),
+    document_hash VARCHAR(64),
+
+    total_calls INTEGER DEFAULT 0,
+    total_latency_ms DOUBLE PRECISION DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cost_usd DOUBLE PRECISION,
+    summary JSONB, -- Totals plus per-agent and per-step rollups
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================================================
 -- INDEXES
 -- ============================================================================
@@ -405,6 +551,68 @@ CREATE INDEX IF NOT EXISTS idx_test_executions_passed
 CREATE INDEX IF NOT EXISTS idx_test_executions_executed_at
     ON test_case_executions(executed_at);
 
+-- Composite/partial indexes for the hot read queries (Migration 009; listings on coalesced sort keys: Migration 016)
+CREATE INDEX IF NOT EXISTS idx_containers_deployed_at_id
+    ON rule_containers((COALESCE(deployed_at, '1970-01-01 00:00:00')) DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_hierarchical_rules_active_tree
+    ON hierarchical_rules(bank_id, policy_type_id, level, order_index)
+    WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_extraction_queries_active_document
+    ON policy_extraction_queries(bank_id, policy_type_id, document_hash, query_order)
+    WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_extracted_rules_active_listing
+    ON extracted_rules(bank_id, policy_type_id, (COALESCE(category, '')), rule_name, id)
+    WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_test_cases_active_listing
+    ON test_cases(bank_id, policy_type_id, (COALESCE(priority, 2147483647)),
+                  (COALESCE(created_at, '1970-01-01 00:00:00')), id)
+    WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_test_executions_case_executed_at
+    ON test_case_executions(test_case_id, (COALESCE(executed_at, '1970-01-01 00:00:00')) DESC, id DESC);
+
+-- Indexes for workflow_jobs (Migration 010)
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_status
+    ON workflow_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_bank_policy
+    ON workflow_jobs(bank_id, policy_type_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_created_at
+    ON workflow_jobs(created_at);
+-- Lease owner lookup (Migration 017)
+CREATE INDEX IF NOT EXISTS idx_workflow_jobs_owner
+    ON workflow_jobs(owner_id) WHERE status IN ('queued', 'running');
+
+-- Indexes for workflow_checkpoints (Migration 011)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflow_checkpoints_key
+    ON workflow_checkpoints(document_hash, step, config_hash);
+CREATE INDEX IF NOT EXISTS idx_workflow_checkpoints_created_at
+    ON workflow_checkpoints(created_at);
+
+-- Indexes for textract_answer_cache (Migration 012)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_textract_answer_cache_key
+    ON textract_answer_cache(document_hash, query_hash);
+
+-- Indexes for policy_document_versions / policy_document_sections (Migration 013)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_policy_document_versions_key
+    ON policy_document_versions(bank_id, policy_type_id, document_hash);
+CREATE INDEX IF NOT EXISTS idx_policy_document_versions_latest
+    ON policy_document_versions(bank_id, policy_type_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_policy_document_sections_version
+    ON policy_document_sections(version_id, section_order);
+
+-- Indexes for rule_translations (Migration 014)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rule_translations_key
+    ON rule_translations(clause_hash, model);
+
+-- Indexes for llm_call_metrics and llm_run_metrics (Migration 015)
+CREATE INDEX IF NOT EXISTS idx_llm_call_metrics_agent_created
+    ON llm_call_metrics(agent, created_at);
+CREATE INDEX IF NOT EXISTS idx_llm_call_metrics_run
+    ON llm_call_metrics(run_id);
+CREATE INDEX IF NOT EXISTS idx_llm_run_metrics_bank_policy
+    ON llm_run_metrics(bank_id, policy_type_id);
+CREATE INDEX IF NOT EXISTS idx_llm_run_metrics_created_at
+    ON llm_run_metrics(created_at);
+
 -- ============================================================================
 -- MIGRATION 007: Test Case Unique Constraint Fix (Partial Index)
 -- ============================================================================
@@ -462,6 +670,13 @@ CREATE TRIGGER hierarchical_rules_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Trigger for workflow_jobs updated_at (Migration 010)
+DROP TRIGGER IF EXISTS trigger_update_workflow_jobs_timestamp ON workflow_jobs;
+CREATE TRIGGER trigger_update_workflow_jobs_timestamp
+    BEFORE UPDATE ON workflow_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 -- Trigger to log deployment history
 CREATE OR REPLACE FUNCTION log_container_deployment()
 RETURNS TRIGGER AS $$
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for section slicing with DocumentIndex
+Compares against the previous per-section line scan on a synthetic 500-page policy
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from DocumentIndex import DocumentIndex, clause_offset, page_number_at, resolve_page_numbers
+
+PAGES = 500
+LINES_PER_PAGE = 50
+
+
+def legacy_extract_section_content(document_text, section, next_section=None):
+    """Section slicing as done before the index: split and scan the document for every section"""
+    lines = document_text.split('\n')
+    section_title = section.get("section_title", "")
+    section_num = section.get("section_number", "")
+
+    start_idx = None
+    for i, line in enumerate(lines):
+        line_stripped = line.strip()
+        if section_num in line and section_title in line:
+            start_idx = i
+            break
+        if section_num and line_stripped.startswith(section_num):
+            if section_title in line or (i + 1 < len(lines) and section_title in lines[i + 1]):
+                start_idx = i
+                break
+        if section_title and len(section_title) > 5 and section_title in line:
+            start_idx = i
+            break
+    if start_idx is None:
+        return ""
+
+    end_idx = len(lines)
+    if next_section:
+        next_title = next_section.get("section_title", "")
+        next_num = next_section.get("section_number", "")
+        for i in range(start_idx + 1, len(lines)):
+            line_stripped = lines[i].strip()
+            if next_num and next_title and next_num in lines[i] and next_title in lines[i]:
+                end_idx = i
+                break
+            elif next_num and line_stripped.startswith(next_num):
+                end_idx = i
+                break
+            elif next_title and len(next_title) > 5 and next_title in lines[i]:
+                end_idx = i
+                break
+    return '\n'.join(lines[start_idx:end_idx])
+
+
+def build_policy():
+    """Synthetic policy: 500 pages of 50 lines with a numbered section every ~80 lines"""
+    lines, toc = [], []
+    chapter, clause = 1, 0
+    for n in range(PAGES * LINES_PER_PAGE):
+        if n % 80 == 0:
+            clause += 1
+            if clause > 9:
+                chapter, clause = chapter + 1, 1
+            section = {"section_number": f"{chapter}.{clause}",
+                       "section_title": f"Underwriting requirement group {len(toc):04d}"}
+            toc.append(section)
+            lines.append(f"{section['section_number']} {section['section_title']}:")
+        else:
+            lines.append(f"    The applicant must meet condition {n} of this group, subject to review.")
+    return '\n'.join(lines), toc
+
+
+def test_document_index():
+    print("=" * 60)
+    print("Benchmarking section slicing on a 500-page policy")
+    print("=" * 60)
+
+    document_text, toc = build_policy()
+    print(f"\nDocument: {len(document_text):,} chars, {PAGES * LINES_PER_PAGE:,} lines, {len(toc)} sections")
+
+    start = time.perf_counter()
+    legacy = [legacy_extract_section_content(document_text, s, toc[i + 1] if i + 1 < len(toc) else None)
+              for i, s in enumerate(toc)]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = DocumentIndex(document_text)
+    indexed = [index.section_content(s, toc[i + 1] if i + 1 < len(toc) else None) for i, s in enumerate(toc)]
+    indexed_seconds = time.perf_counter() - start
+
+    print(f"  Per-section scan: {legacy_seconds * 1000:8.1f} ms")
+    print(f"  DocumentIndex:    {indexed_seconds * 1000:8.1f} ms (including index build)")
+
+    if indexed != legacy:
+        mismatched = sum(1 for a, b in zip(indexed, legacy) if a != b)
+        print(f"✗ {mismatched} sections differ from the per-section scan")
+        return False
+    print(f"✓ All {len(toc)} sections identical to the per-section scan")
+
+    speedup = legacy_seconds / indexed_seconds if indexed_seconds else float('inf')
+    if speedup < 5:
+        print(f"✗ Expected at least 5x speedup, got {speedup:.1f}x")
+        return False
+    print(f"✓ {speedup:.1f}x faster")
+
+    # Pattern-based TOCs carry line numbers and slice directly
+    section = {"section_number": "1.1", "section_title": "x", "line_number": 1}
+    if index.section_content(section, {"line_number": 3}) != '\n'.join(document_text.split('\n')[1:3]):
+        print("✗ Line-number slicing differs")
+        return False
+    print("✓ Line-number slicing unchanged")
+
+    # Headings are matched regardless of case and trailing punctuation
+    text = "1 OVERVIEW\nabout\n2 ELIGIBILITY REQUIREMENTS:\nmust be 18\n3 LIMITS\nmax 1M"
+    content = DocumentIndex(text).section_content({"section_number": "2", "section_title": "Eligibility Requirements"},
+                                                  {"section_number": "3", "section_title": "Limits"})
+    if content != "2 ELIGIBILITY REQUIREMENTS:\nmust be 18":
+        print(f"✗ Normalized heading lookup failed: {content!r}")
+        return False
+    print("✓ Normalized heading lookup")
+
+    # Headings only present inside a line still resolve through the substring fallback
+    text = "Intro\nSee clause 7 Special Cases here\nbody\nEnd Matter follows\ntail"
+    content = DocumentIndex(text).section_content({"section_number": "7", "section_title": "Special Cases"},
+                                                  {"section_number": "", "section_title": "End Matter"})
+    if content != "See clause 7 Special Cases here\nbody":
+        print(f"✗ Fallback search failed: {content!r}")
+        return False
+    print("✓ Substring fallback for inline headings")
+
+    # Clause references resolve to the page their heading is on
+    pages = ["ARTICLE I: SCOPE\nSection 1 Scope", "ARTICLE II: ELIGIBILITY\n2.1 Age\nage 18", "2.2 Income\nSection 3 Limits"]
+    text = '\n'.join(pages)
+    offsets = [0, len(pages[0]) + 1, len(pages[0]) + len(pages[1]) + 2]
+    rules = [{"clause_reference": "Art II", "page_number": 9, "dependencies": [
+        {"clause_reference": "Art II, Sec 2.2", "page_number": 9},
+        {"clause_reference": "Appendix Z", "page_number": 9}]}]
+    resolved = resolve_page_numbers(rules, text, offsets)
+    pages_found = [rules[0]["page_number"]] + [r["page_number"] for r in rules[0]["dependencies"]]
+    if resolved != 2 or pages_found != [2, 3, 9] or page_number_at(offsets, clause_offset(text, "Section 3")) != 3:
+        print(f"✗ Page lookup failed: {resolved} resolved, pages {pages_found}")
+        return False
+    print("✓ Clause references resolved to pages")
+
+    print("\n" + "=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    success = test_document_index()
+    sys.exit(0 if success else 1)
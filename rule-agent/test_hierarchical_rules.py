@@ -99,7 +99,8 @@ def test_hierarchical_rules():
     try:
         retrieved_rules = db_service.get_hierarchical_rules(
             bank_id=bank_id,
-            policy_type_id=policy_type_id
+            policy_type_id=policy_type_id,
+            use_primary=True
         )
         print(f"✓ Successfully retrieved {len(retrieved_rules)} top-level rules")
 
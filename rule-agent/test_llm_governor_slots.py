@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the cross-process LLM slots of LLMGovernor (LLM_GOVERNOR_LOCK_DIR)
+Batch calls of another process must leave the interactive slots free; needs fcntl (Linux/macOS)
+"""
+import sys
+import os
+import multiprocessing
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from LLMGovernor import PRIORITY_BATCH, PRIORITY_INTERACTIVE, _SharedSlots
+
+SLOTS = 3
+RESERVED = 1
+
+
+def hold_batch_slots(lock_dir, count, ready, done):
+    """Worker process: take every batch slot it can get and hold them until told to stop"""
+    slots = _SharedSlots(lock_dir, "TEST", SLOTS, RESERVED)
+    held = [slots.acquire(PRIORITY_BATCH, timeout=5) for _ in range(count)]
+    ready.put(sum(1 for fd in held if fd is not None))
+    done.wait(30)
+    for fd in held:
+        if fd is not None:
+            slots.release(fd)
+
+
+def test_llm_governor_slots():
+    print("=" * 60)
+    print("Testing cross-process LLM slot priority")
+    print("=" * 60)
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as lock_dir:
+        ready, done = context.Queue(), context.Event()
+        worker = context.Process(target=hold_batch_slots, args=(lock_dir, SLOTS - RESERVED, ready, done))
+        worker.start()
+        try:
+            held = ready.get(timeout=30)
+            if held != SLOTS - RESERVED:
+                print(f"✗ Worker process holds {held} batch slots, expected {SLOTS - RESERVED}")
+                return False
+            print(f"✓ Worker process holds all {held} batch slots")
+
+            slots = _SharedSlots(lock_dir, "TEST", SLOTS, RESERVED)
+            if slots.acquire(PRIORITY_BATCH, timeout=0.3) is not None:
+                print("✗ A batch call took a slot reserved for interactive calls")
+                return False
+            print("✓ Batch call waits while the other process holds the batch slots")
+
+            started = time.monotonic()
+            fd = slots.acquire(PRIORITY_INTERACTIVE, timeout=1)
+            if fd is None:
+                print("✗ Interactive call found no free slot")
+                return False
+            print(f"✓ Interactive call admitted in {(time.monotonic() - started) * 1000:.0f} ms")
+            slots.release(fd)
+
+            done.set()
+            worker.join(10)
+            fd = slots.acquire(PRIORITY_BATCH, timeout=5)
+            if fd is None:
+                print("✗ Batch slot not free after the other process released it")
+                return False
+            slots.release(fd)
+            print("✓ Batch call admitted once the other process released its slots")
+        finally:
+            done.set()
+            worker.join(10)
+
+    print("\n" + "=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    success = test_llm_governor_slots()
+    sys.exit(0 if success else 1)
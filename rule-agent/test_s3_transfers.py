@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed S3 uploads and downloads
+Runs against moto's in-process S3 stand-in (pip install "moto[s3]"), so no AWS account is needed
+"""
+import sys
+import os
+import hashlib
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_REGION": "us-east-1",
+    "AWS_S3_BUCKET": "uw-transfer-test",
+    "S3_MULTIPART_THRESHOLD_MB": "5", "S3_MULTIPART_PART_SIZE_MB": "5", "S3_TRANSFER_CONCURRENCY": "2",
+    "S3_SPOOL_MAX_MEMORY_MB": "1"
+})
+
+import boto3
+from moto import mock_aws
+
+MB = 1024 * 1024
+FILE_SIZE = 17 * MB
+PATTERN = bytes(range(251))
+
+
+class GeneratedUpload:
+    """
+    Non-seekable request-like stream that produces its content on demand
+
+    Records the largest single read, i.e. how much of the upload the transfer manager asks for at once.
+    """
+
+    def __init__(self, size):
+        self.remaining = size
+        self.digest = hashlib.sha256()
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.remaining
+        size = min(size, self.remaining)
+        self.largest_read = max(self.largest_read, size)
+        chunk = (PATTERN * (size // len(PATTERN) + 1))[:size]
+        self.remaining -= size
+        self.digest.update(chunk)
+        return chunk
+
+
+def test_s3_transfers():
+    print("=" * 60)
+    print("Testing streamed S3 transfers")
+    print("=" * 60)
+
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="uw-transfer-test")
+
+        from S3Service import S3Service
+        from DocumentExtractor import DocumentExtractor
+        service = S3Service()
+
+        # Streamed multipart upload from a non-seekable stream
+        upload = GeneratedUpload(FILE_SIZE)
+        result = service.upload_file_to_s3(upload, "large policy.pdf", folder="uploads")
+        if result.get("status") != "success":
+            print(f"✗ Upload failed: {result}")
+            return False
+        head = service.s3_client.head_object(Bucket=service.bucket_name, Key=result["s3_key"])
+        parts = head["ETag"].strip('"').rsplit("-", 1)
+        if result["file_size"] != FILE_SIZE or head["ContentLength"] != FILE_SIZE or len(parts) != 2:
+            print(f"✗ Expected a {FILE_SIZE} byte multipart object, got {result['file_size']} bytes, ETag {head['ETag']}")
+            return False
+        if head["Metadata"].get("original-filename") != "large_policy.pdf" or head["ContentType"] != "application/pdf":
+            print(f"✗ Metadata not preserved: {head['Metadata']}, {head['ContentType']}")
+            return False
+        print(f"✓ {FILE_SIZE // MB} MB uploaded in {parts[1]} parts, metadata kept")
+
+        if upload.largest_read > 5 * MB:
+            print(f"✗ Upload read {upload.largest_read} bytes at once (part size 5 MB)")
+            return False
+        print(f"✓ Upload stream read at most {upload.largest_read // MB} MB at a time")
+
+        # Bytes are still accepted
+        small = service.upload_file_to_s3(b"age >= 18", "rules.drl", folder="generated-rules")
+        if small.get("status") != "success" or small["file_size"] != 9:
+            print(f"✗ Bytes upload failed: {small}")
+            return False
+        print("✓ Bytes upload")
+
+        # Ranged download into a spooled file that rolls over to disk
+        spooled = service.download_to_spool(result["s3_key"])
+        with spooled:
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: spooled.read(MB), b""):
+                digest.update(chunk)
+            rolled = spooled._rolled
+        if digest.hexdigest() != upload.digest.hexdigest():
+            print("✗ Downloaded content differs from the upload")
+            return False
+        if not rolled:
+            print("✗ Large download stayed in memory")
+            return False
+        print("✓ Download identical, spooled to disk")
+
+        # Failed uploads report the S3 error code, for streamed and file uploads
+        missing_bucket = S3Service()
+        missing_bucket.bucket_name = "uw-missing-bucket"
+        failed = missing_bucket.upload_file_to_s3(GeneratedUpload(FILE_SIZE), "policy.pdf")
+        if failed.get("status") != "error" or failed.get("error_code") != "NoSuchBucket":
+            print(f"✗ Streamed upload to a missing bucket: {failed}")
+            return False
+        with tempfile.NamedTemporaryFile(suffix=".jar") as jar:
+            jar.write(b"PK")
+            jar.flush()
+            failed_jar = missing_bucket.upload_jar_to_s3(jar.name, "chase-insurance", "1.0.0")
+        if failed_jar.get("status") != "error" or failed_jar.get("error_code") != "NoSuchBucket":
+            print(f"✗ File upload to a missing bucket: {failed_jar}")
+            return False
+        print("✓ Failed uploads report NoSuchBucket")
+
+        if service.download_to_spool("uploads/missing.pdf") is not None:
+            print("✗ Missing object should return None")
+            return False
+        print("✓ Missing object returns None")
+
+        # Document extraction downloads through the transfer manager
+        service.s3_client.put_object(Bucket=service.bucket_name, Key="policies/policy.txt",
+                                     Body="ARTICLE I: ELIGIBILITY\nApplicants must be 18 or older.".encode())
+        extracted = DocumentExtractor().extract_text_from_s3(f"s3://{service.bucket_name}/policies/policy.txt")
+        if extracted.get("format") != "text" or "18 or older" not in extracted.get("text", ""):
+            print(f"✗ Extraction from S3 failed: {extracted}")
+            return False
+        print("✓ Text extracted from S3")
+
+    print("\n" + "=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    success = test_s3_transfers()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental JSON parser of streamed LLM answers
+Feeds answers in small chunks, as a provider stream would, without an LLM
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from StreamingJSON import IncrementalJSONParser, stream_json
+
+
+def parse_streamed(text, chunk_size=3, **kwargs):
+    parser = IncrementalJSONParser(**kwargs)
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    return parser
+
+
+class ScriptedLLM:
+    """Streams a fixed answer per call and records the prompts whose cached answer was discarded"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+        self.discarded = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        answer = self.answers.pop(0)
+        for i in range(0, len(answer), 5):
+            yield answer[i:i + 5]
+
+    def discard_response(self, prompt):
+        self.discarded.append(prompt)
+
+
+def test_streaming_json():
+    print("=" * 60)
+    print("Testing incremental JSON parsing of streamed answers")
+    print("=" * 60)
+
+    # Brackets in the prose before the fenced JSON
+    answers = [
+        ('Here are the rules [as requested]:\n```json\n[{"a": 1}]\n```', [{"a": 1}]),
+        ('Rules (see [1) below:\n```json\n[{"a": 1}, {"b": [2]}]\n```', [{"a": 1}, {"b": [2]}]),
+        ('Note {x} and [y]: [{"id": "1.1", "name": "Age [18+]"}]', [{"id": "1.1", "name": "Age [18+]"}]),
+        ('[{"note": "uses `code` in a string"}]', [{"note": "uses `code` in a string"}])
+    ]
+    for text, expected in answers:
+        parser = parse_streamed(text)
+        if not parser.complete or parser.value() != expected:
+            print(f"✗ {text!r}: expected {expected}, got complete={parser.complete}, text={parser.text()!r}")
+            return False
+        if [element for _, element in parser.elements] != expected:
+            print(f"✗ {text!r}: elements {parser.elements}")
+            return False
+    print(f"✓ {len(answers)} answers with brackets or fences in the prose parsed")
+
+    # Elements of a top-level object reported by key
+    parser = parse_streamed('{"applicant_fields": [{"field_name": "age"}], "policy_fields": [{"field_name": "term"}]}',
+                            element_depth=2)
+    if parser.elements != [("applicant_fields", {"field_name": "age"}), ("policy_fields", {"field_name": "term"})]:
+        print(f"✗ Nested elements: {parser.elements}")
+        return False
+    print("✓ Nested array elements reported with their key")
+
+    # Cut-off answer continued from the last complete element
+    os.environ["LLM_STREAMING"] = "true"
+    llm = ScriptedLLM('Sure [see below]:\n```json\n[{"id": 1}, {"id": 2}, {"id"', '```json\n, {"id": 3}]\n```')
+    value = stream_json(llm, "prompt", IncrementalJSONParser(), label="Test", max_continuations=1)
+    if value != [{"id": 1}, {"id": 2}, {"id": 3}]:
+        print(f"✗ Continuation: {value}")
+        return False
+    print("✓ Cut-off answer continued")
+
+    # Continuation restarting inside an element: complete, but not JSON
+    llm = ScriptedLLM('```json\n[{"id": 1}, {"id": 2}, {"id"', '"id": 3}]')
+    try:
+        stream_json(llm, "prompt", IncrementalJSONParser(), label="Test", max_continuations=1)
+        print("✗ Continuation that does not parse should raise")
+        return False
+    except ValueError:
+        pass
+    if llm.discarded != llm.prompts or len(llm.prompts) != 2:
+        print(f"✗ Expected both requests discarded, discarded {len(llm.discarded)} of {len(llm.prompts)}")
+        return False
+    print("✓ Unparseable continuation raises ValueError, original and continuation discarded")
+
+    try:
+        stream_json(ScriptedLLM("No rules apply [none found]."), "prompt", label="Test", max_continuations=0)
+        print("✗ Prose without JSON should raise")
+        return False
+    except ValueError:
+        print("✓ Prose without JSON raises ValueError")
+
+    print("\n" + "=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    success = test_streaming_json()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent Textract batch processing
+Uses a local stub Textract client, so no AWS credentials are needed
+"""
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from TextractService import TextractService, normalize_query
+
+
+class ThrottlingError(Exception):
+    def __init__(self):
+        super().__init__("Rate exceeded")
+        self.response = {'Error': {'Code': 'ProvisionedThroughputExceededException'}}
+
+
+class StubTextractClient:
+    """
+    In-memory stand-in for the boto3 Textract client
+
+    Each job succeeds job_seconds after it starts and returns one answer per query, split over
+    two result pages. Job start calls are throttled a given number of times.
+    """
+
+    def __init__(self, job_seconds=0.3, throttle_starts=1, fail_batch_with_query=None):
+        self.job_seconds = job_seconds
+        self.throttle_starts = throttle_starts
+        self.fail_batch_with_query = fail_batch_with_query
+        self.jobs = {}
+        self.poll_count = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _running(self, now):
+        return sum(1 for job in self.jobs.values() if now < job["done_at"])
+
+    def start_document_analysis(self, DocumentLocation, FeatureTypes, QueriesConfig):
+        with self._lock:
+            if self.throttle_starts > 0:
+                self.throttle_starts -= 1
+                raise ThrottlingError()
+            job_id = f"job-{len(self.jobs) + 1}"
+            now = time.monotonic()
+            self.jobs[job_id] = {"queries": QueriesConfig['Queries'], "done_at": now + self.job_seconds}
+            self.max_running = max(self.max_running, self._running(now))
+            return {'JobId': job_id}
+
+    def get_document_analysis(self, JobId, NextToken=None):
+        with self._lock:
+            self.poll_count += 1
+            job = self.jobs[JobId]
+            if time.monotonic() < job["done_at"]:
+                return {'JobStatus': 'IN_PROGRESS'}
+            if self.fail_batch_with_query and any(q['Text'] == self.fail_batch_with_query for q in job["queries"]):
+                return {'JobStatus': 'FAILED', 'StatusMessage': 'Stub failure'}
+
+            blocks = []
+            for query in job["queries"]:
+                result_id = f"{JobId}-{query['Alias']}-result"
+                blocks.append({'BlockType': 'QUERY', 'Id': f"{JobId}-{query['Alias']}",
+                               'Query': {'Text': query['Text'], 'Alias': query['Alias']},
+                               'Relationships': [{'Type': 'ANSWER', 'Ids': [result_id]}]})
+                blocks.append({'BlockType': 'QUERY_RESULT', 'Id': result_id,
+                               'Text': f"answer to {query['Text']}", 'Confidence': 95.0})
+
+            # Two result pages; QUERY blocks on the first, QUERY_RESULT blocks on the second
+            if NextToken is None:
+                return {'JobStatus': 'SUCCEEDED', 'Blocks': blocks[0::2], 'NextToken': 'page-2',
+                        'DocumentMetadata': {'Pages': 3}}
+            return {'JobStatus': 'SUCCEEDED', 'Blocks': blocks[1::2], 'DocumentMetadata': {'Pages': 3}}
+
+
+class InMemoryAnswerCache:
+    """Dict-backed stand-in for TextractAnswerCache"""
+
+    def __init__(self):
+        self.answers = {}
+
+    def lookup(self, document_hash, queries):
+        return {q: dict(self.answers[(document_hash, normalize_query(q))], cached=True)
+                for q in queries if (document_hash, normalize_query(q)) in self.answers}
+
+    def store(self, document_hash, query_results):
+        for query, data in query_results.items():
+            if data.get('answer'):
+                self.answers[(document_hash, normalize_query(query))] = {
+                    'answer': data['answer'], 'confidence': data.get('confidence'), 'page': data.get('page')}
+
+
+def make_service(client, answer_cache=None):
+    service = TextractService(textract_client=client, answer_cache=answer_cache)
+    service.max_concurrent_jobs = 3
+    service.poll_initial_seconds = 0.05
+    service.poll_max_seconds = 0.2
+    service.job_timeout_seconds = 10
+    return service
+
+
+def test_textract_batches():
+    print("=" * 60)
+    print("Testing concurrent Textract batch processing")
+    print("=" * 60)
+
+    queries = [f"What is the limit for item {i}?" for i in range(95)]  # 4 batches: 30, 30, 30, 5
+
+    # Test 1: all batches run concurrently within the job limit and every answer is merged
+    print("\n[1] Running 95 queries (4 batches, 3 concurrent jobs)...")
+    client = StubTextractClient(job_seconds=0.3)
+    service = make_service(client)
+    start = time.monotonic()
+    result = service.analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=queries)
+    elapsed = time.monotonic() - start
+
+    if len(result.get("queries", {})) != len(queries):
+        print(f"✗ Expected {len(queries)} answers, got {len(result.get('queries', {}))}")
+        return False
+    print(f"✓ All {len(queries)} queries answered")
+
+    if list(result["queries"].keys()) != queries:
+        print("✗ Answers are not in query order")
+        return False
+    print("✓ Answers merged in query order")
+
+    if result["queries"][queries[42]]["answer"] != f"answer to {queries[42]}":
+        print(f"✗ Wrong answer mapping: {result['queries'][queries[42]]}")
+        return False
+    print("✓ Answers mapped to the right queries across result pages")
+
+    if client.max_running > service.max_concurrent_jobs:
+        print(f"✗ {client.max_running} jobs ran at once (limit {service.max_concurrent_jobs})")
+        return False
+    print(f"✓ At most {client.max_running} jobs ran at once")
+
+    # Sequential processing would take at least 4 x 0.3s
+    if elapsed >= 4 * client.job_seconds:
+        print(f"✗ Batches did not overlap ({elapsed:.2f}s)")
+        return False
+    print(f"✓ Batches overlapped ({elapsed:.2f}s for 4 jobs of {client.job_seconds}s)")
+
+    # Test 2: a failed batch does not discard the answers of the others
+    print("\n[2] Running with one failing batch...")
+    client = StubTextractClient(job_seconds=0.1, throttle_starts=0, fail_batch_with_query=queries[31])
+    result = make_service(client).analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=queries)
+    if result["metadata"].get("failed_batches") != [2] or len(result["queries"]) != len(queries) - 30:
+        print(f"✗ Unexpected result: failed={result['metadata'].get('failed_batches')}, "
+              f"answers={len(result['queries'])}")
+        return False
+    print("✓ Failed batch reported, other batches merged")
+
+    # Test 3: single batch keeps the per-job result format
+    print("\n[3] Running a single batch...")
+    client = StubTextractClient(job_seconds=0.1, throttle_starts=0)
+    result = make_service(client).analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=queries[:10])
+    if len(result.get("queries", {})) != 10 or "document_metadata" not in result.get("metadata", {}):
+        print(f"✗ Unexpected single batch result: {result.get('metadata')}")
+        return False
+    print("✓ Single batch result unchanged")
+
+    # Test 4: answers cached per document are not asked again
+    print("\n[4] Re-running with a changed query list and an answer cache...")
+    answer_cache = InMemoryAnswerCache()
+    client = StubTextractClient(job_seconds=0.05, throttle_starts=0)
+    service = make_service(client, answer_cache)
+    service.analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=queries[:40], document_hash="doc-1")
+    jobs_before = len(client.jobs)
+
+    revised = [q.upper() for q in queries[:35]] + [f"What is the deductible for plan {i}?" for i in range(5)]
+    result = service.analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=revised, document_hash="doc-1")
+    submitted = [q['Text'] for job in list(client.jobs.values())[jobs_before:] for q in job["queries"]]
+    if sorted(submitted) != sorted(revised[35:]):
+        print(f"✗ Expected only the 5 new queries to be submitted, got {len(submitted)}")
+        return False
+    print("✓ Only uncached queries were submitted")
+
+    if list(result["queries"].keys()) != revised or result["metadata"].get("cached_queries") != 35:
+        print(f"✗ Unexpected merged result: {result['metadata']}")
+        return False
+    print("✓ Cached and new answers merged in query order")
+
+    other = service.analyze_document(s3_bucket="bucket", s3_key="policy.pdf", queries=queries[:5], document_hash="doc-2")
+    if other.get("metadata", {}).get("cached_queries"):
+        print("✗ Answers leaked across documents")
+        return False
+    print("✓ Cache is keyed by document hash")
+
+    print("\n" + "=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    success = test_textract_batches()
+    sys.exit(0 if success else 1)